@@ -2,6 +2,7 @@
 
 import argparse
 import datetime
+import functools
 import ipaddress
 import io
 import json
@@ -17,6 +18,7 @@ import sys
 import tempfile
 import time
 import errno
+import hashlib
 import ssl
 from typing import Dict, List, Tuple, Optional, Union, Any, Callable, Sequence, TypeVar, cast
 
@@ -80,6 +82,8 @@ from cephadmlib.call_wrappers import (
     call_throws,
     call_timeout,
     concurrent_tasks,
+    log_call_timings,
+    run_concurrently,
 )
 from cephadmlib.container_engines import (
     Podman,
@@ -1449,6 +1453,8 @@ class CephadmAgent(DaemonForm):
         self.recent_iteration_run_times: List[float] = [0.0, 0.0, 0.0]
         self.recent_iteration_index: int = 0
         self.cached_ls_values: Dict[str, Dict[str, str]] = {}
+        # hashes of the metadata sections the mgr holds for this host
+        self.mgr_hashes: Dict[str, str] = {}
         self.ssl_ctx = ssl.create_default_context()
         self.ssl_ctx.check_hostname = True
         self.ssl_ctx.verify_mode = ssl.CERT_REQUIRED
@@ -1569,6 +1575,7 @@ class CephadmAgent(DaemonForm):
         if not self.volume_gatherer.is_alive():
             self.volume_gatherer.start()
 
+        resent = False
         while not self.stop:
             start_time = time.monotonic()
             ack = self.ack
@@ -1582,17 +1589,27 @@ class CephadmAgent(DaemonForm):
                 for k, v in networks[key].items():
                     networks_list[key][k] = list(v)
 
-            data = json.dumps({'host': self.host,
-                               'ls': (self.ls_gatherer.data if self.ack == self.ls_gatherer.ack
-                                      and self.ls_gatherer.data is not None else []),
-                               'networks': networks_list,
-                               'facts': HostFacts(self.ctx).dump(),
-                               'volume': (self.volume_gatherer.data if self.ack == self.volume_gatherer.ack
-                                          and self.volume_gatherer.data is not None else ''),
-                               'ack': str(ack),
-                               'keyring': self.keyring,
-                               'port': self.listener_port})
-            data = data.encode('ascii')
+            sections: Dict[str, Any] = {'networks': networks_list}
+            if self.ack == self.ls_gatherer.ack and self.ls_gatherer.data is not None:
+                sections['ls'] = self.ls_gatherer.data
+            if self.ack == self.volume_gatherer.ack and self.volume_gatherer.data is not None:
+                sections['volume'] = self.volume_gatherer.data
+            hashes = {name: self._section_hash(section) for name, section in sections.items()}
+            facts = HostFacts(self.ctx, os.path.join(self.ctx.data_dir, HOST_FACTS_FILE)).dump_delta(
+                self.mgr_hashes.get('facts'))
+            hashes['facts'] = json.loads(facts)['version']
+
+            payload: Dict[str, Any] = {'host': self.host,
+                                       'facts': facts,
+                                       'hashes': hashes,
+                                       'ack': str(ack),
+                                       'keyring': self.keyring,
+                                       'port': self.listener_port}
+            # only send the sections the mgr doesn't hold yet
+            for name, section in sections.items():
+                if self.mgr_hashes.get(name) != hashes[name]:
+                    payload[name] = section
+            data = json.dumps(payload).encode('ascii')
 
             try:
                 send_time = time.monotonic()
@@ -1607,7 +1624,17 @@ class CephadmAgent(DaemonForm):
                 response_json = json.loads(response)
                 total_request_time = datetime.timedelta(seconds=(time.monotonic() - send_time)).total_seconds()
                 logger.info(f'Received mgr response: "{response_json["result"]}" {total_request_time} seconds after sending request.')
+                self.mgr_hashes = response_json.get('hashes', {})
+                # the mgr may have lost sections we left out (e.g. after a
+                # failover), send them again right away, but only once
+                if not resent and any(self.mgr_hashes.get(name) != digest for name, digest in hashes.items()):
+                    logger.info('mgr is missing some of the metadata. Sending all of it again')
+                    resent = True
+                    self.wakeup()
+                else:
+                    resent = False
             except Exception as e:
+                self.mgr_hashes = {}
                 logger.error(f'Failed to send metadata to mgr: {e}')
 
             end_time = time.monotonic()
@@ -1619,6 +1646,10 @@ class CephadmAgent(DaemonForm):
             self.event.wait(max(self.loop_interval - int(run_time_average), 0))
             self.event.clear()
 
+    @staticmethod
+    def _section_hash(section: Any) -> str:
+        return hashlib.sha256(json.dumps(section, sort_keys=True).encode('utf-8')).hexdigest()
+
     def _ceph_volume(self, enhanced: bool = False) -> Tuple[str, bool]:
         self.ctx.command = 'inventory --format=json'.split()
         if enhanced:
@@ -3430,6 +3461,12 @@ def command_ls(ctx):
     print(json.dumps(ls, indent=4))
 
 
+# the output of get_container_stats()
+CONTAINER_STATS_FORMAT = '{{.Id}},{{.Config.Image}},{{.Image}},{{.Created}},{{index .Config.Labels "io.ceph.version"}}'
+# software versions of the container images, by image id, under the data dir
+IMAGE_VERSIONS_FILE = 'cephadm-image-versions.json'
+
+
 def list_daemons(
     ctx: CephadmContext,
     detail: bool = True,
@@ -3453,19 +3490,54 @@ def list_daemons(
     # keep track of memory and cpu usage we've seen
     seen_memusage = {}  # type: Dict[str, int]
     seen_cpuperc = {}  # type: Dict[str, str]
-    out, err, code = call(
-        ctx,
-        [container_path, 'stats', '--format', '{{.ID}},{{.MemUsage}}', '--no-stream'],
-        verbosity=CallVerbosity.QUIET
-    )
-    seen_memusage_cid_len, seen_memusage = _parse_mem_usage(code, out)
+    seen_memusage_cid_len = seen_cpuperc_cid_len = 0
 
-    out, err, code = call(
-        ctx,
-        [container_path, 'stats', '--format', '{{.ID}},{{.CPUPerc}}', '--no-stream'],
-        verbosity=CallVerbosity.QUIET
-    )
-    seen_cpuperc_cid_len, seen_cpuperc = _parse_cpu_perc(code, out)
+    # the output of get_container_stats() for all containers, if they could
+    # be inspected at once
+    container_stats = None  # type: Optional[Dict[str, str]]
+
+    # the check_unit() result of each systemd unit
+    unit_states = {}  # type: Dict[str, Tuple[bool, str, bool]]
+
+    if detail:
+        def container_usage() -> Tuple[str, str, int]:
+            return call(
+                ctx,
+                [container_path, 'stats', '--format', '{{.ID}},{{.MemUsage}},{{.CPUPerc}}', '--no-stream'],
+                verbosity=CallVerbosity.QUIET
+            )
+
+        def inspect_containers() -> Optional[Dict[str, str]]:
+            # when looking for a single daemon, inspecting it alone is cheaper
+            if not daemon_name and os.path.exists(data_dir):
+                return _inspect_containers(ctx, container_path)
+            return None
+
+        def get_unit_states() -> Dict[str, Tuple[bool, str, bool]]:
+            units = _list_daemon_units(data_dir, daemon_name)
+            return dict(zip(units, run_concurrently(
+                [functools.partial(check_unit, ctx, u) for u in units])))
+
+        # none of these depend on each other, the container engine and
+        # systemd are queried at once
+        (out, err, code), container_stats, unit_states = run_concurrently(
+            [container_usage, inspect_containers, get_unit_states])
+        mem_lines, cpu_lines = [], []
+        if not code:
+            for line in out.splitlines():
+                cid, _, usage = line.partition(',')
+                (mem, _, cpu) = usage.rpartition(',')
+                mem_lines.append(f'{cid},{mem}')
+                cpu_lines.append(f'{cid},{cpu}')
+        seen_memusage_cid_len, seen_memusage = _parse_mem_usage(code, '\n'.join(mem_lines))
+        seen_cpuperc_cid_len, seen_cpuperc = _parse_cpu_perc(code, '\n'.join(cpu_lines))
+
+        if container_stats:
+            seen_digests = _inspect_image_digests(
+                ctx, container_path,
+                [stats.split(',')[2] for stats in container_stats.values()])
+        seen_versions.update(_load_image_versions(data_dir))
+    cached_versions = dict(seen_versions)
 
     # /var/lib/ceph
     if os.path.exists(data_dir):
@@ -3487,7 +3559,7 @@ def list_daemons(
                         'systemd_unit': legacy_unit_name,
                     }
                     if detail:
-                        (val['enabled'], val['state'], _) = check_unit(ctx, legacy_unit_name)
+                        (val['enabled'], val['state'], _) = unit_states.get(legacy_unit_name) or check_unit(ctx, legacy_unit_name)
                         if not host_version:
                             try:
                                 out, err, code = call(ctx,
@@ -3520,7 +3592,7 @@ def list_daemons(
                     }
                     if detail:
                         # get container id
-                        (val['enabled'], val['state'], _) = check_unit(ctx, unit_name)
+                        (val['enabled'], val['state'], _) = unit_states.get(unit_name) or check_unit(ctx, unit_name)
                         container_id = None
                         image_name = None
                         image_id = None
@@ -3528,7 +3600,8 @@ def list_daemons(
                         version = None
                         start_stamp = None
 
-                        out, err, code = get_container_stats(ctx, container_path, fsid, daemon_type, daemon_id)
+                        out, err, code = get_container_stats(ctx, container_path, fsid, daemon_type, daemon_id,
+                                                             container_stats=container_stats)
                         if not code:
                             (container_id, image_name, image_id, start,
                              version) = out.strip().split(',')
@@ -3661,9 +3734,115 @@ def list_daemons(
                             os.path.join(data_dir, fsid, j, 'unit.configured'))
                     ls.append(val)
 
+    if detail:
+        # forget about the images no daemon uses anymore
+        in_use = set(d.get('container_image_id') for d in ls)
+        versions = {
+            image_id: version for image_id, version in seen_versions.items()
+            if version and (daemon_name or image_id in in_use)
+        }
+        if versions != cached_versions:
+            _save_image_versions(data_dir, versions)
+
     return ls
 
 
+def _list_daemon_units(data_dir: str, daemon_name: Optional[str] = None) -> List[str]:
+    """
+    The systemd units of the daemons list_daemons() lists.
+    """
+    units = []  # type: List[str]
+    if not os.path.exists(data_dir):
+        return units
+    for i in os.listdir(data_dir):
+        if i in ['mon', 'osd', 'mds', 'mgr', 'rgw']:
+            for j in os.listdir(os.path.join(data_dir, i)):
+                if '-' in j:
+                    units.append('ceph-%s@%s' % (i, j.split('-', 1)[1]))
+        elif is_fsid(i):
+            for j in os.listdir(os.path.join(data_dir, i)):
+                if '.' in j and os.path.isdir(os.path.join(data_dir, i, j)):
+                    if daemon_name and j != daemon_name:
+                        continue
+                    (daemon_type, daemon_id) = j.split('.', 1)
+                    units.append(get_unit_name(i, daemon_type, daemon_id))
+    return units
+
+
+def _inspect_containers(ctx: CephadmContext, container_path: str) -> Optional[Dict[str, str]]:
+    """
+    Inspect all the containers with a single call, rather than one per daemon.
+    Returns the get_container_stats() output by container name, or None if the
+    containers could not be inspected.
+    """
+    out, err, code = call(ctx, [container_path, 'ps', '-a', '-q', '--no-trunc'],
+                          verbosity=CallVerbosity.QUIET)
+    if code:
+        return None
+    container_ids = out.split()
+    if not container_ids:
+        return {}
+    out, err, code = call(
+        ctx,
+        [container_path, 'inspect', '--format', '{{.Name}},' + CONTAINER_STATS_FORMAT] + container_ids,
+        verbosity=CallVerbosity.QUIET)
+    if code:
+        # e.g. a container went away in the meantime
+        logger.debug('unable to inspect all containers: %s' % err)
+        return None
+    container_stats = {}
+    for line in out.splitlines():
+        (name, _, stats) = line.partition(',')
+        # docker prefixes the names with a /
+        container_stats[name.lstrip('/')] = stats
+    return container_stats
+
+
+def _inspect_image_digests(ctx: CephadmContext, container_path: str, image_ids: List[str]) -> Dict[str, List[str]]:
+    """
+    Get the digests of the given images with a single call, by image id.
+    """
+    image_ids = sorted(set(image_ids))
+    if not image_ids:
+        return {}
+    out, err, code = call(
+        ctx,
+        [container_path, 'image', 'inspect', '--format', '{{.Id}},{{.RepoDigests}}'] + image_ids,
+        verbosity=CallVerbosity.QUIET)
+    if code:
+        return {}
+    digests = {}
+    for line in out.splitlines():
+        (image_id, _, repo_digests) = line.partition(',')
+        digests[normalize_container_id(image_id)] = list(set(map(
+            normalize_image_digest,
+            repo_digests.strip()[1:-1].split(' '))))
+    return digests
+
+
+def _load_image_versions(data_dir: str) -> Dict[str, Optional[str]]:
+    """
+    Load the software versions found in the images during previous runs, by
+    image id. An image id is the digest of the image, so they never go stale.
+    """
+    try:
+        with open(os.path.join(data_dir, IMAGE_VERSIONS_FILE), 'r') as f:
+            versions = json.load(f)
+        if isinstance(versions, dict):
+            return versions
+    except (IOError, ValueError):
+        pass
+    return {}
+
+
+def _save_image_versions(data_dir: str, versions: Dict[str, str]) -> None:
+    try:
+        with write_new(os.path.join(data_dir, IMAGE_VERSIONS_FILE)) as f:
+            json.dump(versions, f)
+    except OSError as e:
+        logger.debug('unable to save image versions: %s' % e)
+
+
 def _parse_mem_usage(code: int, out: str) -> Tuple[int, Dict[str, int]]:
     # keep track of memory usage we've seen
     seen_memusage = {}  # type: Dict[str, int]
@@ -3710,16 +3889,23 @@ def get_daemon_description(ctx, fsid, name, detail=False, legacy_dir=None):
     raise Error('Daemon not found: {}. See `cephadm ls`'.format(name))
 
 
-def get_container_stats(ctx: CephadmContext, container_path: str, fsid: str, daemon_type: str, daemon_id: str) -> Tuple[str, str, int]:
+def get_container_stats(ctx: CephadmContext, container_path: str, fsid: str, daemon_type: str, daemon_id: str,
+                        container_stats: Optional[Dict[str, str]] = None) -> Tuple[str, str, int]:
     """returns container id, image name, image id, created time, and ceph version if available"""
     c = CephContainer.for_daemon(
         ctx, DaemonIdentity(fsid, daemon_type, daemon_id), 'bash'
     )
     out, err, code = '', '', -1
+    if container_stats is not None:
+        # all containers were inspected already (see _inspect_containers)
+        for name in (c.cname, c.old_cname):
+            if name in container_stats:
+                return container_stats[name], '', 0
+        return out, err, code
     for name in (c.cname, c.old_cname):
         cmd = [
             container_path, 'inspect',
-            '--format', '{{.Id}},{{.Config.Image}},{{.Image}},{{.Created}},{{index .Config.Labels "io.ceph.version"}}',
+            '--format', CONTAINER_STATS_FORMAT,
             name
         ]
         out, err, code = call(ctx, cmd, verbosity=CallVerbosity.QUIET)
@@ -4682,10 +4868,19 @@ def command_rescan_disks(ctx: CephadmContext) -> str:
 ##################################
 
 
+HOST_FACTS_FILE = 'cephadm-host-facts.json'
+
+
 def command_gather_facts(ctx: CephadmContext) -> None:
     """gather_facts is intended to provide host related metadata to the caller"""
-    host = HostFacts(ctx)
-    print(host.dump())
+    cache_path = None
+    if not ctx.no_cache:
+        cache_path = os.path.join(ctx.data_dir, HOST_FACTS_FILE)
+    host = HostFacts(ctx, cache_path)
+    if ctx.since is not None or ctx.delta:
+        print(host.dump_delta(ctx.since))
+    else:
+        print(host.dump())
 
 
 ##################################
@@ -5514,6 +5709,18 @@ def _get_parser():
     parser_gather_facts = subparsers.add_parser(
         'gather-facts', help='gather and return host related information (JSON format)')
     parser_gather_facts.set_defaults(func=command_gather_facts)
+    parser_gather_facts.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='gather all facts again, ignoring and leaving the host facts cache alone')
+    parser_gather_facts.add_argument(
+        '--delta',
+        action='store_true',
+        help='return the facts along with their version, to be passed to --since on the next run')
+    parser_gather_facts.add_argument(
+        '--since',
+        metavar='VERSION',
+        help='only return the facts that changed since the given version was returned (implies --delta)')
 
     parser_maintenance = subparsers.add_parser(
         'host-maintenance', help='Manage the maintenance state of a host')
@@ -5619,6 +5826,9 @@ def main() -> None:
             raise
         logger.error('ERROR: %s' % e)
         sys.exit(1)
+    finally:
+        # where the time of the command went
+        log_call_timings()
     if not r:
         r = 0
     sys.exit(r)
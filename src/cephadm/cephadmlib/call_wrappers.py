@@ -2,13 +2,30 @@
 
 
 import asyncio
+import concurrent.futures
 import logging
 import os
 import subprocess
 import sys
+import threading
+import time
+import weakref
 
+from collections import defaultdict
 from enum import Enum
-from typing import Callable, List, Dict, Optional, Any, Tuple, NoReturn
+from typing import (
+    Any,
+    Callable,
+    Coroutine,
+    DefaultDict,
+    Dict,
+    List,
+    NoReturn,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 
 from .constants import QUIET_LOG_LEVEL, DEFAULT_TIMEOUT
 from .context import CephadmContext
@@ -16,6 +33,12 @@ from .exceptions import TimeoutExpired
 
 logger = logging.getLogger()
 
+T = TypeVar('T')
+
+# max number of commands running at once, whatever thread runs them, and
+# of operations run_concurrently() runs at once
+MAX_CONCURRENT_CALLS = 8
+
 
 async def run_func(func: Callable, cmd: str) -> subprocess.CompletedProcess:
     logger.debug(f'running function {func.__name__}, with parms: {cmd}')
@@ -81,7 +104,6 @@ class CallVerbosity(Enum):
 # from other code for compatibilty on older python versions
 if sys.version_info < (3, 8):  # pragma: no cover
     import itertools
-    import threading
     import warnings
     from asyncio import events
 
@@ -220,7 +242,129 @@ except ImportError:  # pragma: no cover
                 loop.close()
 
 
-def call(
+class _SharedEventLoop:
+    """The event loop all commands run on.
+
+    Rather than creating an event loop per command, a single loop is
+    started on first use, in a daemon thread, and runs for as long as the
+    process does. Commands may be submitted to it from any thread.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid = 0
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            # a forked child does not inherit the thread running the loop
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name='cephadm-event-loop',
+                    daemon=True,
+                )
+                self._thread.start()
+                self._pid = os.getpid()
+            return self._loop
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        loop = self._get_loop()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError('cannot wait for a coroutine on its own loop')
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+_shared_loop = _SharedEventLoop()
+
+
+def run_coroutine(coro: Coroutine[Any, Any, T]) -> T:
+    """Run a coroutine on the shared event loop and wait for its result."""
+    return _shared_loop.run(coro)
+
+
+_call_slots: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]' = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_call_slots() -> asyncio.Semaphore:
+    """The semaphore bounding the commands running on the current loop.
+
+    Operations run by run_concurrently() may themselves run commands
+    concurrently, so the bound is held by the loop running the commands
+    rather than by each run_concurrently() call.
+    """
+    loop = asyncio.get_event_loop()
+    slots = _call_slots.get(loop)
+    if slots is None:
+        slots = _call_slots[loop] = asyncio.Semaphore(MAX_CONCURRENT_CALLS)
+    return slots
+
+
+def run_concurrently(
+    funcs: Sequence[Callable[[], Any]],
+    max_workers: int = MAX_CONCURRENT_CALLS,
+) -> List[Any]:
+    """Run independent operations, e.g. ones running container engine,
+    systemctl or firewall-cmd commands through call(), at once. At most
+    max_workers of them run at the same time, and the commands they run
+    count towards the MAX_CONCURRENT_CALLS commands of the process.
+
+    Returns their results in order. If any of them raised, the first
+    exception, in order, is raised.
+    """
+    if len(funcs) <= 1:
+        return [func() for func in funcs]
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(max_workers, len(funcs))
+    ) as pool:
+        return list(pool.map(lambda func: func(), funcs))
+
+
+class _CallTimings:
+    """Wall time spent in commands, by kind of command."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._timings: DefaultDict[str, List[float]] = defaultdict(list)
+
+    @staticmethod
+    def kind(command: List[str]) -> str:
+        # e.g. 'podman inspect' or 'systemctl is-active'
+        args = [a for a in command[1:2] if not a.startswith('-')]
+        return ' '.join([os.path.basename(command[0])] + args)
+
+    def add(self, command: List[str], elapsed: float) -> None:
+        with self._lock:
+            self._timings[self.kind(command)].append(elapsed)
+
+    def log(self) -> None:
+        with self._lock:
+            timings = sorted(
+                self._timings.items(), key=lambda kv: -sum(kv[1])
+            )
+            self._timings.clear()
+        for kind, elapsed in timings:
+            logger.debug(
+                'call timings: %s: %d call(s), %.3fs total, %.3fs max'
+                % (kind, len(elapsed), sum(elapsed), max(elapsed))
+            )
+
+
+_call_timings = _CallTimings()
+
+
+def log_call_timings() -> None:
+    """Log the time spent in the commands run so far, by kind of command,
+    most expensive first, and start over.
+    """
+    _call_timings.log()
+
+
+async def async_call(
     ctx: CephadmContext,
     command: List[str],
     desc: Optional[str] = None,
@@ -229,13 +373,7 @@ def call(
     **kwargs: Any,
 ) -> Tuple[str, str, int]:
     """
-    Wrap subprocess.Popen to
-
-    - log stdout/stderr to a logger,
-    - decode utf-8
-    - cleanly return out, err, returncode
-
-    :param timeout: timeout in seconds
+    Run a command as an asyncio subprocess, see call().
     """
 
     prefix = command[0] if desc is None else desc
@@ -277,7 +415,15 @@ def call(
                 process.returncode,
             )
 
-    stdout, stderr, returncode = async_run(run_with_timeout())
+    async with _get_call_slots():
+        start = time.monotonic()
+        stdout, stderr, returncode = await run_with_timeout()
+        elapsed = time.monotonic() - start
+    _call_timings.add(command, elapsed)
+    logger.debug(
+        f'{_CallTimings.kind(command)}: exit code {returncode} '
+        f'after {elapsed:.3f}s'
+    )
     log_level = verbosity.success_log_level()
     if returncode != 0:
         log_level = verbosity.error_log_level()
@@ -292,6 +438,31 @@ def call(
     return stdout, stderr, returncode
 
 
+def call(
+    ctx: CephadmContext,
+    command: List[str],
+    desc: Optional[str] = None,
+    verbosity: CallVerbosity = CallVerbosity.VERBOSE_ON_FAILURE,
+    timeout: Optional[int] = DEFAULT_TIMEOUT,
+    **kwargs: Any,
+) -> Tuple[str, str, int]:
+    """
+    Wrap subprocess.Popen to
+
+    - log stdout/stderr to a logger,
+    - decode utf-8
+    - cleanly return out, err, returncode
+
+    The command runs on the shared event loop, so calls made from several
+    threads, e.g. by run_concurrently(), run at once.
+
+    :param timeout: timeout in seconds
+    """
+    return run_coroutine(
+        async_call(ctx, command, desc, verbosity, timeout, **kwargs)
+    )
+
+
 def call_throws(
     ctx: CephadmContext,
     command: List[str],
@@ -1,10 +1,16 @@
 # firewalld.py - functions and types for working with firewalld
 
+import functools
 import logging
 
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
-from .call_wrappers import call, call_throws, CallVerbosity
+from .call_wrappers import (
+    call,
+    call_throws,
+    run_concurrently,
+    CallVerbosity,
+)
 from .context import CephadmContext
 from .daemon_form import DaemonForm, FirewalledServiceDaemonForm
 from .exe_utils import find_executable
@@ -81,6 +87,22 @@ class Firewalld(object):
                 'firewalld service %s is enabled in current zone' % svc
             )
 
+    def _query_ports(self, fw_ports):
+        # type: (List[int]) -> List[Tuple[str, str, int]]
+        # the queries are independent, run them at once. Ports are still
+        # added and removed one after the other.
+        def query(port: int) -> Tuple[str, str, int]:
+            assert self.cmd
+            return call(
+                self.ctx,
+                [self.cmd, '--permanent', '--query-port', f'{port}/tcp'],
+                verbosity=CallVerbosity.DEBUG,
+            )
+
+        return run_concurrently(
+            [functools.partial(query, port) for port in fw_ports]
+        )
+
     def open_ports(self, fw_ports):
         # type: (List[int]) -> None
         if not self.available:
@@ -93,13 +115,9 @@ class Firewalld(object):
         if not self.cmd:
             raise RuntimeError('command not defined')
 
-        for port in fw_ports:
+        results = self._query_ports(fw_ports)
+        for port, (out, err, ret) in zip(fw_ports, results):
             tcp_port = str(port) + '/tcp'
-            out, err, ret = call(
-                self.ctx,
-                [self.cmd, '--permanent', '--query-port', tcp_port],
-                verbosity=CallVerbosity.DEBUG,
-            )
             if ret:
                 logger.info(
                     'Enabling firewalld port %s in current zone...' % tcp_port
@@ -130,13 +148,9 @@ class Firewalld(object):
         if not self.cmd:
             raise RuntimeError('command not defined')
 
-        for port in fw_ports:
+        results = self._query_ports(fw_ports)
+        for port, (out, err, ret) in zip(fw_ports, results):
             tcp_port = str(port) + '/tcp'
-            out, err, ret = call(
-                self.ctx,
-                [self.cmd, '--permanent', '--query-port', tcp_port],
-                verbosity=CallVerbosity.DEBUG,
-            )
             if not ret:
                 logger.info('Disabling port %s in current zone...' % tcp_port)
                 out, err, ret = call(
@@ -1,5 +1,6 @@
 # host_facts.py - classes/functions for gathering metadata on the host
 
+import hashlib
 import ipaddress
 import json
 import logging
@@ -12,13 +13,13 @@ import time
 from glob import glob
 from pathlib import Path
 
-from typing import Any, cast, Dict, List, Optional, Set, Union
+from typing import Any, Callable, cast, Dict, List, Optional, Set, Union
 
 from cephadmlib.call_wrappers import call, call_throws, CallVerbosity
 from cephadmlib.context import CephadmContext
 from cephadmlib.data_utils import bytes_to_human
 from cephadmlib.exe_utils import find_executable
-from cephadmlib.file_utils import read_file
+from cephadmlib.file_utils import read_file, write_new
 from cephadmlib.net_utils import get_fqdn, get_ipv4_address, get_ipv6_address
 
 logger = logging.getLogger()
@@ -114,14 +115,41 @@ class Enclosure:
 
 
 class HostFacts:
+    """Metadata of the host
+
+    The facts fall into three tiers:
+      - static facts (cpu, dmi) only change across a reboot
+      - slow changing facts (block devices, nics) only change with the
+        devices known to udev
+      - volatile facts (memory and cpu usage, ports, link state, enclosure
+        slots, ...) are read on every run
+
+    When a cache path is given, the static and slow changing tiers are kept
+    there and only gathered again once their key changed.
+    """
+
     _dmi_path_list = ['/sys/class/dmi/id']
+    _dmi_fields = (
+        'sys_vendor',
+        'product_family',
+        'product_name',
+        'bios_version',
+        'bios_date',
+        'chassis_serial',
+        'board_serial',
+        'product_serial',
+    )
     _nic_path_list = ['/sys/class/net']
     _apparmor_path_list = ['/etc/apparmor']
     _disk_vendor_workarounds = {'0x1af4': 'Virtio Block Device'}
     _excluded_block_devices = ('sr', 'zram', 'dm-', 'loop', 'md')
     _sg_generic_glob = '/sys/class/scsi_generic/*'
+    _block_path = '/sys/block'
+    _boot_id_path = '/proc/sys/kernel/random/boot_id'
+    _udev_db_path = '/run/udev/data'
+    _cache_version = 1
 
-    def __init__(self, ctx: CephadmContext):
+    def __init__(self, ctx: CephadmContext, cache_path: Optional[str] = None):
         self.ctx: CephadmContext = ctx
         self.cpu_model: str = 'Unknown'
         self.sysctl_options: Dict[str, str] = self._populate_sysctl_options()
@@ -130,14 +158,134 @@ class HostFacts:
         self.cpu_threads: int = 0
         self.interfaces: Dict[str, Any] = {}
 
+        self._cache_path = cache_path
+        self._cache: Dict[str, Any] = self._load_cache()
+        self._cache_dirty = False
+        self._boot_id = read_file([HostFacts._boot_id_path])
+
         self._meminfo: List[str] = read_file(['/proc/meminfo']).splitlines()
-        self._get_cpuinfo()
-        self._process_nics()
+        static = self._cached_tier(
+            'static',
+            self._boot_id if self._boot_id != 'Unknown' else None,
+            self._get_static_facts,
+        )
+        self.cpu_model = static['cpu_model']
+        self.cpu_count = static['cpu_count']
+        self.cpu_cores = static['cpu_cores']
+        self.cpu_threads = static['cpu_threads']
+        self._dmi: Dict[str, str] = static['dmi']
+        self._process_nics(
+            self._cached_tier(
+                'nics',
+                self._sysfs_fingerprint(HostFacts._nic_path_list),
+                self._get_nic_info,
+            )
+        )
         self.arch: str = platform.processor()
         self.kernel: str = platform.release()
         self._enclosures = self._discover_enclosures()
+        devices = self._cached_tier(
+            'devices',
+            self._sysfs_fingerprint([HostFacts._block_path]),
+            self._get_device_facts,
+        )
+        self._block_devices: List[str] = devices['block_devices']
+        self._device_list: List[Dict[str, Any]] = devices['device_list']
+        self._save_cache()
+
+    def _load_cache(self) -> Dict[str, Any]:
+        if self._cache_path:
+            try:
+                with open(self._cache_path, 'r') as f:
+                    cache = json.load(f)
+                if (
+                    isinstance(cache, dict)
+                    and cache.get('version') == HostFacts._cache_version
+                ):
+                    return cache
+            except (OSError, ValueError):
+                pass
+        return {'version': HostFacts._cache_version}
+
+    def _save_cache(self) -> None:
+        if not self._cache_path or not self._cache_dirty:
+            return
+        try:
+            with write_new(self._cache_path) as f:
+                json.dump(self._cache, f)
+            self._cache_dirty = False
+        except OSError as e:
+            logger.debug('unable to save the host facts cache: %s' % e)
+
+    def _cached_tier(
+        self,
+        tier: str,
+        key: Optional[str],
+        loader: Callable[[], Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """Return the facts of a tier from the cache while its key still
+        matches, otherwise gather them with the loader. A key of None means
+        the facts can't be validated, so they are neither taken from nor kept
+        in the cache.
+        """
+        cached = self._cache.get(tier)
+        if (
+            key is not None
+            and isinstance(cached, dict)
+            and cached.get('key') == key
+        ):
+            return cached['facts']
+        facts = loader()
+        if key is not None:
+            self._cache[tier] = {'key': key, 'facts': facts}
+            self._cache_dirty = True
+        return facts
+
+    def _sysfs_fingerprint(self, paths: List[str]) -> Optional[str]:
+        """Identify the state of the devices listed in the sysfs directories
+
+        udev rewrites its database on every device event, and the sysfs entry
+        of a device is recreated when the device is replaced, so together
+        with the boot id their mtimes change whenever facts read from these
+        devices may have. Without a udev database changes can't be detected.
+        """
+        if self._boot_id == 'Unknown':
+            return None
+        try:
+            parts = [
+                self._boot_id,
+                str(os.stat(HostFacts._udev_db_path).st_mtime_ns),
+            ]
+            for path in paths:
+                if not os.path.isdir(path):
+                    continue
+                for entry in sorted(os.listdir(path)):
+                    mtime = os.lstat(os.path.join(path, entry)).st_mtime_ns
+                    parts.append('{}={}'.format(entry, mtime))
+        except OSError:
+            # no udev, or a device went away while listing
+            return None
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def _get_static_facts(self) -> Dict[str, Any]:
+        self._get_cpuinfo()
+        return {
+            'cpu_model': self.cpu_model,
+            'cpu_count': self.cpu_count,
+            'cpu_cores': self.cpu_cores,
+            'cpu_threads': self.cpu_threads,
+            'dmi': {
+                field: read_file(HostFacts._dmi_path_list, field)
+                for field in HostFacts._dmi_fields
+            },
+        }
+
+    def _get_device_facts(self) -> Dict[str, Any]:
         self._block_devices = self._get_block_devs()
-        self._device_list = self._get_device_info()
+        return {
+            'block_devices': self._block_devices,
+            'device_list': self._get_device_info(),
+        }
 
     def _populate_sysctl_options(self) -> Dict[str, str]:
         sysctl_options = {}
@@ -220,7 +368,7 @@ class HostFacts:
         """Determine the list of block devices by looking at /sys/block"""
         return [
             dev
-            for dev in os.listdir('/sys/block')
+            for dev in os.listdir(HostFacts._block_path)
             if not dev.startswith(HostFacts._excluded_block_devices)
         ]
 
@@ -294,7 +442,7 @@ class HostFacts:
         sector. For more information see
         https://git.kernel.org/pub/scm/linux/kernel/git/stable/linux.git/tree/include/linux/types.h?h=v5.15.63#n120
         """
-        size_path = os.path.join('/sys/block', dev, 'size')
+        size_path = os.path.join(HostFacts._block_path, dev, 'size')
         size_blocks = int(read_file([size_path]))
         return size_blocks * 512
 
@@ -485,9 +633,10 @@ class HostFacts:
         """Return the total capacity for all Flash devices (human readable format)"""
         return bytes_to_human(self.flash_capacity_bytes)
 
-    def _process_nics(self):
-        # type: () -> None
-        """Look at the NIC devices and extract network related metadata"""
+    def _get_nic_info(self):
+        # type: () -> Dict[str, Dict[str, Any]]
+        """Look at the NIC devices and extract how they are built, which only
+        changes with the devices themselves"""
         # from https://github.com/torvalds/linux/blob/master/include/uapi/linux/if_arp.h
         hw_lookup = {
             '1': 'ethernet',
@@ -495,6 +644,7 @@ class HostFacts:
             '772': 'loopback',
         }
 
+        nics = {}  # type: Dict[str, Dict[str, Any]]
         for nic_path in HostFacts._nic_path_list:
             if not os.path.exists(nic_path):
                 continue
@@ -521,27 +671,6 @@ class HostFacts:
                     for link in glob(os.path.join(nic_path, iface, 'upper_*'))
                 ]
 
-                try:
-                    mtu = int(
-                        read_file([os.path.join(nic_path, iface, 'mtu')])
-                    )
-                except ValueError:
-                    mtu = 0
-
-                operstate = read_file(
-                    [os.path.join(nic_path, iface, 'operstate')]
-                )
-                try:
-                    speed = int(
-                        read_file([os.path.join(nic_path, iface, 'speed')])
-                    )
-                except (OSError, ValueError):
-                    # OSError : device doesn't support the ethtool get_link_ksettings
-                    # ValueError : raised when the read fails, and returns Unknown
-                    #
-                    # Either way, we show a -1 when speed isn't available
-                    speed = -1
-
                 dev_link = os.path.join(nic_path, iface, 'device')
                 if os.path.exists(dev_link):
                     iftype = 'physical'
@@ -557,18 +686,48 @@ class HostFacts:
                     iftype = 'logical'
                     driver = ''
 
-                self.interfaces[iface] = {
-                    'mtu': mtu,
+                nics[iface] = {
+                    'path': os.path.join(nic_path, iface),
                     'upper_devs_list': upper_devs_list,
                     'lower_devs_list': lower_devs_list,
-                    'operstate': operstate,
                     'iftype': iftype,
                     'nic_type': nic_type,
                     'driver': driver,
-                    'speed': speed,
-                    'ipv4_address': get_ipv4_address(iface),
-                    'ipv6_address': get_ipv6_address(iface),
                 }
+        return nics
+
+    def _process_nics(self, nics):
+        # type: (Dict[str, Dict[str, Any]]) -> None
+        """Combine the NIC devices with their current link state"""
+        for iface, nic in nics.items():
+            nic_path = nic['path']
+            try:
+                mtu = int(read_file([os.path.join(nic_path, 'mtu')]))
+            except ValueError:
+                mtu = 0
+
+            operstate = read_file([os.path.join(nic_path, 'operstate')])
+            try:
+                speed = int(read_file([os.path.join(nic_path, 'speed')]))
+            except (OSError, ValueError):
+                # OSError : device doesn't support the ethtool get_link_ksettings
+                # ValueError : raised when the read fails, and returns Unknown
+                #
+                # Either way, we show a -1 when speed isn't available
+                speed = -1
+
+            self.interfaces[iface] = {
+                'mtu': mtu,
+                'upper_devs_list': nic['upper_devs_list'],
+                'lower_devs_list': nic['lower_devs_list'],
+                'operstate': operstate,
+                'iftype': nic['iftype'],
+                'nic_type': nic['nic_type'],
+                'driver': nic['driver'],
+                'speed': speed,
+                'ipv4_address': get_ipv4_address(iface),
+                'ipv6_address': get_ipv6_address(iface),
+            }
 
     @property
     def nic_count(self):
@@ -610,14 +769,14 @@ class HostFacts:
     def vendor(self):
         # type: () -> str
         """Determine server vendor from DMI data in sysfs"""
-        return read_file(HostFacts._dmi_path_list, 'sys_vendor')
+        return self._dmi['sys_vendor']
 
     @property
     def model(self):
         # type: () -> str
         """Determine server model information from DMI data in sysfs"""
-        family = read_file(HostFacts._dmi_path_list, 'product_family')
-        product = read_file(HostFacts._dmi_path_list, 'product_name')
+        family = self._dmi['product_family']
+        product = self._dmi['product_name']
         if family == 'Unknown' and product:
             return '{}'.format(product)
 
@@ -627,31 +786,31 @@ class HostFacts:
     def bios_version(self):
         # type: () -> str
         """Determine server BIOS version from  DMI data in sysfs"""
-        return read_file(HostFacts._dmi_path_list, 'bios_version')
+        return self._dmi['bios_version']
 
     @property
     def bios_date(self):
         # type: () -> str
         """Determine server BIOS date from  DMI data in sysfs"""
-        return read_file(HostFacts._dmi_path_list, 'bios_date')
+        return self._dmi['bios_date']
 
     @property
     def chassis_serial(self):
         # type: () -> str
         """Determine chassis serial number from DMI data in sysfs"""
-        return read_file(HostFacts._dmi_path_list, 'chassis_serial')
+        return self._dmi['chassis_serial']
 
     @property
     def board_serial(self):
         # type: () -> str
         """Determine mainboard serial number from DMI data in sysfs"""
-        return read_file(HostFacts._dmi_path_list, 'board_serial')
+        return self._dmi['board_serial']
 
     @property
     def product_serial(self):
         # type: () -> str
         """Determine server's serial number from DMI data in sysfs"""
-        return read_file(HostFacts._dmi_path_list, 'product_serial')
+        return self._dmi['product_serial']
 
     @property
     def timestamp(self):
@@ -768,21 +927,11 @@ class HostFacts:
         """Get kernel parameters required/used in Ceph clusters"""
 
         k_param = {}
-        out, _, _ = call_throws(
-            self.ctx, ['sysctl', '-a'], verbosity=CallVerbosity.SILENT
-        )
-        if out:
-            param_list = out.split('\n')
-            param_dict = {
-                param.split(' = ')[0]: param.split(' = ')[-1]
-                for param in param_list
-            }
-
-            # return only desired parameters
-            if 'net.ipv4.ip_nonlocal_bind' in param_dict:
-                k_param['net.ipv4.ip_nonlocal_bind'] = param_dict[
-                    'net.ipv4.ip_nonlocal_bind'
-                ]
+        # return only desired parameters
+        if 'net.ipv4.ip_nonlocal_bind' in self.sysctl_options:
+            k_param['net.ipv4.ip_nonlocal_bind'] = self.sysctl_options[
+                'net.ipv4.ip_nonlocal_bind'
+            ]
 
         return k_param
 
@@ -825,10 +974,9 @@ class HostFacts:
     def udp6_ports_used(self) -> List[int]:
         return HostFacts._process_net_data('/proc/net/udp6', 'udp')
 
-    def dump(self):
-        # type: () -> str
-        """Return the attributes of this HostFacts object as json"""
-        data = {
+    def _facts(self):
+        # type: () -> Dict[str, Any]
+        return {
             k: getattr(self, k)
             for k in dir(self)
             if not k.startswith('_')
@@ -836,7 +984,46 @@ class HostFacts:
                 getattr(self, k), (float, int, str, list, dict, tuple)
             )
         }
-        return json.dumps(data, indent=2, sort_keys=True)
+
+    def dump(self):
+        # type: () -> str
+        """Return the attributes of this HostFacts object as json"""
+        return json.dumps(self._facts(), indent=2, sort_keys=True)
+
+    def dump_delta(self, since=None):
+        # type: (Optional[str]) -> str
+        """Return the attributes of this HostFacts object as json, along with
+        their version.
+
+        When `since` is the version of the previous report, only the facts
+        that changed since are returned, and the facts which went away are
+        listed under 'removed'. Otherwise all facts are returned.
+        """
+        encoded = json.dumps(self._facts(), sort_keys=True)
+        facts = json.loads(encoded)
+        version = hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+        report = {'version': version}  # type: Dict[str, Any]
+        reported = self._cache.get('reported')
+        if (
+            since
+            and isinstance(reported, dict)
+            and reported.get('version') == since
+        ):
+            report['since'] = since
+            report['facts'] = {
+                k: v
+                for k, v in facts.items()
+                if reported['facts'].get(k) != v
+            }
+            report['removed'] = sorted(
+                k for k in reported['facts'] if k not in facts
+            )
+        else:
+            report['facts'] = facts
+        self._cache['reported'] = {'version': version, 'facts': facts}
+        self._cache_dirty = True
+        self._save_cache()
+        return json.dumps(report, indent=2, sort_keys=True)
 
 
 def list_networks(ctx):
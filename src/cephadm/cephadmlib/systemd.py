@@ -5,7 +5,7 @@ import logging
 from typing import Tuple, List, Optional
 
 from .context import CephadmContext
-from .call_wrappers import call, CallVerbosity
+from .call_wrappers import call, run_concurrently, CallVerbosity
 from .packagers import Packager
 
 logger = logging.getLogger()
@@ -16,43 +16,41 @@ def check_unit(ctx, unit_name):
     # NOTE: we ignore the exit code here because systemctl outputs
     # various exit codes based on the state of the service, but the
     # string result is more explicit (and sufficient).
-    enabled = False
-    installed = False
-    try:
-        out, err, code = call(
-            ctx,
-            ['systemctl', 'is-enabled', unit_name],
-            verbosity=CallVerbosity.QUIET,
-        )
-        if code == 0:
-            enabled = True
-            installed = True
-        elif 'disabled' in out:
-            installed = True
-    except Exception as e:
-        logger.warning('unable to run systemctl: %s' % e)
-        enabled = False
-        installed = False
+    def is_enabled() -> Tuple[bool, bool]:
+        try:
+            out, err, code = call(
+                ctx,
+                ['systemctl', 'is-enabled', unit_name],
+                verbosity=CallVerbosity.QUIET,
+            )
+            if code == 0:
+                return True, True
+            elif 'disabled' in out:
+                return False, True
+        except Exception as e:
+            logger.warning('unable to run systemctl: %s' % e)
+        return False, False
 
-    state = 'unknown'
-    try:
-        out, err, code = call(
-            ctx,
-            ['systemctl', 'is-active', unit_name],
-            verbosity=CallVerbosity.QUIET,
-        )
-        out = out.strip()
-        if out in ['active']:
-            state = 'running'
-        elif out in ['inactive']:
-            state = 'stopped'
-        elif out in ['failed', 'auto-restart']:
-            state = 'error'
-        else:
-            state = 'unknown'
-    except Exception as e:
-        logger.warning('unable to run systemctl: %s' % e)
-        state = 'unknown'
+    def is_active() -> str:
+        try:
+            out, err, code = call(
+                ctx,
+                ['systemctl', 'is-active', unit_name],
+                verbosity=CallVerbosity.QUIET,
+            )
+            out = out.strip()
+            if out in ['active']:
+                return 'running'
+            elif out in ['inactive']:
+                return 'stopped'
+            elif out in ['failed', 'auto-restart']:
+                return 'error'
+        except Exception as e:
+            logger.warning('unable to run systemctl: %s' % e)
+        return 'unknown'
+
+    # both queries are independent, run them at once
+    (enabled, installed), state = run_concurrently([is_enabled, is_active])
     return (enabled, state, installed)
 
 
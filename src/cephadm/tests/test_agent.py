@@ -418,8 +418,8 @@ def test_agent_get_ls(_ls_subset, _ls, cephadm_fs):
 @mock.patch("urllib.request.Request.__init__")
 @mock.patch("cephadmlib.agent.urlopen")
 @mock.patch("cephadm.list_networks")
-@mock.patch("cephadm.HostFacts.dump")
-@mock.patch("cephadm.HostFacts.__init__", lambda _, __: None)
+@mock.patch("cephadm.HostFacts.dump_delta")
+@mock.patch("cephadm.HostFacts.__init__", lambda _, __, cache_path=None: None)
 @mock.patch("ssl.SSLContext.load_verify_locations")
 @mock.patch("threading.Thread.is_alive")
 @mock.patch("cephadm.MgrListener.start")
@@ -428,7 +428,7 @@ def test_agent_get_ls(_ls_subset, _ls, cephadm_fs):
 @mock.patch("cephadm.CephadmAgent.pull_conf_settings")
 def test_agent_run(_pull_conf_settings, _port_in_use, _gatherer_start,
                    _listener_start, _is_alive, _load_verify_locations,
-                    _HF_dump, _list_networks, _urlopen, _RQ_init, _wait, _clear):
+                    _HF_dump_delta, _list_networks, _urlopen, _RQ_init, _wait, _clear):
     target_ip = '192.168.0.0'
     target_port = '9999'
     refresh_period = 20
@@ -472,7 +472,7 @@ def test_agent_run(_pull_conf_settings, _port_in_use, _gatherer_start,
 
     class FakeHTTPResponse():
         def __init__(self):
-            pass
+            self.status = 200
 
         def __enter__(self):
             return self
@@ -481,11 +481,13 @@ def test_agent_run(_pull_conf_settings, _port_in_use, _gatherer_start,
             pass
 
         def read(self):
-            return json.dumps({'valid': 'output', 'result': '400'})
+            return json.dumps({'valid': 'output', 'result': '400', 'hashes': mgr_hashes})
 
     _port_in_use.side_effect = _fake_port_in_use
     _is_alive.return_value = False
-    _HF_dump.return_value = 'Host Facts'
+    mgr_hashes: Dict[str, str] = {}
+    facts = json.dumps({'version': 'facts-v1', 'facts': {}})
+    _HF_dump_delta.return_value = facts
     _list_networks.return_value = network_data
     _urlopen.side_effect = lambda *args, **kwargs: FakeHTTPResponse()
     _RQ_init.side_effect = lambda *args, **kwargs: None
@@ -524,21 +526,50 @@ def test_agent_run(_pull_conf_settings, _port_in_use, _gatherer_start,
            'host': host,
            'ls': [{'valid_daemon': 'valid_metadata'}],
            'networks': network_data_no_sets,
-           'facts': 'Host Facts',
+           'facts': facts,
            'volume': 'ceph-volume inventory data',
            'ack': str(7),
            'keyring': 'agent keyring',
            'port': str(open_listener_port)
         }
-        _RQ_init.assert_called_with(
-            f'https://{target_ip}:{target_port}/data',
-            json.dumps(expected_data).encode('ascii'),
-            {'Content-Type': 'application/json'}
-        )
+
+        def _sent_data():
+            url, data, headers = _RQ_init.call_args[0]
+            assert url == f'https://{target_ip}:{target_port}/data'
+            assert headers == {'Content-Type': 'application/json'}
+            return json.loads(data.decode('ascii'))
+
+        sent = _sent_data()
+        hashes = sent.pop('hashes')
+        assert sent == expected_data
+        assert set(hashes) == {'ls', 'networks', 'facts', 'volume'}
+        assert hashes['facts'] == 'facts-v1'
+        _HF_dump_delta.assert_called_with(None)
         _listener_start.assert_called()
         _gatherer_start.assert_called()
         _urlopen.assert_called()
 
+        # once the mgr holds the metadata, only its hashes are sent
+        mgr_hashes.update(hashes)
+        with pytest.raises(EventCleared, match='SUCCESS'):
+            agent.run()
+        with pytest.raises(EventCleared, match='SUCCESS'):
+            agent.run()
+        sent = _sent_data()
+        assert sent['hashes'] == hashes
+        assert 'ls' not in sent
+        assert 'networks' not in sent
+        assert 'volume' not in sent
+        _HF_dump_delta.assert_called_with('facts-v1')
+
+        # changed metadata is sent again
+        agent.ls_gatherer.data = [{'valid_daemon': 'new_metadata'}]
+        with pytest.raises(EventCleared, match='SUCCESS'):
+            agent.run()
+        sent = _sent_data()
+        assert sent['ls'] == [{'valid_daemon': 'new_metadata'}]
+        assert 'volume' not in sent
+
         # agent should not go down if connections fail
         _urlopen.side_effect = Exception()
         with pytest.raises(EventCleared, match='SUCCESS'):
@@ -1202,6 +1202,121 @@ ff792c06d8544b983.scope not found.: OCI runtime error"""
             )
 
 
+class FakeContainerEngine:
+    """
+    Answers the container engine calls made by list_daemons for one
+    container per OSD, counting them.
+    """
+    image_id = 'sha256:' + 'a' * 64
+
+    def __init__(self, ctx, fsid, osds):
+        self.calls = []
+        self.containers_listable = True
+        self.containers = {}
+        for osd in range(osds):
+            c = _cephadm.CephContainer.for_daemon(
+                ctx, _cephadm.DaemonIdentity(fsid, 'osd', str(osd)), 'bash')
+            self.containers['%064x' % osd] = c.cname
+
+    def call(self, ctx, cmd, verbosity=None, **kwargs):
+        self.calls.append(cmd)
+        if cmd[0] == 'systemctl':
+            return ('enabled' if cmd[1] == 'is-enabled' else 'active'), '', 0
+        args = [a for a in cmd[1:] if not a.startswith('{{')]
+        if args[:1] == ['stats']:
+            return ''.join('%s,1GiB / 8GiB,10.00%%\n' % cid[:12]
+                           for cid in self.containers), '', 0
+        if args[:1] == ['ps']:
+            if not self.containers_listable:
+                return '', 'unsupported', 1
+            return ''.join('%s\n' % cid for cid in self.containers), '', 0
+        if args[:1] == ['inspect']:
+            out = ''
+            for name in args[2:]:
+                cid = name if name in self.containers else None
+                for c, n in self.containers.items():
+                    if n == name:
+                        cid = c
+                if cid is None:
+                    return out, 'no such container %s' % name, 1
+                stats = '%s,quay.io/ceph/ceph:v19,%s,2024-01-01 00:00:00.000000000 +0000 UTC,' % (
+                    cid, self.image_id)
+                if cmd[3].startswith('{{.Name}}'):
+                    stats = '/%s,%s' % (self.containers[cid], stats)
+                out += stats + '\n'
+            return out, '', 0
+        if args[:2] == ['image', 'inspect']:
+            if cmd[-1] == '{{.RepoDigests}}':
+                return '[quay.io/ceph/ceph@sha256:%s]\n' % ('b' * 64), '', 0
+            return '%s,[quay.io/ceph/ceph@sha256:%s]\n' % (self.image_id, 'b' * 64), '', 0
+        if args[:1] == ['exec']:
+            return 'ceph version 19.2.0 (abcdef) squid (stable)\n', '', 0
+        return '', 'unexpected call', 1
+
+    def engine_calls(self):
+        return [c for c in self.calls if c[0] == '/usr/bin/podman']
+
+
+def sorted_by_name(ls):
+    return sorted(ls, key=lambda d: d['name'])
+
+
+class TestListDaemons:
+    fsid = '00000000-0000-0000-0000-0000deadbeef'
+
+    @pytest.fixture()
+    def ctx(self, cephadm_fs, funkypatch):
+        from cephadmlib.constants import DATA_DIR
+
+        funkypatch.patch('cephadm.logger')
+        funkypatch.patch('cephadmlib.call_wrappers.call',
+                         dest=lambda *args, **kwargs: self.engine.call(*args, **kwargs))
+        ctx = _cephadm.CephadmContext()
+        ctx.container_engine = mock_podman()
+        ctx.data_dir = DATA_DIR
+        yield ctx
+
+    def _deploy(self, ctx, osds):
+        self.engine = FakeContainerEngine(ctx, self.fsid, osds)
+        for osd in range(osds):
+            os.makedirs(os.path.join(ctx.data_dir, self.fsid, 'osd.%d' % osd))
+
+    @pytest.mark.parametrize('osds', [1, 40])
+    def test_batched_inspection(self, ctx, osds):
+        self._deploy(ctx, osds)
+        ls = _cephadm.list_daemons(ctx)
+        assert len(ls) == osds
+        for d in ls:
+            assert d['container_image_id'] == 'a' * 64
+            assert d['container_image_digests'] == ['quay.io/ceph/ceph@sha256:' + 'b' * 64]
+            assert d['version'] == '19.2.0'
+            assert d['memory_usage'] == 1024 * 1024 * 1024
+            assert d['cpu_percentage'] == '10.00%'
+        # stats, ps, inspect, image inspect and a single version lookup,
+        # whatever the number of daemons. stats runs concurrently with the
+        # others
+        assert [c[1] for c in self.engine.engine_calls() if c[1] != 'stats'] == ['ps', 'inspect', 'image', 'exec']
+        assert sorted(c[1] for c in self.engine.engine_calls()) == ['exec', 'image', 'inspect', 'ps', 'stats']
+
+        # the version of the image is remembered
+        self.engine.calls = []
+        assert sorted_by_name(_cephadm.list_daemons(ctx)) == sorted_by_name(ls)
+        assert sorted(c[1] for c in self.engine.engine_calls()) == ['image', 'inspect', 'ps', 'stats']
+
+    def test_per_daemon_inspection(self, ctx, funkypatch):
+        self._deploy(ctx, 3)
+        batched = _cephadm.list_daemons(ctx)
+        os.unlink(os.path.join(ctx.data_dir, _cephadm.IMAGE_VERSIONS_FILE))
+
+        # fall back to inspecting each daemon when the containers cannot be
+        # listed
+        self.engine.calls = []
+        self.engine.containers_listable = False
+        assert sorted_by_name(_cephadm.list_daemons(ctx)) == sorted_by_name(batched)
+        assert [c[1] for c in self.engine.engine_calls() if c[1] != 'stats'] == [
+            'ps', 'inspect', 'image', 'exec', 'inspect', 'inspect']
+
+
 class TestMaintenance:
     systemd_target = "ceph.00000000-0000-0000-0000-000000c0ffee.target"
     fsid = '0ea8cdd0-1bbf-11ec-a9c7-5254002763fa'
@@ -1,9 +1,11 @@
+import json
+import os
 import pytest
 
 from unittest import mock
 from tests.fixtures import host_sysfs, import_cephadm, cephadm_fs
 
-from cephadmlib.host_facts import Enclosure
+from cephadmlib.host_facts import Enclosure, HostFacts
 
 _cephadm = import_cephadm()
 
@@ -115,3 +117,112 @@ def test_host_facts_security(cephadm_fs):
     assert ksec['complain'] == 0
     assert ksec['enforce'] == 1
     assert ksec['unconfined'] == 2
+
+
+class SysctlFreeHostFacts(HostFacts):
+    def _populate_sysctl_options(self):
+        return {}
+
+
+FACTS_CACHE = '/var/lib/ceph/cephadm-host-facts.json'
+
+
+@pytest.fixture
+def host_facts_fs(cephadm_fs):
+    cephadm_fs.create_file('/proc/sys/kernel/random/boot_id', contents='boot-1\n')
+    cephadm_fs.create_dir('/run/udev/data')
+    cephadm_fs.create_file(
+        '/proc/cpuinfo',
+        contents='model name\t: FakeCPU\nphysical id\t: 0\nsiblings\t: 8\ncpu cores\t: 4\n',
+    )
+    cephadm_fs.create_file('/proc/meminfo', contents='MemTotal: 1024 kB\nMemFree: 512 kB\n')
+    cephadm_fs.create_file('/proc/uptime', contents='100.0 200.0')
+    cephadm_fs.create_file('/proc/loadavg', contents='0.1 0.2 0.3 1/100 1000')
+    for dev, rotational in (('sda', '1'), ('sdb', '0')):
+        cephadm_fs.create_file(f'/sys/block/{dev}/size', contents='2048')
+        cephadm_fs.create_file(f'/sys/block/{dev}/queue/rotational', contents=rotational)
+        cephadm_fs.create_file(f'/sys/block/{dev}/device/model', contents='FakeDisk')
+        cephadm_fs.create_file(f'/sys/block/{dev}/device/vpd_pg80', contents=f'serial-{dev}')
+    for name, contents in (('type', '1'), ('mtu', '1500'), ('operstate', 'up'), ('speed', '1000')):
+        cephadm_fs.create_file(f'/sys/class/net/eth0/{name}', contents=contents)
+    cephadm_fs.create_dir('/sys/class/net/eth0/device')
+    with mock.patch('cephadmlib.host_facts.get_ipv4_address', return_value='10.0.0.1/24'), \
+         mock.patch('cephadmlib.host_facts.get_ipv6_address', return_value=''):
+        yield cephadm_fs
+
+
+class TestHostFactsCache:
+
+    def test_tiers_reused(self, host_facts_fs):
+        ctx = mock.MagicMock()
+        facts = SysctlFreeHostFacts(ctx, FACTS_CACHE)
+        assert facts.hdd_count == 1
+        assert facts.flash_count == 1
+        assert facts.nic_count == 1
+        assert os.path.exists(FACTS_CACHE)
+
+        with mock.patch.object(HostFacts, '_get_cpuinfo') as get_cpuinfo, \
+             mock.patch.object(HostFacts, '_get_nic_info') as get_nic_info, \
+             mock.patch.object(HostFacts, '_get_device_info') as get_device_info:
+            cached = SysctlFreeHostFacts(ctx, FACTS_CACHE)
+        get_cpuinfo.assert_not_called()
+        get_nic_info.assert_not_called()
+        get_device_info.assert_not_called()
+        for fact in ('cpu_model', 'cpu_threads', 'vendor', 'hdd_list', 'flash_list', 'interfaces'):
+            assert getattr(cached, fact) == getattr(facts, fact)
+
+    def test_link_state_not_cached(self, host_facts_fs):
+        ctx = mock.MagicMock()
+        SysctlFreeHostFacts(ctx, FACTS_CACHE)
+        with open('/sys/class/net/eth0/operstate', 'w') as f:
+            f.write('down')
+        facts = SysctlFreeHostFacts(ctx, FACTS_CACHE)
+        assert facts.interfaces['eth0']['operstate'] == 'down'
+
+    def test_device_event_invalidates(self, host_facts_fs):
+        ctx = mock.MagicMock()
+        SysctlFreeHostFacts(ctx, FACTS_CACHE)
+        st = os.stat('/run/udev/data')
+        os.utime('/run/udev/data', ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+        with open('/sys/block/sda/size', 'w') as f:
+            f.write('4096')
+        with mock.patch.object(HostFacts, '_get_cpuinfo') as get_cpuinfo:
+            facts = SysctlFreeHostFacts(ctx, FACTS_CACHE)
+        get_cpuinfo.assert_not_called()
+        assert facts.hdd_capacity_bytes == 4096 * 512
+
+    def test_reboot_invalidates(self, host_facts_fs):
+        ctx = mock.MagicMock()
+        SysctlFreeHostFacts(ctx, FACTS_CACHE)
+        with open('/proc/sys/kernel/random/boot_id', 'w') as f:
+            f.write('boot-2')
+        with open('/proc/cpuinfo', 'w') as f:
+            f.write('model name\t: OtherCPU\n')
+        facts = SysctlFreeHostFacts(ctx, FACTS_CACHE)
+        assert facts.cpu_model == 'OtherCPU'
+
+    def test_no_cache(self, host_facts_fs):
+        facts = SysctlFreeHostFacts(mock.MagicMock())
+        assert facts.hdd_count == 1
+        assert not os.path.exists(FACTS_CACHE)
+
+    def test_delta(self, host_facts_fs):
+        ctx = mock.MagicMock()
+        first = json.loads(SysctlFreeHostFacts(ctx, FACTS_CACHE).dump_delta())
+        assert 'since' not in first
+        assert first['facts']['hdd_count'] == 1
+
+        with open('/sys/class/net/eth0/operstate', 'w') as f:
+            f.write('down')
+        second = json.loads(SysctlFreeHostFacts(ctx, FACTS_CACHE).dump_delta(first['version']))
+        assert second['since'] == first['version']
+        assert second['version'] != first['version']
+        assert second['facts']['interfaces']['eth0']['operstate'] == 'down'
+        assert 'hdd_list' not in second['facts']
+        assert 'cpu_model' not in second['facts']
+        assert second['removed'] == []
+
+        # only the last version is known, older ones get all the facts
+        third = json.loads(SysctlFreeHostFacts(ctx, FACTS_CACHE).dump_delta(first['version']))
+        assert 'since' not in third
+        assert third['facts']['hdd_list'] == first['facts']['hdd_list']
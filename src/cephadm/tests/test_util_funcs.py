@@ -2,6 +2,7 @@
 #
 from unittest import mock
 
+import asyncio
 import functools
 import io
 import os
@@ -9,6 +10,7 @@ import sys
 
 import pytest
 
+from cephadmlib import call_wrappers
 from tests.fixtures import with_cephadm_ctx, import_cephadm
 
 _cephadm = import_cephadm()
@@ -669,6 +671,77 @@ def test_call(caplog, monkeypatch, pyline, expected, call_kwargs, log_check):
         log_check(caplog)
 
 
+def test_call_concurrently():
+    import time
+
+    ctx = FakeContext()
+    sleep = [sys.executable, "-c", "import time; time.sleep(1); print('x')"]
+    with mock.patch("cephadmlib.call_wrappers.logger") as _logger:
+        # forget about the commands of other tests
+        _cephadm.log_call_timings()
+        start = time.monotonic()
+        results = _cephadm.run_concurrently(
+            [functools.partial(_cephadm.call, ctx, sleep) for _ in range(4)]
+        )
+        assert time.monotonic() - start < 3
+        assert results == [("x\n", "", 0)] * 4
+
+        _logger.reset_mock()
+        _cephadm.log_call_timings()
+        msgs = [c.args[0] for c in _logger.debug.call_args_list]
+        assert any(
+            m.startswith(
+                "call timings: %s: 4 call(s)"
+                % os.path.basename(sys.executable)
+            )
+            for m in msgs
+        )
+
+
+def test_call_concurrency_is_bounded():
+    ctx = FakeContext()
+    in_flight = [0, 0]  # current, max
+
+    class FakeProcess:
+        stdout = stderr = True
+        returncode = 0
+
+        async def communicate(self):
+            await asyncio.sleep(0.05)
+            in_flight[0] -= 1
+            return b"", b""
+
+    async def create_subprocess_exec(*args, **kwargs):
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight)
+        return FakeProcess()
+
+    def check_units():
+        # nested, as list_daemons() checking the units of each daemon
+        return _cephadm.run_concurrently(
+            [functools.partial(_cephadm.call, ctx, ["true"]) for _ in range(4)]
+        )
+
+    with mock.patch(
+        "cephadmlib.call_wrappers.asyncio.create_subprocess_exec",
+        create_subprocess_exec,
+    ):
+        results = _cephadm.run_concurrently([check_units] * 8)
+    assert results == [[("", "", 0)] * 4] * 8
+    assert in_flight[0] == 0
+    assert in_flight[1] == call_wrappers.MAX_CONCURRENT_CALLS
+
+
+def test_run_concurrently():
+    def fail():
+        raise ValueError("blat")
+
+    assert _cephadm.run_concurrently([]) == []
+    assert _cephadm.run_concurrently([lambda: 1, lambda: 2]) == [1, 2]
+    with pytest.raises(ValueError, match="blat"):
+        _cephadm.run_concurrently([lambda: 1, fail])
+
+
 class TestWriteNew:
     def test_success(self, tmp_path):
         "Test the simple basic feature of writing a file."
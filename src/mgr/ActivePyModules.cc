@@ -206,6 +206,65 @@ PyObject *ActivePyModules::cacheable_get_python(const std::string &what)
   return obj;
 }
 
+PyObject *ActivePyModules::get_data_version_python(const std::string &what)
+{
+  // the epochs/versions of the maps the object returned by get_python(what)
+  // is built from, or None if it is not versioned.
+  std::vector<uint64_t> versions;
+  without_gil_t no_gil;
+  const bool uses_osdmap = (what.substr(0, 7) == "osd_map" ||
+                            what == "osdmap_crush_map_text" ||
+                            what == "df" ||
+                            what == "osd_pool_stats");
+  const bool uses_pgmap = (what == "pg_summary" ||
+                           what == "pg_status" ||
+                           what == "pg_dump" ||
+                           what == "pg_stats" ||
+                           what == "pool_stats" ||
+                           what == "osd_stats" ||
+                           what == "osd_ping_times" ||
+                           what == "io_rate" ||
+                           what == "df" ||
+                           what == "osd_pool_stats");
+  if (uses_osdmap) {
+    versions.push_back(cluster_state.with_osdmap([](const OSDMap &osd_map) {
+      return static_cast<uint64_t>(osd_map.get_epoch());
+    }));
+  }
+  if (uses_pgmap) {
+    versions.push_back(cluster_state.with_pgmap([](const PGMap &pg_map) {
+      return static_cast<uint64_t>(pg_map.version);
+    }));
+  }
+  if (what == "fs_map") {
+    versions.push_back(cluster_state.with_fsmap([](const FSMap &fsmap) {
+      return static_cast<uint64_t>(fsmap.get_epoch());
+    }));
+  } else if (what == "mon_map") {
+    versions.push_back(cluster_state.with_monmap([](const MonMap &monmap) {
+      return static_cast<uint64_t>(monmap.get_epoch());
+    }));
+  } else if (what == "mgr_map") {
+    versions.push_back(cluster_state.with_mgrmap([](const MgrMap &mgr_map) {
+      return static_cast<uint64_t>(mgr_map.get_epoch());
+    }));
+  } else if (what == "service_map") {
+    versions.push_back(cluster_state.with_servicemap([](const ServiceMap &service_map) {
+      return static_cast<uint64_t>(service_map.epoch);
+    }));
+  }
+  no_gil.acquire_gil();
+
+  if (versions.empty()) {
+    Py_RETURN_NONE;
+  }
+  PyObject *py_versions = PyTuple_New(versions.size());
+  for (size_t i = 0; i < versions.size(); ++i) {
+    PyTuple_SET_ITEM(py_versions, i, PyLong_FromUnsignedLongLong(versions[i]));
+  }
+  return py_versions;
+}
+
 PyObject *ActivePyModules::get_python(const std::string &what)
 {
   uint64_t ttl_seconds = g_conf().get_val<uint64_t>("mgr_ttl_cache_expire_seconds");
@@ -931,6 +990,62 @@ PyObject* ActivePyModules::get_latest_counter_python(
   return with_perf_counters(extract_latest_counters, svc_name, svc_id, path);
 }
 
+PyObject* ActivePyModules::get_latest_counters_python(
+    const std::string &svc_type,
+    int prio_limit)
+{
+  without_gil_t no_gil;
+  std::lock_guard l(lock);
+
+  auto daemons = daemon_state.get_by_service(svc_type);
+  auto f = with_gil(no_gil, [&] {
+    return PyFormatter();
+  });
+  for (auto& [key, state] : daemons) {
+    std::lock_guard l(state->lock);
+    with_gil(no_gil, [&, key=ceph::to_string(key), state=state] {
+      // the counters of each daemon as parallel arrays of paths, values
+      // and counts, so that they can be turned into columns without a
+      // call per counter
+      std::vector<std::pair<const std::string*, PerfCounterInstance*>> selected;
+      for (auto& [path, instance] : state->perf_counters.instances) {
+        if (state->perf_counters.types[path].priority >= prio_limit) {
+          selected.emplace_back(&path, &instance);
+        }
+      }
+      f.open_object_section(key.c_str());
+      f.open_array_section("paths");
+      for (auto& [path, instance] : selected) {
+        f.dump_string("path", *path);
+      }
+      f.close_section();
+      f.open_array_section("values");
+      for (auto& [path, instance] : selected) {
+        if (state->perf_counters.types[*path].type & PERFCOUNTER_LONGRUNAVG) {
+          const auto &avg_data = instance->get_data_avg();
+          f.dump_unsigned("s", avg_data.empty() ? 0 : avg_data.back().s);
+        } else {
+          const auto &data = instance->get_data();
+          f.dump_unsigned("v", data.empty() ? 0 : data.back().v);
+        }
+      }
+      f.close_section();
+      f.open_array_section("counts");
+      for (auto& [path, instance] : selected) {
+        if (state->perf_counters.types[*path].type & PERFCOUNTER_LONGRUNAVG) {
+          const auto &avg_data = instance->get_data_avg();
+          f.dump_unsigned("c", avg_data.empty() ? 0 : avg_data.back().c);
+        } else {
+          f.dump_unsigned("c", 0);
+        }
+      }
+      f.close_section();
+      f.close_section();
+    });
+  }
+  return f.get();
+}
+
 PyObject* ActivePyModules::get_perf_schema_python(
     const std::string &svc_type,
     const std::string &svc_id)
@@ -84,6 +84,7 @@ public:
   Client    &get_client() {return client;}
   PyObject *cacheable_get_python(const std::string &what);
   PyObject *get_python(const std::string &what);
+  PyObject *get_data_version_python(const std::string &what);
   PyObject *get_server_python(const std::string &hostname);
   PyObject *list_servers_python();
   PyObject *get_metadata_python(
@@ -98,6 +99,9 @@ public:
     const std::string &svc_type,
     const std::string &svc_id,
     const std::string &path);
+  PyObject *get_latest_counters_python(
+    const std::string &svc_type,
+    int prio_limit);
   PyObject *get_perf_schema_python(
      const std::string &svc_type,
      const std::string &svc_id);
@@ -384,6 +384,17 @@ ceph_state_get(BaseMgrModule *self, PyObject *args)
   return self->py_modules->cacheable_get_python(what);
 }
 
+static PyObject*
+ceph_state_get_data_version(BaseMgrModule *self, PyObject *args)
+{
+  char *what = NULL;
+  if (!PyArg_ParseTuple(args, "s:ceph_state_get_data_version", &what)) {
+    return NULL;
+  }
+
+  return self->py_modules->get_data_version_python(what);
+}
+
 
 static PyObject*
 ceph_get_server(BaseMgrModule *self, PyObject *args)
@@ -663,6 +674,18 @@ get_latest_counter(BaseMgrModule *self, PyObject *args)
       svc_name, svc_id, counter_path);
 }
 
+static PyObject*
+get_latest_counters(BaseMgrModule *self, PyObject *args)
+{
+  char *svc_type = nullptr;
+  int prio_limit = 0;
+  if (!PyArg_ParseTuple(args, "si:get_latest_counters", &svc_type,
+                                                         &prio_limit)) {
+    return nullptr;
+  }
+  return self->py_modules->get_latest_counters_python(svc_type, prio_limit);
+}
+
 static PyObject*
 get_perf_schema(BaseMgrModule *self, PyObject *args)
 {
@@ -1432,6 +1455,9 @@ PyMethodDef BaseMgrModule_methods[] = {
   {"_ceph_get", (PyCFunction)ceph_state_get, METH_VARARGS,
    "Get a cluster object"},
 
+  {"_ceph_get_data_version", (PyCFunction)ceph_state_get_data_version, METH_VARARGS,
+   "Get the version of a cluster object"},
+
   {"_ceph_get_server", (PyCFunction)ceph_get_server, METH_VARARGS,
    "Get a server object"},
 
@@ -1480,6 +1506,9 @@ PyMethodDef BaseMgrModule_methods[] = {
   {"_ceph_get_latest_counter", (PyCFunction)get_latest_counter, METH_VARARGS,
     "Get the latest performance counter"},
 
+  {"_ceph_get_latest_counters", (PyCFunction)get_latest_counters, METH_VARARGS,
+    "Get the latest values of the performance counters of a daemon type"},
+
   {"_ceph_get_perf_schema", (PyCFunction)get_perf_schema, METH_VARARGS,
     "Get the performance counter schema"},
 
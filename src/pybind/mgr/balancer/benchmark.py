@@ -0,0 +1,174 @@
+"""
+Benchmark of the balancer evaluation of an optimization pass, evaluating every
+step from scratch versus updating the evaluation of the previous step.
+
+Besides the evaluation alone, it times the Python side of a crush-compat
+optimize pass: building the state of every step, evaluating it and computing
+its misplaced ratio, as do_crush_compat() does. The full variant also dumps
+the crush map and indexes the pg stats at every step, as it used to.
+
+The clusters are built with OSDMap.build_simple(), which is only available
+within ceph-mgr. Run it through the selftest module::
+
+    echo 'from balancer.benchmark import main; main()' | ceph mgr self-test eval -i -
+"""
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from mgr_module import OSDMap
+
+from .module import Eval, MappingState, Module
+
+
+POOL_ID = 1
+
+
+class Evaluator(object):
+    """
+    The evaluation of the balancer module, outside of the module.
+    """
+    calc_eval = Module.calc_eval
+
+    def __init__(self, metrics: str = 'pgs,objects,bytes') -> None:
+        self.log = logging.getLogger(__name__)
+        self.metrics = metrics
+
+    def get_module_option(self, key: str) -> Any:
+        assert key == 'crush_compat_metrics'
+        return self.metrics
+
+
+class BenchOSDMap(object):
+    """
+    A build_simple() map, with its osds in and a replicated pool whose pgs
+    are mapped by @pg_up rather than by CRUSH.
+    """
+    def __init__(self, osdmap: OSDMap, dump: Dict[str, Any], pg_up: Dict[str, List[int]]) -> None:
+        self.osdmap = osdmap
+        self._dump = dump
+        self.pg_up = pg_up
+
+    def dump(self) -> Dict[str, Any]:
+        return self._dump
+
+    def get_crush(self):
+        return self.osdmap.get_crush()
+
+    def get_pools_by_take(self, take: int) -> List[int]:
+        return [POOL_ID]
+
+    def map_pool_pgs_up(self, poolid: int) -> Dict[str, List[int]]:
+        return self.pg_up
+
+
+class Cluster(object):
+    def __init__(self, num_osd: int, pgs_per_osd: int, size: int, rng: random.Random) -> None:
+        self.rng = rng
+        self.osdmap = OSDMap.build_simple(num_osd=num_osd)
+        num_pg = num_osd * pgs_per_osd // size
+        self.dump = self.osdmap.dump()
+        for osd in self.dump['osds']:
+            osd['weight'] = 1.0
+        self.dump['pools'] = [{
+            'pool': POOL_ID,
+            'pool_name': 'bench',
+            'crush_rule': 0,
+            'size': size,
+            'pg_num': num_pg,
+            'pg_num_target': num_pg,
+        }]
+        osds = [o['osd'] for o in self.dump['osds']]
+        self.pg_up = {}
+        self.pgs_by_osd: Dict[int, set] = {osd: set() for osd in osds}
+        pg_stats = []
+        for ps in range(num_pg):
+            pgid = '%d.%x' % (POOL_ID, ps)
+            up = rng.sample(osds, size)
+            self.pg_up[pgid] = up
+            for osd in up:
+                self.pgs_by_osd[osd].add(pgid)
+            objects = rng.randint(500, 1500)
+            pg_stats.append({
+                'pgid': pgid,
+                'stat_sum': {'num_objects': objects, 'num_bytes': objects << 22},
+            })
+        self.raw_pg_stats = {'pg_stats': pg_stats}
+        self.raw_pool_stats = {'pool_stats': [{'poolid': POOL_ID}]}
+        self.pg_stat: Optional[Dict[str, Any]] = None
+
+    def state(self, desc: str, shared: bool = True) -> MappingState:
+        ms = MappingState(BenchOSDMap(self.osdmap, self.dump, dict(self.pg_up)),
+                          self.raw_pg_stats, self.raw_pool_stats, desc,
+                          pg_stat=self.pg_stat if shared else None)
+        if self.pg_stat is None:
+            self.pg_stat = ms.pg_stat
+        return ms
+
+    def move_pgs(self, pe: Eval, moves: int) -> int:
+        """
+        move a replica of a pg from each of the @moves fullest osds to one of
+        the emptiest ones, as pg-upmap-items would.
+        """
+        count = pe.count_by_pool['bench']['pgs']
+        by_count = sorted(self.pgs_by_osd, key=lambda osd: count.get(osd, 0))
+        did = 0
+        for src, dst in zip(reversed(by_count[-moves:]), by_count[:moves]):
+            candidates = [pgid for pgid in self.pgs_by_osd[src]
+                          if dst not in self.pg_up[pgid]]
+            if not candidates:
+                continue
+            pgid = self.rng.choice(candidates)
+            self.pg_up[pgid] = [dst if osd == src else osd for osd in self.pg_up[pgid]]
+            self.pgs_by_osd[src].remove(pgid)
+            self.pgs_by_osd[dst].add(pgid)
+            did += 1
+        return did
+
+
+def run(num_osd: int, pgs_per_osd: int, size: int, steps: int, moves: int, seed: int) -> str:
+    evaluator = Evaluator()
+    cluster = Cluster(num_osd, pgs_per_osd, size, random.Random(seed))
+    initial = cluster.state('initial')
+    pe = evaluator.calc_eval(initial, [])
+    initial_score = pe.score
+    full = incremental = 0.0
+    full_pass = incremental_pass = 0.0
+    did = 0
+    for step in range(steps):
+        did += cluster.move_pgs(pe, moves)
+
+        start = time.perf_counter()
+        ms = cluster.state('step %d' % step, shared=False)
+        ms.crush_dump  # dumped by every state before
+        eval_start = time.perf_counter()
+        full_pe = evaluator.calc_eval(ms, [])
+        full += time.perf_counter() - eval_start
+        ms.calc_misplaced_from(initial)
+        full_pass += time.perf_counter() - start
+
+        start = time.perf_counter()
+        ms = cluster.state('step %d' % step)
+        eval_start = time.perf_counter()
+        pe = evaluator.calc_eval(ms, [], base=pe)
+        incremental += time.perf_counter() - eval_start
+        ms.calc_misplaced_from(initial)
+        incremental_pass += time.perf_counter() - start
+        assert abs(pe.score - full_pe.score) <= 1e-9, (pe.score, full_pe.score)
+    return ('{:>6} osds {:>8} pgs: {} moves, score {:.6f} -> {:.6f}, '
+            'evaluation {:.1f} ms full, {:.1f} ms incremental, '
+            'optimize pass of {} steps {:.1f} ms full, {:.1f} ms incremental'.format(
+                num_osd, len(cluster.pg_up), did, initial_score, pe.score,
+                full * 1000 / max(steps, 1), incremental * 1000 / max(steps, 1),
+                steps, full_pass * 1000, incremental_pass * 1000))
+
+
+def main(osds: Sequence[int] = (1000, 5000, 10000),
+         pgs_per_osd: int = 100,
+         size: int = 3,
+         steps: int = 10,
+         moves: int = 10,
+         seed: int = 0) -> None:
+    for num_osd in osds:
+        print(run(num_osd, pgs_per_osd, size, steps, moves, seed))
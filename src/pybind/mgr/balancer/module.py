@@ -19,17 +19,20 @@ TIME_FORMAT = '%Y-%m-%d_%H:%M:%S'
 
 
 class MappingState:
-    def __init__(self, osdmap, raw_pg_stats, raw_pool_stats, desc=''):
+    def __init__(self, osdmap, raw_pg_stats, raw_pool_stats, desc='', pg_stat=None):
         self.desc = desc
         self.osdmap = osdmap
         self.osdmap_dump = self.osdmap.dump()
         self.crush = osdmap.get_crush()
-        self.crush_dump = self.crush.dump()
+        self._crush_dump = None
         self.raw_pg_stats = raw_pg_stats
         self.raw_pool_stats = raw_pool_stats
-        self.pg_stat = {
-            i['pgid']: i['stat_sum'] for i in raw_pg_stats.get('pg_stats', [])
-        }
+        if pg_stat is None:
+            # not shared with a state built from the same raw_pg_stats
+            pg_stat = {
+                i['pgid']: i['stat_sum'] for i in raw_pg_stats.get('pg_stats', [])
+            }
+        self.pg_stat = pg_stat
         osd_poolids = [p['pool'] for p in self.osdmap_dump.get('pools', [])]
         pg_poolids = [p['poolid'] for p in raw_pool_stats.get('pool_stats', [])]
         self.poolids = set(osd_poolids) & set(pg_poolids)
@@ -40,6 +43,14 @@ class MappingState:
             for a, b in self.pg_up_by_poolid[poolid].items():
                 self.pg_up[a] = b
 
+    @property
+    def crush_dump(self):
+        # dumped on demand: the states of the steps of an optimization are
+        # only evaluated, which does not need it
+        if self._crush_dump is None:
+            self._crush_dump = self.crush.dump()
+        return self._crush_dump
+
     def calc_misplaced_from(self, other_ms):
         num = len(other_ms.pg_up)
         misplaced = 0
@@ -93,7 +104,8 @@ class MsPlan(Plan):
         return MappingState(self.initial.osdmap.apply_incremental(self.inc),
                             self.initial.raw_pg_stats,
                             self.initial.raw_pool_stats,
-                            'plan %s final' % self.name)
+                            'plan %s final' % self.name,
+                            pg_stat=self.initial.pg_stat)
 
     def show(self) -> str:
         ls = []
@@ -151,6 +163,9 @@ class Eval:
         self.read_balance_score_by_pool: Dict[str, Dict[str, float]] = {}
         self.read_balance_score_acting_by_pool: Dict[str, float] = {}
 
+        # root -> by_* -> osd -> count, kept as integers
+        self.raw_count_by_root: Dict[str, dict] = {}
+
     def show(self, verbose: bool = False) -> str:
         if verbose:
             r = self.ms.desc + '\n'
@@ -172,6 +187,132 @@ class Eval:
             r += 'read_balance_scores (lower is better) %s\n' % self.read_balance_score_acting_by_pool
         return r
 
+    def same_layout(self, other: 'Eval') -> bool:
+        """
+        Whether the pg counts of @other can be updated into ours: same pg
+        stats, pools, pgs, roots and osds under each root.
+        """
+        return (self.ms.pg_stat is other.ms.pg_stat
+                and self.pool_name == other.pool_name
+                and self.pool_roots == other.pool_roots
+                and all(self.ms.pg_up_by_poolid[p].keys() == other.ms.pg_up_by_poolid[p].keys()
+                        for p in self.pool_name)
+                and self.target_by_root.keys() == other.target_by_root.keys()
+                and all(t.keys() == other.target_by_root[r].keys()
+                        for r, t in self.target_by_root.items()))
+
+    def reset_counts(self) -> None:
+        for pool in self.pool_id:
+            self.count_by_pool[pool] = {'pgs': {}, 'objects': {}, 'bytes': {}}
+            self.total_by_pool[pool] = {'pgs': 0, 'objects': 0, 'bytes': 0}
+        for root, target in self.target_by_root.items():
+            self.raw_count_by_root[root] = {
+                'pgs': dict.fromkeys(target, 0),
+                'objects': dict.fromkeys(target, 0),
+                'bytes': dict.fromkeys(target, 0),
+            }
+            self.total_by_root[root] = {'pgs': 0, 'objects': 0, 'bytes': 0}
+
+    def copy_counts(self, other: 'Eval') -> None:
+        def copy_counts(counts):
+            return {a: {k: dict(v) for k, v in b.items()} for a, b in counts.items()}
+
+        self.count_by_pool = copy_counts(other.count_by_pool)
+        self.raw_count_by_root = copy_counts(other.raw_count_by_root)
+        self.total_by_pool = {a: dict(b) for a, b in other.total_by_pool.items()}
+        self.total_by_root = {a: dict(b) for a, b in other.total_by_root.items()}
+
+    def account_pgs(self, pool: str, mappings, sign: int = 1) -> None:
+        """
+        Add (or remove, with a negative @sign) the pgs of @pool, given as
+        (pgid, up set) tuples, to the counts.
+        """
+        pgs_by_osd = self.count_by_pool[pool]['pgs']
+        objects_by_osd = self.count_by_pool[pool]['objects']
+        bytes_by_osd = self.count_by_pool[pool]['bytes']
+        total = self.total_by_pool[pool]
+        roots = [(self.target_by_root[root], self.raw_count_by_root[root], self.total_by_root[root])
+                 for root in self.pool_roots[pool]]
+        for pgid, up in mappings:
+            stat = self.ms.pg_stat[pgid]
+            objects = sign * stat['num_objects']
+            bytes = sign * stat['num_bytes']
+            for osd in [int(osd) for osd in up]:
+                if osd == CRUSHMap.ITEM_NONE:
+                    continue
+                pgs = pgs_by_osd.get(osd, 0) + sign
+                if pgs:
+                    pgs_by_osd[osd] = pgs
+                    objects_by_osd[osd] = objects_by_osd.get(osd, 0) + objects
+                    bytes_by_osd[osd] = bytes_by_osd.get(osd, 0) + bytes
+                else:
+                    del pgs_by_osd[osd]
+                    del objects_by_osd[osd]
+                    del bytes_by_osd[osd]
+                # pick a root to associate this pg instance with.
+                # note that this is imprecise if the roots have
+                # overlapping children.
+                # FIXME: divide bytes by k for EC pools.
+                for target, actual, root_total in roots:
+                    if osd in target:
+                        actual['pgs'][osd] += sign
+                        actual['objects'][osd] += objects
+                        actual['bytes'][osd] += bytes
+                        total['pgs'] += sign
+                        total['objects'] += objects
+                        total['bytes'] += bytes
+                        root_total['pgs'] += sign
+                        root_total['objects'] += objects
+                        root_total['bytes'] += bytes
+                        break
+
+    def update_stats(self, metrics: List[str]) -> None:
+        """
+        Compute the actual distributions, stats and scores from the counts.
+        """
+        for pool, count in self.count_by_pool.items():
+            total = self.total_by_pool[pool]
+            self.actual_by_pool[pool] = {
+                t: {k: float(v) / float(max(total[t], 1)) for k, v in count[t].items()}
+                for t in ('pgs', 'objects', 'bytes')
+            }
+        for root, actual in self.raw_count_by_root.items():
+            total = self.total_by_root[root]
+            self.count_by_root[root] = {
+                t: {k: float(v) for k, v in actual[t].items()}
+                for t in ('pgs', 'objects', 'bytes')
+            }
+            self.actual_by_root[root] = {
+                t: {k: float(v) / float(max(total[t], 1)) for k, v in actual[t].items()}
+                for t in ('pgs', 'objects', 'bytes')
+            }
+
+        # average and stddev and score
+        self.stats_by_root = {
+            a: self.calc_stats(
+                b,
+                self.target_by_root[a],
+                self.total_by_root[a]
+            ) for a, b in self.count_by_root.items()
+        }
+
+        # the scores are already normalized
+        self.score_by_root = {
+            r: {
+                'pgs': self.stats_by_root[r]['pgs']['score'],
+                'objects': self.stats_by_root[r]['objects']['score'],
+                'bytes': self.stats_by_root[r]['bytes']['score'],
+            } for r in self.total_by_root.keys()
+        }
+
+        # total score is just average of normalized stddevs
+        self.score = 0.0
+        for r, vs in self.score_by_root.items():
+            for k, v in vs.items():
+                if k in metrics:
+                    self.score += v
+        self.score /= len(metrics) * len(self.root_ids)
+
     def calc_stats(self, count, target, total):
         num = max(len(target), 1)
         r: Dict[str, Dict[str, Union[int, float]]] = {}
@@ -781,7 +922,14 @@ class Module(MgrModule):
                           pools)
         return plan
 
-    def calc_eval(self, ms: MappingState, pools: List[str]) -> Eval:
+    def calc_eval(self, ms: MappingState, pools: List[str],
+                  base: Optional[Eval] = None) -> Eval:
+        """
+        Evaluate the distribution of @ms. If given, @base is the evaluation
+        of a state of the same cluster (e.g. before a step of an optimization)
+        whose counts are updated for the pgs mapped differently, instead of
+        counting all pgs again.
+        """
         pe = Eval(ms)
         pool_rule = {}
         pool_info = {}
@@ -807,9 +955,7 @@ class Module(MgrModule):
                       for a in ms.osdmap_dump.get('osds', []) if a['weight'] > 0}
 
         # get expected distributions by root
-        actual_by_root: Dict[str, Dict[str, dict]] = {}
         rootids = ms.crush.find_takes()
-        roots = []
         for rootid in rootids:
             ls = ms.osdmap.get_pools_by_take(rootid)
             want = []
@@ -825,7 +971,6 @@ class Module(MgrModule):
                 pe.pool_roots[pe.pool_name[poolid]].append(root)
                 pe.root_pools[root].append(pe.pool_name[poolid])
             pe.root_ids[root] = rootid
-            roots.append(root)
             weight_map = ms.crush.get_take_weight_osd_map(rootid)
             adjusted_map = {
                 osd: cw * osd_weight[osd]
@@ -835,94 +980,28 @@ class Module(MgrModule):
             assert len(adjusted_map) == 0 or sum_w > 0
             pe.target_by_root[root] = {osd: w / sum_w
                                        for osd, w in adjusted_map.items()}
-            actual_by_root[root] = {
-                'pgs': {},
-                'objects': {},
-                'bytes': {},
-            }
-            for osd in pe.target_by_root[root]:
-                actual_by_root[root]['pgs'][osd] = 0
-                actual_by_root[root]['objects'][osd] = 0
-                actual_by_root[root]['bytes'][osd] = 0
-            pe.total_by_root[root] = {
-                'pgs': 0,
-                'objects': 0,
-                'bytes': 0,
-            }
         self.log.debug('pool_roots %s' % pe.pool_roots)
         self.log.debug('root_pools %s' % pe.root_pools)
         self.log.debug('target_by_root %s' % pe.target_by_root)
 
         # pool and root actual
+        if base is not None and pe.same_layout(base):
+            # only account for the pgs whose mapping changed
+            pe.copy_counts(base)
+            for pool, pi in pool_info.items():
+                poolid = pi['pool']
+                pm = ms.pg_up_by_poolid[poolid]
+                base_pm = base.ms.pg_up_by_poolid[poolid]
+                changed = [pgid for pgid, up in pm.items() if up != base_pm[pgid]]
+                pe.account_pgs(pool, [(pgid, base_pm[pgid]) for pgid in changed], -1)
+                pe.account_pgs(pool, [(pgid, pm[pgid]) for pgid in changed])
+            self.log.debug('reused counts of %s' % base.ms.desc)
+        else:
+            pe.reset_counts()
+            for pool, pi in pool_info.items():
+                pe.account_pgs(pool, ms.pg_up_by_poolid[pi['pool']].items())
+
         for pool, pi in pool_info.items():
-            poolid = pi['pool']
-            pm = ms.pg_up_by_poolid[poolid]
-            pgs = 0
-            objects = 0
-            bytes = 0
-            pgs_by_osd = {}
-            objects_by_osd = {}
-            bytes_by_osd = {}
-            for pgid, up in pm.items():
-                for osd in [int(osd) for osd in up]:
-                    if osd == CRUSHMap.ITEM_NONE:
-                        continue
-                    if osd not in pgs_by_osd:
-                        pgs_by_osd[osd] = 0
-                        objects_by_osd[osd] = 0
-                        bytes_by_osd[osd] = 0
-                    pgs_by_osd[osd] += 1
-                    objects_by_osd[osd] += ms.pg_stat[pgid]['num_objects']
-                    bytes_by_osd[osd] += ms.pg_stat[pgid]['num_bytes']
-                    # pick a root to associate this pg instance with.
-                    # note that this is imprecise if the roots have
-                    # overlapping children.
-                    # FIXME: divide bytes by k for EC pools.
-                    for root in pe.pool_roots[pool]:
-                        if osd in pe.target_by_root[root]:
-                            actual_by_root[root]['pgs'][osd] += 1
-                            actual_by_root[root]['objects'][osd] += ms.pg_stat[pgid]['num_objects']
-                            actual_by_root[root]['bytes'][osd] += ms.pg_stat[pgid]['num_bytes']
-                            pgs += 1
-                            objects += ms.pg_stat[pgid]['num_objects']
-                            bytes += ms.pg_stat[pgid]['num_bytes']
-                            pe.total_by_root[root]['pgs'] += 1
-                            pe.total_by_root[root]['objects'] += ms.pg_stat[pgid]['num_objects']
-                            pe.total_by_root[root]['bytes'] += ms.pg_stat[pgid]['num_bytes']
-                            break
-            pe.count_by_pool[pool] = {
-                'pgs': {
-                    k: v
-                    for k, v in pgs_by_osd.items()
-                },
-                'objects': {
-                    k: v
-                    for k, v in objects_by_osd.items()
-                },
-                'bytes': {
-                    k: v
-                    for k, v in bytes_by_osd.items()
-                },
-            }
-            pe.actual_by_pool[pool] = {
-                'pgs': {
-                    k: float(v) / float(max(pgs, 1))
-                    for k, v in pgs_by_osd.items()
-                },
-                'objects': {
-                    k: float(v) / float(max(objects, 1))
-                    for k, v in objects_by_osd.items()
-                },
-                'bytes': {
-                    k: float(v) / float(max(bytes, 1))
-                    for k, v in bytes_by_osd.items()
-                },
-            }
-            pe.total_by_pool[pool] = {
-                'pgs': pgs,
-                'objects': objects,
-                'bytes': bytes,
-            }
             try:
                 read_balance_scores = pi['read_balance']
                 pe.read_balance_score_acting_by_pool[pool] = read_balance_scores['score_acting']
@@ -939,68 +1018,13 @@ class Module(MgrModule):
                 self.log.debug("Skipping pool '{}' since it does not have a read_balance_score, "
                                "likely because it is not replicated.".format(pool))
 
-        for root in pe.total_by_root:
-            pe.count_by_root[root] = {
-                'pgs': {
-                    k: float(v)
-                    for k, v in actual_by_root[root]['pgs'].items()
-                },
-                'objects': {
-                    k: float(v)
-                    for k, v in actual_by_root[root]['objects'].items()
-                },
-                'bytes': {
-                    k: float(v)
-                    for k, v in actual_by_root[root]['bytes'].items()
-                },
-            }
-            pe.actual_by_root[root] = {
-                'pgs': {
-                    k: float(v) / float(max(pe.total_by_root[root]['pgs'], 1))
-                    for k, v in actual_by_root[root]['pgs'].items()
-                },
-                'objects': {
-                    k: float(v) / float(max(pe.total_by_root[root]['objects'], 1))
-                    for k, v in actual_by_root[root]['objects'].items()
-                },
-                'bytes': {
-                    k: float(v) / float(max(pe.total_by_root[root]['bytes'], 1))
-                    for k, v in actual_by_root[root]['bytes'].items()
-                },
-            }
+        # get the list of score metrics, comma separated
+        metrics = cast(str, self.get_module_option('crush_compat_metrics')).split(',')
+        pe.update_stats(metrics)
         self.log.debug('actual_by_pool %s' % pe.actual_by_pool)
         self.log.debug('actual_by_root %s' % pe.actual_by_root)
-
-        # average and stddev and score
-        pe.stats_by_root = {
-            a: pe.calc_stats(
-                b,
-                pe.target_by_root[a],
-                pe.total_by_root[a]
-            ) for a, b in pe.count_by_root.items()
-        }
         self.log.debug('stats_by_root %s' % pe.stats_by_root)
-
-        # the scores are already normalized
-        pe.score_by_root = {
-            r: {
-                'pgs': pe.stats_by_root[r]['pgs']['score'],
-                'objects': pe.stats_by_root[r]['objects']['score'],
-                'bytes': pe.stats_by_root[r]['bytes']['score'],
-            } for r in pe.total_by_root.keys()
-        }
         self.log.debug('score_by_root %s' % pe.score_by_root)
-
-        # get the list of score metrics, comma separated
-        metrics = cast(str, self.get_module_option('crush_compat_metrics')).split(',')
-
-        # total score is just average of normalized stddevs
-        pe.score = 0.0
-        for r, vs in pe.score_by_root.items():
-            for k, v in vs.items():
-                if k in metrics:
-                    pe.score += v
-        pe.score /= len(metrics) * len(roots)
         return pe
 
     def evaluate(self, ms: MappingState, pools: List[str], verbose: bool = False) -> str:
@@ -1342,7 +1366,7 @@ class Module(MgrModule):
             # recalc
             plan.compat_ws = copy.deepcopy(next_ws)
             next_ms = plan.final_state()
-            next_pe = self.calc_eval(next_ms, plan.pools)
+            next_pe = self.calc_eval(next_ms, plan.pools, base=best_pe)
             next_misplaced = next_ms.calc_misplaced_from(ms)
             self.log.debug('Step result score %f -> %f, misplacing %f',
                            best_pe.score, next_pe.score, next_misplaced)
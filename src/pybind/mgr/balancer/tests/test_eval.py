@@ -0,0 +1,114 @@
+import random
+from unittest import mock
+
+import pytest
+
+from balancer.module import CRUSHMap, Eval, MappingState, Module
+
+
+NUM_OSD = 8
+POOLS = {1: ('rbd', 64, 3), 2: ('cephfs_data', 32, 2)}  # id -> name, pg_num, size
+
+
+class FakeCrush:
+    def find_takes(self):
+        return [-1]
+
+    def get_item_name(self, item):
+        return 'default'
+
+    def get_take_weight_osd_map(self, root):
+        return {osd: 1.0 for osd in range(NUM_OSD)}
+
+    def dump(self):
+        raise AssertionError('the evaluation does not need the crush dump')
+
+
+class FakeOSDMap:
+    def __init__(self, pg_up):
+        self.pg_up = pg_up
+
+    def dump(self):
+        return {
+            'pools': [{'pool': poolid, 'pool_name': name, 'crush_rule': 0}
+                      for poolid, (name, _, _) in POOLS.items()],
+            'osds': [{'osd': osd, 'weight': 1.0} for osd in range(NUM_OSD)],
+        }
+
+    def get_crush(self):
+        return FakeCrush()
+
+    def get_pools_by_take(self, take):
+        return list(POOLS)
+
+    def map_pool_pgs_up(self, poolid):
+        return {pgid: up for pgid, up in self.pg_up.items()
+                if pgid.startswith('%d.' % poolid)}
+
+
+@pytest.fixture
+def balancer():
+    # CRUSHMap derives from the mocked ceph_module
+    with mock.patch.object(CRUSHMap, 'ITEM_NONE', 0x7fffffff, create=True):
+        yield Module('balancer', 0, 0)
+
+
+@pytest.fixture
+def cluster():
+    rng = random.Random(0)
+    pg_up = {}
+    pg_stats = []
+    for poolid, (_, pg_num, size) in POOLS.items():
+        for ps in range(pg_num):
+            pgid = '%d.%x' % (poolid, ps)
+            pg_up[pgid] = rng.sample(range(NUM_OSD), size)
+            objects = rng.randint(10, 100)
+            pg_stats.append({
+                'pgid': pgid,
+                'stat_sum': {'num_objects': objects, 'num_bytes': objects << 22},
+            })
+    raw_pg_stats = {'pg_stats': pg_stats}
+    raw_pool_stats = {'pool_stats': [{'poolid': poolid} for poolid in POOLS]}
+    return rng, pg_up, raw_pg_stats, raw_pool_stats
+
+
+def assert_same_eval(pe, full_pe):
+    assert pe.count_by_pool == full_pe.count_by_pool
+    assert pe.count_by_root == full_pe.count_by_root
+    assert pe.total_by_pool == full_pe.total_by_pool
+    assert pe.total_by_root == full_pe.total_by_root
+    assert pe.actual_by_root == full_pe.actual_by_root
+    for root, scores in full_pe.score_by_root.items():
+        assert pe.score_by_root[root] == pytest.approx(scores)
+    assert pe.score == pytest.approx(full_pe.score)
+
+
+def test_incremental_eval_matches_full_eval(balancer, cluster):
+    rng, pg_up, raw_pg_stats, raw_pool_stats = cluster
+    ms = MappingState(FakeOSDMap(dict(pg_up)), raw_pg_stats, raw_pool_stats, 'initial')
+    pe = balancer.calc_eval(ms, [])
+    for step in range(5):
+        # remap a replica of a few pgs, as an optimization step would
+        for pgid in rng.sample(sorted(pg_up), 10):
+            up = pg_up[pgid]
+            src = rng.choice(up)
+            dst = rng.choice([osd for osd in range(NUM_OSD) if osd not in up])
+            pg_up[pgid] = [dst if osd == src else osd for osd in up]
+        next_ms = MappingState(FakeOSDMap(dict(pg_up)), raw_pg_stats, raw_pool_stats,
+                               'step %d' % step, pg_stat=ms.pg_stat)
+        with mock.patch.object(Eval, 'reset_counts', side_effect=AssertionError):
+            next_pe = balancer.calc_eval(next_ms, [], base=pe)
+        assert_same_eval(next_pe, balancer.calc_eval(next_ms, []))
+        pe = next_pe
+
+
+def test_eval_of_other_layout_counts_all_pgs(balancer, cluster):
+    _, pg_up, raw_pg_stats, raw_pool_stats = cluster
+    ms = MappingState(FakeOSDMap(dict(pg_up)), raw_pg_stats, raw_pool_stats, 'initial')
+    pe = balancer.calc_eval(ms, [])
+    del pg_up['1.0']
+    # not sharing the pg stats of the base state
+    next_ms = MappingState(FakeOSDMap(dict(pg_up)), raw_pg_stats, raw_pool_stats, 'merged')
+    next_pe = balancer.calc_eval(next_ms, [], base=pe)
+    assert_same_eval(next_pe, balancer.calc_eval(next_ms, []))
+    assert next_pe.total_by_pool['rbd']['pgs'] == pe.total_by_pool['rbd']['pgs'] - 3
@@ -69,12 +69,14 @@ class BaseMgrModule(object):
     def _ceph_cluster_log(self, channel: str, priority: int, message: str) -> None: ...
     def _ceph_get_context(self) -> object: ...
     def _ceph_get(self, data_name: str) -> Any: ...
+    def _ceph_get_data_version(self, data_name: str) -> Optional[Tuple[int, ...]]: ...
     def _ceph_get_server(self, hostname: Optional[str]) -> Union[ServerInfoT,
                                                                  List[ServerInfoT]]: ...
     def _ceph_get_perf_schema(self, svc_type: str, svc_name: str) -> Dict[str, Any]: ...
     def _ceph_get_rocksdb_version(self) -> str: ...
     def _ceph_get_counter(self, svc_type: str, svc_name: str, path: str) -> Dict[str, List[Tuple[float, int]]]: ...
     def _ceph_get_latest_counter(self, svc_type, svc_name, path): ...
+    def _ceph_get_latest_counters(self, svc_type: str, prio_limit: int) -> Dict[str, Dict[str, List[Any]]]: ...
     def _ceph_get_metadata(self, svc_type, svc_id): ...
     def _ceph_get_daemon_status(self, svc_type, svc_id): ...
     def _ceph_send_command(self,
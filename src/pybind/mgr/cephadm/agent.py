@@ -657,6 +657,8 @@ class HostData(Server):
             # host agent is reporting on is marked offline, it shouldn't be any more
             self.mgr.offline_hosts_remove(data['host'])
             results['result'] = self.handle_metadata(data)
+            # tell the agent what we hold, so it only sends what changed
+            results['hashes'] = dict(self.mgr.cache.metadata_hashes.get(data['host'], {}))
         return results
 
     def check_request_fields(self, data: Dict[str, Any]) -> None:
@@ -685,9 +687,14 @@ class HostData(Server):
         except Exception as e:
             raise Exception(
                 f'Counter value from agent on host {host} could not be converted to an integer: {e}')
+        if 'hashes' in data and not isinstance(data['hashes'], dict):
+            raise Exception(
+                f'Agent on host {host} reported malformed metadata hashes ("hashes" field)')
         metadata_types = ['ls', 'networks', 'facts', 'volume']
         metadata_types_str = '{' + ', '.join(metadata_types) + '}'
-        if not all(item in data.keys() for item in metadata_types):
+        # unchanged metadata is only reported by its hash
+        reported = set(data.keys()) | set(data.get('hashes', {}).keys())
+        if not all(item in reported for item in metadata_types):
             self.mgr.log.warning(
                 f'Agent on host {host} reported incomplete metadata. Not all of {metadata_types_str} were present. Received fields {fields}')
 
@@ -720,16 +727,35 @@ class HostData(Server):
                 self.mgr.log.debug(
                     f'Received old metadata from agent on host {host}. Requested up-to-date metadata.')
 
+            # agents send the hash of each section of metadata, and leave out
+            # the sections whose hash matches the one we hold
+            hashes: Dict[str, str] = data.get('hashes', {})
+            held = self.mgr.cache.metadata_hashes.setdefault(host, {})
+            unchanged = set(
+                section for section, digest in hashes.items()
+                if section not in data and held.get(section) == digest
+            )
+            for section in unchanged:
+                self.mgr.cache.metadata_unchanged(host, section)
+
             if 'ls' in data and data['ls']:
                 self.mgr._process_ls_output(host, data['ls'])
                 self.mgr.update_failed_daemon_health_check()
             if 'networks' in data and data['networks']:
                 self.mgr.cache.update_host_networks(host, data['networks'])
             if 'facts' in data and data['facts']:
-                self.mgr.cache.update_host_facts(host, json.loads(data['facts']))
+                if 'hashes' in data:
+                    if not self.mgr.cache.apply_host_facts_report(host, json.loads(data['facts'])):
+                        self.mgr.log.debug(
+                            f'Could not apply facts delta from agent on host {host}. Requesting all facts')
+                else:
+                    self.mgr.cache.update_host_facts(host, json.loads(data['facts']))
             if 'volume' in data and data['volume']:
                 ret = Devices.from_json(json.loads(data['volume']))
                 self.mgr.cache.update_host_devices(host, ret.devices)
+            for section in ['ls', 'networks', 'volume']:
+                if section in hashes and section in data:
+                    held[section] = hashes[section]
 
             if (
                 error_daemons_old != set([dd.name() for dd in self.mgr.cache.get_error_daemons()])
@@ -739,7 +765,7 @@ class HostData(Server):
                     f'Change detected in state of daemons from {host} agent metadata. Kicking serve loop')
                 self.mgr._kick_serve_loop()
 
-            if up_to_date and ('ls' in data and data['ls']):
+            if up_to_date and (('ls' in data and data['ls']) or 'ls' in unchanged):
                 was_out_of_date = not self.mgr.cache.all_host_metadata_up_to_date()
                 self.mgr.cache.metadata_up_to_date[host] = True
                 if was_out_of_date and self.mgr.cache.all_host_metadata_up_to_date():
@@ -0,0 +1,144 @@
+"""
+Benchmark of the wall time of a fleet-wide metadata refresh over ssh, running
+the refresh commands of every host one round trip after the other from a pool
+of worker threads, as the serve loop used to, versus running those of a host
+all at once over its connection, on many hosts at a time with
+SSHManager._on_hosts(), as CephadmServe._fetch_host_metadata() does.
+
+All hosts are served by a local asyncssh server, whose commands take
+--command-time ms to run. Run it from src/pybind/mgr within the tox
+environment::
+
+    UNITTEST=true python -m cephadm.benchmark --hosts 10,100,300
+"""
+import argparse
+import asyncio
+import multiprocessing.pool
+import time
+from tempfile import NamedTemporaryFile
+from typing import Any, Dict, List, Set
+
+import asyncssh
+
+from .ssh import EventLoopThread, Executables, RemoteCommand, SSHManager
+
+# ls, gather-facts, list-networks
+COMMANDS_PER_HOST = 3
+
+
+class BenchServer(asyncssh.SSHServer):
+    def begin_auth(self, username: str) -> bool:
+        # no authentication
+        return False
+
+
+class FakeInventory(object):
+    def __init__(self, hosts: List[str]) -> None:
+        self.hosts = set(hosts)
+
+    def __contains__(self, host: str) -> bool:
+        return host in self.hosts
+
+    def get_addr(self, host: str) -> str:
+        return '127.0.0.1'
+
+
+class FakeMgr(object):
+    def __init__(self, hosts: List[str], port: int, args: argparse.Namespace) -> None:
+        self.inventory = FakeInventory(hosts)
+        self.offline_hosts: Set[str] = set()
+        self.ssh_user = 'root'
+        self._ssh_options = None
+        self._cluster_fsid = 'fsid'
+        self.ssh_keepalive_interval = 7
+        self.ssh_keepalive_count_max = 3
+        self.ssh_max_sessions_per_host = args.sessions_per_host
+        self.ssh_max_concurrent_hosts = args.concurrent_hosts
+        self.tkey = NamedTemporaryFile(prefix='cephadm-benchmark-identity-')
+        self.tkey.write(asyncssh.generate_private_key('ssh-ed25519').export_private_key())
+        self.tkey.flush()
+        self.config = NamedTemporaryFile(prefix='cephadm-benchmark-conf-', mode='w')
+        self.config.write(f'Host *\n  Port {port}\n')
+        self.config.flush()
+        self.ssh_config_fname = self.config.name
+
+    def offline_hosts_remove(self, host: str) -> None:
+        self.offline_hosts.discard(host)
+
+
+def start_server(loop: EventLoopThread, command_time: float) -> Any:
+    async def handle(process: Any) -> None:
+        await asyncio.sleep(command_time)
+        process.stdout.write('{}\n')
+        process.exit(0)
+
+    async def start() -> Any:
+        return await asyncssh.create_server(
+            BenchServer, '127.0.0.1', 0,
+            server_host_keys=[asyncssh.generate_private_key('ssh-ed25519')],
+            process_factory=handle)
+
+    return loop.get_result(start())
+
+
+def refresh_threaded(loop: EventLoopThread, ssh: SSHManager, hosts: List[str], cmd: RemoteCommand) -> None:
+    def refresh(host: str) -> None:
+        for _ in range(COMMANDS_PER_HOST):
+            loop.get_result(ssh._execute_command(host, cmd))
+
+    with multiprocessing.pool.ThreadPool(10) as pool:
+        pool.map(refresh, hosts)
+
+
+def refresh_batched(loop: EventLoopThread, ssh: SSHManager, hosts: List[str], cmd: RemoteCommand) -> None:
+    async def refresh(host: str) -> None:
+        await asyncio.gather(*[ssh._execute_command(host, cmd) for _ in range(COMMANDS_PER_HOST)])
+
+    results = loop.get_result(ssh._on_hosts(hosts, refresh))
+    failed = {h: r for h, r in results.items() if isinstance(r, BaseException)}
+    assert not failed, failed
+
+
+def run(loop: EventLoopThread, port: int, num_hosts: int, args: argparse.Namespace) -> str:
+    hosts = ['host%d' % i for i in range(num_hosts)]
+    cmd = RemoteCommand(Executables.TRUE)
+    timings: Dict[str, List[float]] = {}
+    for name, refresh in (('threaded', refresh_threaded), ('batched', refresh_batched)):
+        ssh = SSHManager(FakeMgr(hosts, port, args))  # type: ignore
+        for _ in range(args.rounds + 1):
+            # the first round includes connecting to every host
+            start = time.perf_counter()
+            refresh(loop, ssh, hosts, cmd)
+            timings.setdefault(name, []).append(time.perf_counter() - start)
+        ssh._reset_cons()
+    return '{:>5} hosts: {}'.format(num_hosts, ', '.join(
+        '{} {:.2f}s cold {:.2f}s warm'.format(
+            name, t[0], sum(t[1:]) / max(len(t) - 1, 1))
+        for name, t in timings.items()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--hosts', default='10,100,300',
+                        help='comma separated list of host counts')
+    parser.add_argument('--command-time', type=float, default=50,
+                        help='run time of a command in ms')
+    parser.add_argument('--rounds', type=int, default=3,
+                        help='refreshes to time after the first one')
+    parser.add_argument('--sessions-per-host', type=int, default=8)
+    parser.add_argument('--concurrent-hosts', type=int, default=100)
+    args = parser.parse_args()
+
+    loop = EventLoopThread()
+    try:
+        server = start_server(loop, args.command_time / 1000)
+        port = server.sockets[0].getsockname()[1]
+        for num_hosts in [int(h) for h in args.hosts.split(',')]:
+            print(run(loop, port, num_hosts, args))
+        server.close()
+    finally:
+        loop._loop.call_soon_threadsafe(loop._loop.stop)
+
+
+if __name__ == '__main__':
+    main()
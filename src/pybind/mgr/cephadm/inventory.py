@@ -86,6 +86,7 @@ class Inventory:
 
         # load inventory
         i = self.mgr.get_store('inventory')
+        self.mgr.store_writer.loaded('inventory', i)
         if i:
             self._inventory: Dict[str, dict] = json.loads(i)
             # handle old clusters missing 'hostname' key from hostspec
@@ -232,7 +233,7 @@ class Inventory:
         return [h for h in self._inventory if self._inventory[h].get("status", "").lower() == state]
 
     def save(self) -> None:
-        self.mgr.set_store('inventory', json.dumps(self._inventory))
+        self.mgr.store_writer.set('inventory', json.dumps(self._inventory), sync=True)
 
 
 class SpecDescription(NamedTuple):
@@ -279,6 +280,7 @@ class SpecStore():
     def load(self):
         # type: () -> None
         for k, v in self.mgr.get_store_prefix(SPEC_STORE_PREFIX).items():
+            self.mgr.store_writer.loaded(k, v)
             service_name = k[len(SPEC_STORE_PREFIX):]
             try:
                 j = cast(Dict[str, dict], json.loads(v))
@@ -369,9 +371,10 @@ class SpecStore():
         if name in self._needs_configuration:
             data['needs_configuration'] = self._needs_configuration[name]
 
-        self.mgr.set_store(
+        self.mgr.store_writer.set(
             SPEC_STORE_PREFIX + name,
             json.dumps(data, sort_keys=True),
+            sync=True,
         )
         self.mgr.events.for_service(self._specs[name],
                                     OrchestratorEvent.INFO,
@@ -471,7 +474,7 @@ class SpecStore():
                 del self.spec_deleted[service_name]
             if service_name in self._needs_configuration:
                 del self._needs_configuration[service_name]
-            self.mgr.set_store(SPEC_STORE_PREFIX + service_name, None)
+            self.mgr.store_writer.set(SPEC_STORE_PREFIX + service_name, None, sync=True)
         return found
 
     def _rm_certs_and_keys(self, spec: ServiceSpec) -> None:
@@ -578,6 +581,8 @@ class ClientKeyringStore():
         self.mgr: CephadmOrchestrator = mgr
         self.mgr = mgr
         self.keys: Dict[str, ClientKeyringSpec] = {}
+        # entity -> (keyring, fetched at)
+        self.keyrings: Dict[str, Tuple[str, datetime.datetime]] = {}
 
     def load(self) -> None:
         c = self.mgr.get_store('client_keyrings') or b'{}'
@@ -593,13 +598,36 @@ class ClientKeyringStore():
 
     def update(self, ks: ClientKeyringSpec) -> None:
         self.keys[ks.entity] = ks
+        self.keyrings.pop(ks.entity, None)
         self.save()
 
     def rm(self, entity: str) -> None:
+        self.keyrings.pop(entity, None)
         if entity in self.keys:
             del self.keys[entity]
             self.save()
 
+    def get_keyring(self, entity: str) -> Optional[str]:
+        """
+        The keyring of an entity, as returned by `auth get`.
+
+        The mgr is not told about changes to the auth database, so keyrings
+        are fetched again after `client_keyring_cache_timeout` seconds.
+        """
+        cutoff = datetime_now() - datetime.timedelta(
+            seconds=self.mgr.client_keyring_cache_timeout)
+        if entity in self.keyrings and self.keyrings[entity][1] >= cutoff:
+            return self.keyrings[entity][0]
+        ret, keyring, err = self.mgr.mon_command({
+            'prefix': 'auth get',
+            'entity': entity,
+        })
+        if ret:
+            self.keyrings.pop(entity, None)
+            return None
+        self.keyrings[entity] = (keyring, datetime_now())
+        return keyring
+
 
 class TunedProfileStore():
     """
@@ -704,6 +732,19 @@ class HostCache():
     Used to run daemon actions after deploying a daemon. We need to
     store it persistently, in order to stay consistent across
     MGR failovers.
+
+    6. `metadata_hashes`: O(hosts)
+
+    The content hash of each section of metadata (ls, networks, facts,
+    volume) last received from the agent of a host. Agents skip sending
+    the sections whose hash we already hold. Kept in memory only, so that
+    agents send everything again after a MGR failover.
+
+    Host records are persisted write-behind through the StoreWriter: a
+    MGR failover may lose the last `store_flush_interval` seconds of
+    updates, which the refresh of every host after a failover makes up for.
+    Changes of the scheduled daemon actions cannot be made up for and are
+    written through.
     """
 
     def __init__(self, mgr):
@@ -719,6 +760,8 @@ class HostCache():
         self.osdspec_previews = {}     # type: Dict[str, List[Dict[str, Any]]]
         self.osdspec_last_applied = {}  # type: Dict[str, Dict[str, datetime.datetime]]
         self.networks = {}             # type: Dict[str, Dict[str, Dict[str, List[str]]]]
+        # changes with the networks of any host, for the placement cache
+        self.networks_generation = 0
         self.last_network_update = {}   # type: Dict[str, datetime.datetime]
         self.last_device_update = {}   # type: Dict[str, datetime.datetime]
         self.last_device_change = {}   # type: Dict[str, datetime.datetime]
@@ -736,19 +779,27 @@ class HostCache():
         self.registry_login_queue: Set[str] = set()
 
         self.scheduled_daemon_actions: Dict[str, Dict[str, str]] = {}
+        # scheduled daemon actions last written to the store, by host
+        self._saved_daemon_actions: Dict[str, Dict[str, str]] = {}
 
         self.metadata_up_to_date = {}  # type: Dict[str, bool]
+        self.metadata_hashes = {}  # type: Dict[str, Dict[str, str]]
+        # host -> check or refresh -> how it last failed, until it succeeds
+        self.refresh_failures = {}  # type: Dict[str, Dict[str, str]]
+        # hosts whose devices changed since they were last saved
+        self._dirty_devices = set()  # type: Set[str]
 
     def load(self):
         # type: () -> None
         for k, v in self.mgr.get_store_prefix(HOST_CACHE_PREFIX).items():
+            self.mgr.store_writer.loaded(k, v)
             host = k[len(HOST_CACHE_PREFIX):]
             if self._get_host_cache_entry_status(host) != HostCacheStatus.host:
                 if self._get_host_cache_entry_status(host) == HostCacheStatus.devices:
                     continue
                 self.mgr.log.warning('removing stray HostCache host record %s' % (
                     host))
-                self.mgr.set_store(k, None)
+                self.mgr.store_writer.set(k, None, sync=True)
             try:
                 j = json.loads(v)
                 if 'last_device_update' in j:
@@ -773,6 +824,9 @@ class HostCache():
                 # still want to check old device location for upgrade scenarios
                 for d in j.get('devices', []):
                     self.devices[host].append(inventory.Device.from_json(d))
+                if self.devices[host]:
+                    # move them to the new location on the next save
+                    self._dirty_devices.add(host)
                 self.devices[host] += self.load_host_devices(host)
                 self.networks[host] = j.get('networks_and_interfaces', {})
                 self.osdspec_previews[host] = j.get('osdspec_previews', {})
@@ -792,6 +846,7 @@ class HostCache():
                         j['last_tuned_profile_update'])
                 self.registry_login_queue.add(host)
                 self.scheduled_daemon_actions[host] = j.get('scheduled_daemon_actions', {})
+                self._saved_daemon_actions[host] = dict(self.scheduled_daemon_actions[host])
                 self.metadata_up_to_date[host] = j.get('metadata_up_to_date', False)
 
                 self.mgr.log.debug(
@@ -846,6 +901,49 @@ class HostCache():
         self.mgr.inventory.update_known_hostnames(hostnames[0], hostnames[1], hostnames[2])
         self.last_facts_update[host] = datetime_now()
 
+    def apply_host_facts_report(self, host: str, report: Dict[str, Any]) -> bool:
+        """
+        Update the facts of a host with a `gather-facts --delta` report. A
+        report holding only the facts changed since a version we don't have
+        can't be applied, in which case False is returned.
+        """
+        hashes = self.metadata_hashes.setdefault(host, {})
+        if 'since' in report:
+            if host not in self.facts or hashes.get('facts') != report['since']:
+                hashes.pop('facts', None)
+                return False
+            facts = dict(self.facts[host])
+            facts.update(report['facts'])
+            for k in report.get('removed', []):
+                facts.pop(k, None)
+        else:
+            facts = report['facts']
+        self.update_host_facts(host, facts)
+        hashes['facts'] = report['version']
+        return True
+
+    def metadata_unchanged(self, host: str, section: str) -> None:
+        """
+        The agent of a host reported the same section of metadata as it did
+        last time, so what we hold is as good as a fresh update.
+        """
+        now = datetime_now()
+        if section == 'ls':
+            self._tmp_daemons.pop(host, {})
+            self.last_daemon_update[host] = now
+            # not saved: losing these on a failover only makes the daemons
+            # look as old as their last change
+            for dd in self.daemons.get(host, {}).values():
+                dd.last_refresh = now
+        elif section == 'networks':
+            self.last_network_update[host] = now
+        elif section == 'volume':
+            self.last_device_update[host] = now
+
+    def _invalidate_metadata_hash(self, host: str, section: str) -> None:
+        if host in self.metadata_hashes:
+            self.metadata_hashes[host].pop(section, None)
+
     def update_autotune(self, host: str) -> None:
         self.last_autotune[host] = datetime_now()
 
@@ -873,6 +971,7 @@ class HostCache():
                 or self.devices_changed(host, dls)
         ):
             self.last_device_change[host] = datetime_now()
+            self._dirty_devices.add(host)
         self.last_device_update[host] = datetime_now()
         self.devices[host] = dls
 
@@ -881,6 +980,8 @@ class HostCache():
             host: str,
             nets: Dict[str, Dict[str, List[str]]]
     ) -> None:
+        if self.networks.get(host) != nets:
+            self.networks_generation += 1
         self.networks[host] = nets
         self.last_network_update[host] = datetime_now()
 
@@ -924,6 +1025,7 @@ class HostCache():
         self.daemons[host] = {}
         self.devices[host] = []
         self.networks[host] = {}
+        self.networks_generation += 1
         self.osdspec_previews[host] = []
         self.osdspec_last_applied[host] = {}
         self.daemon_config_deps[host] = {}
@@ -944,12 +1046,14 @@ class HostCache():
         self.last_facts_update.pop(host, None)
         self.osdspec_previews_refresh_queue.append(host)
         self.last_autotune.pop(host, None)
+        self.metadata_hashes.pop(host, None)
 
     def invalidate_host_daemons(self, host):
         # type: (str) -> None
         self.daemon_refresh_queue.append(host)
         if host in self.last_daemon_update:
             del self.last_daemon_update[host]
+        self._invalidate_metadata_hash(host, 'ls')
         self.mgr.event.set()
 
     def invalidate_host_devices(self, host):
@@ -957,6 +1061,7 @@ class HostCache():
         self.device_refresh_queue.append(host)
         if host in self.last_device_update:
             del self.last_device_update[host]
+        self._invalidate_metadata_hash(host, 'volume')
         self.mgr.event.set()
 
     def invalidate_host_networks(self, host):
@@ -964,6 +1069,7 @@ class HostCache():
         self.network_refresh_queue.append(host)
         if host in self.last_network_update:
             del self.last_network_update[host]
+        self._invalidate_metadata_hash(host, 'networks')
         self.mgr.event.set()
 
     def distribute_new_registry_login_info(self) -> None:
@@ -1013,12 +1119,17 @@ class HostCache():
             j['scheduled_daemon_actions'] = self.scheduled_daemon_actions[host]
         if host in self.metadata_up_to_date:
             j['metadata_up_to_date'] = self.metadata_up_to_date[host]
-        if host in self.devices:
+        if host in self._dirty_devices:
             self.save_host_devices(host)
 
-        self.mgr.set_store(HOST_CACHE_PREFIX + host, json.dumps(j))
+        # daemon actions are requested by users, do not lose them to a failover
+        actions = self.scheduled_daemon_actions.get(host, {})
+        sync = actions != self._saved_daemon_actions.get(host, {})
+        self.mgr.store_writer.set(HOST_CACHE_PREFIX + host, json.dumps(j), sync=sync)
+        self._saved_daemon_actions[host] = dict(actions)
 
     def save_host_devices(self, host: str) -> None:
+        self._dirty_devices.discard(host)
         if host not in self.devices or not self.devices[host]:
             logger.debug(f'Host {host} has no devices to save')
             return
@@ -1044,12 +1155,12 @@ class HostCache():
                 dev_dict: Dict[str, Any] = {'devices': dev_list}
                 if dev_cache_counter == 0:
                     dev_dict.update({'entries': len(dev_lists)})
-                self.mgr.set_store(HOST_CACHE_PREFIX + host + '.devices.'
-                                   + str(dev_cache_counter), json.dumps(dev_dict))
+                self.mgr.store_writer.set(HOST_CACHE_PREFIX + host + '.devices.'
+                                          + str(dev_cache_counter), json.dumps(dev_dict))
                 dev_cache_counter += 1
         else:
-            self.mgr.set_store(HOST_CACHE_PREFIX + host + '.devices.'
-                               + str(dev_cache_counter), json.dumps({'devices': devs, 'entries': 1}))
+            self.mgr.store_writer.set(HOST_CACHE_PREFIX + host + '.devices.'
+                                      + str(dev_cache_counter), json.dumps({'devices': devs, 'entries': 1}))
 
     def load_host_devices(self, host: str) -> List[inventory.Device]:
         dev_cache_counter: int = 0
@@ -1098,6 +1209,7 @@ class HostCache():
             self.loading_osdspec_preview.remove(host)
         if host in self.networks:
             del self.networks[host]
+            self.networks_generation += 1
         if host in self.last_daemon_update:
             del self.last_daemon_update[host]
         if host in self.last_device_update:
@@ -1112,14 +1224,38 @@ class HostCache():
             del self.daemon_config_deps[host]
         if host in self.scheduled_daemon_actions:
             del self.scheduled_daemon_actions[host]
+        self._saved_daemon_actions.pop(host, None)
         if host in self.last_client_files:
             del self.last_client_files[host]
-        self.mgr.set_store(HOST_CACHE_PREFIX + host, None)
+        if host in self.metadata_hashes:
+            del self.metadata_hashes[host]
+        self.refresh_failures.pop(host, None)
+        self._dirty_devices.discard(host)
+        self.mgr.store_writer.set(HOST_CACHE_PREFIX + host, None)
 
     def get_hosts(self):
         # type: () -> List[str]
         return list(self.daemons)
 
+    def update_refresh_failure(self, host: str, what: str, failure: Optional[str]) -> None:
+        """
+        Record the outcome of a check or refresh (@what) of @host: the
+        failure is kept until that check or refresh next succeeds, so that
+        the health warnings don't depend on which hosts a pass visited.
+        """
+        if failure:
+            self.refresh_failures.setdefault(host, {})[what] = failure
+        elif what in self.refresh_failures.get(host, {}):
+            del self.refresh_failures[host][what]
+
+    def get_refresh_failures(self, whats: List[str]) -> List[str]:
+        return [
+            failure
+            for host, failures in self.refresh_failures.items()
+            if self.mgr.inventory._inventory.get(host, {}).get('status', '').lower() != 'maintenance'
+            for what, failure in failures.items() if what in whats
+        ]
+
     def get_schedulable_hosts(self) -> List[HostSpec]:
         """
         Returns all usable hosts that went through _refresh_host_daemons().
@@ -1755,11 +1891,12 @@ class AgentCache():
     def load(self):
         # type: () -> None
         for k, v in self.mgr.get_store_prefix(AGENT_CACHE_PREFIX).items():
+            self.mgr.store_writer.loaded(k, v)
             host = k[len(AGENT_CACHE_PREFIX):]
             if host not in self.mgr.inventory:
                 self.mgr.log.warning('removing stray AgentCache record for agent on %s' % (
                     host))
-                self.mgr.set_store(k, None)
+                self.mgr.store_writer.set(k, None, sync=True)
             try:
                 j = json.loads(v)
                 self.agent_config_deps[host] = {}
@@ -1796,7 +1933,7 @@ class AgentCache():
         if host in self.agent_timestamp:
             j['agent_timestamp'] = datetime_to_str(self.agent_timestamp[host])
 
-        self.mgr.set_store(AGENT_CACHE_PREFIX + host, json.dumps(j))
+        self.mgr.store_writer.set(AGENT_CACHE_PREFIX + host, json.dumps(j))
 
     def update_agent_config_deps(self, host: str, deps: List[str], stamp: datetime.datetime) -> None:
         self.agent_config_deps[host] = {
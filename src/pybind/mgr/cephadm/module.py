@@ -80,7 +80,9 @@ from .services.monitoring import GrafanaService, AlertmanagerService, Prometheus
 from .services.jaeger import ElasticSearchService, JaegerAgentService, JaegerCollectorService, JaegerQueryService
 from .services.node_proxy import NodeProxy
 from .services.smb import SMBService
-from .schedule import HostAssignment
+from .schedule import HostAssignment, PlacementCache
+from .refresh_scheduler import HostRefreshScheduler
+from .store_writer import StoreWriter
 from .inventory import (
     Inventory,
     SpecStore,
@@ -223,6 +225,31 @@ class CephadmOrchestrator(orchestrator.Orchestrator, MgrModule,
             default=10 * 60,
             desc='how frequently to perform a host check',
         ),
+        Option(
+            'client_keyring_cache_timeout',
+            type='secs',
+            default=60,
+            desc='seconds to cache the client keyrings maintained by cephadm',
+            long_desc='Changes made to a client keyring outside of cephadm are '
+            'deployed to the hosts after up to this many seconds.',
+        ),
+        Option(
+            'refresh_max_hosts_per_loop',
+            type='int',
+            default=100,
+            min=0,
+            desc='maximum number of hosts to refresh in one pass of the serve loop',
+            long_desc='Hosts with pending work are refreshed first, then the hosts that are '
+            'most overdue. 0 means no limit.',
+        ),
+        Option(
+            'store_flush_interval',
+            type='secs',
+            default=5,
+            desc='seconds to hold back writes of cached host state to the config-key store',
+            long_desc='Repeated updates of the same key within the interval result in a single '
+            'write. Set to 0 to write through immediately.',
+        ),
         Option(
             'mode',
             type='str',
@@ -504,6 +531,16 @@ class CephadmOrchestrator(orchestrator.Orchestrator, MgrModule,
             default=10,
             desc='max number of osds that will be drained simultaneously when osds are removed'
         ),
+        Option(
+            'upgrade_prepull_max_hosts',
+            type='int',
+            default=10,
+            min=0,
+            desc='max number of hosts pulling the target image of an upgrade at once',
+            long_desc='Before any daemon is restarted, an upgrade pulls the target image on '
+            'every host with daemons to upgrade. This bounds the load that puts on the '
+            'registry. 0 disables pulling the image ahead of the restarts.',
+        ),
         Option(
             'service_discovery_port',
             type='int',
@@ -548,6 +585,38 @@ class CephadmOrchestrator(orchestrator.Orchestrator, MgrModule,
             desc='How many times ssh connections can fail liveness checks '
             'before the host is marked offline'
         ),
+        Option(
+            'ssh_max_sessions_per_host',
+            type='int',
+            default=8,
+            min=1,
+            desc='How many commands may run at once on the ssh connection to a host',
+            long_desc='Should stay below the MaxSessions setting of the sshd on the hosts.'
+        ),
+        Option(
+            'ssh_max_concurrent_hosts',
+            type='int',
+            default=100,
+            min=1,
+            desc='How many hosts batched ssh commands are run on at once'
+        ),
+        Option(
+            'deploy_max_in_flight',
+            type='int',
+            default=16,
+            min=0,
+            desc='maximum number of daemons of a service deployed or removed at once',
+            long_desc='Daemons are deployed in waves of at most this many daemons. '
+            'Monitors are always deployed one at a time. 0 means no limit.',
+        ),
+        Option(
+            'deploy_max_in_flight_per_host',
+            type='int',
+            default=1,
+            min=0,
+            desc='maximum number of daemons of a service deployed or removed at once on a single host',
+            long_desc='0 means no limit.',
+        ),
         Option(
             'cephadm_log_destination',
             type='str',
@@ -585,6 +654,9 @@ class CephadmOrchestrator(orchestrator.Orchestrator, MgrModule,
             self.daemon_cache_timeout = 0
             self.facts_cache_timeout = 0
             self.host_check_interval = 0
+            self.client_keyring_cache_timeout = 0
+            self.refresh_max_hosts_per_loop = 0
+            self.store_flush_interval = 0
             self.max_count_per_host = 0
             self.mode = ''
             self.container_image_base = ''
@@ -644,6 +716,7 @@ class CephadmOrchestrator(orchestrator.Orchestrator, MgrModule,
             self.secure_monitoring_stack = False
             self.apply_spec_fails: List[Tuple[str, str]] = []
             self.max_osd_draining_count = 10
+            self.upgrade_prepull_max_hosts = 0
             self.device_enhanced_scan = False
             self.inventory_list_all = False
             self.cgroups_split = True
@@ -653,6 +726,10 @@ class CephadmOrchestrator(orchestrator.Orchestrator, MgrModule,
             self.oob_default_addr = ''
             self.ssh_keepalive_interval = 0
             self.ssh_keepalive_count_max = 0
+            self.ssh_max_sessions_per_host = 0
+            self.ssh_max_concurrent_hosts = 0
+            self.deploy_max_in_flight = 0
+            self.deploy_max_in_flight_per_host = 0
 
         self.notify(NotifyType.mon_map, None)
         self.config_notify()
@@ -678,6 +755,10 @@ class CephadmOrchestrator(orchestrator.Orchestrator, MgrModule,
 
         self.health_checks: Dict[str, dict] = {}
 
+        self.store_writer = StoreWriter(self)
+        self.refresh_scheduler = HostRefreshScheduler(self)
+        self.placement_cache = PlacementCache()
+
         self.inventory = Inventory(self)
 
         self.cache = HostCache(self)
@@ -799,6 +880,9 @@ class CephadmOrchestrator(orchestrator.Orchestrator, MgrModule,
         self.offline_watcher.shutdown()
         self.run = False
         self.event.set()
+        # after stopping the serve loop, so that its last updates are
+        # written too
+        self.store_writer.shutdown()
 
     def _get_cephadm_service(self, service_type: str) -> CephadmService:
         assert service_type in ServiceSpec.KNOWN_SERVICE_TYPES
@@ -1172,6 +1256,8 @@ class CephadmOrchestrator(orchestrator.Orchestrator, MgrModule,
         ret = {
             "workers": worker_count,
             "paused": self.paused,
+            "store_writes": dict(self.store_writer.stats),
+            "refresh_queue": dict(self.refresh_scheduler.stats),
         }
 
         return True, err, ret
@@ -2064,6 +2150,7 @@ Then run the following:
 
         self.inventory.rm_host(host)
         self.cache.rm_host(host)
+        self.refresh_scheduler.rm_host(host)
         self.ssh.reset_con(host)
         # if host was in offline host list, we should remove it now.
         self.offline_hosts_remove(host)
@@ -0,0 +1,145 @@
+import datetime
+import logging
+import random
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+from ceph.utils import datetime_now
+
+from cephadm.utils import SpecialHostLabels
+
+if TYPE_CHECKING:
+    from cephadm.module import CephadmOrchestrator
+
+logger = logging.getLogger(__name__)
+
+# spread of the periodic visits of a host, as a fraction of the interval
+REFRESH_JITTER = 0.2
+
+
+class HostRefreshScheduler:
+    """
+    Decides which hosts CephadmServe visits in a pass of
+    _refresh_hosts_and_daemons().
+
+    Hosts with pending work (queued refreshes, scheduled daemon actions,
+    daemons deployed but not yet seen, out of date metadata, a down agent)
+    are visited first. All other hosts are visited when the first of their
+    periodic refreshes (facts, daemons, devices, ...) falls due, with
+    jitter, so that the hosts of a large cluster don't all come due in the
+    same pass. Hosts whose metadata is reported by an agent have fewer of
+    those and are visited less often. At most
+    `refresh_max_hosts_per_loop` hosts are visited in one pass, the most
+    overdue ones first, so that a pass over a large cluster does not delay
+    applying services.
+    """
+
+    def __init__(self, mgr: "CephadmOrchestrator") -> None:
+        self.mgr = mgr
+        self.next_visit: Dict[str, datetime.datetime] = {}
+        self.stats: Dict[str, Any] = {
+            'urgent': 0,
+            'due': 0,
+            'visited': 0,
+            'queue_depth': 0,
+            'max_lag': 0,
+        }
+
+    def _interval(self) -> float:
+        return max(30, min(
+            self.mgr.host_check_interval,
+            self.mgr.facts_cache_timeout,
+            self.mgr.daemon_cache_timeout,
+            self.mgr.device_cache_timeout,
+        ))
+
+    def _refresh_due(self, host: str) -> Optional[datetime.datetime]:
+        """
+        When the first of the periodic refreshes of a host falls due, as
+        checked by the host_needs_*() predicates of the HostCache.
+        """
+        cache = self.mgr.cache
+        timers = [(cache.last_host_check, self.mgr.host_check_interval)]
+        if not self.mgr.inventory.has_label(host, SpecialHostLabels.NO_MEMORY_AUTOTUNE):
+            timers.append((cache.last_autotune, self.mgr.autotune_interval))
+        if not self.mgr.use_agent or cache.is_host_draining(host):
+            timers += [
+                (cache.last_daemon_update, self.mgr.daemon_cache_timeout),
+                (cache.last_facts_update, self.mgr.facts_cache_timeout),
+                (cache.last_network_update, self.mgr.device_cache_timeout),
+                (cache.last_device_update, self.mgr.device_cache_timeout),
+            ]
+        elif not cache.get_daemons_by_type('agent', host=host):
+            timers.append((cache.last_daemon_update, self.mgr.daemon_cache_timeout))
+        due = [last[host] + datetime.timedelta(seconds=timeout)
+               for last, timeout in timers if host in last]
+        return min(due) if due else None
+
+    def _urgent(self, host: str) -> bool:
+        cache = self.mgr.cache
+        if host not in self.next_visit:
+            return True
+        if host in self.mgr.offline_hosts:
+            # the refresh predicates skip offline hosts, keeping them queued
+            return False
+        if (
+            host in cache.daemon_refresh_queue
+            or host in cache.device_refresh_queue
+            or host in cache.network_refresh_queue
+            or host in cache.osdspec_previews_refresh_queue
+            or host in cache.registry_login_queue
+            or cache.scheduled_daemon_actions.get(host)
+            or cache._tmp_daemons.get(host)
+            or not cache.host_metadata_up_to_date(host)
+        ):
+            return True
+        return self.mgr.use_agent and self.mgr.agent_helpers._agent_down(host)
+
+    def select(self, hosts: List[str]) -> List[str]:
+        """
+        Return the hosts to visit in this pass.
+        """
+        now = datetime_now()
+        urgent: List[str] = []
+        due: List[str] = []
+        for host in hosts:
+            if self.mgr.inventory._inventory[host].get("status", "").lower() == "maintenance":
+                continue
+            if self._urgent(host):
+                urgent.append(host)
+            elif self.next_visit[host] <= now:
+                due.append(host)
+        due.sort(key=lambda h: self.next_visit[h])
+
+        candidates = urgent + due
+        limit = self.mgr.refresh_max_hosts_per_loop
+        selected = candidates[:limit] if limit else candidates
+        lag = max([(now - self.next_visit[h]).total_seconds()
+                   for h in candidates[len(selected):] if h in self.next_visit] or [0])
+        self.stats.update({
+            'urgent': len(urgent),
+            'due': len(due),
+            'visited': len(selected),
+            'queue_depth': len(candidates) - len(selected),
+            'max_lag': int(lag),
+        })
+        if len(selected) < len(candidates):
+            logger.debug(f'Refreshing {len(selected)} of {len(candidates)} hosts, '
+                         f'{len(urgent)} with pending work')
+        return selected
+
+    def visited(self, host: str) -> None:
+        """
+        Schedule the next periodic visit of a host, when its first periodic
+        refresh falls due. A refresh that keeps failing is not retried more
+        often than every `_interval()` seconds.
+        """
+        now = datetime_now()
+        interval = self._interval()
+        due = self._refresh_due(host)
+        if due is not None:
+            interval = max(interval, (due - now).total_seconds())
+        interval *= random.uniform(1 - REFRESH_JITTER, 1 + REFRESH_JITTER)
+        self.next_visit[host] = now + datetime.timedelta(seconds=interval)
+
+    def rm_host(self, host: str) -> None:
+        self.next_visit.pop(host, None)
@@ -1,8 +1,10 @@
 import ipaddress
 import hashlib
+import json
 import logging
 import random
-from typing import List, Optional, Callable, TypeVar, Tuple, NamedTuple, Dict
+from collections import OrderedDict
+from typing import List, Optional, Callable, TypeVar, Tuple, NamedTuple, Dict, Hashable
 
 import orchestrator
 from ceph.deployment.service_spec import ServiceSpec
@@ -481,3 +483,71 @@ class HostAssignment(object):
         candidates = [
             c for c in candidates if c.hostname not in unreachable_hosts or in_maintenance[c.hostname]]
         return candidates
+
+    def cache_key(self, networks_generation: int, extra: Hashable = None) -> Hashable:
+        """
+        Everything place() depends on. The networks of the hosts are only
+        represented by @networks_generation, which must change whenever they
+        do. @extra is for the state filter_new_host depends on.
+        """
+        def hosts_key(hosts: List[orchestrator.HostSpec]) -> Hashable:
+            return tuple((h.hostname, tuple(sorted(h.labels)), h.status) for h in hosts)
+
+        def daemons_key(daemons: List[DaemonDescription]) -> Hashable:
+            # in order, as place() keeps the order of equally ranked daemons
+            return tuple(
+                (d.daemon_type, d.daemon_id, d.hostname, tuple(d.ports or []), d.ip,
+                 d.is_active, d.rank, d.rank_generation)
+                for d in daemons
+            )
+
+        uses_networks = bool(self.spec.networks) or self.filter_new_host is not None
+        return (
+            json.dumps(self.spec.to_json(), sort_keys=True),
+            self.primary_daemon_type,
+            self.per_host_daemon_type,
+            self.allow_colo,
+            hosts_key(self.hosts),
+            hosts_key(self.unreachable_hosts),
+            hosts_key(self.draining_hosts),
+            daemons_key(self.daemons),
+            tuple(sorted(set(d.hostname or '' for d in self.related_service_daemons or []))),
+            json.dumps(self.rank_map, sort_keys=True) if self.rank_map is not None else None,
+            networks_generation if uses_networks else None,
+            self.filter_new_host.__name__ if self.filter_new_host else None,
+            extra,
+        )
+
+
+class PlacementCache(object):
+    """
+    Memoizes HostAssignment.place(), so that the placement of a service is
+    only computed again once anything it depends on changed.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[Hashable, Tuple[List[DaemonPlacement], List[DaemonPlacement], List[DaemonDescription]]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def place(self,
+              ha: HostAssignment,
+              networks_generation: int,
+              extra: Hashable = None,
+              ) -> Tuple[List[DaemonPlacement], List[DaemonPlacement], List[DaemonDescription]]:
+        key = ha.cache_key(networks_generation, extra)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            slots, to_add, to_remove = self.entries[key]
+            # hand out the daemons of this call, they may carry newer state
+            current = {d.name(): d for d in ha.daemons}
+            return list(slots), list(to_add), [current.get(d.name(), d) for d in to_remove]
+        self.misses += 1
+        # failures are not cached
+        slots, to_add, to_remove = ha.place()
+        self.entries[key] = (list(slots), list(to_add), list(to_remove))
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return slots, to_add, to_remove
@@ -1,3 +1,4 @@
+import asyncio
 import ipaddress
 import hashlib
 import json
@@ -6,7 +7,7 @@ import uuid
 import os
 from collections import defaultdict
 from typing import TYPE_CHECKING, Optional, List, cast, Dict, Any, Union, Tuple, Set, \
-    DefaultDict, Callable
+    DefaultDict, Callable, TypeVar
 
 from ceph.deployment import inventory
 from ceph.deployment.drive_group import DriveGroupSpec
@@ -43,9 +44,14 @@ logger = logging.getLogger(__name__)
 
 REQUIRES_POST_ACTIONS = ['grafana', 'iscsi', 'prometheus', 'alertmanager', 'rgw', 'nvmeof', 'mgmt-gateway']
 
+# daemons of these types are deployed and removed one at a time
+SERIAL_DEPLOY_TYPES = ['mon']
+
 WHICH = ssh.RemoteExecutable('which')
 CEPHADM_EXE = ssh.RemoteExecutable('/usr/bin/cephadm')
 
+T = TypeVar('T')
+
 
 class CephadmServe:
     """
@@ -179,6 +185,9 @@ class CephadmServe:
                 self.mgr.device_cache_timeout,
             )
         )
+        if self.mgr.refresh_scheduler.stats['queue_depth']:
+            # hosts were left out of the last refresh
+            sleep_interval = 1
         self.log.debug('Sleeping for %d seconds', sleep_interval)
         self.mgr.event.wait(sleep_interval)
         self.mgr.event.clear()
@@ -248,9 +257,12 @@ class CephadmServe:
 
     def _refresh_hosts_and_daemons(self) -> None:
         self.log.debug('_refresh_hosts_and_daemons')
-        bad_hosts = []
-        failures = []
         agents_down: List[str] = []
+        scheduled = set(self.mgr.refresh_scheduler.select(self.mgr.cache.get_hosts()))
+        fetched = self._fetch_host_metadata([
+            h for h in scheduled
+            if self.mgr.inventory._inventory[h].get("status", "").lower() != "maintenance"
+        ])
 
         @forall_hosts
         def refresh(host: str) -> None:
@@ -263,10 +275,13 @@ class CephadmServe:
                 if self.mgr.agent_helpers._check_agent(host):
                     agents_down.append(host)
 
+            if host not in scheduled:
+                return
+            results = fetched.get(host, {})
+
             if self.mgr.cache.host_needs_check(host):
-                r = self._check_host(host)
-                if r is not None:
-                    bad_hosts.append(r)
+                r = self._check_host(host, results)
+                self.mgr.cache.update_refresh_failure(host, 'check-host', r)
 
             if (
                 not self.mgr.use_agent
@@ -275,34 +290,29 @@ class CephadmServe:
             ):
                 if self.mgr.cache.host_needs_daemon_refresh(host):
                     self.log.debug('refreshing %s daemons' % host)
-                    r = self._refresh_host_daemons(host)
-                    if r:
-                        failures.append(r)
+                    r = self._refresh_host_daemons(host, results)
+                    self.mgr.cache.update_refresh_failure(host, 'daemons', r)
 
                 if self.mgr.cache.host_needs_facts_refresh(host):
                     self.log.debug(('Refreshing %s facts' % host))
-                    r = self._refresh_facts(host)
-                    if r:
-                        failures.append(r)
+                    r = self._refresh_facts(host, results)
+                    self.mgr.cache.update_refresh_failure(host, 'facts', r)
 
                 if self.mgr.cache.host_needs_network_refresh(host):
                     self.log.debug(('Refreshing %s networks' % host))
-                    r = self._refresh_host_networks(host)
-                    if r:
-                        failures.append(r)
+                    r = self._refresh_host_networks(host, results)
+                    self.mgr.cache.update_refresh_failure(host, 'networks', r)
 
                 if self.mgr.cache.host_needs_device_refresh(host):
                     self.log.debug('refreshing %s devices' % host)
-                    r = self._refresh_host_devices(host)
-                    if r:
-                        failures.append(r)
+                    r = self._refresh_host_devices(host, results)
+                    self.mgr.cache.update_refresh_failure(host, 'devices', r)
                 self.mgr.cache.metadata_up_to_date[host] = True
             elif not self.mgr.cache.get_daemons_by_type('agent', host=host):
                 if self.mgr.cache.host_needs_daemon_refresh(host):
                     self.log.debug('refreshing %s daemons' % host)
-                    r = self._refresh_host_daemons(host)
-                    if r:
-                        failures.append(r)
+                    r = self._refresh_host_daemons(host, results)
+                    self.mgr.cache.update_refresh_failure(host, 'daemons', r)
                 self.mgr.cache.metadata_up_to_date[host] = True
 
             if self.mgr.cache.host_needs_registry_login(host) and self.mgr.get_store('registry_credentials'):
@@ -310,14 +320,12 @@ class CephadmServe:
                 with self.mgr.async_timeout_handler(host, 'cephadm registry-login'):
                     r = self.mgr.wait_async(self._registry_login(
                         host, json.loads(str(self.mgr.get_store('registry_credentials')))))
-                if r:
-                    bad_hosts.append(r)
+                self.mgr.cache.update_refresh_failure(host, 'registry-login', r)
 
             if self.mgr.cache.host_needs_osdspec_preview_refresh(host):
                 self.log.debug(f"refreshing OSDSpec previews for {host}")
                 r = self._refresh_host_osdspec_previews(host)
-                if r:
-                    failures.append(r)
+                self.mgr.cache.update_refresh_failure(host, 'osdspec-previews', r)
 
             if (
                     self.mgr.cache.host_needs_autotune_memory(host)
@@ -326,6 +334,8 @@ class CephadmServe:
                 self.log.debug(f"autotuning memory for {host}")
                 self._autotune_host_memory(host)
 
+            self.mgr.refresh_scheduler.visited(host)
+
         refresh(self.mgr.cache.get_hosts())
 
         self._write_all_client_files()
@@ -342,6 +352,10 @@ class CephadmServe:
                 'CEPHADM_REFRESH_FAILED',
         ]:
             self.mgr.remove_health_warning(k)
+        # failures are kept per host, as not every host is visited in every pass
+        bad_hosts = self.mgr.cache.get_refresh_failures(['check-host', 'registry-login'])
+        failures = self.mgr.cache.get_refresh_failures(
+            ['daemons', 'facts', 'networks', 'devices', 'osdspec-previews'])
         if bad_hosts:
             self.mgr.set_health_warning(
                 'CEPHADM_HOST_CHECK_FAILED', f'{len(bad_hosts)} hosts fail cephadm check', len(bad_hosts), bad_hosts)
@@ -350,16 +364,123 @@ class CephadmServe:
                 'CEPHADM_REFRESH_FAILED', 'failed to probe daemons or devices', len(failures), failures)
         self.mgr.update_failed_daemon_health_check()
 
-    def _check_host(self, host: str) -> Optional[str]:
+    def _fetch_host_metadata(self, hosts: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Run the cephadm commands of the metadata refresh that are due on
+        @hosts up front: those of a host all at once over its connection,
+        on up to `ssh_max_concurrent_hosts` hosts at a time, rather than one
+        round trip after the other from the refresh threads. Returns the
+        output of each command, or the exception it failed with, by host
+        and command. Whatever is not fetched here, e.g. because the agent of
+        a host turns out to be down, is run by the _refresh_*() methods.
+        """
+        todo: Dict[str, List[str]] = {}
+        for host in hosts:
+            commands = self._metadata_commands(host)
+            if commands:
+                todo[host] = commands
+        if not todo:
+            return {}
+        timeout = max(60, self.mgr.default_cephadm_command_timeout)
+
+        async def run(host: str, command: str) -> Any:
+            with self.mgr.async_timeout_handler(host, f'cephadm {command}'):
+                return await asyncio.wait_for(self._run_metadata_command(host, command), timeout)
+
+        async def fetch(host: str) -> Dict[str, Any]:
+            results = await asyncio.gather(*[run(host, c) for c in todo[host]],
+                                           return_exceptions=True)
+            return dict(zip(todo[host], results))
+
+        # hosts beyond ssh_max_concurrent_hosts wait for a turn
+        turns = -(-len(todo) // max(1, self.mgr.ssh_max_concurrent_hosts))
+        try:
+            with self.mgr.async_timeout_handler(cmd=f'refreshing metadata of {len(todo)} hosts'):
+                by_host = self.mgr.wait_async(
+                    self.mgr.ssh._on_hosts(list(todo), fetch), timeout * turns + 5)
+        except OrchestratorError as e:
+            self.log.warning(f'{e}, refreshing the hosts one command at a time')
+            return {}
+        return {h: r for h, r in by_host.items() if isinstance(r, dict)}
+
+    def _metadata_commands(self, host: str) -> List[str]:
+        """
+        The metadata refresh commands that are due on @host, ahead of the
+        checks in _refresh_hosts_and_daemons().
+        """
+        cache = self.mgr.cache
+        commands = []
+        if cache.host_needs_check(host) and host in self.mgr.inventory:
+            commands.append('check-host')
+        if not self.mgr.use_agent or cache.is_host_draining(host):
+            if cache.host_needs_daemon_refresh(host):
+                commands.append('ls')
+            if cache.host_needs_facts_refresh(host):
+                commands.append('gather-facts')
+            if cache.host_needs_network_refresh(host):
+                commands.append('list-networks')
+            if cache.host_needs_device_refresh(host):
+                commands.append('ceph-volume -- inventory')
+        elif not cache.get_daemons_by_type('agent', host=host):
+            if cache.host_needs_daemon_refresh(host):
+                commands.append('ls')
+        return commands
+
+    async def _run_metadata_command(self, host: str, command: str) -> Any:
+        log_output = self.mgr.log_refresh_metadata
+        if command == 'check-host':
+            return await self._run_cephadm(
+                host, cephadmNoImage, 'check-host', [],
+                error_ok=True, no_fsid=True, log_output=log_output)
+        if command == 'ls':
+            return await self._run_cephadm_json(
+                host, 'mon', 'ls', [], no_fsid=True, log_output=log_output)
+        if command == 'gather-facts':
+            return await self._run_cephadm_json(
+                host, cephadmNoImage, 'gather-facts', [], no_fsid=True, log_output=log_output)
+        if command == 'list-networks':
+            return await self._run_cephadm_json(
+                host, 'mon', 'list-networks', [], no_fsid=True, log_output=log_output)
+        assert command == 'ceph-volume -- inventory', command
+        inventory_args = ['--', 'inventory',
+                          '--format=json-pretty',
+                          '--filter-for-batch']
+        if self.mgr.device_enhanced_scan:
+            inventory_args.insert(-1, "--with-lsm")
+        if self.mgr.inventory_list_all:
+            inventory_args.insert(-1, "--list-all")
+        try:
+            return await self._run_cephadm_json(
+                host, 'osd', 'ceph-volume', inventory_args, log_output=log_output)
+        except OrchestratorError as e:
+            if 'unrecognized arguments: --filter-for-batch' not in str(e):
+                raise
+            rerun_args = inventory_args.copy()
+            rerun_args.remove('--filter-for-batch')
+            return await self._run_cephadm_json(
+                host, 'osd', 'ceph-volume', rerun_args, log_output=log_output)
+
+    def _metadata_result(self, host: str, command: str,
+                         fetched: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        The result of a metadata refresh command, as fetched by
+        _fetch_host_metadata() or else by running it now.
+        """
+        if fetched and command in fetched:
+            result = fetched.pop(command)
+            if isinstance(result, BaseException):
+                raise result
+            return result
+        with self.mgr.async_timeout_handler(host, f'cephadm {command}'):
+            return self.mgr.wait_async(self._run_metadata_command(host, command))
+
+    def _check_host(self, host: str, fetched: Optional[Dict[str, Any]] = None) -> Optional[str]:
         if host not in self.mgr.inventory:
             return None
         self.log.debug(' checking %s' % host)
         try:
             addr = self.mgr.inventory.get_addr(host) if host in self.mgr.inventory else host
-            with self.mgr.async_timeout_handler(host, 'cephadm check-host'):
-                out, err, code = self.mgr.wait_async(self._run_cephadm(
-                    host, cephadmNoImage, 'check-host', [],
-                    error_ok=True, no_fsid=True, log_output=self.mgr.log_refresh_metadata))
+            out, err, code = self._metadata_result(host, 'check-host', fetched)
             self.mgr.cache.update_last_host_check(host)
             self.mgr.cache.save_host(host)
             if code:
@@ -373,22 +494,17 @@ class CephadmServe:
             return 'host %s (%s) failed check: %s' % (host, addr, e)
         return None
 
-    def _refresh_host_daemons(self, host: str) -> Optional[str]:
+    def _refresh_host_daemons(self, host: str, fetched: Optional[Dict[str, Any]] = None) -> Optional[str]:
         try:
-            with self.mgr.async_timeout_handler(host, 'cephadm ls'):
-                ls = self.mgr.wait_async(self._run_cephadm_json(
-                    host, 'mon', 'ls', [], no_fsid=True, log_output=self.mgr.log_refresh_metadata))
+            ls = self._metadata_result(host, 'ls', fetched)
         except OrchestratorError as e:
             return str(e)
         self.mgr._process_ls_output(host, ls)
         return None
 
-    def _refresh_facts(self, host: str) -> Optional[str]:
+    def _refresh_facts(self, host: str, fetched: Optional[Dict[str, Any]] = None) -> Optional[str]:
         try:
-            with self.mgr.async_timeout_handler(host, 'cephadm gather-facts'):
-                val = self.mgr.wait_async(self._run_cephadm_json(
-                    host, cephadmNoImage, 'gather-facts', [],
-                    no_fsid=True, log_output=self.mgr.log_refresh_metadata))
+            val = self._metadata_result(host, 'gather-facts', fetched)
         except OrchestratorError as e:
             return str(e)
 
@@ -396,32 +512,9 @@ class CephadmServe:
 
         return None
 
-    def _refresh_host_devices(self, host: str) -> Optional[str]:
-        with_lsm = self.mgr.device_enhanced_scan
-        list_all = self.mgr.inventory_list_all
-        inventory_args = ['--', 'inventory',
-                          '--format=json-pretty',
-                          '--filter-for-batch']
-        if with_lsm:
-            inventory_args.insert(-1, "--with-lsm")
-        if list_all:
-            inventory_args.insert(-1, "--list-all")
-
+    def _refresh_host_devices(self, host: str, fetched: Optional[Dict[str, Any]] = None) -> Optional[str]:
         try:
-            try:
-                with self.mgr.async_timeout_handler(host, 'cephadm ceph-volume -- inventory'):
-                    devices = self.mgr.wait_async(self._run_cephadm_json(
-                        host, 'osd', 'ceph-volume', inventory_args, log_output=self.mgr.log_refresh_metadata))
-            except OrchestratorError as e:
-                if 'unrecognized arguments: --filter-for-batch' in str(e):
-                    rerun_args = inventory_args.copy()
-                    rerun_args.remove('--filter-for-batch')
-                    with self.mgr.async_timeout_handler(host, 'cephadm ceph-volume -- inventory'):
-                        devices = self.mgr.wait_async(self._run_cephadm_json(
-                            host, 'osd', 'ceph-volume', rerun_args, log_output=self.mgr.log_refresh_metadata))
-                else:
-                    raise
-
+            devices = self._metadata_result(host, 'ceph-volume -- inventory', fetched)
         except OrchestratorError as e:
             return str(e)
 
@@ -433,11 +526,9 @@ class CephadmServe:
         self.mgr.cache.save_host(host)
         return None
 
-    def _refresh_host_networks(self, host: str) -> Optional[str]:
+    def _refresh_host_networks(self, host: str, fetched: Optional[Dict[str, Any]] = None) -> Optional[str]:
         try:
-            with self.mgr.async_timeout_handler(host, 'cephadm list-networks'):
-                networks = self.mgr.wait_async(self._run_cephadm_json(
-                    host, 'mon', 'list-networks', [], no_fsid=True, log_output=self.mgr.log_refresh_metadata))
+            networks = self._metadata_result(host, 'list-networks', fetched)
         except OrchestratorError as e:
             return str(e)
 
@@ -831,7 +922,8 @@ class CephadmServe:
         )
 
         try:
-            all_slots, slots_to_add, daemons_to_remove = ha.place()
+            all_slots, slots_to_add, daemons_to_remove = self.mgr.placement_cache.place(
+                ha, self.mgr.cache.networks_generation, tuple(public_networks))
             daemons_to_remove = [d for d in daemons_to_remove if (d.hostname and self.mgr.inventory._inventory[d.hostname].get(
                 'status', '').lower() not in ['maintenance', 'offline'] and d.hostname not in self.mgr.offline_hosts)]
             self.log.debug('Add %s, remove %s' % (slots_to_add, daemons_to_remove))
@@ -920,82 +1012,112 @@ class CephadmServe:
 
             # create daemons
             daemon_place_fails = []
-            for slot in slots_to_add:
-                # first remove daemon with conflicting port or name?
-                if slot.ports or slot.name in [d.name() for d in daemons_to_remove]:
-                    for d in daemons_to_remove:
-                        if (
-                            d.hostname != slot.hostname
-                            or not (set(d.ports or []) & set(slot.ports))
-                            or (d.ip and slot.ip and d.ip != slot.ip)
-                            and d.name() != slot.name
-                        ):
-                            continue
-                        if d.name() != slot.name:
-                            self.log.info(
-                                f'Removing {d.name()} before deploying to {slot} to avoid a port or conflict'
-                            )
-                        # NOTE: we don't check ok-to-stop here to avoid starvation if
-                        # there is only 1 gateway.
-                        self._remove_daemon(d.name(), d.hostname)
-                        daemons_to_remove.remove(d)
-                        progress_done += 1
-                        hosts_altered.add(d.hostname)
-                        break
 
-                # do not attempt to deploy node-proxy agent when oob details are not provided.
-                if slot.daemon_type == 'node-proxy' and slot.hostname not in self.mgr.node_proxy_cache.oob.keys():
-                    self.log.debug(
-                        f'Not deploying node-proxy agent on {slot.hostname} as oob details are not present.'
-                    )
-                    continue
+            def place_failed(daemon_type: str, daemon_id: str, host: str, e: Exception) -> str:
+                msg = (f"Failed while placing {daemon_type}.{daemon_id} "
+                       f"on {host}: {e}")
+                self.mgr.events.for_service(spec, 'ERROR', msg)
+                self.mgr.log.error(msg)
+                return msg
 
-                # deploy new daemon
-                daemon_id = slot.name
+            waves = self._deploy_waves(service_type, slots_to_add, lambda s: s.hostname)
+            for wave_num, wave in enumerate(waves, start=1):
+                wave_fails: List[str] = []
+                daemon_specs: List[CephadmDaemonDeploySpec] = []
+                for slot in wave:
+                    # first remove daemon with conflicting port or name?
+                    if slot.ports or slot.name in [d.name() for d in daemons_to_remove]:
+                        for d in daemons_to_remove:
+                            if (
+                                d.hostname != slot.hostname
+                                or not (set(d.ports or []) & set(slot.ports))
+                                or (d.ip and slot.ip and d.ip != slot.ip)
+                                and d.name() != slot.name
+                            ):
+                                continue
+                            if d.name() != slot.name:
+                                self.log.info(
+                                    f'Removing {d.name()} before deploying to {slot} to avoid a port or conflict'
+                                )
+                            # NOTE: we don't check ok-to-stop here to avoid starvation if
+                            # there is only 1 gateway.
+                            self._remove_daemon(d.name(), d.hostname)
+                            daemons_to_remove.remove(d)
+                            progress_done += 1
+                            hosts_altered.add(d.hostname)
+                            break
+
+                    # do not attempt to deploy node-proxy agent when oob details are not provided.
+                    if slot.daemon_type == 'node-proxy' and slot.hostname not in self.mgr.node_proxy_cache.oob.keys():
+                        self.log.debug(
+                            f'Not deploying node-proxy agent on {slot.hostname} as oob details are not present.'
+                        )
+                        continue
 
-                daemon_spec = svc.make_daemon_spec(
-                    slot.hostname, daemon_id, slot.network, spec,
-                    daemon_type=slot.daemon_type,
-                    ports=slot.ports,
-                    ip=slot.ip,
-                    rank=slot.rank,
-                    rank_generation=slot.rank_generation,
-                )
-                self.log.debug('Placing %s.%s on host %s' % (
-                    slot.daemon_type, daemon_id, slot.hostname))
+                    # deploy new daemon
+                    daemon_id = slot.name
 
-                try:
-                    daemon_spec = svc.prepare_create(daemon_spec)
-                    with self.mgr.async_timeout_handler(slot.hostname, f'cephadm deploy ({daemon_spec.daemon_type} type dameon)'):
-                        self.mgr.wait_async(self._create_daemon(daemon_spec))
-                    r = True
+                    daemon_spec = svc.make_daemon_spec(
+                        slot.hostname, daemon_id, slot.network, spec,
+                        daemon_type=slot.daemon_type,
+                        ports=slot.ports,
+                        ip=slot.ip,
+                        rank=slot.rank,
+                        rank_generation=slot.rank_generation,
+                    )
+                    self.log.debug('Placing %s.%s on host %s' % (
+                        slot.daemon_type, daemon_id, slot.hostname))
+
+                    try:
+                        daemon_specs.append(svc.prepare_create(daemon_spec))
+                    except (RuntimeError, OrchestratorError) as e:
+                        wave_fails.append(place_failed(slot.daemon_type, daemon_id, slot.hostname, e))
+                        progress_done += 1
+                        update_progress()
+
+                # deploy the whole wave at once
+                results = self._create_daemons(daemon_specs) if daemon_specs else []
+                unexpected: Optional[BaseException] = None
+                for daemon_spec, result in zip(daemon_specs, results):
                     progress_done += 1
                     update_progress()
+                    if isinstance(result, (RuntimeError, OrchestratorError)):
+                        wave_fails.append(place_failed(
+                            daemon_spec.daemon_type, daemon_spec.daemon_id, daemon_spec.host, result))
+                        continue
+                    if isinstance(result, BaseException):
+                        unexpected = unexpected or result
+                        continue
+                    r = True
                     hosts_altered.add(daemon_spec.host)
                     self.mgr.spec_store.mark_needs_configuration(spec.service_name())
-                except (RuntimeError, OrchestratorError) as e:
-                    msg = (f"Failed while placing {slot.daemon_type}.{daemon_id} "
-                           f"on {slot.hostname}: {e}")
-                    self.mgr.events.for_service(spec, 'ERROR', msg)
-                    self.mgr.log.error(msg)
-                    daemon_place_fails.append(msg)
-                    # only return "no change" if no one else has already succeeded.
-                    # later successes will also change to True
-                    if r is None:
-                        r = False
-                    progress_done += 1
-                    update_progress()
-                    continue
 
-                # add to daemon list so next name(s) will also be unique
-                sd = orchestrator.DaemonDescription(
-                    hostname=slot.hostname,
-                    daemon_type=slot.daemon_type,
-                    daemon_id=daemon_id,
-                    service_name=spec.service_name()
-                )
-                daemons.append(sd)
-                self.mgr.cache.append_tmp_daemon(slot.hostname, sd)
+                    # add to daemon list so next name(s) will also be unique
+                    sd = orchestrator.DaemonDescription(
+                        hostname=daemon_spec.host,
+                        daemon_type=daemon_spec.daemon_type,
+                        daemon_id=daemon_spec.daemon_id,
+                        service_name=spec.service_name()
+                    )
+                    daemons.append(sd)
+                    self.mgr.cache.append_tmp_daemon(daemon_spec.host, sd)
+                if unexpected is not None:
+                    raise unexpected
+
+                daemon_place_fails += wave_fails
+                if wave_fails and r is None:
+                    # only return "no change" if no one else has already succeeded.
+                    r = False
+                if len(waves) > 1:
+                    self.log.info(f'{service_name}: deployed wave {wave_num}/{len(waves)}, '
+                                  f'{len(wave) - len(wave_fails)} daemon(s) placed, '
+                                  f'{len(wave_fails)} failed')
+                    if wave_fails and len(wave_fails) == len(wave) and wave_num < len(waves):
+                        # don't roll a broken deployment out to the remaining hosts.
+                        # The next serve loop pass tries again.
+                        self.log.warning(f'{service_name}: every daemon of wave {wave_num} failed, '
+                                         f'postponing the remaining {len(waves) - wave_num} wave(s)')
+                        break
 
             if daemon_place_fails:
                 self.mgr.set_health_warning('CEPHADM_DAEMON_PLACE_FAIL', f'Failed to place {len(daemon_place_fails)} daemon(s)', len(
@@ -1020,28 +1142,38 @@ class CephadmServe:
                 r = svc.ok_to_stop(cast(List[str], daemon_ids), force=True)
                 return not r.retval
 
-            while daemons_to_remove and not _ok_to_stop(daemons_to_remove):
-                # let's find a subset that is ok-to-stop
-                non_error_daemon_index = -1
-                # prioritize removing daemons in error state
-                for i, dmon in enumerate(daemons_to_remove):
-                    if dmon.status != DaemonDescriptionStatus.error:
-                        non_error_daemon_index = i
-                        break
-                if non_error_daemon_index != -1:
-                    daemons_to_remove.pop(non_error_daemon_index)
-                else:
-                    # all daemons in list are in error state
-                    # we should be able to remove all of them
-                    break
-            for d in daemons_to_remove:
+            if daemons_to_remove and not _ok_to_stop(daemons_to_remove):
+                # let's find the largest subset that is ok-to-stop, prioritizing
+                # removing daemons in error state: all of those, and as many of
+                # the others as possible, found by bisecting rather than dropping
+                # one daemon per ok-to-stop check
+                others = [i for i, d in enumerate(daemons_to_remove)
+                          if d.status != DaemonDescriptionStatus.error]
+
+                def subset(n: int) -> List[orchestrator.DaemonDescription]:
+                    keep = set(others[len(others) - n:])
+                    return [d for i, d in enumerate(daemons_to_remove)
+                            if i in keep or d.status == DaemonDescriptionStatus.error]
+
+                # with all others it is not ok-to-stop. Without any, only daemons
+                # in error state are left, we should be able to remove all of them
+                lo, hi = 0, len(others) - 1
+                while lo < hi:
+                    mid = (lo + hi + 1) // 2
+                    if _ok_to_stop(subset(mid)):
+                        lo = mid
+                    else:
+                        hi = mid - 1
+                daemons_to_remove = subset(lo)
+            for remove_wave in self._deploy_waves(service_type, daemons_to_remove,
+                                                  lambda dd: cast(str, dd.hostname)):
                 r = True
-                assert d.hostname is not None
-                self._remove_daemon(d.name(), d.hostname)
-
-                progress_done += 1
+                self._remove_daemons([(dd.name(), cast(str, dd.hostname)) for dd in remove_wave])
+                for dd in remove_wave:
+                    assert dd.hostname is not None
+                    progress_done += 1
+                    hosts_altered.add(dd.hostname)
                 update_progress()
-                hosts_altered.add(d.hostname)
                 self.mgr.spec_store.mark_needs_configuration(spec.service_name())
 
             if progress_total:
@@ -1250,7 +1382,8 @@ class CephadmServe:
                     daemons=[],
                     networks=self.mgr.cache.networks,
                 )
-                all_slots, _, _ = ha.place()
+                all_slots, _, _ = self.mgr.placement_cache.place(
+                    ha, self.mgr.cache.networks_generation)
                 for host in {s.hostname for s in all_slots}:
                     if host not in client_files:
                         client_files[host] = {}
@@ -1264,11 +1397,8 @@ class CephadmServe:
         # client keyrings
         for ks in self.mgr.keys.keys.values():
             try:
-                ret, keyring, err = self.mgr.mon_command({
-                    'prefix': 'auth get',
-                    'entity': ks.entity,
-                })
-                if ret:
+                keyring = self.mgr.keys.get_keyring(ks.entity)
+                if keyring is None:
                     self.log.warning(f'unable to fetch keyring for {ks.entity}')
                     continue
                 digest = ''.join('%02x' % c for c in hashlib.sha256(
@@ -1281,7 +1411,8 @@ class CephadmServe:
                     daemons=[],
                     networks=self.mgr.cache.networks,
                 )
-                all_slots, _, _ = ha.place()
+                all_slots, _, _ = self.mgr.placement_cache.place(
+                    ha, self.mgr.cache.networks_generation)
                 for host in {s.hostname for s in all_slots}:
                     if host not in client_files:
                         client_files[host] = {}
@@ -1316,6 +1447,7 @@ class CephadmServe:
         if self.mgr.cache.is_host_unreachable(host):
             return
         old_files = self.mgr.cache.get_host_client_files(host).copy()
+        files: List[ssh.RemoteFile] = []
         for path, m in client_files.get(host, {}).items():
             mode, uid, gid, content, digest = m
             if path in old_files:
@@ -1324,20 +1456,75 @@ class CephadmServe:
                 if match:
                     continue
             self.log.info(f'Updating {host}:{path}')
-            self.mgr.ssh.write_remote_file(host, path, content, mode, uid, gid)
-            self.mgr.cache.update_client_file(host, path, digest, mode, uid, gid)
+            files.append(ssh.RemoteFile(path, content, mode, uid, gid))
+        if files:
+            self.mgr.ssh.write_remote_files(host, files)
+            for f in files:
+                mode, uid, gid, _, digest = client_files[host][f.path]
+                self.mgr.cache.update_client_file(host, f.path, digest, mode, uid, gid)
             updated_files = True
-        for path in old_files.keys():
-            if path == '/etc/ceph/ceph.conf':
-                continue
-            self.log.info(f'Removing {host}:{path}')
-            cmd = ssh.RemoteCommand(ssh.Executables.RM, ['-f', path])
+        removed = [path for path in old_files.keys() if path != '/etc/ceph/ceph.conf']
+        if removed:
+            self.log.info(f'Removing {host}:{", ".join(removed)}')
+            cmd = ssh.RemoteCommand(ssh.Executables.RM, ['-f'] + removed)
             self.mgr.ssh.check_execute_command(host, cmd)
             updated_files = True
-            self.mgr.cache.removed_client_file(host, path)
+            for path in removed:
+                self.mgr.cache.removed_client_file(host, path)
         if updated_files:
             self.mgr.cache.save_host(host)
 
+    def _deploy_waves(self, service_type: str, items: List[T],
+                      hostname: Callable[[T], str]) -> List[List[T]]:
+        """
+        Split the daemons to deploy or remove into waves of at most
+        `deploy_max_in_flight` daemons, with at most
+        `deploy_max_in_flight_per_host` of them on the same host.
+        """
+        max_in_flight = 1 if service_type in SERIAL_DEPLOY_TYPES else self.mgr.deploy_max_in_flight
+        max_per_host = self.mgr.deploy_max_in_flight_per_host
+        waves: List[List[T]] = []
+        while items:
+            wave: List[T] = []
+            rest: List[T] = []
+            per_host: DefaultDict[str, int] = defaultdict(int)
+            for item in items:
+                host = hostname(item)
+                if (
+                    (max_in_flight and len(wave) >= max_in_flight)
+                    or (max_per_host and per_host[host] >= max_per_host)
+                ):
+                    rest.append(item)
+                    continue
+                wave.append(item)
+                per_host[host] += 1
+            waves.append(wave)
+            items = rest
+        return waves
+
+    def _create_daemons(self, daemon_specs: List[CephadmDaemonDeploySpec]) -> List[Any]:
+        """
+        Deploy daemons at once. Returns, in order, the result of deploying
+        each daemon, or the exception it failed with.
+        """
+        timeout = max(60, self.mgr.default_cephadm_command_timeout)
+
+        async def create(daemon_spec: CephadmDaemonDeploySpec) -> str:
+            try:
+                return await asyncio.wait_for(self._create_daemon(daemon_spec), timeout)
+            except asyncio.TimeoutError:
+                raise OrchestratorError(
+                    f'Command "cephadm deploy ({daemon_spec.daemon_type} type dameon)" timed out '
+                    f'on host {daemon_spec.host} ({timeout} second timeout)')
+
+        async def create_all() -> List[Any]:
+            return await asyncio.gather(*[create(d) for d in daemon_specs], return_exceptions=True)
+
+        hosts = ','.join(sorted(set(d.host for d in daemon_specs)))
+        with self.mgr.async_timeout_handler(hosts, f'cephadm deploy ({len(daemon_specs)} daemons)'):
+            # every deployment is bounded by the timeout above
+            return self.mgr.wait_async(create_all(), timeout + 60)
+
     async def _create_daemon(self,
                              daemon_spec: CephadmDaemonDeploySpec,
                              reconfig: bool = False,
@@ -1528,43 +1715,77 @@ class CephadmServe:
         """
         Remove a daemon
         """
-        (daemon_type, daemon_id) = name.split('.', 1)
-        daemon = orchestrator.DaemonDescription(
-            daemon_type=daemon_type,
-            daemon_id=daemon_id,
-            hostname=host)
-
-        with set_exception_subject('service', daemon.service_id(), overwrite=True):
-
-            self.mgr.cephadm_services[daemon_type_to_service(daemon_type)].pre_remove(daemon)
-            # NOTE: we are passing the 'force' flag here, which means
-            # we can delete a mon instances data.
-            dd = self.mgr.cache.get_daemon(daemon.daemon_name)
-            if dd.ports:
-                args = ['--name', name, '--force', '--tcp-ports', ' '.join(map(str, dd.ports))]
-            else:
-                args = ['--name', name, '--force']
+        return self._remove_daemons([(name, host)], no_post_remove=no_post_remove)[0]
 
-            self.log.info('Removing daemon %s from %s -- ports %s' % (name, host, dd.ports))
-            with self.mgr.async_timeout_handler(host, f'cephadm rm-daemon (daemon {name})'):
-                out, err, code = self.mgr.wait_async(self._run_cephadm(
-                    host, name, 'rm-daemon', args))
+    def _remove_daemons(self, daemons: List[Tuple[str, str]], no_post_remove: bool = False) -> List[str]:
+        """
+        Remove daemons, given as (name, host) pairs, running `cephadm rm-daemon`
+        for all of them at once.
+        """
+        removals: List[Tuple[orchestrator.DaemonDescription, List[str]]] = []
+        for name, host in daemons:
+            (daemon_type, daemon_id) = name.split('.', 1)
+            daemon = orchestrator.DaemonDescription(
+                daemon_type=daemon_type,
+                daemon_id=daemon_id,
+                hostname=host)
+
+            with set_exception_subject('service', daemon.service_id(), overwrite=True):
+                self.mgr.cephadm_services[daemon_type_to_service(daemon_type)].pre_remove(daemon)
+                # NOTE: we are passing the 'force' flag here, which means
+                # we can delete a mon instances data.
+                dd = self.mgr.cache.get_daemon(daemon.daemon_name)
+                if dd.ports:
+                    args = ['--name', name, '--force', '--tcp-ports', ' '.join(map(str, dd.ports))]
+                else:
+                    args = ['--name', name, '--force']
+
+                self.log.info('Removing daemon %s from %s -- ports %s' % (name, host, dd.ports))
+            removals.append((daemon, args))
+
+        async def rm_daemons() -> List[Any]:
+            return await asyncio.gather(*[
+                self._run_cephadm(cast(str, daemon.hostname), daemon.name(), 'rm-daemon', args)
+                for daemon, args in removals
+            ], return_exceptions=True)
+
+        hosts = ','.join(sorted(set(host for _, host in daemons)))
+        names = ' '.join(name for name, _ in daemons)
+        with self.mgr.async_timeout_handler(hosts, f'cephadm rm-daemon (daemon {names})'):
+            results = self.mgr.wait_async(rm_daemons())
+
+        msgs: List[str] = []
+        failed: Optional[Tuple[orchestrator.DaemonDescription, BaseException]] = None
+        for (daemon, _), result in zip(removals, results):
+            name, host = daemon.name(), cast(str, daemon.hostname)
+            daemon_type = cast(str, daemon.daemon_type)
+            if isinstance(result, BaseException):
+                failed = failed or (daemon, result)
+                continue
+            out, err, code = result
             if not code:
                 # remove item from cache
                 self.mgr.cache.rm_daemon(host, name)
             self.mgr.cache.invalidate_host_daemons(host)
 
-            if not no_post_remove:
-                if daemon_type not in ['iscsi']:
-                    self.mgr.cephadm_services[daemon_type_to_service(
-                        daemon_type)].post_remove(daemon, is_failed_deploy=False)
-                else:
-                    self.mgr.scheduled_async_actions.append(lambda: self.mgr.cephadm_services[daemon_type_to_service(
-                                                            daemon_type)].post_remove(daemon, is_failed_deploy=False))
-                    self.mgr._kick_serve_loop()
+            with set_exception_subject('service', daemon.service_id(), overwrite=True):
+                if not no_post_remove:
+                    if daemon_type not in ['iscsi']:
+                        self.mgr.cephadm_services[daemon_type_to_service(
+                            daemon_type)].post_remove(daemon, is_failed_deploy=False)
+                    else:
+                        self.mgr.scheduled_async_actions.append(
+                            lambda daemon=daemon, daemon_type=daemon_type: self.mgr.cephadm_services[
+                                daemon_type_to_service(daemon_type)].post_remove(daemon, is_failed_deploy=False))
+                        self.mgr._kick_serve_loop()
 
             self.mgr.recently_altered_daemons[name] = datetime_now()
-            return "Removed {} from host '{}'".format(name, host)
+            msgs.append("Removed {} from host '{}'".format(name, host))
+
+        if failed is not None:
+            with set_exception_subject('service', failed[0].service_id(), overwrite=True):
+                raise failed[1]
+        return msgs
 
     async def _run_cephadm_json(self,
                                 host: str,
@@ -8,7 +8,8 @@ from threading import Thread
 from contextlib import contextmanager
 from io import StringIO
 from shlex import quote
-from typing import TYPE_CHECKING, Optional, List, Tuple, Dict, Iterator, TypeVar, Awaitable, Union
+from typing import TYPE_CHECKING, Optional, List, Tuple, Dict, Iterator, TypeVar, Awaitable, Union, \
+    NamedTuple, Callable
 from orchestrator import OrchestratorError
 
 try:
@@ -49,6 +50,14 @@ class RemoteExecutable(str):
     pass
 
 
+class RemoteFile(NamedTuple):
+    path: str
+    content: bytes
+    mode: Optional[int] = None
+    uid: Optional[int] = None
+    gid: Optional[int] = None
+
+
 class RemoteCommand:
     exe: RemoteExecutable
     args: List[str]
@@ -145,11 +154,33 @@ class SSHManager:
     def __init__(self, mgr: "CephadmOrchestrator"):
         self.mgr: "CephadmOrchestrator" = mgr
         self.cons: Dict[str, "SSHClientConnection"] = {}
+        # created within the event loop
+        self.connect_locks: Dict[str, asyncio.Lock] = {}
+        self.sessions: Dict[str, asyncio.Semaphore] = {}
+
+    def _sessions(self, host: str) -> asyncio.Semaphore:
+        """
+        Bounds the sessions (commands, sftp) open at once on the
+        connection to a host.
+        """
+        if host not in self.sessions:
+            self.sessions[host] = asyncio.Semaphore(self.mgr.ssh_max_sessions_per_host)
+        return self.sessions[host]
 
     async def _remote_connection(self,
                                  host: str,
                                  addr: Optional[str] = None,
                                  ) -> "SSHClientConnection":
+        if host not in self.connect_locks:
+            self.connect_locks[host] = asyncio.Lock()
+        # commands run concurrently on a host share one connection
+        async with self.connect_locks[host]:
+            return await self._connect(host, addr)
+
+    async def _connect(self,
+                       host: str,
+                       addr: Optional[str] = None,
+                       ) -> "SSHClientConnection":
         if not self.cons.get(host) or host not in self.mgr.inventory:
             if not addr and host in self.mgr.inventory:
                 addr = self.mgr.inventory.get_addr(host)
@@ -242,7 +273,8 @@ class SSHManager:
         if log_command:
             logger.debug(f'Running command: {rcmd}')
         try:
-            r = await conn.run(str(rcmd), input=stdin)
+            async with self._sessions(host):
+                r = await conn.run(str(rcmd), input=stdin)
         # handle these Exceptions otherwise you might get a weird error like
         # TypeError: __init__() missing 1 required positional argument: 'reason' (due to the asyncssh error interacting with raise_if_exception)
         except asyncssh.ChannelOpenError as e:
@@ -314,6 +346,24 @@ class SSHManager:
         with self.mgr.async_timeout_handler(host, " ".join(cmd)):
             return self.mgr.wait_async(self._check_execute_command(host, cmd, stdin, addr, log_command))
 
+    async def _on_hosts(self,
+                        hosts: List[str],
+                        func: Callable[[str], Awaitable[T]],
+                        ) -> Dict[str, Union[T, BaseException]]:
+        """
+        Run @func for every host of @hosts, on up to
+        `ssh_max_concurrent_hosts` hosts at once. The result of a host is
+        what @func returned, or the exception it failed with.
+        """
+        limit = asyncio.Semaphore(self.mgr.ssh_max_concurrent_hosts)
+
+        async def run(host: str) -> T:
+            async with limit:
+                return await func(host)
+
+        results = await asyncio.gather(*[run(host) for host in hosts], return_exceptions=True)
+        return dict(zip(hosts, results))
+
     async def _write_remote_file(self,
                                  host: str,
                                  path: str,
@@ -323,15 +373,27 @@ class SSHManager:
                                  gid: Optional[int] = None,
                                  addr: Optional[str] = None,
                                  ) -> None:
+        await self._write_remote_files(host, [RemoteFile(path, content, mode, uid, gid)], addr)
+
+    async def _write_remote_files(self,
+                                  host: str,
+                                  files: List[RemoteFile],
+                                  addr: Optional[str] = None,
+                                  ) -> None:
+        """
+        Write @files to @host in one sftp session. The steps around the
+        transfer handle all files at once, with one command per step where
+        possible.
+        """
         try:
             cephadm_tmp_dir = f"/tmp/cephadm-{self.mgr._cluster_fsid}"
-            dirname = os.path.dirname(path)
-            mkdir = RemoteCommand(Executables.MKDIR, ['-p', dirname])
+            tmp_paths = [cephadm_tmp_dir + f.path + '.new' for f in files]
+            dirnames = sorted(set(os.path.dirname(f.path) for f in files))
+            mkdir = RemoteCommand(Executables.MKDIR, ['-p'] + dirnames)
             await self._check_execute_command(host, mkdir, addr=addr)
-            mkdir2 = RemoteCommand(Executables.MKDIR, ['-p', cephadm_tmp_dir + dirname])
+            mkdir2 = RemoteCommand(Executables.MKDIR, ['-p'] + [cephadm_tmp_dir + d for d in dirnames])
             await self._check_execute_command(host, mkdir2, addr=addr)
-            tmp_path = cephadm_tmp_dir + path + '.new'
-            touch = RemoteCommand(Executables.TOUCH, [tmp_path])
+            touch = RemoteCommand(Executables.TOUCH, tmp_paths)
             await self._check_execute_command(host, touch, addr=addr)
             if self.mgr.ssh_user != 'root':
                 assert self.mgr.ssh_user
@@ -340,31 +402,44 @@ class SSHManager:
                     ['-R', self.mgr.ssh_user, cephadm_tmp_dir]
                 )
                 await self._check_execute_command(host, chown, addr=addr)
-                chmod = RemoteCommand(Executables.CHMOD, [str(644), tmp_path])
+                chmod = RemoteCommand(Executables.CHMOD, [str(644)] + tmp_paths)
                 await self._check_execute_command(host, chmod, addr=addr)
-            with NamedTemporaryFile(prefix='cephadm-write-remote-file-') as f:
-                os.fchmod(f.fileno(), 0o600)
-                f.write(content)
-                f.flush()
-                conn = await self._remote_connection(host, addr)
+            conn = await self._remote_connection(host, addr)
+            async with self._sessions(host):
                 async with conn.start_sftp_client() as sftp:
-                    await sftp.put(f.name, tmp_path)
-            if uid is not None and gid is not None and mode is not None:
-                # shlex quote takes str or byte object, not int
-                chown = RemoteCommand(
-                    Executables.CHOWN,
-                    ['-R', str(uid) + ':' + str(gid), tmp_path]
-                )
-                await self._check_execute_command(host, chown, addr=addr)
-                chmod = RemoteCommand(Executables.CHMOD, [oct(mode)[2:], tmp_path])
-                await self._check_execute_command(host, chmod, addr=addr)
-            mv = RemoteCommand(Executables.MV, [tmp_path, path])
-            await self._check_execute_command(host, mv, addr=addr)
+                    for f, tmp_path in zip(files, tmp_paths):
+                        async with sftp.open(tmp_path, 'wb') as remote:
+                            await remote.write(f.content)
+            owners: Dict[str, List[str]] = {}
+            modes: Dict[str, List[str]] = {}
+            for f, tmp_path in zip(files, tmp_paths):
+                if f.uid is not None and f.gid is not None and f.mode is not None:
+                    # shlex quote takes str or byte object, not int
+                    owners.setdefault(str(f.uid) + ':' + str(f.gid), []).append(tmp_path)
+                    modes.setdefault(oct(f.mode)[2:], []).append(tmp_path)
+            await self._execute_checked(host, [
+                RemoteCommand(Executables.CHOWN, ['-R', owner] + paths)
+                for owner, paths in owners.items()
+            ] + [
+                RemoteCommand(Executables.CHMOD, [mode] + paths)
+                for mode, paths in modes.items()
+            ], addr)
+            await self._execute_checked(host, [
+                RemoteCommand(Executables.MV, [tmp_path, f.path])
+                for f, tmp_path in zip(files, tmp_paths)
+            ], addr)
         except Exception as e:
-            msg = f"Unable to write {host}:{path}: {e}"
+            msg = f"Unable to write {host}:{', '.join(f.path for f in files)}: {e}"
             logger.exception(msg)
             raise OrchestratorError(msg)
 
+    async def _execute_checked(self,
+                               host: str,
+                               cmds: List[RemoteCommand],
+                               addr: Optional[str] = None,
+                               ) -> None:
+        await asyncio.gather(*[self._check_execute_command(host, cmd, addr=addr) for cmd in cmds])
+
     def write_remote_file(self,
                           host: str,
                           path: str,
@@ -378,6 +453,14 @@ class SSHManager:
             self.mgr.wait_async(self._write_remote_file(
                 host, path, content, mode, uid, gid, addr))
 
+    def write_remote_files(self,
+                           host: str,
+                           files: List[RemoteFile],
+                           addr: Optional[str] = None,
+                           ) -> None:
+        with self.mgr.async_timeout_handler(host, f'writing {len(files)} files'):
+            self.mgr.wait_async(self._write_remote_files(host, files, addr))
+
     async def _reset_con(self, host: str) -> None:
         conn = self.cons.get(host)
         if conn:
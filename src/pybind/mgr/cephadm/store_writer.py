@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from cephadm.module import CephadmOrchestrator
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(value: Optional[str]) -> str:
+    if value is None:
+        return ''
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+
+class StoreWriter:
+    """
+    Write-behind layer in front of the config-key store.
+
+    Every set_store() is a round trip to the monitors. Values set through
+    here are held back for `store_flush_interval` seconds, so that repeated
+    updates of the same key only result in a single write, and values equal
+    to what the store already holds are not written at all.
+
+    Only use write-behind for state that can be rebuilt after a mgr failover
+    (e.g. the host cache). State a user asked for must be set with `sync=True`,
+    which still skips unchanged values but writes through immediately.
+    """
+
+    def __init__(self, mgr: "CephadmOrchestrator") -> None:
+        self.mgr = mgr
+        self.lock = threading.Lock()
+        # serializes flushes, so a key is never overwritten with an older value
+        self.flush_lock = threading.Lock()
+        self.pending: Dict[str, Optional[str]] = {}
+        # digest of the value the store holds, by key
+        self.stored: Dict[str, str] = {}
+        # digest of the values being written by a flush, by key
+        self.flushing: Dict[str, str] = {}
+        self.timer: Optional[threading.Timer] = None
+        # once shut down, everything is written through
+        self.stopped = False
+        self.stats: Dict[str, int] = {
+            'writes': 0,
+            'bytes_written': 0,
+            'skipped_unchanged': 0,
+            'coalesced': 0,
+            'flushes': 0,
+        }
+
+    def loaded(self, key: str, value: Optional[str]) -> None:
+        """
+        Note a value read from the store, so that writing it back unchanged
+        can be skipped.
+        """
+        with self.lock:
+            self.stored[key] = _digest(value)
+
+    def _written(self, key: str) -> Optional[str]:
+        # digest of the value the store holds once the running flush is done
+        return self.flushing.get(key, self.stored.get(key))
+
+    def set(self, key: str, value: Optional[str], sync: bool = False) -> None:
+        digest = _digest(value)
+        with self.lock:
+            sync = sync or self.stopped
+            if key in self.pending:
+                # the pending value will never be written
+                self.stats['coalesced'] += 1
+                if self._written(key) == digest:
+                    del self.pending[key]
+                    return
+                if not sync:
+                    self.pending[key] = value
+                    return
+                del self.pending[key]
+            elif self._written(key) == digest:
+                self.stats['skipped_unchanged'] += 1
+                return
+            if not sync and self.mgr.store_flush_interval:
+                self.pending[key] = value
+                self._schedule_flush()
+                return
+        with self.flush_lock:
+            self._write(key, value)
+
+    def _schedule_flush(self) -> None:
+        if self.timer is None:
+            self.timer = threading.Timer(self.mgr.store_flush_interval, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def _write(self, key: str, value: Optional[str]) -> None:
+        self.mgr.set_store(key, value)
+        with self.lock:
+            self.stored[key] = _digest(value)
+            self.stats['writes'] += 1
+            self.stats['bytes_written'] += len(value) if value is not None else 0
+
+    def flush(self) -> None:
+        with self.flush_lock:
+            with self.lock:
+                pending = self.pending
+                self.pending = {}
+                self.flushing = {key: _digest(value) for key, value in pending.items()}
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+            if not pending:
+                return
+            self.stats['flushes'] += 1
+            for key, value in pending.items():
+                try:
+                    self._write(key, value)
+                except Exception as e:
+                    logger.warning(f'Failed to write {key} to the config-key store: {e}')
+                    with self.lock:
+                        # retry with the next flush, unless it was updated meanwhile
+                        self.pending.setdefault(key, value)
+                        self._schedule_flush()
+                finally:
+                    with self.lock:
+                        del self.flushing[key]
+            logger.debug(f'Flushed {len(pending)} keys to the config-key store')
+
+    def shutdown(self) -> None:
+        with self.lock:
+            self.stopped = True
+        self.flush()
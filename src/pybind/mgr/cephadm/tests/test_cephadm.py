@@ -1,4 +1,5 @@
 import asyncio
+import datetime
 import json
 import logging
 
@@ -7,7 +8,10 @@ from contextlib import contextmanager
 import pytest
 
 from ceph.deployment.drive_group import DriveGroupSpec, DeviceSelection
+from cephadm import agent
 from cephadm.serve import CephadmServe
+from cephadm.ssh import RemoteFile
+from cephadm.store_writer import StoreWriter
 from cephadm.inventory import (
     HostCacheStatus,
     ClientKeyringSpec,
@@ -1541,6 +1545,33 @@ class TestCephadm(object):
                                           "fail"),
                     ]
 
+    def test_deploy_waves(self, cephadm_module):
+        serve = CephadmServe(cephadm_module)
+        hosts = ['host1', 'host1', 'host2', 'host3', 'host1']
+        with mock.patch.object(cephadm_module, 'deploy_max_in_flight', 2), \
+                mock.patch.object(cephadm_module, 'deploy_max_in_flight_per_host', 1):
+            assert serve._deploy_waves('crash', hosts, lambda h: h) == [
+                ['host1', 'host2'], ['host1', 'host3'], ['host1']]
+            assert serve._deploy_waves('mon', hosts[:3], lambda h: h) == [
+                ['host1'], ['host1'], ['host2']]
+        with mock.patch.object(cephadm_module, 'deploy_max_in_flight', 0), \
+                mock.patch.object(cephadm_module, 'deploy_max_in_flight_per_host', 0):
+            assert serve._deploy_waves('crash', hosts, lambda h: h) == [hosts]
+
+    @mock.patch("cephadm.serve.CephadmServe._run_cephadm")
+    def test_deploy_waves_failed(self, _run_cephadm, cephadm_module):
+        _run_cephadm.side_effect = async_side_effect(('{}', '', 0))
+        with with_host(cephadm_module, 'test'), with_host(cephadm_module, 'test2'):
+            _run_cephadm.side_effect = OrchestratorError('fail')
+            ps = PlacementSpec(hosts=['test', 'test2'], count=2)
+            _run_cephadm.reset_mock()
+            with mock.patch.object(cephadm_module, 'deploy_max_in_flight', 1):
+                r = CephadmServe(cephadm_module)._apply_service(ServiceSpec('crash', placement=ps))
+            assert not r
+            # the second wave was not attempted
+            assert _run_cephadm.call_count == 1
+            assert cephadm_module.health_checks['CEPHADM_DAEMON_PLACE_FAIL']['count'] == 1
+
     @mock.patch("cephadm.serve.CephadmServe._run_cephadm")
     def test_daemon_place_fail_health_warning(self, _run_cephadm, cephadm_module):
         _run_cephadm.side_effect = async_side_effect(('{}', '', 0))
@@ -1617,6 +1648,7 @@ class TestCephadm(object):
             assert byte_len(json.dumps([d.to_json() for d in fake_devices])) < entry_size * 2
             cephadm_module.cache.update_host_devices('test', fake_devices)
             cephadm_module.cache.save_host_devices('test')
+            cephadm_module.store_writer.flush()
             expected_calls = [
                 mock.call('host.test.devices.0', json.dumps(
                     {'devices': [d.to_json() for d in [FakeDev()] * 34], 'entries': 3})),
@@ -1632,6 +1664,7 @@ class TestCephadm(object):
             assert byte_len(json.dumps([d.to_json() for d in fake_devices])) < entry_size * 5
             cephadm_module.cache.update_host_devices('test', fake_devices)
             cephadm_module.cache.save_host_devices('test')
+            cephadm_module.store_writer.flush()
             expected_calls = [
                 mock.call('host.test.devices.0', json.dumps(
                     {'devices': [d.to_json() for d in [FakeDev()] * 50], 'entries': 6})),
@@ -1652,6 +1685,7 @@ class TestCephadm(object):
             assert byte_len(json.dumps([d.to_json() for d in fake_devices])) < entry_size
             cephadm_module.cache.update_host_devices('test', fake_devices)
             cephadm_module.cache.save_host_devices('test')
+            cephadm_module.store_writer.flush()
             expected_calls = [
                 mock.call('host.test.devices.0', json.dumps(
                     {'devices': [d.to_json() for d in [FakeDev()] * 62], 'entries': 1})),
@@ -1664,6 +1698,7 @@ class TestCephadm(object):
             assert byte_len(json.dumps([d.to_json() for d in fake_devices])) < entry_size * 2
             cephadm_module.cache.update_host_devices('test', fake_devices)
             cephadm_module.cache.save_host_devices('test')
+            cephadm_module.store_writer.flush()
             expected_calls = [
                 mock.call('host.test.devices.0', json.dumps(
                     {'devices': [d.to_json() for d in [FakeDev()] * 22], 'entries': 3})),
@@ -1682,6 +1717,7 @@ class TestCephadm(object):
             assert byte_len(json.dumps([d.to_json() for d in fake_devices])) < entry_size * 2
             cephadm_module.cache.update_host_devices('test', fake_devices)
             cephadm_module.cache.save_host_devices('test')
+            cephadm_module.store_writer.flush()
             expected_calls = [
                 mock.call('host.test.devices.0', json.dumps(
                     {'devices': [d.to_json() for d in [FakeDev('a'), FakeDev('b')]], 'entries': 3})),
@@ -1708,6 +1744,292 @@ class TestCephadm(object):
         devs = cephadm_module.cache.load_host_devices('test')
         assert devs == [Device('/path')] * 20
 
+    @mock.patch("cephadm.serve.CephadmServe._run_cephadm")
+    def test_save_host_dirty_devices(self, _run_cephadm, cephadm_module: CephadmOrchestrator):
+        _run_cephadm.side_effect = async_side_effect(('{}', '', 0))
+        with with_host(cephadm_module, 'test'):
+            cephadm_module.cache.update_host_devices('test', [Device('/dev/sdb')])
+            with mock.patch.object(cephadm_module.cache, 'save_host_devices',
+                                   wraps=cephadm_module.cache.save_host_devices) as _save_devs:
+                cephadm_module.cache.save_host('test')
+                assert _save_devs.call_count == 1
+                # unchanged devices are not saved again
+                cephadm_module.cache.update_host_devices('test', [Device('/dev/sdb')])
+                cephadm_module.cache.save_host('test')
+                assert _save_devs.call_count == 1
+                cephadm_module.cache.update_host_devices('test', [Device('/dev/sdc')])
+                cephadm_module.cache.save_host('test')
+                assert _save_devs.call_count == 2
+
+    @mock.patch("cephadm.serve.CephadmServe._run_cephadm")
+    def test_store_writer(self, _run_cephadm, cephadm_module: CephadmOrchestrator):
+        _run_cephadm.side_effect = async_side_effect(('{}', '', 0))
+        with with_host(cephadm_module, 'test'):
+            writer = cephadm_module.store_writer
+            writer.flush()
+            with mock.patch.object(cephadm_module, 'store_flush_interval', 60), \
+                    mock.patch.object(cephadm_module, 'set_store') as _set_store:
+                cephadm_module.cache.save_host('test')
+                cephadm_module.cache.last_host_check['test'] = datetime_now()
+                cephadm_module.cache.save_host('test')
+                # held back and coalesced into one write
+                _set_store.assert_not_called()
+                assert list(writer.pending) == ['host.test']
+                writer.flush()
+                _set_store.assert_called_once()
+                assert writer.timer is None
+
+                # unchanged, not written again
+                cephadm_module.cache.save_host('test')
+                assert not writer.pending
+                _set_store.assert_called_once()
+
+                # specs are written through
+                cephadm_module.spec_store.save(ServiceSpec('crash'))
+                _set_store.assert_any_call('spec.crash', mock.ANY)
+                assert not writer.pending
+
+                # so are changes of the scheduled daemon actions
+                _set_store.reset_mock()
+                cephadm_module.cache.schedule_daemon_action('test', 'crash.test', 'restart')
+                cephadm_module.cache.save_host('test')
+                _set_store.assert_called_once_with('host.test', mock.ANY)
+                assert not writer.pending
+                cephadm_module.cache.rm_scheduled_daemon_action('test', 'crash.test')
+                cephadm_module.cache.save_host('test')
+                assert _set_store.call_count == 2
+                assert not writer.pending
+
+                # pending writes are flushed on shutdown, later ones written through
+                cephadm_module.cache.last_host_check['test'] = datetime_now()
+                cephadm_module.cache.save_host('test')
+                assert list(writer.pending) == ['host.test']
+                writer.shutdown()
+                assert not writer.pending
+                assert _set_store.call_count == 3
+                cephadm_module.cache.last_host_check['test'] = datetime_now()
+                cephadm_module.cache.save_host('test')
+                assert not writer.pending
+                assert _set_store.call_count == 4
+                writer.stopped = False
+
+    def test_store_writer_set_during_flush(self):
+        writer = StoreWriter(mock.MagicMock(store_flush_interval=60))
+        writer.loaded('host.test', 'old')
+        writer.set('host.test', 'new')
+
+        def set_store(key, value):
+            if value == 'new':
+                # set back to the stored value while the flush writes 'new'
+                writer.set('host.test', 'old')
+        writer.mgr.set_store.side_effect = set_store
+
+        writer.flush()
+        assert writer.pending == {'host.test': 'old'}
+        writer.flush()
+        assert writer.mgr.set_store.call_args_list == [
+            mock.call('host.test', 'new'), mock.call('host.test', 'old')]
+        assert not writer.pending and not writer.flushing
+        # the value being flushed is not written twice either
+        writer.mgr.set_store.side_effect = lambda key, value: writer.set(key, value)
+        writer.set('host.test', 'new')
+        writer.flush()
+        assert writer.mgr.set_store.call_count == 3
+        assert not writer.pending
+        assert writer.timer is None
+
+    @mock.patch("cephadm.serve.CephadmServe._run_cephadm")
+    def test_refresh_scheduler(self, _run_cephadm, cephadm_module: CephadmOrchestrator):
+        _run_cephadm.side_effect = async_side_effect(('{}', '', 0))
+        with with_host(cephadm_module, 'host1'), with_host(cephadm_module, 'host2'), \
+                with_host(cephadm_module, 'host3'):
+            scheduler = cephadm_module.refresh_scheduler
+            hosts = ['host1', 'host2', 'host3']
+            for h in hosts:
+                cephadm_module.cache.metadata_up_to_date[h] = True
+                scheduler.visited(h)
+            assert scheduler.select(hosts) == []
+
+            now = datetime_now()
+            scheduler.next_visit['host1'] = now - datetime.timedelta(seconds=10)
+            scheduler.next_visit['host2'] = now - datetime.timedelta(seconds=100)
+            cephadm_module.cache.invalidate_host_daemons('host3')
+            with mock.patch.object(cephadm_module, 'refresh_max_hosts_per_loop', 2):
+                # pending work first, then the most overdue host
+                assert scheduler.select(hosts) == ['host3', 'host2']
+            assert scheduler.stats['queue_depth'] == 1
+            assert scheduler.stats['max_lag'] >= 10
+
+            # other hosts are visited when their first periodic refresh falls due
+            with mock.patch.object(cephadm_module, 'facts_cache_timeout', 300), \
+                    mock.patch.object(cephadm_module, 'daemon_cache_timeout', 600), \
+                    mock.patch.object(cephadm_module, 'host_check_interval', 600), \
+                    mock.patch.object(cephadm_module, 'device_cache_timeout', 1800):
+                now = datetime_now()
+                cache = cephadm_module.cache
+                for last in (cache.last_host_check, cache.last_autotune, cache.last_daemon_update,
+                             cache.last_facts_update, cache.last_network_update,
+                             cache.last_device_update):
+                    last['host1'] = now
+                scheduler.visited('host1')
+                lag = (scheduler.next_visit['host1'] - now).total_seconds()
+                assert 300 * 0.8 - 1 <= lag <= 300 * 1.2 + 1
+                # metadata reported by an agent leaves fewer refreshes to the serve loop
+                cephadm_module.use_agent = True
+                try:
+                    with mock.patch.object(cache, 'get_daemons_by_type', return_value=[mock.Mock()]):
+                        scheduler.visited('host1')
+                finally:
+                    cephadm_module.use_agent = False
+                lag = (scheduler.next_visit['host1'] - now).total_seconds()
+                assert 600 * 0.8 - 1 <= lag <= 600 * 1.2 + 1
+                # but a refresh that keeps failing is not retried in every pass
+                cache.last_facts_update['host1'] = now - datetime.timedelta(seconds=3600)
+                scheduler.visited('host1')
+                lag = (scheduler.next_visit['host1'] - now).total_seconds()
+                assert lag >= 300 * 0.8 - 1
+
+    @mock.patch("cephadm.serve.CephadmServe._run_cephadm")
+    def test_refresh_failures_persist(self, _run_cephadm, cephadm_module: CephadmOrchestrator):
+        _run_cephadm.side_effect = async_side_effect(('{}', '', 0))
+        with with_host(cephadm_module, 'host1'), with_host(cephadm_module, 'host2'):
+            serve = CephadmServe(cephadm_module)
+            cache = cephadm_module.cache
+            with mock.patch.object(serve, '_refresh_facts', return_value='facts failed'):
+                cache.last_facts_update.pop('host1', None)
+                with mock.patch.object(cephadm_module.refresh_scheduler, 'select',
+                                       return_value=['host1']):
+                    serve._refresh_hosts_and_daemons()
+                assert 'CEPHADM_REFRESH_FAILED' in cephadm_module.health_checks
+
+                # a pass that doesn't visit the failing host keeps the warning
+                with mock.patch.object(cephadm_module.refresh_scheduler, 'select',
+                                       return_value=['host2']):
+                    serve._refresh_hosts_and_daemons()
+                assert cephadm_module.health_checks['CEPHADM_REFRESH_FAILED']['detail'] == [
+                    'facts failed']
+
+            # until the refresh of that host succeeds
+            cache.last_facts_update.pop('host1', None)
+            with mock.patch.object(cephadm_module.refresh_scheduler, 'select',
+                                   return_value=['host1']):
+                serve._refresh_hosts_and_daemons()
+            assert 'CEPHADM_REFRESH_FAILED' not in cephadm_module.health_checks
+
+    @mock.patch("cephadm.serve.CephadmServe._run_cephadm")
+    def test_fetch_host_metadata(self, _run_cephadm, cephadm_module: CephadmOrchestrator):
+        running = []
+        most = []
+
+        async def _run(host, entity, command, *args, **kwargs):
+            running.append(command)
+            most.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(command)
+            if command == 'list-networks':
+                return [''], ['boom'], 1
+            return ['[]' if command == 'ceph-volume' else '{}'], [''], 0
+
+        _run_cephadm.side_effect = _run
+        with with_host(cephadm_module, 'test'):
+            cephadm_module.cache.invalidate_host_daemons('test')
+            cephadm_module.cache.invalidate_host_networks('test')
+            cephadm_module.cache.invalidate_host_devices('test')
+            cephadm_module.cache.last_facts_update.pop('test', None)
+            cephadm_module.cache.last_host_check.pop('test', None)
+            serve = CephadmServe(cephadm_module)
+            fetched = serve._fetch_host_metadata(['test'])
+            # the commands of a host run at once
+            assert max(most) == 5
+            results = fetched['test']
+            assert sorted(results) == ['ceph-volume -- inventory', 'check-host', 'gather-facts',
+                                       'list-networks', 'ls']
+            assert results['ls'] == {}
+            assert isinstance(results['list-networks'], OrchestratorError)
+
+            # and are picked up by the refresh rather than run again
+            _run_cephadm.reset_mock()
+            assert serve._refresh_host_daemons('test', results) is None
+            assert 'boom' in serve._refresh_host_networks('test', results)
+            _run_cephadm.assert_not_called()
+            # each of them once
+            assert serve._refresh_facts('test', results) is None
+            assert serve._refresh_facts('test', results) is None
+            assert _run_cephadm.call_count == 1
+
+    @mock.patch("cephadm.serve.CephadmServe._run_cephadm")
+    def test_agent_metadata_hashes(self, _run_cephadm, cephadm_module: CephadmOrchestrator):
+        _run_cephadm.side_effect = async_side_effect(('{}', '', 0))
+        with with_host(cephadm_module, 'test'):
+            cache = cephadm_module.cache
+            host_data = mock.Mock(mgr=cephadm_module)
+            cephadm_module.agent_cache.agent_counter['test'] = 1
+            ls = [{'style': 'cephadm:v1', 'name': 'mon.test', 'fsid': 'fsid',
+                   'systemd_unit': 'unit', 'enabled': True, 'state': 'running'}]
+            facts = {'hostname': 'test', 'cpu_load': 1.0, 'hdd_count': 2}
+            data = {
+                'host': 'test',
+                'port': '1234',
+                'ack': '1',
+                'hashes': {'ls': 'ls1', 'networks': 'net1', 'facts': 'facts1'},
+                'ls': ls,
+                'networks': {'1.2.3.0/24': {'eth0': ['1.2.3.4']}},
+                'facts': json.dumps({'version': 'facts1', 'facts': facts}),
+            }
+            with mock.patch.object(cephadm_module, '_process_ls_output') as _process_ls:
+                agent.HostData.handle_metadata(host_data, data)
+                assert _process_ls.call_count == 1
+            assert cache.metadata_hashes['test'] == {'ls': 'ls1', 'networks': 'net1', 'facts': 'facts1'}
+            assert cache.facts['test'] == facts
+            assert cache.metadata_up_to_date['test']
+
+            # unchanged sections are only sent by hash, facts as delta
+            cache.metadata_up_to_date['test'] = False
+            cache.last_daemon_update.pop('test', None)
+            last_refresh = datetime_now() - datetime.timedelta(minutes=10)
+            cache.daemons['test'] = {'mon.test': DaemonDescription(
+                'mon', 'test', 'test', last_refresh=last_refresh)}
+            data = {
+                'host': 'test',
+                'port': '1234',
+                'ack': '1',
+                'hashes': {'ls': 'ls1', 'networks': 'net1', 'facts': 'facts2'},
+                'facts': json.dumps({'version': 'facts2', 'since': 'facts1',
+                                     'facts': {'cpu_load': 2.0}, 'removed': ['hdd_count']}),
+            }
+            with mock.patch.object(cephadm_module, '_process_ls_output') as _process_ls:
+                agent.HostData.handle_metadata(host_data, data)
+                _process_ls.assert_not_called()
+            assert 'test' in cache.last_daemon_update
+            assert cache.daemons['test']['mon.test'].last_refresh > last_refresh
+            assert cache.metadata_up_to_date['test']
+            assert cache.facts['test'] == {'hostname': 'test', 'cpu_load': 2.0}
+            assert cache.metadata_hashes['test']['facts'] == 'facts2'
+
+            # a delta against a version we don't hold is dropped
+            data['facts'] = json.dumps({'version': 'facts4', 'since': 'facts3',
+                                        'facts': {'cpu_load': 4.0}, 'removed': []})
+            agent.HostData.handle_metadata(host_data, data)
+            assert cache.facts['test']['cpu_load'] == 2.0
+            assert 'facts' not in cache.metadata_hashes['test']
+
+            # invalidated sections have to be sent again
+            cache.invalidate_host_daemons('test')
+            assert 'ls' not in cache.metadata_hashes['test']
+
+            # the hash of an empty section is held as well
+            data = {
+                'host': 'test',
+                'port': '1234',
+                'ack': '1',
+                'hashes': {'ls': 'ls2', 'networks': 'net2'},
+                'ls': [],
+                'networks': {},
+            }
+            agent.HostData.handle_metadata(host_data, data)
+            assert cache.metadata_hashes['test']['ls'] == 'ls2'
+            assert cache.metadata_hashes['test']['networks'] == 'net2'
+
     @mock.patch("cephadm.module.Inventory.__contains__")
     def test_check_stray_host_cache_entry(self, _contains, cephadm_module: CephadmOrchestrator):
         def _fake_inv(key):
@@ -2254,7 +2576,7 @@ class TestCephadm(object):
     @mock.patch("cephadm.ssh.SSHManager._remote_connection")
     @mock.patch("cephadm.ssh.SSHManager._execute_command")
     @mock.patch("cephadm.ssh.SSHManager._check_execute_command")
-    @mock.patch("cephadm.ssh.SSHManager._write_remote_file")
+    @mock.patch("cephadm.ssh.SSHManager._write_remote_files")
     def test_etc_ceph(self, _write_file, check_execute_command, execute_command, remote_connection, cephadm_module):
         _write_file.side_effect = async_side_effect(None)
         check_execute_command.side_effect = async_side_effect('')
@@ -2273,11 +2595,10 @@ class TestCephadm(object):
 
             CephadmServe(cephadm_module)._write_all_client_files()
             # Make sure both ceph conf locations (default and per fsid) are called
-            _write_file.assert_has_calls([mock.call('test', '/etc/ceph/ceph.conf', b'',
-                                          0o644, 0, 0, None),
-                                         mock.call('test', '/var/lib/ceph/fsid/config/ceph.conf', b'',
-                                          0o644, 0, 0, None)]
-                                         )
+            _write_file.assert_called_with('test', [
+                RemoteFile('/etc/ceph/ceph.conf', b'', 0o644, 0, 0),
+                RemoteFile('/var/lib/ceph/fsid/config/ceph.conf', b'', 0o644, 0, 0),
+            ], None)
             ceph_conf_files = cephadm_module.cache.get_host_client_files('test')
             assert len(ceph_conf_files) == 2
             assert '/etc/ceph/ceph.conf' in ceph_conf_files
@@ -2286,13 +2607,12 @@ class TestCephadm(object):
             # set extra config and expect that we deploy another ceph.conf
             cephadm_module._set_extra_ceph_conf('[mon]\nk=v')
             CephadmServe(cephadm_module)._write_all_client_files()
-            _write_file.assert_has_calls([mock.call('test',
-                                                    '/etc/ceph/ceph.conf',
-                                                    b'[mon]\nk=v\n', 0o644, 0, 0, None),
-                                          mock.call('test',
-                                                    '/var/lib/ceph/fsid/config/ceph.conf',
-                                                    b'[mon]\nk=v\n', 0o644, 0, 0, None)])
+            _write_file.assert_called_with('test', [
+                RemoteFile('/etc/ceph/ceph.conf', b'[mon]\nk=v\n', 0o644, 0, 0),
+                RemoteFile('/var/lib/ceph/fsid/config/ceph.conf', b'[mon]\nk=v\n', 0o644, 0, 0),
+            ], None)
             # reload
+            cephadm_module.store_writer.flush()
             cephadm_module.cache.last_client_files = {}
             cephadm_module.cache.load()
 
@@ -2433,6 +2753,27 @@ osd_k2 = osd_v2
             assert '/etc/ceph/ceph.keyring1.keyring' in client_files['host2'].keys()
             assert 'host3' not in client_files.keys()
 
+    def test_client_keyring_cache(self, cephadm_module):
+        cephadm_module.keys.update(ClientKeyringSpec('keyring1', PlacementSpec(label='keyring1')))
+        with mock.patch("cephadm.module.CephadmOrchestrator.mon_command") as _mon_cmd:
+            _mon_cmd.return_value = (0, 'real-keyring', '')
+            assert cephadm_module.keys.get_keyring('keyring1') == 'real-keyring'
+            assert cephadm_module.keys.get_keyring('keyring1') == 'real-keyring'
+            assert _mon_cmd.call_count == 1
+
+            # fetched again once the spec changed or the cache timed out
+            cephadm_module.keys.update(ClientKeyringSpec('keyring1', PlacementSpec(label='other')))
+            assert cephadm_module.keys.get_keyring('keyring1') == 'real-keyring'
+            assert _mon_cmd.call_count == 2
+            with mock.patch.object(cephadm_module, 'client_keyring_cache_timeout', 0), \
+                    mock.patch("cephadm.inventory.datetime_now",
+                               lambda: datetime_now() + datetime.timedelta(seconds=1)):
+                cephadm_module.keys.get_keyring('keyring1')
+            assert _mon_cmd.call_count == 3
+
+            _mon_cmd.return_value = (-2, '', 'not found')
+            assert cephadm_module.keys.get_keyring('keyring2') is None
+
     @mock.patch("cephadm.serve.CephadmServe._run_cephadm")
     def test_registry_login(self, _run_cephadm, cephadm_module: CephadmOrchestrator):
         def check_registry_credentials(url, username, password):
@@ -7,6 +7,7 @@ from cephadm.agent import NodeProxyEndpoint
 from unittest.mock import MagicMock, call, patch
 from cephadm.inventory import AgentCache, NodeProxyCache, Inventory
 from cephadm.ssl_cert_utils import SSLCerts
+from cephadm.store_writer import StoreWriter
 from . import node_proxy_data
 
 PORT = 58585
@@ -28,6 +29,8 @@ class FakeMgr:
         self.set_store = MagicMock()
         self.set_health_warning = MagicMock()
         self.remove_health_warning = MagicMock()
+        self.store_flush_interval = 0
+        self.store_writer = StoreWriter(self)
         self.inventory = Inventory(self)
         self.agent_cache = AgentCache(self)
         self.agent_cache.agent_ports = {"host01": 1234}
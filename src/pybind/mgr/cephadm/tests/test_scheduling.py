@@ -16,7 +16,7 @@ from ceph.deployment.service_spec import (
 from ceph.deployment.hostspec import SpecValidationError
 
 from cephadm.module import HostAssignment
-from cephadm.schedule import DaemonPlacement
+from cephadm.schedule import DaemonPlacement, PlacementCache
 from orchestrator import DaemonDescription, OrchestratorValidationError, OrchestratorError
 
 
@@ -1753,3 +1753,43 @@ def test_placement_regex_host_pattern(service_type, placement, hosts, expected_a
         daemons=[],
     ).place()
     assert sorted([h.hostname for h in to_add]) == expected_add
+
+
+def test_placement_cache():
+    cache = PlacementCache()
+    spec = ServiceSpec('mgr', placement=PlacementSpec(count=2))
+
+    def place(hosts, daemons, networks_generation=0):
+        return cache.place(HostAssignment(
+            spec=spec,
+            hosts=[HostSpec(h) for h in hosts],
+            unreachable_hosts=[],
+            draining_hosts=[],
+            daemons=daemons,
+        ), networks_generation)
+
+    hosts = 'host1 host2 host3'.split()
+    daemons = [DaemonDescription('mgr', 'a', 'host1')]
+    slots, to_add, to_remove = place(hosts, daemons)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert len(slots) == 2 and len(to_add) == 1
+
+    # same inputs
+    assert place(hosts, [DaemonDescription('mgr', 'a', 'host1')])[:2] == (slots, to_add)
+    assert (cache.hits, cache.misses) == (1, 1)
+    # networks are not used by this placement
+    place(hosts, daemons, networks_generation=1)
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    # changed daemons or hosts
+    place(hosts, daemons + [DaemonDescription('mgr', 'b', to_add[0].hostname)])
+    place(hosts + ['host4'], daemons)
+    assert (cache.hits, cache.misses) == (2, 3)
+
+    # daemons to remove are the ones passed in
+    daemons = [DaemonDescription('mgr', x, 'host1') for x in 'abc']
+    _, _, to_remove = place(hosts, daemons)
+    daemons = [DaemonDescription('mgr', x, 'host1') for x in 'abc']
+    _, _, cached = place(hosts, daemons)
+    assert [d.name() for d in cached] == [d.name() for d in to_remove] == ['mgr.b', 'mgr.c']
+    assert all(any(d is dd for dd in daemons) for d in cached)
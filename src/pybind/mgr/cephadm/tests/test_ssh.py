@@ -1,3 +1,4 @@
+import asyncio
 import asyncssh
 from asyncssh.process import SSHCompletedProcess
 from unittest import mock
@@ -20,6 +21,7 @@ from ceph.deployment.hostspec import HostSpec
 
 from cephadm import CephadmOrchestrator
 from cephadm.serve import CephadmServe
+from cephadm.ssh import RemoteFile
 from cephadm.tests.fixtures import with_host, wait, async_side_effect
 from orchestrator import OrchestratorError
 
@@ -98,6 +100,75 @@ class TestWithSSH:
         # Test case 4: generic error
         run_test('test4', FakeConn(exception=Exception), "Generic error while executing command.+")
 
+    @mock.patch("cephadm.ssh.SSHManager._remote_connection")
+    @mock.patch("cephadm.ssh.SSHManager._check_execute_command")
+    def test_write_remote_files(self, check_execute_command, remote_connection, cephadm_module):
+        check_execute_command.side_effect = async_side_effect('')
+        written = {}
+
+        class FakeRemoteFile:
+            def __init__(self, path):
+                self.path = path
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *args):
+                pass
+
+            async def write(self, data):
+                written[self.path] = data
+
+        class FakeSFTP:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *args):
+                pass
+
+            def open(self, path, mode):
+                return FakeRemoteFile(path)
+
+        conn = mock.Mock()
+        conn.start_sftp_client.return_value = FakeSFTP()
+        remote_connection.side_effect = async_side_effect(conn)
+
+        tmp_dir = f'/tmp/cephadm-{cephadm_module._cluster_fsid}'
+        cephadm_module.ssh.write_remote_files('test', [
+            RemoteFile('/etc/ceph/ceph.conf', b'conf', 0o644, 0, 0),
+            RemoteFile('/etc/ceph/ceph.client.admin.keyring', b'key', 0o600, 0, 0),
+        ])
+        assert written == {
+            tmp_dir + '/etc/ceph/ceph.conf.new': b'conf',
+            tmp_dir + '/etc/ceph/ceph.client.admin.keyring.new': b'key',
+        }
+        # one sftp session and one command per step, except for the renames
+        conn.start_sftp_client.assert_called_once()
+        cmds = [c.args[1] for c in check_execute_command.call_args_list]
+        assert [c.exe for c in cmds] == ['mkdir', 'mkdir', 'touch', 'chown', 'chmod', 'chmod', 'mv', 'mv']
+        assert cmds[0].args == ['-p', '/etc/ceph']
+
+    def test_on_hosts(self, cephadm_module):
+        running = []
+        most = []
+
+        async def func(host):
+            running.append(host)
+            most.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(host)
+            if host == 'bad':
+                raise OrchestratorError('unreachable')
+            return host.upper()
+
+        cephadm_module.ssh_max_concurrent_hosts = 2
+        results = cephadm_module.wait_async(
+            cephadm_module.ssh._on_hosts(['host1', 'host2', 'host3', 'bad'], func))
+        assert results['host1'] == 'HOST1'
+        assert results['host3'] == 'HOST3'
+        assert isinstance(results['bad'], OrchestratorError)
+        assert max(most) == 2
+
 
 @pytest.mark.skipif(ConnectionLost is not None, reason='asyncssh')
 class TestWithoutSSH:
@@ -191,6 +191,40 @@ def test_upgrade_run(use_repo_digest, cephadm_module: CephadmOrchestrator):
                     assert image == 'to_image'
 
 
+def test_upgrade_prepull(cephadm_module: CephadmOrchestrator):
+    pulled: List[str] = []
+
+    async def _run_cephadm(s, host, entity, cmd, args, **kwargs):
+        if cmd == 'pull':
+            pulled.append(host)
+        if cmd == 'inspect-image' and host not in pulled:
+            return [json.dumps({'repo_digests': ['to_image@old_digest']})], '', 0
+        if host == 'host4':
+            return [''], 'error', 1
+        return [json.dumps({'repo_digests': ['to_image@repo_digest']})], '', 0
+
+    hosts = ['host1', 'host2', 'host3']
+    cephadm_module.upgrade.upgrade_state = UpgradeState('to_image', 0, target_digests=['to_image@repo_digest'])
+    with mock.patch("cephadm.serve.CephadmServe._run_cephadm", _run_cephadm), \
+            mock.patch.object(cephadm_module, 'upgrade_prepull_max_hosts', 2):
+        assert not cephadm_module.upgrade._prepull_image(hosts, 'to_image', ['to_image@repo_digest'])
+        assert pulled == ['host1', 'host2']
+        assert 'Pulling to_image image on 2 host(s) (0/3 hosts done)' == cephadm_module.upgrade.upgrade_info_str
+
+        # resumes from the saved state
+        state = json.loads(cephadm_module.get_store('upgrade_state'))
+        cephadm_module.upgrade.upgrade_state = UpgradeState.from_json(state)
+        assert cephadm_module.upgrade._prepull_image(hosts, 'to_image', ['to_image@repo_digest'])
+        assert pulled == ['host1', 'host2', 'host3']
+        assert cephadm_module.upgrade._prepull_image(hosts, 'to_image', ['to_image@repo_digest'])
+        assert pulled == ['host1', 'host2', 'host3']
+
+        assert not cephadm_module.upgrade._prepull_image(hosts + ['host4'], 'to_image', ['to_image@repo_digest'])
+        assert cephadm_module.upgrade.upgrade_state.paused
+        assert cephadm_module.health_checks['UPGRADE_FAILED_PULL']['detail'] == [
+            'failed to pull to_image on host host4']
+
+
 def test_upgrade_state_null(cephadm_module: CephadmOrchestrator):
     # This test validates https://tracker.ceph.com/issues/47580
     cephadm_module.set_store('upgrade_state', 'null')
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 import time
@@ -70,6 +71,7 @@ class UpgradeState:
                  services: Optional[List[str]] = None,
                  total_count: Optional[int] = None,
                  remaining_count: Optional[int] = None,
+                 prepulled_hosts: Optional[List[str]] = None,
                  ):
         self._target_name: str = target_name  # Use CephadmUpgrade.target_image instead.
         self.progress_id: str = progress_id
@@ -87,6 +89,8 @@ class UpgradeState:
         self.services = services
         self.total_count = total_count
         self.remaining_count = remaining_count
+        # hosts that have the image of target_digests
+        self.prepulled_hosts: List[str] = prepulled_hosts or []
 
     def to_json(self) -> dict:
         return {
@@ -105,6 +109,7 @@ class UpgradeState:
             'services': self.services,
             'total_count': self.total_count,
             'remaining_count': self.remaining_count,
+            'prepulled_hosts': self.prepulled_hosts,
         }
 
     @classmethod
@@ -866,41 +871,43 @@ class CephadmUpgrade:
             assert d.daemon_id is not None
             assert d.hostname is not None
 
-            # make sure host has latest container image
-            with self.mgr.async_timeout_handler(d.hostname, 'cephadm inspect-image'):
-                out, errs, code = self.mgr.wait_async(CephadmServe(self.mgr)._run_cephadm(
-                    d.hostname, '', 'inspect-image', [],
-                    image=target_image, no_fsid=True, error_ok=True))
-            if code or not any(d in target_digests for d in json.loads(''.join(out)).get('repo_digests', [])):
-                logger.info('Upgrade: Pulling %s on %s' % (target_image,
-                                                           d.hostname))
-                self.upgrade_info_str = 'Pulling %s image on host %s' % (
-                    target_image, d.hostname)
-                with self.mgr.async_timeout_handler(d.hostname, 'cephadm pull'):
+            if d.hostname not in self.upgrade_state.prepulled_hosts:
+                # make sure host has latest container image
+                with self.mgr.async_timeout_handler(d.hostname, 'cephadm inspect-image'):
                     out, errs, code = self.mgr.wait_async(CephadmServe(self.mgr)._run_cephadm(
-                        d.hostname, '', 'pull', [],
+                        d.hostname, '', 'inspect-image', [],
                         image=target_image, no_fsid=True, error_ok=True))
-                if code:
-                    self._fail_upgrade('UPGRADE_FAILED_PULL', {
-                        'severity': 'warning',
-                        'summary': 'Upgrade: failed to pull target image',
-                        'count': 1,
-                        'detail': [
-                            'failed to pull %s on host %s' % (target_image,
-                                                              d.hostname)],
-                    })
-                    return
-                r = json.loads(''.join(out))
-                if not any(d in target_digests for d in r.get('repo_digests', [])):
-                    logger.info('Upgrade: image %s pull on %s got new digests %s (not %s), restarting' % (
-                        target_image, d.hostname, r['repo_digests'], target_digests))
-                    self.upgrade_info_str = 'Image %s pull on %s got new digests %s (not %s), restarting' % (
-                        target_image, d.hostname, r['repo_digests'], target_digests)
-                    self.upgrade_state.target_digests = r['repo_digests']
-                    self._save_upgrade_state()
-                    return
+                if code or not any(d in target_digests for d in json.loads(''.join(out)).get('repo_digests', [])):
+                    logger.info('Upgrade: Pulling %s on %s' % (target_image,
+                                                               d.hostname))
+                    self.upgrade_info_str = 'Pulling %s image on host %s' % (
+                        target_image, d.hostname)
+                    with self.mgr.async_timeout_handler(d.hostname, 'cephadm pull'):
+                        out, errs, code = self.mgr.wait_async(CephadmServe(self.mgr)._run_cephadm(
+                            d.hostname, '', 'pull', [],
+                            image=target_image, no_fsid=True, error_ok=True))
+                    if code:
+                        self._fail_upgrade('UPGRADE_FAILED_PULL', {
+                            'severity': 'warning',
+                            'summary': 'Upgrade: failed to pull target image',
+                            'count': 1,
+                            'detail': [
+                                'failed to pull %s on host %s' % (target_image,
+                                                                  d.hostname)],
+                        })
+                        return
+                    r = json.loads(''.join(out))
+                    if not any(d in target_digests for d in r.get('repo_digests', [])):
+                        logger.info('Upgrade: image %s pull on %s got new digests %s (not %s), restarting' % (
+                            target_image, d.hostname, r['repo_digests'], target_digests))
+                        self.upgrade_info_str = 'Image %s pull on %s got new digests %s (not %s), restarting' % (
+                            target_image, d.hostname, r['repo_digests'], target_digests)
+                        self.upgrade_state.target_digests = r['repo_digests']
+                        self.upgrade_state.prepulled_hosts = []
+                        self._save_upgrade_state()
+                        return
 
-                self.upgrade_info_str = 'Currently upgrading %s daemons' % (d.daemon_type)
+                    self.upgrade_info_str = 'Currently upgrading %s daemons' % (d.daemon_type)
 
             if len(to_upgrade) > 1:
                 logger.info('Upgrade: Updating %s.%s (%d/%d)' % (d.daemon_type, d.daemon_id, num, min(len(to_upgrade),
@@ -932,6 +939,93 @@ class CephadmUpgrade:
                 self.upgrade_state.remaining_count -= 1
                 self._save_upgrade_state()
 
+    async def _pull_image(self, host: str, target_image: str, target_digests: List[str]) -> Tuple[List[str], List[str], int]:
+        serve = CephadmServe(self.mgr)
+        out, errs, code = await serve._run_cephadm(
+            host, '', 'inspect-image', [],
+            image=target_image, no_fsid=True, error_ok=True)
+        if not code and any(d in target_digests for d in json.loads(''.join(out)).get('repo_digests', [])):
+            return out, errs, code
+        logger.info('Upgrade: Pulling %s on %s' % (target_image, host))
+        return await serve._run_cephadm(
+            host, '', 'pull', [],
+            image=target_image, no_fsid=True, error_ok=True)
+
+    def _prepull_image(self, hosts: List[str], target_image: str, target_digests: List[str]) -> bool:
+        """
+        Pull the target image on the hosts of the daemons to upgrade before
+        any daemon is restarted, so that downloading the image is not on the
+        critical path of every restart. At most `upgrade_prepull_max_hosts`
+        hosts pull at once, one batch per call. The hosts that have the image
+        are kept in the upgrade state, so a new mgr continues where the
+        previous one stopped.
+
+        Returns True once all hosts have the image.
+        """
+        assert self.upgrade_state is not None
+        if not self.mgr.upgrade_prepull_max_hosts:
+            return True
+        todo = [h for h in hosts if h not in self.upgrade_state.prepulled_hosts]
+        if not todo:
+            return True
+        batch = todo[:self.mgr.upgrade_prepull_max_hosts]
+        self.upgrade_info_str = 'Pulling %s image on %d host(s) (%d/%d hosts done)' % (
+            target_image, len(batch), len(hosts) - len(todo), len(hosts))
+        logger.info('Upgrade: Pulling %s on host(s) %s (%d/%d hosts done)' % (
+            target_image, ','.join(batch), len(hosts) - len(todo), len(hosts)))
+
+        timeout = max(60, self.mgr.default_cephadm_command_timeout)
+
+        async def pull_all() -> List[Any]:
+            return await asyncio.gather(*[
+                asyncio.wait_for(self._pull_image(h, target_image, target_digests), timeout)
+                for h in batch
+            ], return_exceptions=True)
+
+        with self.mgr.async_timeout_handler(','.join(batch), 'cephadm pull'):
+            # every pull is bounded by the timeout above
+            results = self.mgr.wait_async(pull_all(), timeout + 60)
+
+        failed: List[str] = []
+        host_error: Optional[HostConnectionError] = None
+        for host, result in zip(batch, results):
+            if isinstance(result, HostConnectionError):
+                host_error = host_error or result
+                continue
+            if isinstance(result, (asyncio.TimeoutError, OrchestratorError)):
+                failed.append('failed to pull %s on host %s: %s' % (target_image, host, str(result) or 'timed out'))
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            out, errs, code = result
+            if code:
+                failed.append('failed to pull %s on host %s' % (target_image, host))
+                continue
+            repo_digests = json.loads(''.join(out)).get('repo_digests', [])
+            if not any(d in target_digests for d in repo_digests):
+                logger.info('Upgrade: image %s pull on %s got new digests %s (not %s), restarting' % (
+                    target_image, host, repo_digests, target_digests))
+                self.upgrade_info_str = 'Image %s pull on %s got new digests %s (not %s), restarting' % (
+                    target_image, host, repo_digests, target_digests)
+                self.upgrade_state.target_digests = repo_digests
+                self.upgrade_state.prepulled_hosts = []
+                self._save_upgrade_state()
+                return False
+            self.upgrade_state.prepulled_hosts.append(host)
+        self._save_upgrade_state()
+
+        if host_error is not None:
+            raise host_error
+        if failed:
+            self._fail_upgrade('UPGRADE_FAILED_PULL', {
+                'severity': 'warning',
+                'summary': 'Upgrade: failed to pull target image',
+                'count': len(failed),
+                'detail': failed,
+            })
+            return False
+        return len(batch) == len(todo)
+
     def _handle_need_upgrade_self(self, need_upgrade_self: bool, upgrading_mgrs: bool) -> None:
         if need_upgrade_self:
             try:
@@ -1177,6 +1271,15 @@ class CephadmUpgrade:
         if self.upgrade_state.hosts is not None:
             logger.debug(f'Filtering daemons to upgrade by hosts: {self.upgrade_state.hosts}')
             daemons = [d for d in daemons if d.hostname in self.upgrade_state.hosts]
+
+        prepull_hosts = sorted(set(
+            d.hostname for d in daemons
+            if d.hostname and d.daemon_type in CEPH_IMAGE_TYPES
+            and not any(dg in target_digests for dg in (d.container_image_digests or []))
+        ))
+        if not self._prepull_image(prepull_hosts, target_image, target_digests):
+            return
+
         upgraded_daemon_count: int = 0
         for daemon_type in CEPH_UPGRADE_ORDER:
             if self.upgrade_state.remaining_count is not None and self.upgrade_state.remaining_count <= 0:
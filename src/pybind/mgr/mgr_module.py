@@ -42,7 +42,7 @@ import sqlite3
 import sys
 import time
 from ceph_argparse import CephArgtype
-from mgr_util import profile_method
+from mgr_util import freeze, profile_method
 
 if sys.version_info >= (3, 8):
     from typing import get_args, get_origin
@@ -183,6 +183,25 @@ class HandleCommandResult(NamedTuple):
     stderr: str = ""            # Typically used for error messages.
 
 
+class PerfCounterColumns(NamedTuple):
+    """
+    Perf counters of the daemons of one type sharing the same schema, in
+    columnar form, see `MgrModule.get_perf_counter_columns()`.
+
+    The schema (counter paths, types and descriptions) is stored once, the
+    paths are interned.  `values` and `counts` hold one row per daemon, in
+    the order of `daemons`, with one column per counter.  `counts` is only
+    meaningful for long running averages and 0 otherwise.
+    """
+    daemon_type: str
+    paths: Tuple[str, ...]
+    types: Tuple[int, ...]
+    descriptions: Tuple[str, ...]
+    daemons: List[str]
+    values: List[List[Union[int, float]]]
+    counts: List[List[int]]
+
+
 class MonCommandFailed(RuntimeError):
     pass
 
@@ -1113,6 +1132,12 @@ class MgrModule(ceph_module.BaseMgrModule, MgrModuleLoggingMixin):
 
         self._db_lock = threading.Lock()
 
+        # get_readonly() cache: data name -> (version, read-only object)
+        self._readonly_cache = {}  # type: Dict[str, Tuple[Any, Any]]
+        self._readonly_cache_lock = threading.Lock()
+        self._readonly_cache_hits = 0
+        self._readonly_cache_misses = 0
+
     @classmethod
     def _register_options(cls, module_name: str) -> None:
         cls.MODULE_OPTIONS.append(
@@ -1504,6 +1529,49 @@ class MgrModule(ceph_module.BaseMgrModule, MgrModuleLoggingMixin):
 
         return obj
 
+    @API.expose
+    def get_readonly(self, data_name: str) -> Any:
+        """
+        Like `get()`, but return a read-only view of the object, which is
+        shared by all callers as long as the maps it is built from did not
+        change.
+
+        The objects are memoized by data name and by the epochs or versions
+        of their maps (the OSDMap, PGMap, FSMap, MonMap, MgrMap or
+        ServiceMap), so that modules reading e.g. ``osd_map``, ``pg_dump``
+        or ``df`` several times per cycle do not have them dumped and copied
+        every time.  Objects not built from a versioned map are fetched on
+        every call.
+
+        :param str data_name: see `get()`
+        :return: the object, with read-only dicts and lists
+        """
+        version = self._ceph_get_data_version(data_name)
+        if version is not None:
+            with self._readonly_cache_lock:
+                cached = self._readonly_cache.get(data_name)
+                if cached is not None and cached[0] == version:
+                    self._readonly_cache_hits += 1
+                    return cached[1]
+
+        obj = freeze(self.get(data_name))
+        with self._readonly_cache_lock:
+            self._readonly_cache_misses += 1
+            if version is not None:
+                self._readonly_cache[data_name] = (version, obj)
+        return obj
+
+    def get_readonly_cache_stats(self) -> Dict[str, int]:
+        """
+        Return the hits and misses of the `get_readonly()` cache.
+        """
+        with self._readonly_cache_lock:
+            return {
+                'hits': self._readonly_cache_hits,
+                'misses': self._readonly_cache_misses,
+                'entries': len(self._readonly_cache),
+            }
+
     def _stattype_to_str(self, stattype: int) -> str:
 
         typeonly = stattype & self.PERFCOUNTER_TYPE_MASK
@@ -2277,6 +2345,80 @@ class MgrModule(ceph_module.BaseMgrModule, MgrModuleLoggingMixin):
 
         return result
 
+    @API.expose
+    @profile_method()
+    def get_perf_counter_columns(
+        self,
+        prio_limit: int = PRIO_USEFUL,
+        services: Sequence[str] = (
+            "mds",
+            "mon",
+            "osd",
+            "rbd-mirror",
+            "cephfs-mirror",
+            "rgw",
+            "tcmu-runner",
+        ),
+    ) -> List[PerfCounterColumns]:
+        """
+        Return the same perf counters as `get_unlabeled_perf_counters()`,
+        grouped by daemon type and schema in columnar form.
+
+        The schemas and the latest values are fetched with one call into
+        ceph-mgr per daemon type rather than one per daemon and counter, and
+        daemons with the same schema share it, so that a sweep over all
+        daemons can be turned into output without per counter dicts.
+        """
+        groups = {}  # type: Dict[Tuple[str, Tuple[str, ...]], PerfCounterColumns]
+        schemas_by_type = {}  # type: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]]
+        latest_by_type = {}  # type: Dict[str, Dict[str, Dict[str, List[Any]]]]
+
+        for server in self.list_servers():
+            for service in cast(List[ServiceInfoT], server['services']):
+                svc_type = service['type']
+                if svc_type not in services:
+                    continue
+                if svc_type not in schemas_by_type:
+                    schemas_by_type[svc_type] = self.get_perf_schema(svc_type, '')
+                    latest_by_type[svc_type] = self._ceph_get_latest_counters(
+                        svc_type, prio_limit)
+
+                svc_full_name = "{0}.{1}".format(svc_type, service['id'])
+                schema = schemas_by_type[svc_type].get(svc_full_name)
+                latest = latest_by_type[svc_type].get(svc_full_name)
+                if not schema or latest is None:
+                    self.log.warning("No perf counter schema for {0}".format(
+                        svc_full_name))
+                    continue
+
+                # the schema may have changed in between the two calls
+                paths = tuple(path for path in latest['paths'] if path in schema)
+                columns = groups.get((svc_type, paths))
+                if columns is None:
+                    columns = PerfCounterColumns(
+                        daemon_type=svc_type,
+                        paths=tuple(sys.intern(path) for path in paths),
+                        types=tuple(int(schema[path]['type']) for path in paths),
+                        descriptions=tuple(str(schema[path]['description'])
+                                           for path in paths),
+                        daemons=[],
+                        values=[],
+                        counts=[],
+                    )
+                    groups[(svc_type, paths)] = columns
+
+                values = latest['values']  # type: List[Union[int, float]]
+                counts = latest['counts']  # type: List[int]
+                if len(paths) != len(latest['paths']):
+                    selected = [path in schema for path in latest['paths']]
+                    values = [v for v, keep in zip(values, selected) if keep]
+                    counts = [c for c, keep in zip(counts, selected) if keep]
+                columns.daemons.append(svc_full_name)
+                columns.values.append(values)
+                columns.counts.append(counts)
+
+        return list(groups.values())
+
     @API.expose
     def set_uri(self, uri: str) -> None:
         """
@@ -13,6 +13,7 @@ if 'UNITTEST' in os.environ:
 import bcrypt
 import cephfs
 import contextlib
+import copy
 import datetime
 import errno
 import socket
@@ -521,6 +522,75 @@ def test_port_allocation(addr: str, port: int) -> None:
             raise e
 
 
+class ReadOnlyDict(dict):
+    """
+    A dict refusing modifications, see `freeze()`.
+
+    Copies made with `copy.copy()` or `copy.deepcopy()` are plain, mutable
+    dicts.
+    """
+
+    def _readonly(self, *args: Any, **kwargs: Any) -> Any:
+        raise TypeError('read-only dict')
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly  # type: ignore[assignment]
+    __ior__ = _readonly  # type: ignore[assignment]
+
+    def __copy__(self) -> Dict[Any, Any]:
+        return dict(self)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> Dict[Any, Any]:
+        return {k: copy.deepcopy(v, memo) for k, v in self.items()}
+
+    def __reduce__(self) -> Any:
+        return dict, (dict(self),)
+
+
+class ReadOnlyList(list):
+    """
+    A list refusing modifications, see `freeze()`.
+
+    Copies made with `copy.copy()` or `copy.deepcopy()` are plain, mutable
+    lists.
+    """
+
+    def _readonly(self, *args: Any, **kwargs: Any) -> Any:
+        raise TypeError('read-only list')
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly  # type: ignore[assignment]
+    append = clear = extend = insert = pop = remove = reverse = sort = _readonly  # type: ignore[assignment]
+
+    def __copy__(self) -> List[Any]:
+        return list(self)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> List[Any]:
+        return [copy.deepcopy(v, memo) for v in self]
+
+    def __reduce__(self) -> Any:
+        return list, (list(self),)
+
+
+def freeze(obj: Any) -> Any:
+    """
+    Return a read-only copy of a structure of dicts and lists, as returned by
+    `MgrModule.get()`.
+
+    >>> d = freeze({'a': [1, {'b': 2}]})
+    >>> d['a'][1]['b']
+    2
+    >>> d['a'].append(3)
+    Traceback (most recent call last):
+    ...
+    TypeError: read-only list
+    """
+    if isinstance(obj, dict):
+        return ReadOnlyDict((k, freeze(v)) for k, v in obj.items())
+    if isinstance(obj, list):
+        return ReadOnlyList(freeze(v) for v in obj)
+    return obj
+
+
 def merge_dicts(*args: Dict[T, Any]) -> Dict[T, Any]:
     """
     >>> merge_dicts({1:2}, {3:4})
@@ -2120,6 +2120,15 @@ Usage:
                 output += f"\nPaused: {'Yes' if result['paused'] else 'No'}"
             if 'workers' in result and detail:
                 output += f"\nHost Parallelism: {result['workers']}"
+            if 'store_writes' in result and detail:
+                sw = result['store_writes']
+                output += (f"\nStore Writes: {sw['writes']} ({sw['bytes_written']} bytes), "
+                           f"{sw['skipped_unchanged']} unchanged skipped, "
+                           f"{sw['coalesced']} coalesced")
+            if 'refresh_queue' in result and detail:
+                rq = result['refresh_queue']
+                output += (f"\nRefresh Queue: {rq['queue_depth']} hosts waiting "
+                           f"(max lag {rq['max_lag']}s), {rq['visited']} refreshed last pass")
         return HandleCommandResult(stdout=output)
 
     @_cli_write_command('orch tuned-profile apply')
@@ -1,2 +1,6 @@
 # flake8: noqa
+import os
+
+if 'UNITTEST' in os.environ:
+    import tests
 from .module import Module, StandbyModule
@@ -0,0 +1,69 @@
+"""
+Benchmark of the perf counter collection and metric rendering of the
+prometheus module, using a synthetic perf counter dump.
+
+Run it from src/pybind/mgr within the tox environment::
+
+    UNITTEST=true python -m prometheus.benchmark --daemons 2000
+"""
+import argparse
+import logging
+import threading
+import time
+
+from typing import List
+
+from tests.benchmark_perf_counters import FakePerfCounterSource
+from .module import Module
+
+logger = logging.getLogger(__name__)
+
+
+class BenchModule(FakePerfCounterSource, Module):
+    def __init__(self) -> None:
+        # skip the MgrModule initialisation, only the metrics are needed
+        self._collector_local = threading.local()
+        self.metrics = self._setup_static_metrics()
+
+    @property
+    def log(self) -> logging.Logger:
+        return logger
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--daemons', type=int, default=2000)
+    parser.add_argument('--counters', type=int, default=60,
+                        help='perf counters per daemon')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--change-ratio', type=float, default=0.2,
+                        help='ratio of counters changing between two rounds')
+    args = parser.parse_args()
+
+    module = BenchModule()
+    module.setup_perf_counters(args.daemons, args.counters)
+    collect_times: List[float] = []
+    render_times: List[float] = []
+    size = 0
+    for _ in range(args.rounds):
+        for metric in module.metrics.values():
+            metric.clear()
+        start = time.perf_counter()
+        module.get_perf_counters()
+        collected = time.perf_counter()
+        size = len(module.render_metrics())
+        rendered = time.perf_counter()
+        collect_times.append(collected - start)
+        render_times.append(rendered - collected)
+        module.update_perf_counters(args.change_ratio)
+
+    print('{} daemons, {} counters each, {} bytes of output'.format(
+        args.daemons, args.counters, size))
+    print('collect: first {:.3f}s, mean of others {:.3f}s'.format(
+        collect_times[0], sum(collect_times[1:]) / max(len(collect_times) - 1, 1)))
+    print('render:  first {:.3f}s, mean of others {:.3f}s'.format(
+        render_times[0], sum(render_times[1:]) / max(len(render_times) - 1, 1)))
+
+
+if __name__ == '__main__':
+    main()
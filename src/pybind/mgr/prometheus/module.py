@@ -8,16 +8,20 @@ import re
 import threading
 import time
 import enum
+import concurrent.futures
+import gzip
+import hashlib
+import uuid
 from packaging import version  # type: ignore
 from collections import namedtuple
 import tempfile
 
-from mgr_module import CLIReadCommand, MgrModule, MgrStandbyModule, PG_STATES, Option, ServiceInfoT, HandleCommandResult, CLIWriteCommand
+from mgr_module import CLIReadCommand, MgrModule, MgrStandbyModule, PG_STATES, Option, ServiceInfoT, HandleCommandResult, CLIWriteCommand, PerfCounterColumns
 from mgr_util import get_default_addr, profile_method, build_url
 from orchestrator import OrchestratorClientMixin, raise_if_exception, OrchestratorError
 from rbd import RBD
 
-from typing import DefaultDict, Optional, Dict, Any, Set, cast, Tuple, Union, List, Callable, IO
+from typing import DefaultDict, Optional, Dict, Any, Set, cast, Tuple, Union, List, Callable, IO, Match
 
 LabelValues = Tuple[str, ...]
 Number = Union[int, float]
@@ -311,6 +315,40 @@ class HealthHistory:
         return yaml.safe_dump(self.as_dict(), explicit_start=True, default_flow_style=False)
 
 
+# Must be kept in sync with promethize() in src/exporter/util.cc
+def promethize(path: str) -> str:
+    ''' replace illegal metric name characters '''
+    result = re.sub(r'[./\s]|::', '_', path).replace('+', '_plus')
+
+    # Hyphens usually turn into underscores, unless they are
+    # trailing
+    if result.endswith("-"):
+        result = result[0:-1] + "_minus"
+    else:
+        result = result.replace("-", "_")
+
+    return "ceph_{0}".format(result)
+
+
+def floatstr(value: float) -> str:
+    ''' represent as Go-compatible float '''
+    if value == float('inf'):
+        return '+Inf'
+    if value == float('-inf'):
+        return '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value))
+
+
+def escape_label_value(value: Any) -> str:
+    ''' escape a label value as required by the text exposition format '''
+    result = str(value)
+    if '\\' in result or '"' in result or '\n' in result:
+        result = result.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return result
+
+
 class Metric(object):
     def __init__(self, mtype: str, name: str, desc: str, labels: Optional[LabelValues] = None) -> None:
         self.mtype = mtype
@@ -318,6 +356,12 @@ class Metric(object):
         self.desc = desc
         self.labelnames = labels  # tuple if present
         self.value: Dict[LabelValues, Number] = {}
+        # Rendered HELP/TYPE header and per series (prefix, value, line)
+        # tuples. Both survive clear() so that a series whose value did not
+        # change between two scrapes is not formatted again.
+        self._header: Optional[str] = None
+        self._promethized_name = ''
+        self._series: Dict[LabelValues, Tuple[str, Number, str]] = {}
 
     def clear(self) -> None:
         self.value = {}
@@ -327,57 +371,55 @@ class Metric(object):
         labelvalues = labelvalues or ('',)
         self.value[labelvalues] = value
 
-    def str_expfmt(self) -> str:
+    def _series_prefix(self, name: str, labelvalues: LabelValues) -> str:
+        if self.labelnames:
+            labels = ','.join('%s="%s"' % (k, escape_label_value(v))
+                              for k, v in zip(self.labelnames, labelvalues))
+        else:
+            labels = ''
+        if labels:
+            return '\n{name}{{{labels}}} '.format(name=name, labels=labels)
+        return '\n{name} '.format(name=name)
 
-        # Must be kept in sync with promethize() in src/exporter/util.cc
-        def promethize(path: str) -> str:
-            ''' replace illegal metric name characters '''
-            result = re.sub(r'[./\s]|::', '_', path).replace('+', '_plus')
+    def expfmt_lines(self) -> List[str]:
+        """
+        Return the exposition format of this metric as a list of lines,
+        meant to be joined with the lines of the other metrics.
 
-            # Hyphens usually turn into underscores, unless they are
-            # trailing
-            if result.endswith("-"):
-                result = result[0:-1] + "_minus"
-            else:
-                result = result.replace("-", "_")
-
-            return "ceph_{0}".format(result)
-
-        def floatstr(value: float) -> str:
-            ''' represent as Go-compatible float '''
-            if value == float('inf'):
-                return '+Inf'
-            if value == float('-inf'):
-                return '-Inf'
-            if math.isnan(value):
-                return 'NaN'
-            return repr(float(value))
-
-        name = promethize(self.name)
-        expfmt = '''
-# HELP {name} {desc}
-# TYPE {name} {mtype}'''.format(
-            name=name,
-            desc=self.desc,
-            mtype=self.mtype,
-        )
+        Series that were rendered by a previous call and still have the same
+        value are taken from the cache, series that are gone are dropped
+        from it.
+        """
+        if self._header is None:
+            self._promethized_name = promethize(self.name)
+            self._header = '\n# HELP {name} {desc}\n# TYPE {name} {mtype}'.format(
+                name=self._promethized_name,
+                desc=self.desc,
+                mtype=self.mtype,
+            )
+        name = self._promethized_name
 
+        lines = [self._header]
+        cached_series = self._series
+        series: Dict[LabelValues, Tuple[str, Number, str]] = {}
         for labelvalues, value in self.value.items():
-            if self.labelnames:
-                labels_list = zip(self.labelnames, labelvalues)
-                labels = ','.join('%s="%s"' % (k, v) for k, v in labels_list)
-            else:
-                labels = ''
-            if labels:
-                fmtstr = '\n{name}{{{labels}}} {value}'
+            cached = cached_series.get(labelvalues)
+            if cached is None:
+                prefix = self._series_prefix(name, labelvalues)
+            elif cached[1] == value:
+                series[labelvalues] = cached
+                lines.append(cached[2])
+                continue
             else:
-                fmtstr = '\n{name} {value}'
-            expfmt += fmtstr.format(
-                name=name,
-                labels=labels,
-                value=floatstr(value),
-            )
-        return expfmt
+                prefix = cached[0]
+            line = prefix + floatstr(value)
+            series[labelvalues] = (prefix, value, line)
+            lines.append(line)
+        self._series = series
+        return lines
+
+    def str_expfmt(self) -> str:
+        return ''.join(self.expfmt_lines())
 
     def group_by(
         self,
@@ -497,53 +539,346 @@ class MetricCounter(Metric):
         self.value[labelvalues] += value
 
 
+class CachedMetrics(object):
+    """
+    The /metrics response body of one collection cycle.
+
+    The OpenMetrics and gzip encoded variants of the body are computed at
+    most once, on first request, and shared by every scraper.  The ETag is
+    derived from the @payload of the body, which leaves out the metrics of
+    the exporter itself as they change with every collector run.  It is a
+    weak ETag, unique per payload, variant and mgr instance.
+    """
+
+    TEXT_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+    OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+    _instance_id = uuid.uuid4().hex[:12]
+
+    def __init__(self, text: str, payload: Optional[str] = None) -> None:
+        self.text = text
+        digest = hashlib.sha1((text if payload is None else payload).encode('utf-8'))
+        self.tag = '{}-{}'.format(self._instance_id, digest.hexdigest()[:16])
+        self._lock = threading.RLock()
+        self._bodies: Dict[Tuple[bool, bool], bytes] = {}
+
+    def etag(self, openmetrics: bool, gzipped: bool) -> str:
+        return 'W/"{}{}{}"'.format(self.tag,
+                                   '-om' if openmetrics else '',
+                                   '-gz' if gzipped else '')
+
+    def body(self, openmetrics: bool, gzipped: bool) -> bytes:
+        with self._lock:
+            body = self._bodies.get((openmetrics, gzipped))
+            if body is None:
+                if gzipped:
+                    body = gzip.compress(self.body(openmetrics, False), compresslevel=6)
+                elif openmetrics:
+                    body = to_openmetrics(self.text).encode('utf-8')
+                else:
+                    body = self.text.encode('utf-8')
+                self._bodies[(openmetrics, gzipped)] = body
+            return body
+
+
+def to_openmetrics(text: str) -> str:
+    """
+    Convert the text exposition format to the OpenMetrics text format.
+
+    OpenMetrics requires the ``_total`` suffix on counter samples, so the
+    counters already named that way become counter families without the
+    suffix.  The other counters are declared as ``unknown``, as renaming them
+    would break existing queries.
+
+    >>> to_openmetrics('\\n# HELP ceph_a a\\n# TYPE ceph_a counter\\nceph_a 1.0\\n')
+    '# HELP ceph_a a\\n# TYPE ceph_a unknown\\nceph_a 1.0\\n# EOF\\n'
+    >>> to_openmetrics('\\n# HELP ceph_b_total b\\n# TYPE ceph_b_total counter\\nceph_b_total 1.0\\n')
+    '# HELP ceph_b b\\n# TYPE ceph_b counter\\nceph_b_total 1.0\\n# EOF\\n'
+    """
+    def family(m: Match[str]) -> str:
+        name, desc, mtype = m.groups()
+        if mtype == 'counter' and name.endswith('_total'):
+            name = name[:-len('_total')]
+        else:
+            mtype = 'unknown'
+        return '# HELP {name} {desc}\n# TYPE {name} {mtype}'.format(
+            name=name, desc=desc, mtype=mtype)
+
+    text = re.sub(r'^# HELP (\S+) (.*)\n# TYPE \1 (untyped|counter)$', family, text, flags=re.M)
+    return text.lstrip('\n') + '# EOF\n'
+
+
+def accept_quality(header: str, value: str, **params: str) -> float:
+    """
+    Return the quality the ``Accept`` or ``Accept-Encoding`` @header gives to
+    the media type or content coding @value.  The most specific element of
+    the header matching @value wins; an element with a parameter, such as
+    ``version``, only matches if it equals the one in @params.
+
+    >>> accept = 'application/openmetrics-text;version=1.0.0,text/plain;version=0.0.4;q=0.5,*/*;q=0.1'
+    >>> accept_quality(accept, 'text/plain', version='0.0.4')
+    0.5
+    >>> accept_quality(accept, 'application/json')
+    0.1
+    >>> accept_quality('gzip;q=0, identity', 'gzip')
+    0.0
+    """
+    best = (-1, 0.0)
+    main_type = value.split('/')[0]
+    for element in header.split(','):
+        name, *element_params = [p.strip() for p in element.split(';')]
+        name = name.lower()
+        quality = 1.0
+        matches = True
+        for param in element_params:
+            key, _, val = param.partition('=')
+            key, val = key.strip().lower(), val.strip().strip('"')
+            if key == 'q':
+                try:
+                    quality = min(max(float(val), 0.0), 1.0)
+                except ValueError:
+                    matches = False
+            elif params.get(key, val) != val:
+                matches = False
+        if not matches:
+            continue
+        if name == value:
+            specificity = 2
+        elif name == main_type + '/*':
+            specificity = 1
+        elif name in ('*', '*/*'):
+            specificity = 0
+        else:
+            continue
+        if (specificity, quality) > best:
+            best = (specificity, quality)
+    return best[1]
+
+
+def respond_metrics(cached: CachedMetrics) -> bytes:
+    """
+    Respond to a /metrics request with the cached metrics, in the format and
+    content encoding negotiated with the scraper.
+    """
+    request = cherrypy.request
+    # the text format, unless the scraper strictly prefers OpenMetrics
+    accept = request.headers.get('Accept', '')
+    openmetrics = (accept_quality(accept, 'application/openmetrics-text', version='1.0.0')
+                   > accept_quality(accept, 'text/plain', version='0.0.4'))
+    gzipped = accept_quality(request.headers.get('Accept-Encoding', ''), 'gzip') > 0
+    etag = cached.etag(openmetrics, gzipped)
+
+    headers = cherrypy.response.headers
+    headers['Content-Type'] = (CachedMetrics.OPENMETRICS_CONTENT_TYPE if openmetrics
+                               else CachedMetrics.TEXT_CONTENT_TYPE)
+    headers['ETag'] = etag
+    headers['Vary'] = 'Accept, Accept-Encoding'
+    if_none_match = request.headers.get('If-None-Match', '')
+    # If-None-Match uses the weak comparison
+    if etag[2:] in [tag.strip()[2:] if tag.strip().startswith('W/') else tag.strip()
+                    for tag in if_none_match.split(',')]:
+        cherrypy.response.status = 304
+        return b''
+    if gzipped:
+        headers['Content-Encoding'] = 'gzip'
+    return cached.body(openmetrics, gzipped)
+
+
+class MetricCollector(object):
+    """
+    A collector method of the module, run on its own refresh interval.
+
+    The collector owns a private set of metrics, so that it can run
+    concurrently with the other collectors, and keeps the rendered lines of
+    the metrics it collected during its last successful run.
+    """
+
+    def __init__(self,
+                 module: 'Module',
+                 name: str,
+                 interval_option: Optional[str] = None,
+                 enabled: Optional[Callable[[], bool]] = None) -> None:
+        self.mod = module
+        self.name = name
+        self.interval_option = interval_option
+        self.enabled = enabled or (lambda: True)
+        self.metrics = module._setup_static_metrics()
+        self.snapshot: Dict[str, List[str]] = {}
+        self.duration = 0.0
+        self.started = time.time()
+        self.last_success = 0.0
+        self.next_run = 0.0
+        self.running = False
+
+    @property
+    def interval(self) -> float:
+        if self.interval_option:
+            interval = cast(float, self.mod.get_localized_module_option(self.interval_option, 0.0))
+            if interval > 0:
+                return interval
+        return self.mod.scrape_interval
+
+    def is_stale(self, now: float) -> bool:
+        # the staleness budget of a collector is one scrape interval on top
+        # of its own refresh interval, counted from the time it got scheduled
+        # if it has not succeeded since
+        since = max(self.last_success, self.started)
+        return now - since > self.interval + self.mod.scrape_interval
+
+    def run(self) -> None:
+        start_time = time.time()
+        self.mod._collector_local.metrics = self.metrics
+        try:
+            for metric in self.metrics.values():
+                metric.clear()
+            getattr(self.mod, self.name)()
+            snapshot = {key: metric.expfmt_lines()
+                        for key, metric in self.metrics.items() if metric.value}
+        finally:
+            del self.mod._collector_local.metrics
+        self.snapshot = snapshot
+        self.last_success = time.time()
+        self.duration = self.last_success - start_time
+
+
 class MetricCollectionThread(threading.Thread):
+    """
+    Schedules every collector on its own interval on a small pool of worker
+    threads and publishes the merged snapshots of all collectors into the
+    module's cache whenever one of them finishes, so that a slow collector
+    never delays the metrics of the others.
+    """
+
     def __init__(self, module: 'Module') -> None:
         self.mod = module
         self.active = True
         self.event = threading.Event()
+        self.publish_lock = threading.Lock()
+        self.collectors = [
+            MetricCollector(module, 'get_health'),
+            MetricCollector(module, 'get_df'),
+            MetricCollector(module, 'get_osd_blocklisted_entries'),
+            MetricCollector(module, 'get_pool_stats'),
+            MetricCollector(module, 'get_fs'),
+            MetricCollector(module, 'get_osd_stats'),
+            MetricCollector(module, 'get_quorum_status'),
+            MetricCollector(module, 'get_mgr_status'),
+            MetricCollector(module, 'get_metadata_and_osd_status',
+                            'metadata_collect_interval'),
+            MetricCollector(module, 'get_pg_status'),
+            MetricCollector(module, 'get_pool_repaired_objects'),
+            MetricCollector(module, 'get_num_objects'),
+            MetricCollector(module, 'get_all_daemon_health_metrics'),
+            MetricCollector(module, 'get_perf_counters',
+                            'perf_counters_collect_interval',
+                            lambda: not module.get_module_option('exclude_perf_counters')),
+            MetricCollector(module, 'get_rbd_stats', 'rbd_stats_collect_interval'),
+            MetricCollector(module, 'get_collect_time_metrics'),
+        ]
+        self.duration_metric = Metric(
+            'gauge',
+            'prometheus_collector_duration_seconds',
+            'The seconds the last successful run of a collector took',
+            ('collector',))
+        self.last_success_metric = Metric(
+            'gauge',
+            'prometheus_collector_last_success_timestamp_seconds',
+            'The time of the last successful run of a collector',
+            ('collector',))
         super(MetricCollectionThread, self).__init__(target=self.collect)
 
     def collect(self) -> None:
         self.mod.log.info('starting metric collection thread')
-        while self.active:
-            self.mod.log.debug('collecting cache in thread')
-            if self.mod.have_mon_connection():
-                start_time = time.time()
-
-                try:
-                    data = self.mod.collect()
-                except Exception:
-                    # Log any issues encountered during the data collection and continue
-                    self.mod.log.exception("failed to collect metrics:")
+        threads = cast(int, self.mod.get_localized_module_option('collector_threads', 4))
+        started = time.time()
+        for collector in self.collectors:
+            collector.started = started
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+            while self.active:
+                if not self.mod.have_mon_connection():
+                    self.mod.log.error('No MON connection')
                     self.event.wait(self.mod.scrape_interval)
                     continue
 
-                duration = time.time() - start_time
-                self.mod.log.debug('collecting cache in thread done')
-
-                sleep_time = self.mod.scrape_interval - duration
-                if sleep_time < 0:
-                    self.mod.log.warning(
-                        'Collecting data took more time than configured scrape interval. '
-                        'This possibly results in stale data. Please check the '
-                        '`stale_cache_strategy` configuration option. '
-                        'Collecting data took {:.2f} seconds but scrape interval is configured '
-                        'to be {:.0f} seconds.'.format(
-                            duration,
-                            self.mod.scrape_interval,
-                        )
-                    )
-                    sleep_time = 0
+                now = time.time()
+                for collector in self.collectors:
+                    if collector.running or collector.next_run > now:
+                        continue
+                    if not collector.enabled():
+                        collector.snapshot = {}
+                        collector.started = now
+                        continue
+                    collector.running = True
+                    collector.next_run = now + collector.interval
+                    executor.submit(self.run_collector, collector)
 
-                with self.mod.collect_lock:
-                    self.mod.collect_cache = data
-                    self.mod.collect_time = duration
+                next_run = min(c.next_run for c in self.collectors)
+                self.event.wait(max(next_run - time.time(), 1.0))
 
-                self.event.wait(sleep_time)
-            else:
-                self.mod.log.error('No MON connection')
-                self.event.wait(self.mod.scrape_interval)
+    def run_collector(self, collector: MetricCollector) -> None:
+        self.mod.log.debug('running collector {}'.format(collector.name))
+        try:
+            collector.run()
+        except Exception:
+            # Log any issues encountered during the data collection and continue
+            self.mod.log.exception('collector {} failed to collect metrics:'.format(
+                collector.name))
+        else:
+            if collector.duration > collector.interval:
+                self.mod.log.warning(
+                    'Collector {} took more time than its refresh interval. '
+                    'This possibly results in stale data. Please check the '
+                    '`stale_cache_strategy` configuration option. '
+                    'Collecting data took {:.2f} seconds but the interval is configured '
+                    'to be {:.0f} seconds.'.format(
+                        collector.name,
+                        collector.duration,
+                        collector.interval,
+                    )
+                )
+        finally:
+            collector.running = False
+        self.publish()
+
+    def publish(self) -> None:
+        with self.publish_lock:
+            merged: Dict[str, List[str]] = {}
+            self.duration_metric.clear()
+            self.last_success_metric.clear()
+            for collector in self.collectors:
+                if not collector.enabled():
+                    continue
+                self.duration_metric.set(collector.duration, (collector.name,))
+                self.last_success_metric.set(collector.last_success, (collector.name,))
+                for key, lines in collector.snapshot.items():
+                    if key in merged:
+                        # skip the HELP/TYPE header of the other collector
+                        merged[key].extend(lines[1:])
+                    else:
+                        merged[key] = list(lines)
+
+            # keep the HELP/TYPE headers of the metrics without values
+            families = []
+            for key, metric in self.mod.metrics.items():
+                families.append((key, merged.pop(key, []) or metric.expfmt_lines()))
+            families.extend(merged.items())
+            # the metrics of the exporter itself change with every run of a
+            # collector, keep them out of the payload the ETag is derived from
+            payload: List[str] = []
+            self_metrics: List[str] = []
+            for key, lines in families:
+                (self_metrics if key.startswith('prometheus_') else payload).extend(lines)
+            self_metrics.extend(self.duration_metric.expfmt_lines())
+            self_metrics.extend(self.last_success_metric.expfmt_lines())
+            data = ''.join(payload + self_metrics) + '\n'
+
+            with self.mod.collect_lock:
+                if self.mod.collect_cache is None or self.mod.collect_cache.text != data:
+                    self.mod.collect_cache = CachedMetrics(data, ''.join(payload))
+
+    def stale_collectors(self) -> List[str]:
+        now = time.time()
+        return [c.name for c in self.collectors if c.enabled() and c.is_stale(now)]
 
     def stop(self) -> None:
         self.active = False
@@ -609,6 +944,37 @@ class Module(MgrModule, OrchestratorClientMixin):
             desc='Do not include perf-counters in the metrics output',
             long_desc='Gathering perf-counters from a single Prometheus exporter can degrade ceph-mgr performance, especially in large clusters. Instead, Ceph-exporter daemons are now used by default for perf-counter gathering. This should only be disabled when no ceph-exporters are deployed.',
             runtime=True
+        ),
+        Option(
+            name='collector_threads',
+            type='int',
+            default=4,
+            min=1,
+            desc='number of threads running the metric collectors'
+        ),
+        Option(
+            name='metadata_collect_interval',
+            type='float',
+            default=0.0,
+            desc='interval in seconds between refreshes of the OSD metadata and status metrics',
+            long_desc='scrape_interval is used if 0',
+            runtime=True
+        ),
+        Option(
+            name='perf_counters_collect_interval',
+            type='float',
+            default=0.0,
+            desc='interval in seconds between refreshes of the perf counter metrics',
+            long_desc='scrape_interval is used if 0',
+            runtime=True
+        ),
+        Option(
+            name='rbd_stats_collect_interval',
+            type='float',
+            default=0.0,
+            desc='interval in seconds between refreshes of the RBD image metrics',
+            long_desc='scrape_interval is used if 0',
+            runtime=True
         )
     ]
 
@@ -619,14 +985,14 @@ class Module(MgrModule, OrchestratorClientMixin):
         super(Module, self).__init__(*args, **kwargs)
         self.key_file: IO[bytes]
         self.cert_file: IO[bytes]
+        self._collector_local = threading.local()
         self.metrics = self._setup_static_metrics()
         self.shutdown_event = threading.Event()
-        self.collect_lock = threading.Lock()
-        self.collect_time = 0.0
+        self.collect_lock: threading.Lock = threading.Lock()
         self.scrape_interval: float = 15.0
         self.cache = True
         self.stale_cache_strategy: str = self.STALE_CACHE_FAIL
-        self.collect_cache: Optional[str] = None
+        self.collect_cache: Optional[CachedMetrics] = None
         self.rbd_stats = {
             'pools': {},
             'pools_refresh_time': 0,
@@ -650,6 +1016,18 @@ class Module(MgrModule, OrchestratorClientMixin):
         self.metrics_thread = MetricCollectionThread(_global_instance)
         self.health_history = HealthHistory(self)
 
+    @property
+    def metrics(self) -> Dict[str, Metric]:
+        """
+        The metrics of the collector running in the calling thread, the
+        module wide metrics otherwise.
+        """
+        return getattr(self._collector_local, 'metrics', self._metrics)
+
+    @metrics.setter
+    def metrics(self, metrics: Dict[str, Metric]) -> None:
+        self._metrics = metrics
+
     def _setup_static_metrics(self) -> Dict[str, Metric]:
         metrics = {}
         metrics['health_status'] = Metric(
@@ -960,7 +1338,7 @@ class Module(MgrModule, OrchestratorClientMixin):
     def get_pool_stats(self) -> None:
         # retrieve pool stats to provide per pool recovery metrics
         # (osd_pool_stats moved to mgr in Mimic)
-        pstats = self.get('osd_pool_stats')
+        pstats = self.get_readonly('osd_pool_stats')
         for pool in pstats['pool_stats']:
             for stat in OSD_POOL_STATS:
                 self.metrics['pool_{}'.format(stat)].set(
@@ -971,7 +1349,7 @@ class Module(MgrModule, OrchestratorClientMixin):
     @profile_method()
     def get_df(self) -> None:
         # maybe get the to-be-exported metrics from a config?
-        df = self.get('df')
+        df = self.get_readonly('df')
         for stat in DF_CLUSTER:
             self.metrics['cluster_{}'.format(stat)].set(df['stats'][stat])
             for device_class in df['stats_by_class']:
@@ -1053,7 +1431,7 @@ class Module(MgrModule, OrchestratorClientMixin):
 
     @profile_method()
     def get_mgr_status(self) -> None:
-        mgr_map = self.get('mgr_map')
+        mgr_map = self.get_readonly('mgr_map')
         servers = self.get_service_list()
 
         active = mgr_map['active_name']
@@ -1097,7 +1475,7 @@ class Module(MgrModule, OrchestratorClientMixin):
     @profile_method()
     def get_pg_status(self) -> None:
 
-        pg_summary = self.get('pg_summary')
+        pg_summary = self.get_readonly('pg_summary')
 
         for pool in pg_summary['by_pool']:
             num_by_state: DefaultDict[str, int] = defaultdict(int)
@@ -1117,7 +1495,7 @@ class Module(MgrModule, OrchestratorClientMixin):
 
     @profile_method()
     def get_osd_stats(self) -> None:
-        osd_stats = self.get('osd_stats')
+        osd_stats = self.get_readonly('osd_stats')
         for osd in osd_stats['osd_stats']:
             id_ = osd['osd']
             for stat in OSD_STATS:
@@ -1138,14 +1516,14 @@ class Module(MgrModule, OrchestratorClientMixin):
 
     @profile_method()
     def get_metadata_and_osd_status(self) -> None:
-        osd_map = self.get('osd_map')
+        osd_map = self.get_readonly('osd_map')
         osd_flags = osd_map['flags'].split(',')
         for flag in OSD_FLAGS:
             self.metrics['osd_flag_{}'.format(flag)].set(
                 int(flag in osd_flags)
             )
 
-        osd_devices = self.get('osd_map_crush')['devices']
+        osd_devices = self.get_readonly('osd_map_crush')['devices']
         servers = self.get_service_list()
         for osd in osd_map['osds']:
             # id can be used to link osd metrics and metadata
@@ -1332,7 +1710,7 @@ class Module(MgrModule, OrchestratorClientMixin):
 
     @profile_method()
     def get_num_objects(self) -> None:
-        pg_sum = self.get('pg_summary')['pg_stats_sum']['stat_sum']
+        pg_sum = self.get_readonly('pg_summary')['pg_stats_sum']['stat_sum']
         for obj in NUM_OBJECTS:
             stat = 'num_objects_{}'.format(obj)
             self.metrics[stat].set(pg_sum[stat])
@@ -1358,7 +1736,7 @@ class Module(MgrModule, OrchestratorClientMixin):
         # '*' can be used to indicate all pools or namespaces
         pools_string = cast(str, self.get_localized_module_option('rbd_stats_pools'))
         pool_keys = set()
-        osd_map = self.get('osd_map')
+        osd_map = self.get_readonly('osd_map')
         rbd_pools = [pool['pool_name'] for pool in osd_map['pools']
                      if 'rbd' in pool.get('application_metadata', {})]
         for x in re.split(r'[\s,]+', pools_string):
@@ -1640,7 +2018,7 @@ class Module(MgrModule, OrchestratorClientMixin):
                 cast(MetricCounter, count_metric).add(1, (method_name,))
 
     def get_pool_repaired_objects(self) -> None:
-        dump = self.get('pg_dump')
+        dump = self.get_readonly('pg_dump')
         for stats in dump['pool_stats']:
             path = 'pool_objects_repaired'
             self.metrics[path].set(stats['stat_sum']['num_objects_repaired'],
@@ -1658,52 +2036,71 @@ class Module(MgrModule, OrchestratorClientMixin):
         """
         Get the perf counters for all daemons
         """
-        for daemon, counters in self.get_unlabeled_perf_counters().items():
-            for path, counter_info in counters.items():
-                # Skip histograms, they are represented by long running avgs
-                stattype = self._stattype_to_str(counter_info['type'])
-                if not stattype or stattype == 'histogram':
-                    self.log.debug('ignoring %s, type %s' % (path, stattype))
-                    continue
-
-                path, label_names, labels = self._perfpath_to_path_labels(
-                    daemon, path)
-
-                # Get the value of the counter
-                value = self._perfvalue_to_value(
-                    counter_info['type'], counter_info['value'])
-
-                # Represent the long running avgs as sum/count pairs
-                if counter_info['type'] & self.PERFCOUNTER_LONGRUNAVG:
-                    _path = path + '_sum'
-                    if _path not in self.metrics:
-                        self.metrics[_path] = Metric(
-                            stattype,
-                            _path,
-                            counter_info['description'] + ' Total',
-                            label_names,
-                        )
-                    self.metrics[_path].set(value, labels)
-                    _path = path + '_count'
-                    if _path not in self.metrics:
-                        self.metrics[_path] = Metric(
-                            'counter',
-                            _path,
-                            counter_info['description'] + ' Count',
-                            label_names,
-                        )
-                    self.metrics[_path].set(counter_info['count'], labels,)
-                else:
-                    if path not in self.metrics:
-                        self.metrics[path] = Metric(
-                            stattype,
-                            path,
-                            counter_info['description'],
-                            label_names,
-                        )
-                    self.metrics[path].set(value, labels)
+        for columns in self.get_perf_counter_columns():
+            self._perf_counter_columns_to_metrics(columns)
         self.add_fixed_name_metrics()
 
+    def _perf_counter_columns_to_metrics(self, columns: PerfCounterColumns) -> None:
+        if not columns.daemons:
+            return
+
+        # Resolve the metrics of every counter once for all the daemons
+        # sharing the schema: the metric path and the labels other than the
+        # daemon name only depend on the daemon type and the counter path.
+        targets = []
+        schema = zip(columns.paths, columns.types, columns.descriptions)
+        for i, (path, tp, desc) in enumerate(schema):
+            # Skip histograms, they are represented by long running avgs
+            stattype = self._stattype_to_str(tp)
+            if not stattype or stattype == 'histogram':
+                self.log.debug('ignoring %s, type %s' % (path, stattype))
+                continue
+
+            path, label_names, labels = self._perfpath_to_path_labels(
+                columns.daemons[0], path)
+
+            # Represent the long running avgs as sum/count pairs
+            count_metric = None
+            if tp & self.PERFCOUNTER_LONGRUNAVG:
+                _path = path + '_sum'
+                if _path not in self.metrics:
+                    self.metrics[_path] = Metric(
+                        stattype,
+                        _path,
+                        desc + ' Total',
+                        label_names,
+                    )
+                value_metric = self.metrics[_path]
+                _path = path + '_count'
+                if _path not in self.metrics:
+                    self.metrics[_path] = Metric(
+                        'counter',
+                        _path,
+                        desc + ' Count',
+                        label_names,
+                    )
+                count_metric = self.metrics[_path]
+            else:
+                if path not in self.metrics:
+                    self.metrics[path] = Metric(
+                        stattype,
+                        path,
+                        desc,
+                        label_names,
+                    )
+                value_metric = self.metrics[path]
+            targets.append((i, value_metric, count_metric, labels[1:],
+                            bool(tp & self.PERFCOUNTER_TIME)))
+
+        for daemon, values, counts in zip(columns.daemons, columns.values, columns.counts):
+            daemon_labels = self._perfpath_to_path_labels(daemon, '')[2][:1]
+            for i, value_metric, count_metric, extra_labels, is_time in targets:
+                labels = daemon_labels + extra_labels
+                # Convert from ns to seconds
+                value_metric.set(values[i] / 1000000000.0 if is_time else values[i], labels)
+                if count_metric is not None:
+                    count_metric.set(counts[i], labels)
+
     @profile_method(True)
     def collect(self) -> str:
         # Clear the metrics before scraping
@@ -1731,11 +2128,22 @@ class Module(MgrModule, OrchestratorClientMixin):
         self.get_collect_time_metrics()
 
         # Return formatted metrics and clear no longer used data
-        _metrics = [m.str_expfmt() for m in self.metrics.values()]
+        data = self.render_metrics()
         for k in self.metrics.keys():
             self.metrics[k].clear()
 
-        return ''.join(_metrics) + '\n'
+        return data
+
+    @profile_method()
+    def render_metrics(self) -> str:
+        """
+        Render all metrics in the exposition format with a single join.
+        """
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            lines.extend(metric.expfmt_lines())
+        lines.append('\n')
+        return ''.join(lines)
 
     @CLIReadCommand('prometheus file_sd_config')
     def get_file_sd_config(self) -> Tuple[int, str, str]:
@@ -1854,51 +2262,47 @@ class Module(MgrModule, OrchestratorClientMixin):
 </html>'''
 
             @cherrypy.expose
-            def metrics(self) -> Optional[str]:
+            def metrics(self) -> Optional[bytes]:
                 # Lock the function execution
                 assert isinstance(_global_instance, Module)
                 with _global_instance.collect_lock:
-                    return self._metrics(_global_instance)
+                    cached = self._metrics(_global_instance)
+                if cached is None:
+                    return None
+                return respond_metrics(cached)
 
             @staticmethod
-            def _metrics(instance: 'Module') -> Optional[str]:
+            def _metrics(instance: 'Module') -> Optional[CachedMetrics]:
                 if not self.cache:
                     self.log.debug('Cache disabled, collecting and returning without cache')
-                    cherrypy.response.headers['Content-Type'] = 'text/plain'
-                    return self.collect()
+                    return CachedMetrics(self.collect())
 
                 # Return cached data if available
                 if not instance.collect_cache:
                     raise cherrypy.HTTPError(503, 'No cached data available yet')
 
-                def respond() -> Optional[str]:
+                def respond() -> Optional[CachedMetrics]:
                     assert isinstance(instance, Module)
-                    cherrypy.response.headers['Content-Type'] = 'text/plain'
                     return instance.collect_cache
 
-                if instance.collect_time < instance.scrape_interval:
+                stale = instance.metrics_thread.stale_collectors()
+                if not stale:
                     # Respond if cache isn't stale
                     return respond()
 
                 if instance.stale_cache_strategy == instance.STALE_CACHE_RETURN:
                     # Respond even if cache is stale
                     instance.log.info(
-                        'Gathering data took {:.2f} seconds, metrics are stale for {:.2f} seconds, '
-                        'returning metrics from stale cache.'.format(
-                            instance.collect_time,
-                            instance.collect_time - instance.scrape_interval
-                        )
+                        'Metrics of collector(s) {} are stale, '
+                        'returning metrics from stale cache.'.format(', '.join(stale))
                     )
                     return respond()
 
                 if instance.stale_cache_strategy == instance.STALE_CACHE_FAIL:
                     # Fail if cache is stale
                     msg = (
-                        'Gathering data took {:.2f} seconds, metrics are stale for {:.2f} seconds, '
-                        'returning "service unavailable".'.format(
-                            instance.collect_time,
-                            instance.collect_time - instance.scrape_interval,
-                        )
+                        'Metrics of collector(s) {} are stale, '
+                        'returning "service unavailable".'.format(', '.join(stale))
                     )
                     instance.log.error(msg)
                     raise cherrypy.HTTPError(503, msg)
@@ -2005,6 +2409,7 @@ class StandbyModule(MgrStandbyModule):
         })
 
         module = self
+        empty_metrics = CachedMetrics('')
 
         class Root(object):
             @cherrypy.expose
@@ -2025,9 +2430,8 @@ class StandbyModule(MgrStandbyModule):
                     raise cherrypy.HTTPError(status, message="Keep on looking")
 
             @cherrypy.expose
-            def metrics(self) -> str:
-                cherrypy.response.headers['Content-Type'] = 'text/plain'
-                return ''
+            def metrics(self) -> bytes:
+                return respond_metrics(empty_metrics)
 
         cherrypy.tree.mount(Root(), '/', {})
         self.log.info('Starting engine...')
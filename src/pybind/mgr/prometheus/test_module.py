@@ -1,7 +1,13 @@
+import gzip
+import logging
+import threading
+import time
 from typing import Dict
-from unittest import TestCase
+from unittest import TestCase, mock
 
-from prometheus.module import Metric, LabelValues, Number
+from mgr_module import PerfCounterColumns
+from prometheus.module import Metric, MetricCollectionThread, Module, CachedMetrics, \
+    respond_metrics, LabelValues, Number
 
 
 class MetricGroupTest(TestCase):
@@ -91,3 +97,266 @@ ceph_disk_occupation_display{ceph_daemon="osd.5+osd.6",device="/dev/dm-1",instan
         with self.assertRaises(AssertionError) as cm:
             m.group_by(["foo"], {"bar": "not callable str"})
         self.assertEqual(str(cm.exception), "joins must be callable")
+
+
+class MetricExpfmtTest(TestCase):
+    def test_str_expfmt_escapes_label_values(self):
+        m = Metric("gauge", "name", "desc", labels=("foo",))
+        m.set(1, ('a"b\\c\nd',))
+        self.assertEqual(
+            m.str_expfmt(),
+            '\n# HELP ceph_name desc\n# TYPE ceph_name gauge'
+            '\nceph_name{foo="a\\"b\\\\c\\nd"} 1.0')
+
+    def test_str_expfmt_reuses_unchanged_series(self):
+        m = Metric("gauge", "name", "desc", labels=("foo",))
+        m.set(1, ("a",))
+        m.set(2, ("b",))
+        m.str_expfmt()
+        line_a = m._series[("a",)][2]
+
+        m.clear()
+        m.set(1, ("a",))
+        m.set(3, ("b",))
+        self.assertEqual(
+            m.str_expfmt(),
+            '\n# HELP ceph_name desc\n# TYPE ceph_name gauge'
+            '\nceph_name{foo="a"} 1.0\nceph_name{foo="b"} 3.0')
+        self.assertIs(m._series[("a",)][2], line_a)
+
+    def test_str_expfmt_drops_removed_series(self):
+        m = Metric("gauge", "name", "desc", labels=("foo",))
+        m.set(1, ("a",))
+        m.set(2, ("b",))
+        m.str_expfmt()
+
+        m.clear()
+        m.set(2, ("b",))
+        self.assertEqual(
+            m.str_expfmt(),
+            '\n# HELP ceph_name desc\n# TYPE ceph_name gauge\nceph_name{foo="b"} 2.0')
+        self.assertEqual(list(m._series), [("b",)])
+
+
+class CollectorModule(Module):
+    log = logging.getLogger(__name__)
+
+    def __init__(self):
+        # skip the MgrModule initialisation, only the metrics are needed
+        self._collector_local = threading.local()
+        self.metrics = self._setup_static_metrics()
+        self.collect_lock = threading.Lock()
+        self.collect_cache = None
+        self.scrape_interval = 15.0
+        self.options = {}
+
+    def get_localized_module_option(self, key, default=None):
+        return self.options.get(key, default)
+
+    def get_module_option(self, key, default=None):
+        return self.options.get(key, default)
+
+    def get_health(self):
+        self.metrics['health_status'].set(1)
+
+    def get_df(self):
+        self.metrics['cluster_total_bytes'].set(42)
+
+
+class MetricCollectionThreadTest(TestCase):
+    def setUp(self):
+        self.mod = CollectorModule()
+        self.thread = MetricCollectionThread(self.mod)
+        self.collectors = {c.name: c for c in self.thread.collectors}
+
+    def test_collector_interval(self):
+        collector = self.collectors['get_perf_counters']
+        self.assertEqual(collector.interval, 15.0)
+        self.mod.options['perf_counters_collect_interval'] = 120.0
+        self.assertEqual(collector.interval, 120.0)
+
+    def test_collectors_use_private_metrics(self):
+        self.thread.run_collector(self.collectors['get_health'])
+        self.assertEqual(self.mod.metrics['health_status'].value, {})
+        self.assertEqual(self.collectors['get_health'].metrics['health_status'].value, {('',): 1})
+        self.assertIn('\nceph_health_status 1.0', self.mod.collect_cache.text)
+        self.assertIn('\n# HELP ceph_cluster_total_bytes DF total_bytes', self.mod.collect_cache.text)
+        self.assertNotIn('\nceph_cluster_total_bytes ', self.mod.collect_cache.text)
+
+    def test_publish_keeps_other_collectors(self):
+        self.thread.run_collector(self.collectors['get_health'])
+        self.thread.run_collector(self.collectors['get_df'])
+        self.assertIn('\nceph_health_status 1.0', self.mod.collect_cache.text)
+        self.assertIn('\nceph_cluster_total_bytes 42.0', self.mod.collect_cache.text)
+        self.assertIn(
+            '\nceph_prometheus_collector_duration_seconds{collector="get_df"}',
+            self.mod.collect_cache.text)
+
+    def test_failed_collector_keeps_snapshot(self):
+        collector = self.collectors['get_health']
+        self.thread.run_collector(collector)
+        last_success = collector.last_success
+        with mock.patch.object(CollectorModule, 'get_health', side_effect=RuntimeError):
+            self.thread.run_collector(collector)
+        self.assertEqual(collector.last_success, last_success)
+        self.assertFalse(collector.running)
+        self.assertIn('\nceph_health_status 1.0', self.mod.collect_cache.text)
+
+    def test_unchanged_scrape_is_not_modified(self):
+        collector = self.collectors['get_health']
+        self.thread.run_collector(collector)
+        with mock.patch('prometheus.module.cherrypy') as cherrypy:
+            cherrypy.request.headers = {}
+            cherrypy.response.headers = {}
+            respond_metrics(self.mod.collect_cache)
+            etag = cherrypy.response.headers['ETag']
+            text = self.mod.collect_cache.text
+            collector.duration += 1
+            collector.last_success += 1
+            self.thread.publish()
+            self.assertNotEqual(self.mod.collect_cache.text, text)
+            cherrypy.request.headers['If-None-Match'] = etag
+            self.assertEqual(respond_metrics(self.mod.collect_cache), b'')
+            self.assertEqual(cherrypy.response.status, 304)
+
+    def test_stale_collectors(self):
+        self.mod.options['exclude_perf_counters'] = True
+        now = time.time()
+        for collector in self.thread.collectors:
+            collector.started = 0.0
+            collector.last_success = now
+        self.assertEqual(self.thread.stale_collectors(), [])
+        self.collectors['get_df'].last_success = now - 31
+        self.assertEqual(self.thread.stale_collectors(), ['get_df'])
+        self.collectors['get_perf_counters'].last_success = 0
+        self.assertEqual(self.thread.stale_collectors(), ['get_df'])
+
+    def test_stale_collectors_before_first_success(self):
+        now = time.time()
+        for collector in self.thread.collectors:
+            collector.started = now
+        self.assertEqual(self.thread.stale_collectors(), [])
+        self.collectors['get_df'].started = now - 31
+        self.assertEqual(self.thread.stale_collectors(), ['get_df'])
+        self.collectors['get_df'].last_success = now
+        self.assertEqual(self.thread.stale_collectors(), [])
+
+
+class RespondMetricsTest(TestCase):
+    def setUp(self):
+        self.cached = CachedMetrics('\n# HELP ceph_a a\n# TYPE ceph_a untyped\nceph_a 1.0\n')
+        patcher = mock.patch('prometheus.module.cherrypy')
+        self.cherrypy = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cherrypy.request.headers = {}
+        self.cherrypy.response.headers = {}
+
+    def test_plain(self):
+        body = respond_metrics(self.cached)
+        self.assertEqual(body, self.cached.text.encode('utf-8'))
+        self.assertEqual(self.cherrypy.response.headers['Content-Type'],
+                         CachedMetrics.TEXT_CONTENT_TYPE)
+        self.assertNotIn('Content-Encoding', self.cherrypy.response.headers)
+
+    def test_gzip_is_computed_once(self):
+        self.cherrypy.request.headers['Accept-Encoding'] = 'gzip, deflate'
+        body = respond_metrics(self.cached)
+        self.assertEqual(gzip.decompress(body), self.cached.text.encode('utf-8'))
+        self.assertEqual(self.cherrypy.response.headers['Content-Encoding'], 'gzip')
+        self.assertIs(respond_metrics(self.cached), body)
+
+    def test_openmetrics(self):
+        self.cherrypy.request.headers['Accept'] = \
+            'application/openmetrics-text;version=1.0.0,text/plain;version=0.0.4;q=0.5'
+        body = respond_metrics(self.cached)
+        self.assertEqual(body, b'# HELP ceph_a a\n# TYPE ceph_a unknown\nceph_a 1.0\n# EOF\n')
+        self.assertEqual(self.cherrypy.response.headers['Content-Type'],
+                         CachedMetrics.OPENMETRICS_CONTENT_TYPE)
+
+    def test_gzip_refused(self):
+        self.cherrypy.request.headers['Accept-Encoding'] = 'gzip;q=0, deflate'
+        self.assertEqual(respond_metrics(self.cached), self.cached.text.encode('utf-8'))
+        self.assertNotIn('Content-Encoding', self.cherrypy.response.headers)
+
+    def test_text_unless_openmetrics_preferred(self):
+        for accept in ['text/plain;version=0.0.4,application/openmetrics-text;version=1.0.0',
+                       'application/openmetrics-text;version=0.0.1,text/plain;q=0.5',
+                       'application/openmetrics-text;q=0.5,*/*',
+                       '*/*']:
+            self.cherrypy.request.headers['Accept'] = accept
+            self.assertEqual(respond_metrics(self.cached), self.cached.text.encode('utf-8'))
+            self.assertEqual(self.cherrypy.response.headers['Content-Type'],
+                             CachedMetrics.TEXT_CONTENT_TYPE)
+
+    def test_openmetrics_counter_families(self):
+        self.cherrypy.request.headers['Accept'] = \
+            'application/openmetrics-text;version=1.0.0,text/plain;version=0.0.4;q=0.5,*/*;q=0.1'
+        cached = CachedMetrics('\n# HELP ceph_a_total a\n# TYPE ceph_a_total counter\n'
+                               'ceph_a_total{x="y"} 1.0\n'
+                               '\n# HELP ceph_b b\n# TYPE ceph_b counter\nceph_b 1.0\n')
+        self.assertEqual(respond_metrics(cached),
+                         b'# HELP ceph_a a\n# TYPE ceph_a counter\nceph_a_total{x="y"} 1.0\n'
+                         b'\n# HELP ceph_b b\n# TYPE ceph_b unknown\nceph_b 1.0\n# EOF\n')
+
+    def test_not_modified(self):
+        respond_metrics(self.cached)
+        etag = self.cherrypy.response.headers['ETag']
+        self.cherrypy.request.headers['If-None-Match'] = etag
+        self.assertEqual(respond_metrics(self.cached), b'')
+        self.assertEqual(self.cherrypy.response.status, 304)
+
+    def test_etag_per_payload_and_variant(self):
+        same = CachedMetrics(self.cached.text + '\nceph_prometheus_x 1.0\n', self.cached.text)
+        self.assertEqual(self.cached.etag(False, False), same.etag(False, False))
+        other = CachedMetrics(self.cached.text.replace('1.0', '2.0'))
+        self.assertNotEqual(self.cached.etag(False, False), other.etag(False, False))
+        self.assertNotEqual(self.cached.etag(False, False), self.cached.etag(False, True))
+        self.assertNotEqual(self.cached.etag(False, False), self.cached.etag(True, False))
+
+
+class PerfCountersTest(TestCase):
+    def test_get_perf_counters_from_columns(self):
+        mod = CollectorModule()
+        columns = PerfCounterColumns(
+            daemon_type='osd',
+            paths=('osd.op_r', 'osd.op_r_latency', 'osd.op_hist'),
+            types=(Module.PERFCOUNTER_U64 | Module.PERFCOUNTER_COUNTER,
+                   Module.PERFCOUNTER_TIME | Module.PERFCOUNTER_LONGRUNAVG,
+                   Module.PERFCOUNTER_HISTOGRAM),
+            descriptions=('reads', 'read latency', 'histogram'),
+            daemons=['osd.0', 'osd.1'],
+            values=[[1, 2000000000, 0], [3, 500000000, 0]],
+            counts=[[0, 4, 0], [0, 5, 0]],
+        )
+        with mock.patch.object(CollectorModule, 'get_perf_counter_columns',
+                               return_value=[columns]):
+            mod.get_perf_counters()
+        self.assertEqual(mod.metrics['osd.op_r'].value,
+                         {('osd.0',): 1, ('osd.1',): 3})
+        self.assertEqual(mod.metrics['osd.op_r'].labelnames, ('ceph_daemon',))
+        self.assertEqual(mod.metrics['osd.op_r_latency_sum'].value,
+                         {('osd.0',): 2.0, ('osd.1',): 0.5})
+        self.assertEqual(mod.metrics['osd.op_r_latency_count'].value,
+                         {('osd.0',): 4, ('osd.1',): 5})
+        self.assertNotIn('osd.op_hist', mod.metrics)
+
+    def test_perf_counter_columns_match_dicts(self):
+        from tests.benchmark_perf_counters import FakePerfCounterSource
+
+        class FakeModule(FakePerfCounterSource, CollectorModule):
+            pass
+
+        mod = FakeModule()
+        mod.setup_perf_counters(daemons=3, counters=6)
+        dicts = mod.get_unlabeled_perf_counters()
+        n = 0
+        for columns in mod.get_perf_counter_columns():
+            for daemon, values, counts in zip(columns.daemons, columns.values,
+                                              columns.counts):
+                self.assertEqual(list(columns.paths), list(dicts[daemon]))
+                for path, value, count in zip(columns.paths, values, counts):
+                    counter = dicts[daemon][path]
+                    self.assertEqual(value, counter['value'])
+                    self.assertEqual(count, counter.get('count', 0))
+                    n += 1
+        self.assertEqual(n, 18)
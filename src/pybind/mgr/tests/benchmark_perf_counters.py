@@ -0,0 +1,153 @@
+"""
+Microbenchmark of the perf counter ingestion of the mgr modules, comparing
+`get_unlabeled_perf_counters()` and a per counter walk like the exporters do
+with `get_perf_counter_columns()` and a columnar walk.
+
+Run it from src/pybind/mgr within the tox environment::
+
+    UNITTEST=true python -m tests.benchmark_perf_counters --daemons 1000
+"""
+import argparse
+import logging
+import random
+import time
+
+from typing import Any, Dict, List, Tuple
+
+from mgr_module import MgrModule
+
+logger = logging.getLogger(__name__)
+
+# the PERFCOUNTER_* combinations reported by the daemons
+COUNTER_TYPES = [
+    ('gauge', MgrModule.PERFCOUNTER_U64),
+    ('counter', MgrModule.PERFCOUNTER_U64 | MgrModule.PERFCOUNTER_COUNTER),
+    ('latency', MgrModule.PERFCOUNTER_TIME | MgrModule.PERFCOUNTER_LONGRUNAVG),
+]
+
+
+class FakePerfCounterSource(object):
+    """
+    Mixin replacing the perf counter related calls into ceph-mgr with a
+    synthetic cluster of OSDs.
+    """
+
+    def setup_perf_counters(self, daemons: int, counters: int) -> None:
+        self.perf_schema: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.perf_values: Dict[Tuple[str, str], Dict[str, Tuple[Any, ...]]] = {}
+        for daemon_id in range(daemons):
+            schema = {}
+            latest = {}
+            for i in range(counters):
+                kind, stattype = COUNTER_TYPES[i % len(COUNTER_TYPES)]
+                path = 'osd.{}_{}'.format(kind, i)
+                schema[path] = {
+                    'description': 'synthetic {} {}'.format(kind, i),
+                    'type': stattype,
+                    'priority': MgrModule.PRIO_USEFUL,
+                    'units': MgrModule.NONE,
+                }
+                if stattype & MgrModule.PERFCOUNTER_LONGRUNAVG:
+                    latest[path] = (time.time(), random.randint(0, 1 << 32),
+                                    random.randint(0, 1 << 16))
+                else:
+                    latest[path] = (time.time(), random.randint(0, 1 << 32))
+            self.perf_schema['osd.{}'.format(daemon_id)] = schema
+            self.perf_values[('osd', str(daemon_id))] = latest
+
+    def update_perf_counters(self, ratio: float) -> None:
+        for latest in self.perf_values.values():
+            for path, data in latest.items():
+                if random.random() < ratio:
+                    latest[path] = (data[0], data[1] + 1) + data[2:]
+
+    def list_servers(self) -> List[Dict[str, Any]]:
+        return [{
+            'hostname': 'host{}'.format(i),
+            'services': [{'type': svc_type, 'id': svc_id}
+                         for svc_type, svc_id in list(self.perf_values)[i::10]],
+        } for i in range(10)]
+
+    def _ceph_get_perf_schema(self, svc_type: str, svc_name: str) -> Dict[str, Any]:
+        if svc_name:
+            key = '{}.{}'.format(svc_type, svc_name)
+            return {key: self.perf_schema[key]}
+        return {k: v for k, v in self.perf_schema.items() if k.startswith(svc_type + '.')}
+
+    def _ceph_get_latest_counter(self, svc_type: str, svc_name: str, path: str) -> Any:
+        return {path: self.perf_values[(svc_type, svc_name)][path]}
+
+    def _ceph_get_latest_counters(self, svc_type: str,
+                                  prio_limit: int) -> Dict[str, Dict[str, List[Any]]]:
+        result = {}
+        for (daemon_type, daemon_id), latest in self.perf_values.items():
+            if daemon_type != svc_type:
+                continue
+            key = '{}.{}'.format(daemon_type, daemon_id)
+            schema = self.perf_schema[key]
+            paths = [path for path in latest if schema[path]['priority'] >= prio_limit]
+            long_run_avg = [bool(schema[path]['type'] & MgrModule.PERFCOUNTER_LONGRUNAVG)
+                            for path in paths]
+            result[key] = {
+                'paths': paths,
+                'values': [latest[path][1] for path in paths],
+                'counts': [latest[path][2] if avg else 0
+                           for path, avg in zip(paths, long_run_avg)],
+            }
+        return result
+
+
+class BenchModule(FakePerfCounterSource, MgrModule):
+    def __init__(self) -> None:
+        # skip the MgrModule initialisation, only the perf counters are needed
+        pass
+
+    @property
+    def log(self) -> logging.Logger:
+        return logger
+
+
+def walk_dicts(module: MgrModule) -> int:
+    n = 0
+    for daemon, counters in module.get_unlabeled_perf_counters().items():
+        for path, counter_info in counters.items():
+            stattype = module._stattype_to_str(counter_info['type'])
+            if not stattype or stattype == 'histogram':
+                continue
+            path, label_names, labels = module._perfpath_to_path_labels(daemon, path)
+            module._perfvalue_to_value(counter_info['type'], counter_info['value'])
+            n += 1
+    return n
+
+
+def walk_columns(module: MgrModule) -> int:
+    n = 0
+    for columns in module.get_perf_counter_columns():
+        is_time = [bool(tp & module.PERFCOUNTER_TIME) for tp in columns.types]
+        for values in columns.values:
+            for value, time_value in zip(values, is_time):
+                value = value / 1000000000.0 if time_value else value
+                n += 1
+    return n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--daemons', type=int, default=1000)
+    parser.add_argument('--counters', type=int, default=60,
+                        help='perf counters per daemon')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    module = BenchModule()
+    module.setup_perf_counters(args.daemons, args.counters)
+    for name, walk in (('dicts', walk_dicts), ('columns', walk_columns)):
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            n = walk(module)
+        duration = (time.perf_counter() - start) / args.rounds
+        print('{:8} {:.3f}s per sweep, {} counters'.format(name, duration, n))
+
+
+if __name__ == '__main__':
+    main()
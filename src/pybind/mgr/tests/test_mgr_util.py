@@ -1,4 +1,6 @@
+import copy
 import datetime
+import pickle
 from unittest.mock import MagicMock, patch
 import mgr_util
 
@@ -85,3 +87,60 @@ class TestCephFsEarmarkResolver:
         mock_parse_earmark.side_effect = mgr_util.EarmarkParseError
         result = resolver.check_earmark("error.test", mgr_util.EarmarkTopScope.SMB)
         assert result is False
+
+
+class TestFreeze:
+
+    def test_read_only(self):
+        frozen = mgr_util.freeze({'pools': [{'id': 1, 'stats': {'used': 2}}]})
+        assert frozen == {'pools': [{'id': 1, 'stats': {'used': 2}}]}
+        with pytest.raises(TypeError):
+            frozen['pools'] = []
+        with pytest.raises(TypeError):
+            frozen.update(foo=1)
+        with pytest.raises(TypeError):
+            frozen['pools'].append({})
+        with pytest.raises(TypeError):
+            frozen['pools'][0]['stats'].pop('used')
+
+    def test_copies_are_mutable(self):
+        frozen = mgr_util.freeze({'osds': [{'osd': 0}]})
+        shallow = copy.copy(frozen)
+        shallow['epoch'] = 1
+        deep = copy.deepcopy(frozen)
+        deep['osds'].append({'osd': 1})
+        deep['osds'][0]['up'] = 1
+        assert frozen == {'osds': [{'osd': 0}]}
+        assert type(pickle.loads(pickle.dumps(frozen))) is dict
+
+
+class TestGetReadonly:
+
+    @pytest.fixture
+    def module(self):
+        from mgr_module import MgrModule
+
+        class Module(MgrModule):
+            pass
+
+        return Module('test', None, None)
+
+    def test_cached_by_version(self, module):
+        module._ceph_get = MagicMock(side_effect=lambda _: {'epoch': 1, 'osds': []})
+        module.mock_store_set('_ceph_get_data_version', 'osd_map', (1,))
+        first = module.get_readonly('osd_map')
+        assert module.get_readonly('osd_map') is first
+        assert module._ceph_get.call_count == 1
+
+        module.mock_store_set('_ceph_get_data_version', 'osd_map', (2,))
+        assert module.get_readonly('osd_map') is not first
+        assert module._ceph_get.call_count == 2
+        assert module.get_readonly_cache_stats() == {
+            'hits': 1, 'misses': 2, 'entries': 1}
+
+    def test_unversioned_not_cached(self, module):
+        module._ceph_get = MagicMock(return_value={'status': 'HEALTH_OK'})
+        assert module.get_readonly('health') == {'status': 'HEALTH_OK'}
+        module.get_readonly('health')
+        assert module._ceph_get.call_count == 2
+        assert module.get_readonly_cache_stats()['entries'] == 0
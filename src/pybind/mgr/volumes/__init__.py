@@ -1,2 +1,5 @@
+import os
+if 'UNITTEST' in os.environ:
+    import tests  # noqa
 
 from .module import Module
@@ -0,0 +1,56 @@
+"""
+Benchmark of the clone copier against an in-memory file system simulating the
+latency of metadata operations and the bandwidth of a single data stream.
+
+Run it from src/pybind/mgr within the tox environment::
+
+    UNITTEST=true python -m volumes.benchmark --threads 0,4,16
+"""
+import argparse
+import stat
+
+from .fs.copy_engine import ParallelCopier
+from .tests.memfs import MemFs, Node, mock_cephfs
+
+
+def populate(fs, args):
+    fs.mkdir(b'/src', 0o755)
+    fs.mkdir(b'/dst', 0o755)
+    for d in range(args.dirs):
+        dir_path = b'/src/dir.%d' % d
+        fs.add(dir_path, Node(stat.S_IFDIR | 0o755))
+        for f in range(args.files):
+            fs.add(b'%s/file.%d' % (dir_path, f), Node(stat.S_IFREG | 0o644, args.file_size))
+        fs.add(b'%s/link' % dir_path, Node(stat.S_IFLNK | 0o777, 4, b'file'))
+    for f in range(args.large_files):
+        fs.add(b'/src/large.%d' % f, Node(stat.S_IFREG | 0o644, args.large_file_size))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--dirs', type=int, default=20)
+    parser.add_argument('--files', type=int, default=50,
+                        help='small files per directory')
+    parser.add_argument('--file-size', type=int, default=64 * 1024)
+    parser.add_argument('--large-files', type=int, default=2)
+    parser.add_argument('--large-file-size', type=int, default=256 * 1024 * 1024)
+    parser.add_argument('--chunk-size', type=int, default=64 * 1024 * 1024)
+    parser.add_argument('--latency', type=float, default=0.5,
+                        help='latency of a file system call in ms')
+    parser.add_argument('--bandwidth', type=float, default=500,
+                        help='bandwidth of a data stream in MiB/s')
+    parser.add_argument('--threads', default='0,4,16',
+                        help='comma separated list of copier thread counts')
+    args = parser.parse_args()
+
+    with mock_cephfs():
+        for nr_threads in [int(t) for t in args.threads.split(',')]:
+            fs = MemFs(args.latency / 1000, args.bandwidth * 1024 * 1024)
+            populate(fs, args)
+            copier = ParallelCopier(fs, lambda: False, nr_threads, args.chunk_size)
+            copier.copy(b'/src', b'/dst')
+            print('{:>3} copier threads: {}'.format(nr_threads, copier.stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,4 @@
 import os
-import stat
 import time
 import errno
 import logging
@@ -11,7 +10,7 @@ from mgr_util import lock_timeout_log
 
 from .async_job import AsyncJobs
 from .exception import IndexException, MetadataMgrException, OpSmException, VolumeException
-from .fs_util import copy_file
+from .copy_engine import DEFAULT_CHUNK_SIZE, ParallelCopier
 from .operations.versions.op_sm import SubvolumeOpSm
 from .operations.versions.subvolume_attrs import SubvolumeTypes, SubvolumeStates, SubvolumeActions
 from .operations.resolver import resolve_group_and_subvolume_name
@@ -26,22 +25,22 @@ from .operations.template import SubvolumeOpType
 log = logging.getLogger(__name__)
 
 # helper for fetching a clone entry for a given volume
-def get_next_clone_entry(fs_client, volspec, volname, running_jobs):
-    log.debug("fetching clone entry for volume '{0}'".format(volname))
+def get_pending_clone_entries(fs_client, volspec, volname, running_jobs):
+    log.debug("fetching clone entries for volume '{0}'".format(volname))
 
     try:
         with open_volume_lockless(fs_client, volname) as fs_handle:
             try:
                 with open_clone_index(fs_handle, volspec) as clone_index:
-                    job = clone_index.get_oldest_clone_entry(running_jobs)
-                    return 0, job
+                    jobs = clone_index.get_clone_entries(running_jobs)
+                    return 0, jobs
             except IndexException as ve:
                 if ve.errno == -errno.ENOENT:
-                    return 0, None
+                    return 0, []
                 raise ve
     except VolumeException as ve:
-        log.error("error fetching clone entry for volume '{0}' ({1})".format(volname, ve))
-        return ve.errno, None
+        log.error("error fetching clone entries for volume '{0}' ({1})".format(volname, ve))
+        return ve.errno, []
 
 @contextmanager
 def open_at_volume(fs_client, volspec, volname, groupname, subvolname, op_type):
@@ -97,77 +96,24 @@ def handle_clone_pending(fs_client, volspec, volname, index, groupname, subvolna
         raise VolumeException(oe.errno, oe.error_str)
     return (next_state, False)
 
-def sync_attrs(fs_handle, target_path, source_statx):
-    try:
-        fs_handle.lchown(target_path, source_statx["uid"], source_statx["gid"])
-        fs_handle.lutimes(target_path, (time.mktime(source_statx["atime"].timetuple()),
-                                        time.mktime(source_statx["mtime"].timetuple())))
-        fs_handle.lchmod(target_path, source_statx["mode"])
-    except cephfs.Error as e:
-        log.warning("error synchronizing attrs for {0} ({1})".format(target_path, e))
-        raise e
-
-def bulk_copy(fs_handle, source_path, dst_path, should_cancel):
+def bulk_copy(fs_handle, source_path, dst_path, should_cancel, nr_threads=0,
+              chunk_size=DEFAULT_CHUNK_SIZE, checkpoint=None, checkpoint_interval=0,
+              resume_from=None):
     """
     bulk copy data from source to destination -- only directories, symlinks
-    and regular files are synced.
+    and regular files are synced. regular files are copied by @nr_threads
+    copier threads (in the calling thread if zero), files larger than
+    @chunk_size are copied in parallel chunks. the progress of the copy is
+    passed to @checkpoint every @checkpoint_interval seconds, and a copy
+    is resumed from such a progress with @resume_from.
     """
     log.info("copying data from {0} to {1}".format(source_path, dst_path))
-    def cptree(src_root_path, dst_root_path):
-        log.debug("cptree: {0} -> {1}".format(src_root_path, dst_root_path))
-        try:
-            with fs_handle.opendir(src_root_path) as dir_handle:
-                d = fs_handle.readdir(dir_handle)
-                while d and not should_cancel():
-                    if d.d_name not in (b".", b".."):
-                        log.debug("d={0}".format(d))
-                        d_full_src = os.path.join(src_root_path, d.d_name)
-                        d_full_dst = os.path.join(dst_root_path, d.d_name)
-                        stx = fs_handle.statx(d_full_src, cephfs.CEPH_STATX_MODE  |
-                                                          cephfs.CEPH_STATX_UID   |
-                                                          cephfs.CEPH_STATX_GID   |
-                                                          cephfs.CEPH_STATX_ATIME |
-                                                          cephfs.CEPH_STATX_MTIME |
-                                                          cephfs.CEPH_STATX_SIZE,
-                                                          cephfs.AT_SYMLINK_NOFOLLOW)
-                        handled = True
-                        mo = stx["mode"] & ~stat.S_IFMT(stx["mode"])
-                        if stat.S_ISDIR(stx["mode"]):
-                            log.debug("cptree: (DIR) {0}".format(d_full_src))
-                            try:
-                                fs_handle.mkdir(d_full_dst, mo)
-                            except cephfs.Error as e:
-                                if not e.args[0] == errno.EEXIST:
-                                    raise
-                            cptree(d_full_src, d_full_dst)
-                        elif stat.S_ISLNK(stx["mode"]):
-                            log.debug("cptree: (SYMLINK) {0}".format(d_full_src))
-                            target = fs_handle.readlink(d_full_src, 4096)
-                            try:
-                                fs_handle.symlink(target[:stx["size"]], d_full_dst)
-                            except cephfs.Error as e:
-                                if not e.args[0] == errno.EEXIST:
-                                    raise
-                        elif stat.S_ISREG(stx["mode"]):
-                            log.debug("cptree: (REG) {0}".format(d_full_src))
-                            copy_file(fs_handle, d_full_src, d_full_dst, mo, cancel_check=should_cancel)
-                        else:
-                            handled = False
-                            log.warning("cptree: (IGNORE) {0}".format(d_full_src))
-                        if handled:
-                            sync_attrs(fs_handle, d_full_dst, stx)
-                    d = fs_handle.readdir(dir_handle)
-                stx_root = fs_handle.statx(src_root_path, cephfs.CEPH_STATX_ATIME |
-                                                          cephfs.CEPH_STATX_MTIME,
-                                                          cephfs.AT_SYMLINK_NOFOLLOW)
-                fs_handle.lutimes(dst_root_path, (time.mktime(stx_root["atime"].timetuple()),
-                                                  time.mktime(stx_root["mtime"].timetuple())))
-        except cephfs.Error as e:
-            if not e.args[0] == errno.ENOENT:
-                raise VolumeException(-e.args[0], e.args[1])
-    cptree(source_path, dst_path)
-    if should_cancel():
-        raise VolumeException(-errno.EINTR, "user interrupted clone operation")
+    copier = ParallelCopier(fs_handle, should_cancel, nr_threads, chunk_size,
+                            checkpoint=checkpoint,
+                            checkpoint_interval=checkpoint_interval,
+                            resume_from=resume_from)
+    copier.copy(source_path, dst_path)
+    log.info("copied data from {0} to {1}: {2}".format(source_path, dst_path, copier.stats))
 
 def set_quota_on_clone(fs_handle, clone_volumes_pair):
     src_path = clone_volumes_pair[1].snapshot_data_path(clone_volumes_pair[2])
@@ -209,8 +155,16 @@ def do_clone(fs_client, volspec, volname, groupname, subvolname, should_cancel):
             dst_path = subvol0.path
             # XXX: this is where cloning (of subvolume's snapshots) actually
             # happens.
-            bulk_copy(fs_handle, src_path, dst_path, should_cancel)
+            # resume from where an interrupted clone (mgr failover) left off
+            checkpoint = subvol0.get_clone_checkpoint()
+            bulk_copy(fs_handle, src_path, dst_path, should_cancel,
+                      nr_threads=fs_client.mgr.clone_copy_threads,
+                      chunk_size=fs_client.mgr.clone_copy_chunk_size,
+                      checkpoint=subvol0.set_clone_checkpoint,
+                      checkpoint_interval=fs_client.mgr.clone_checkpoint_interval,
+                      resume_from=checkpoint)
             set_quota_on_clone(fs_handle, (subvol0, subvol1, subvol2))
+            subvol0.remove_clone_checkpoint()
 
 def update_clone_failure_status(fs_client, volspec, volname, groupname, subvolname, ve):
     with open_clone_subvol_pair_in_vol(fs_client, volspec, volname, groupname,
@@ -385,6 +339,7 @@ class Cloner(AsyncJobs):
                                 logging.debug("Cancelling pending job {0}".format(clone_job))
                                 # clone has not started yet -- cancel right away.
                                 self._cancel_pending_clone(fs_handle, clone_subvolume, clonename, groupname, status, track_idx)
+                                self._unqueue_job(volname, clone_job)
                                 return
             # cancelling an on-going clone would persist "canceled" state in subvolume metadata.
             # to persist the new state, async cloner accesses the volume in exclusive mode.
@@ -400,8 +355,8 @@ class Cloner(AsyncJobs):
             log.error("error cancelling clone {0}: ({1})".format(job, e))
             raise VolumeException(-errno.EINVAL, "error canceling clone")
 
-    def get_next_job(self, volname, running_jobs):
-        return get_next_clone_entry(self.fs_client, self.vc.volspec, volname, running_jobs)
+    def get_pending_jobs(self, volname, running_jobs):
+        return get_pending_clone_entries(self.fs_client, self.vc.volspec, volname, running_jobs)
 
     def execute_job(self, volname, job, should_cancel):
         clone(self.fs_client, self.vc.volspec, volname, job[0].decode('utf-8'), job[1].decode('utf-8'), self.state_table, should_cancel, self.snapshot_clone_delay)
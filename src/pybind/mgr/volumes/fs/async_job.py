@@ -37,22 +37,22 @@ class JobThread(threading.Thread):
             try:
                 # fetch next job to execute
                 with lock_timeout_log(self.async_job.lock):
+                    timed_out = True
                     while True:
                         if self.should_reconfigure_num_threads():
                             log.info("thread [{0}] terminating due to reconfigure".format(thread_name))
                             self.async_job.threads.remove(self)
                             return
                         timo = self.async_job.wakeup_timeout
-                        if timo is not None:
-                            volnames = list_volumes(self.vc.mgr)
-                            missing = set(volnames) - set(self.async_job.q)
-                            for m in missing:
-                                self.async_job.jobs[m] = []
-                                self.async_job.q.append(m)
+                        if timo is not None and timed_out:
+                            # periodic async work: look for jobs on disk
+                            for volname in list_volumes(self.vc.mgr):
+                                self.async_job._track_volume(volname)
+                                self.async_job.needs_scan.add(volname)
                         vol_job = self.async_job.get_job()
                         if vol_job:
                             break
-                        self.async_job.cv.wait(timeout=timo)
+                        timed_out = not self.async_job.cv.wait(timeout=timo)
                     self.async_job.register_async_job(vol_job[0], vol_job[1], thread_id)
 
                 # execute the job (outside lock)
@@ -61,6 +61,10 @@ class JobThread(threading.Thread):
             except NotImplementedException:
                 raise
             except Exception:
+                # the job is probably still pending on disk, look it up again
+                if vol_job:
+                    with lock_timeout_log(self.async_job.lock):
+                        self.async_job.needs_scan.add(vol_job[0])
                 # unless the jobs fetching and execution routines are not implemented
                 # retry till we hit cap limit.
                 retries += 1
@@ -69,12 +73,13 @@ class JobThread(threading.Thread):
                 exc_type, exc_value, exc_traceback = sys.exc_info()
                 log.warning("traceback: {0}".format("".join(
                     traceback.format_exception(exc_type, exc_value, exc_traceback))))
+                # back off before retrying
+                time.sleep(1)
             finally:
                 # when done, unregister the job
                 if vol_job:
                     with lock_timeout_log(self.async_job.lock):
                         self.async_job.unregister_async_job(vol_job[0], vol_job[1], thread_id)
-                time.sleep(1)
         log.error("thread [{0}] reached exception limit, bailing out...".format(thread_name))
         self.vc.cluster_log("thread {0} bailing out due to exception".format(thread_name))
         with lock_timeout_log(self.async_job.lock):
@@ -100,11 +105,18 @@ class AsyncJobs(threading.Thread):
     `jobs` executing concurrently (capped by number of concurrent jobs).
 
     Usability is simple: subclass this and implement the following:
-      - get_next_job(volname, running_jobs)
+      - get_pending_jobs(volname, running_jobs)
       - execute_job(volname, job, should_cancel)
 
     ... and do not forget to invoke base class constructor.
 
+    Pending jobs are tracked in memory by volume. Callers knowing the job
+    they created pass it to `queue_job()`, which makes it available to the
+    worker threads right away. Otherwise (and on startup, when periodic
+    async work is enabled or after a failed job), the pending jobs of the
+    volume are looked up once on disk with `get_pending_jobs()`, instead of
+    every time a worker thread looks for a job.
+
     Job cancelation is for a volume as a whole, i.e., all executing jobs
     for a volume are canceled. Cancelation is poll based -- jobs need to
     periodically check if cancelation is requested, after which the job
@@ -122,6 +134,10 @@ class AsyncJobs(threading.Thread):
         self.q = deque()  # type: deque
         # volume => job tracking
         self.jobs = {}
+        # volume => jobs pending execution, in execution order
+        self.pending_jobs = {}  # type: dict
+        # volumes whose pending jobs are to be looked up on disk
+        self.needs_scan = set()  # type: set
         # lock, cv for kickstarting jobs
         self.lock = threading.Lock()
         self.cv = threading.Condition(self.lock)
@@ -167,6 +183,7 @@ class AsyncJobs(threading.Thread):
                     for i in range(c, self.nr_concurrent_jobs):
                         self.threads.append(JobThread(self, self.vc, name="{0}.{1}.{2}".format(self.name_pfx, time.time(), i)))
                         self.threads[-1].start()
+                self.tick()
                 self.cv.wait(timeout=5)
 
     def shutdown(self):
@@ -182,6 +199,41 @@ class AsyncJobs(threading.Thread):
         """
         self.nr_concurrent_jobs = nr_concurrent_jobs
 
+    def _track_volume(self, volname):
+        if volname not in self.q:
+            self.q.append(volname)
+            self.jobs[volname] = []
+            self.pending_jobs[volname] = []
+
+    def _untrack_volume(self, volname):
+        self.q.remove(volname)
+        self.jobs.pop(volname)
+        self.pending_jobs.pop(volname, None)
+        self.needs_scan.discard(volname)
+
+    def _scan_volume(self, volname, running_jobs):
+        """
+        rebuild the pending jobs of a volume from disk. return 0 on success.
+        """
+        (ret, jobs) = self.get_pending_jobs(volname, running_jobs)
+        if ret == 0:
+            log.debug("found {0} pending jobs for volume '{1}'".format(len(jobs), volname))
+            self.pending_jobs[volname] = list(jobs)
+            self.needs_scan.discard(volname)
+        return ret
+
+    def next_job(self, volname, running_jobs):
+        """
+        pop the next pending job of a volume, or return None. called under
+        `self.lock`.
+        """
+        pending = self.pending_jobs.get(volname, [])
+        while pending:
+            job = pending.pop(0)
+            if job not in running_jobs:
+                return job
+        return None
+
     def get_job(self):
         log.debug("processing {0} volume entries".format(len(self.q)))
         nr_vols = len(self.q)
@@ -192,17 +244,17 @@ class AsyncJobs(threading.Thread):
             # do this now so that the other thread pick up jobs for other volumes
             self.q.rotate(1)
             running_jobs = [j[0] for j in self.jobs[volname]]
-            (ret, job) = self.get_next_job(volname, running_jobs)
+            ret = 0
+            if volname in self.needs_scan:
+                ret = self._scan_volume(volname, running_jobs)
+            job = self.next_job(volname, running_jobs)
             if job:
                 next_job = (volname, job)
                 break
             # this is an optimization when for a given volume there are no more
             # jobs and no jobs are in progress. in such cases we remove the volume
-            # from the tracking list so as to:
-            #
-            # a. not query the filesystem for jobs over and over again
-            # b. keep the filesystem connection idle so that it can be freed
-            #    from the connection pool
+            # from the tracking list so as to keep the filesystem connection idle
+            # so that it can be freed from the connection pool.
             #
             # if at all there are jobs for a volume, the volume gets added again
             # to the tracking list and the jobs get kickstarted.
@@ -213,8 +265,7 @@ class AsyncJobs(threading.Thread):
             nr_vols -= 1
         for vol in to_remove:
             log.debug("auto removing volume '{0}' from tracked volumes".format(vol))
-            self.q.remove(vol)
-            self.jobs.pop(vol)
+            self._untrack_volume(vol)
         return next_job
 
     def register_async_job(self, volname, job, thread_id):
@@ -233,17 +284,29 @@ class AsyncJobs(threading.Thread):
             logging.info("waking up cancellation waiters")
             self.cancel_cv.notifyAll()
 
-    def queue_job(self, volname):
+    def queue_job(self, volname, job=None):
         """
-        queue a volume for asynchronous job execution.
+        queue a job for asynchronous execution. if @job is not given, the
+        pending jobs of the volume are looked up on disk.
         """
-        log.info("queuing job for volume '{0}'".format(volname))
+        log.info("queuing job {0} for volume '{1}'".format(job, volname))
         with lock_timeout_log(self.lock):
-            if volname not in self.q:
-                self.q.append(volname)
-                self.jobs[volname] = []
+            self._track_volume(volname)
+            if job is None:
+                self.needs_scan.add(volname)
+            elif job not in self.pending_jobs[volname]:
+                self.pending_jobs[volname].append(job)
             self.cv.notifyAll()
 
+    def _unqueue_job(self, volname, job):
+        """
+        drop a job that will not be executed. called under `self.lock`.
+        """
+        try:
+            self.pending_jobs.get(volname, []).remove(job)
+        except ValueError:
+            pass
+
     def _cancel_jobs(self, volname):
         """
         cancel all jobs for the volume. do nothing is the no jobs are
@@ -255,6 +318,8 @@ class AsyncJobs(threading.Thread):
             if volname not in self.q and volname not in self.jobs:
                 return
             self.q.remove(volname)
+            self.pending_jobs.pop(volname, None)
+            self.needs_scan.discard(volname)
             # cancel in-progress operation and wait until complete
             for j in self.jobs[volname]:
                 j[1].cancel_job()
@@ -309,11 +374,18 @@ class AsyncJobs(threading.Thread):
             for volname in list(self.q):
                 self._cancel_jobs(volname)
 
-    def get_next_job(self, volname, running_jobs):
+    def tick(self):
+        """
+        periodic work of the tick thread, every few seconds. called under
+        `self.lock`.
+        """
+        pass
+
+    def get_pending_jobs(self, volname, running_jobs):
         """
-        get the next job for asynchronous execution as (retcode, job) tuple. if no
-        jobs are available return (0, None) else return (0, job). on error return
-        (-ret, None). called under `self.lock`.
+        get the jobs pending execution for a volume, excluding @running_jobs, as
+        (retcode, jobs) tuple, in the order they should be executed. on error
+        return (-ret, []). called under `self.lock`.
         """
         raise NotImplementedException()
 
@@ -0,0 +1,506 @@
+'''
+Parallel copy engine used by the asynchronous cloner to copy the data of a
+snapshot to a clone subvolume.
+
+The source tree is walked by the calling thread, which creates directories and
+symbolic links and feeds a bounded queue of copy tasks for regular files. A
+pool of copier threads drains the queue. Files larger than the chunk size are
+split into ranged chunks that are copied in parallel and share a pair of file
+descriptors. Each chunk is synced once copied, before it counts as done -- the
+copier finishing the last chunk closes the file.
+
+A directory is complete once it has been listed and everything below it has
+been copied. Its attributes are synchronized then, since creating entries
+updates its timestamps. The completed directories (collapsed into their
+completed parents) and the chunks copied for files in flight make up the
+checkpoint of the copy, from which an interrupted copy is resumed.
+'''
+import errno
+import logging
+import os
+import queue
+import stat
+import threading
+import time
+
+import cephfs
+
+from .exception import VolumeException
+from .fs_util import sync_attrs
+
+log = logging.getLogger(__name__)
+
+IO_SIZE = 8 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+# copy tasks queued per copier thread
+QUEUE_DEPTH = 16
+
+CHECKPOINT_VERSION = 1
+
+
+def encode_path(path):
+    return path.decode('utf-8', 'surrogateescape')
+
+
+def decode_path(path):
+    return path.encode('utf-8', 'surrogateescape')
+
+
+class CopyStats(object):
+    """
+    Counters of a copy operation, updated by the walker and the copiers.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start = time.monotonic()
+        self.end = None
+        self.dirs = 0
+        self.symlinks = 0
+        self.files = 0
+        self.bytes = 0
+        self.skipped = 0
+
+    def add(self, **counts):
+        with self.lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    @property
+    def duration(self):
+        return (self.end or time.monotonic()) - self.start
+
+    def __str__(self):
+        duration = self.duration
+        rate = self.bytes / duration if duration > 0 else 0.0
+        return ("{0} dirs, {1} symlinks, {2} files, {3} bytes in {4:.3f}s "
+                "({5:.1f} files/s, {6:.1f} MiB/s), {7} entries skipped".format(
+                    self.dirs, self.symlinks, self.files, self.bytes, duration,
+                    self.files / duration if duration > 0 else 0.0,
+                    rate / (1024 * 1024), self.skipped))
+
+
+class DirCopy(object):
+    """
+    A directory being copied. @pending counts the listing of the directory
+    and the files and subdirectories below it that are not copied yet.
+    """
+    def __init__(self, parent, rel_path, src_path, dst_path, stx):
+        self.parent = parent
+        self.rel_path = rel_path
+        self.src_path = src_path
+        self.dst_path = dst_path
+        self.stx = stx
+        self.pending = 1
+        self.done_children = []
+
+
+class FileCopy(object):
+    """
+    A regular file being copied as one or more chunks. The file is opened by
+    the first chunk to run, and closed by the last one to finish.
+    """
+    def __init__(self, parent, rel_path, src_path, dst_path, stx, chunk_size,
+                 chunks, done_chunks=()):
+        self.parent = parent
+        self.rel_path = rel_path
+        self.src_path = src_path
+        self.dst_path = dst_path
+        self.stx = stx
+        self.chunk_size = chunk_size
+        self.nr_chunks = max(1, -(-stx["size"] // chunk_size))
+        self.chunks = chunks
+        self.done_chunks = set(done_chunks)
+        self.pending = len(chunks)
+        self.failed = False
+        self.src_fd = None
+        self.dst_fd = None
+        self.lock = threading.Lock()
+
+    @property
+    def mode(self):
+        return self.stx["mode"] & ~stat.S_IFMT(self.stx["mode"])
+
+    def chunk_range(self, index):
+        # the last chunk copies up to EOF
+        length = self.chunk_size if index < self.nr_chunks - 1 else None
+        return index * self.chunk_size, length
+
+    def open(self, fs):
+        with self.lock:
+            if self.src_fd is not None:
+                return
+            flags = os.O_CREAT | os.O_WRONLY
+            if not self.done_chunks:
+                flags |= os.O_TRUNC
+            src_fd = fs.open(self.src_path, os.O_RDONLY)
+            try:
+                dst_fd = fs.open(self.dst_path, flags, self.mode)
+            except cephfs.Error:
+                fs.close(src_fd)
+                raise
+            self.src_fd, self.dst_fd = src_fd, dst_fd
+
+    def put(self, index, failed):
+        """
+        drop a chunk reference, return True for the last chunk. a chunk is
+        only recorded as done (and checkpointed) once its data is synced.
+        """
+        with self.lock:
+            self.pending -= 1
+            if failed:
+                self.failed = True
+            else:
+                self.done_chunks.add(index)
+            return self.pending == 0
+
+    def close(self, fs):
+        for fd in (self.src_fd, self.dst_fd):
+            if fd is not None:
+                fs.close(fd)
+        self.src_fd = self.dst_fd = None
+
+
+class ParallelCopier(object):
+    """
+    Copy a directory tree with a pool of @nr_threads copier threads. With no
+    copier threads, files are copied by the calling thread as they are found.
+
+    @checkpoint, if set, is called with the progress of the copy (a dict that
+    can be serialized to JSON) every @checkpoint_interval seconds. Passing
+    it back as @resume_from skips what was already copied.
+    """
+    def __init__(self, fs_handle, should_cancel, nr_threads=0,
+                 chunk_size=DEFAULT_CHUNK_SIZE, checkpoint=None,
+                 checkpoint_interval=0, resume_from=None):
+        self.fs = fs_handle
+        self.should_cancel = should_cancel
+        self.nr_threads = max(0, nr_threads)
+        self.chunk_size = max(IO_SIZE, chunk_size)
+        queue_depth = max(1, self.nr_threads) * QUEUE_DEPTH
+        self.tasks = queue.Queue(maxsize=queue_depth)  # type: queue.Queue
+        self.error = None
+        self.error_lock = threading.Lock()
+        self.stats = CopyStats()
+        # completed directories (without their completed subdirectories)
+        # and chunked files being copied, by path relative to the source root
+        self.lock = threading.Lock()
+        self.done_dirs = set()
+        self.inflight = {}
+        self.checkpoint_cb = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_lock = threading.Lock()
+        self.last_checkpoint = time.monotonic()
+        self.resume_from = resume_from
+        self.src_root_path = None
+
+    def stopped(self):
+        return self.error is not None or self.should_cancel()
+
+    def set_error(self, e):
+        with self.error_lock:
+            if self.error is None:
+                self.error = e
+
+    def copy(self, src_root_path, dst_root_path):
+        self.src_root_path = src_root_path
+        resumed_files = self.load_checkpoint(src_root_path)
+        threads = [threading.Thread(target=self.copier, name="copier.{0}".format(i))
+                   for i in range(self.nr_threads)]
+        for thread in threads:
+            thread.start()
+        try:
+            if b'' not in self.done_dirs:
+                root = DirCopy(None, b'', src_root_path, dst_root_path, None)
+                self.walk(root, resumed_files)
+        except VolumeException as ve:
+            self.set_error(ve)
+        finally:
+            for _ in threads:
+                self.tasks.put(None)
+            for thread in threads:
+                thread.join()
+        self.stats.end = time.monotonic()
+        if self.should_cancel():
+            raise VolumeException(-errno.EINTR, "user interrupted clone operation")
+        if self.error is not None:
+            raise self.error
+
+    def load_checkpoint(self, src_root_path):
+        """
+        restore the completed directories from the checkpoint to resume from,
+        and return the chunks copied so far by chunked file.
+        """
+        resumed_files = {}  # type: dict
+        checkpoint = self.resume_from
+        if not checkpoint:
+            return resumed_files
+        if checkpoint.get('version') != CHECKPOINT_VERSION or \
+           checkpoint.get('source') != encode_path(src_root_path):
+            log.info("ignoring checkpoint of another copy: {0}".format(checkpoint.get('source')))
+            self.resume_from = None
+            return resumed_files
+        self.done_dirs = set(decode_path(p) for p in checkpoint.get('done', []))
+        for rel_path, progress in checkpoint.get('files', {}).items():
+            resumed_files[decode_path(rel_path)] = (progress['chunk_size'], progress['chunks'])
+        log.info("resuming copy of {0}: {1} completed directories, {2} files in flight".format(
+            src_root_path, len(self.done_dirs), len(resumed_files)))
+        return resumed_files
+
+    def maybe_checkpoint(self):
+        if not self.checkpoint_cb or self.checkpoint_interval <= 0:
+            return
+        if time.monotonic() - self.last_checkpoint < self.checkpoint_interval:
+            return
+        if not self.checkpoint_lock.acquire(blocking=False):
+            # being written by another thread
+            return
+        try:
+            with self.lock:
+                checkpoint = {
+                    'version': CHECKPOINT_VERSION,
+                    'source': encode_path(self.src_root_path),
+                    'done': sorted(encode_path(p) for p in self.done_dirs),
+                    'files': {encode_path(fc.rel_path): {'chunk_size': fc.chunk_size,
+                                                         'chunks': sorted(fc.done_chunks)}
+                              for fc in self.inflight.values() if fc.done_chunks},
+                }
+            self.checkpoint_cb(checkpoint)
+            self.last_checkpoint = time.monotonic()
+        except VolumeException as ve:
+            # not fatal, the copy would be restarted from an older checkpoint
+            log.warning("failed to checkpoint copy of {0}: {1}".format(self.src_root_path, ve))
+            self.last_checkpoint = time.monotonic()
+        finally:
+            self.checkpoint_lock.release()
+
+    def walk(self, root, resumed_files):
+        """
+        walk the source tree depth first, creating directories and symbolic
+        links and queueing regular files.
+        """
+        stack = [root]
+        while stack and not self.stopped():
+            dc = stack.pop()
+            log.debug("cptree: {0} -> {1}".format(dc.src_path, dc.dst_path))
+            subdirs = []
+            try:
+                with self.fs.opendir(dc.src_path) as dir_handle:
+                    d = self.fs.readdir(dir_handle)
+                    while d and not self.stopped():
+                        if d.d_name not in (b".", b".."):
+                            subdir = self.copy_entry(dc, d.d_name, resumed_files)
+                            if subdir is not None:
+                                subdirs.append(subdir)
+                            self.maybe_checkpoint()
+                        d = self.fs.readdir(dir_handle)
+            except cephfs.Error as e:
+                if not e.args[0] == errno.ENOENT:
+                    raise VolumeException(-e.args[0], e.args[1])
+            if self.stopped():
+                break
+            # pop subdirectories in readdir order
+            stack.extend(reversed(subdirs))
+            self.put_dir(dc)
+
+    def copy_entry(self, dc, d_name, resumed_files):
+        """
+        copy a directory entry, return its DirCopy if it is a directory to
+        descend into.
+        """
+        rel_path = os.path.join(dc.rel_path, d_name)
+        if rel_path in self.done_dirs:
+            with self.lock:
+                dc.done_children.append(rel_path)
+            self.stats.add(skipped=1)
+            return None
+        d_full_src = os.path.join(dc.src_path, d_name)
+        d_full_dst = os.path.join(dc.dst_path, d_name)
+        stx = self.fs.statx(d_full_src, cephfs.CEPH_STATX_MODE  |
+                                        cephfs.CEPH_STATX_UID   |
+                                        cephfs.CEPH_STATX_GID   |
+                                        cephfs.CEPH_STATX_ATIME |
+                                        cephfs.CEPH_STATX_MTIME |
+                                        cephfs.CEPH_STATX_SIZE,
+                                        cephfs.AT_SYMLINK_NOFOLLOW)
+        mo = stx["mode"] & ~stat.S_IFMT(stx["mode"])
+        if stat.S_ISDIR(stx["mode"]):
+            log.debug("cptree: (DIR) {0}".format(d_full_src))
+            try:
+                self.fs.mkdir(d_full_dst, mo)
+            except cephfs.Error as e:
+                if not e.args[0] == errno.EEXIST:
+                    raise
+            with self.lock:
+                dc.pending += 1
+            return DirCopy(dc, rel_path, d_full_src, d_full_dst, stx)
+        if stat.S_ISLNK(stx["mode"]):
+            log.debug("cptree: (SYMLINK) {0}".format(d_full_src))
+            target = self.fs.readlink(d_full_src, 4096)
+            try:
+                self.fs.symlink(target[:stx["size"]], d_full_dst)
+            except cephfs.Error as e:
+                if not e.args[0] == errno.EEXIST:
+                    raise
+            sync_attrs(self.fs, d_full_dst, stx)
+            self.stats.add(symlinks=1)
+        elif stat.S_ISREG(stx["mode"]):
+            log.debug("cptree: (REG) {0}".format(d_full_src))
+            resumed = resumed_files.pop(rel_path, None)
+            if resumed is None and self.resume_from and self.is_copied(d_full_dst, stx):
+                self.stats.add(skipped=1)
+                return None
+            with self.lock:
+                dc.pending += 1
+            self.queue_file(dc, rel_path, d_full_src, d_full_dst, stx, resumed)
+        else:
+            log.warning("cptree: (IGNORE) {0}".format(d_full_src))
+        return None
+
+    def is_copied(self, dst_path, stx):
+        """
+        check whether a file was copied before the copy was interrupted --
+        attributes are synchronized once its data is synced.
+        """
+        try:
+            dst_stx = self.fs.statx(dst_path, cephfs.CEPH_STATX_MODE  |
+                                              cephfs.CEPH_STATX_MTIME |
+                                              cephfs.CEPH_STATX_SIZE,
+                                              cephfs.AT_SYMLINK_NOFOLLOW)
+        except cephfs.ObjectNotFound:
+            return False
+        # timestamps are synchronized with a resolution of one second
+        return (dst_stx["size"] == stx["size"] and
+                dst_stx["mode"] == stx["mode"] and
+                time.mktime(dst_stx["mtime"].timetuple()) ==
+                time.mktime(stx["mtime"].timetuple()))
+
+    def queue_file(self, dc, rel_path, src_path, dst_path, stx, resumed=None):
+        if resumed is not None:
+            chunk_size, done_chunks = resumed
+        else:
+            chunk_size, done_chunks = self.chunk_size, ()
+        fc = FileCopy(dc, rel_path, src_path, dst_path, stx, chunk_size, [], done_chunks)
+        fc.chunks = [i for i in range(fc.nr_chunks) if i not in fc.done_chunks]
+        if not fc.chunks:
+            # interrupted before the attributes of the file were synced
+            fc.chunks = [fc.nr_chunks - 1]
+        fc.pending = len(fc.chunks)
+        if fc.nr_chunks > 1:
+            with self.lock:
+                self.inflight[rel_path] = fc
+        for i, index in enumerate(fc.chunks):
+            task = (fc, index)
+            if not self.nr_threads:
+                self.run_task(task)
+                continue
+            while True:
+                if self.stopped():
+                    # account for the chunks that will never run
+                    for index in fc.chunks[i:]:
+                        self.finish(fc, index, True)
+                    return
+                try:
+                    self.tasks.put(task, timeout=1)
+                    break
+                except queue.Full:
+                    pass
+
+    def copier(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                return
+            if self.stopped():
+                self.finish(task[0], task[1], True)
+            else:
+                self.run_task(task)
+                self.maybe_checkpoint()
+
+    def run_task(self, task):
+        fc, index = task
+        failed = True
+        try:
+            fc.open(self.fs)
+            self.copy_range(fc, *fc.chunk_range(index))
+            # the chunk may be checkpointed as soon as it is done, its data
+            # must not be lost to a failover then
+            self.fs.fsync(fc.dst_fd, 0)
+            failed = False
+        except cephfs.Error as e:
+            self.set_error(VolumeException(-e.args[0], e.args[1]))
+        except VolumeException as ve:
+            self.set_error(ve)
+        except Exception as e:
+            log.exception("error copying {0}".format(fc.src_path))
+            self.set_error(VolumeException(-errno.EIO, str(e)))
+        finally:
+            self.finish(fc, index, failed)
+
+    def copy_range(self, fc, offset, length):
+        end = None if length is None else offset + length
+        while end is None or offset < end:
+            if self.stopped():
+                raise VolumeException(-errno.EINTR, "copy operation interrupted")
+            size = IO_SIZE if end is None else min(IO_SIZE, end - offset)
+            data = self.fs.read(fc.src_fd, offset, size)
+            if not len(data):
+                break
+            written = 0
+            while written < len(data):
+                written += self.fs.write(fc.dst_fd, data[written:], offset + written)
+            offset += len(data)
+            self.stats.add(bytes=len(data))
+
+    def finish(self, fc, index, failed):
+        if not fc.put(index, failed):
+            return
+        try:
+            fc.close(self.fs)
+        except cephfs.Error as e:
+            fc.failed = True
+            self.set_error(VolumeException(-e.args[0], e.args[1]))
+        if fc.failed:
+            # leave the progress of the file to the checkpoint
+            return
+        try:
+            sync_attrs(self.fs, fc.dst_path, fc.stx)
+        except cephfs.Error as e:
+            self.set_error(VolumeException(-e.args[0], e.args[1]))
+            return
+        with self.lock:
+            self.inflight.pop(fc.rel_path, None)
+        self.stats.add(files=1)
+        self.put_dir(fc.parent)
+
+    def put_dir(self, dc):
+        """
+        drop a reference on a directory, completing it (and possibly its
+        ancestors) once everything below it has been copied.
+        """
+        while dc is not None:
+            with self.lock:
+                dc.pending -= 1
+                if dc.pending:
+                    return
+            try:
+                if dc.stx is not None:
+                    sync_attrs(self.fs, dc.dst_path, dc.stx)
+                else:
+                    stx_root = self.fs.statx(dc.src_path, cephfs.CEPH_STATX_ATIME |
+                                                          cephfs.CEPH_STATX_MTIME,
+                                                          cephfs.AT_SYMLINK_NOFOLLOW)
+                    self.fs.lutimes(dc.dst_path, (time.mktime(stx_root["atime"].timetuple()),
+                                                  time.mktime(stx_root["mtime"].timetuple())))
+            except cephfs.Error as e:
+                if not e.args[0] == errno.ENOENT:
+                    self.set_error(VolumeException(-e.args[0], e.args[1]))
+                    return
+            with self.lock:
+                for rel_path in dc.done_children:
+                    self.done_dirs.discard(rel_path)
+                self.done_dirs.add(dc.rel_path)
+                if dc.parent is not None:
+                    dc.parent.done_children.append(dc.rel_path)
+            if dc.stx is not None:
+                self.stats.add(dirs=1)
+            dc = dc.parent
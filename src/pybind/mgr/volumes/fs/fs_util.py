@@ -1,4 +1,5 @@
 import os
+import time
 import errno
 import logging
 
@@ -190,6 +191,19 @@ def copy_file(fs, src, dst, mode, cancel_check=None):
         fs.close(src_fd)
         fs.close(dst_fd)
 
+def sync_attrs(fs, target_path, source_statx):
+    """
+    Set ownership, timestamps and mode of @target_path from @source_statx.
+    """
+    try:
+        fs.lchown(target_path, source_statx["uid"], source_statx["gid"])
+        fs.lutimes(target_path, (time.mktime(source_statx["atime"].timetuple()),
+                                 time.mktime(source_statx["mtime"].timetuple())))
+        fs.lchmod(target_path, source_statx["mode"])
+    except cephfs.Error as e:
+        log.warning("error synchronizing attrs for {0} ({1})".format(target_path, e))
+        raise e
+
 def get_ancestor_xattr(fs, path, attr):
     """
     Helper for reading layout information: if this xattr is missing
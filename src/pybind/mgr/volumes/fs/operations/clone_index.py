@@ -91,6 +91,30 @@ class CloneIndex(Index):
                       f'the exception - {e}')
             raise IndexException(-e.args[0], e.args[1])
 
+    def get_clone_entries(self, exclude=[]):
+        """
+        get all clone entries as (tracking id, sink path) tuples, oldest first.
+        """
+        try:
+            entries = []
+            exclude_tracking_ids = [v[0] for v in exclude]
+            for entry in list_one_entry_at_a_time(self.fs, self.path):
+                dname = entry.d_name
+                dpath = os.path.join(self.path, dname)
+                st = self.fs.lstat(dpath)
+                if dname not in exclude_tracking_ids and stat.S_ISLNK(st.st_mode):
+                    entries.append((st.st_ctime, dname, st.st_size))
+            entries.sort(key=lambda e: e[0])
+            clone_entries = []
+            for (_, dname, linklen) in entries:
+                sink_path = self.fs.readlink(os.path.join(self.path, dname), PATH_MAX)
+                clone_entries.append((dname, sink_path[:linklen]))
+            return clone_entries
+        except cephfs.Error as e:
+            log.debug('Exception cephfs.Error has been caught. Printing '
+                      f'the exception - {e}')
+            raise IndexException(-e.args[0], e.args[1])
+
     def find_clone_entry_index(self, sink_path):
         try:
             for entry in list_one_entry_at_a_time(self.fs, self.path):
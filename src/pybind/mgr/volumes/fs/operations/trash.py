@@ -1,6 +1,9 @@
 import os
+import time
 import uuid
 import logging
+import threading
+from collections import deque
 from contextlib import contextmanager
 
 import cephfs
@@ -10,6 +13,204 @@ from ..exception import VolumeException
 
 log = logging.getLogger(__name__)
 
+class _PurgeDir(object):
+    """
+    A directory being purged. `pending` counts its listing and the batches
+    of entries and subdirectories below it that are not removed yet.
+    """
+    def __init__(self, parent, path):
+        self.parent = parent
+        self.path = path
+        self.pending = 1
+
+class PurgeTree(object):
+    """
+    A directory tree being purged, possibly by several threads.
+
+    Directories to list and batches of entries to unlink are queued in a
+    deque: the thread owning the purge takes the most recent tasks (depth
+    first, like a recursive removal), other threads steal the oldest ones,
+    which usually are the largest subtrees. A directory is removed by the
+    thread completing the last task below it. The file system handle is the
+    one of the owner, which waits for the tasks of the other threads to
+    complete before returning, even when the purge is aborted.
+    """
+    # entries unlinked per task
+    UNLINK_BATCH = 1024
+    # beyond this many queued tasks, subdirectories are purged inline
+    MAX_QUEUED_TASKS = 4096
+    # minimum interval between two calls to `on_work`
+    WAKE_INTERVAL = 1.0
+
+    def __init__(self, fs, root_path, on_purged=None, on_work=None):
+        self.fs = fs
+        self.root_path = root_path
+        self.on_purged = on_purged
+        self.on_work = on_work
+        self.lock = threading.Lock()
+        self.cv = threading.Condition(self.lock)
+        self.tasks = deque([(_PurgeDir(None, root_path), None)])
+        self.busy = 0
+        self.done = False
+        self.aborted = False
+        self.error = None
+        self.last_wake = 0.0
+
+    def stealable(self):
+        with self.lock:
+            return bool(self.tasks) and not (self.done or self.aborted)
+
+    def purge(self, should_cancel):
+        """
+        purge the tree, with the help of the threads calling `work()`. return
+        once the tree is removed, or the purge is aborted, and no other thread
+        is processing a task.
+        """
+        self.work(should_cancel, owner=True)
+        if self.error is not None:
+            raise self.error
+
+    def work(self, should_cancel, owner=False):
+        """
+        process queued tasks until none is left. the owner of the purge also
+        waits for the tasks being processed by other threads.
+        """
+        while True:
+            with self.lock:
+                while True:
+                    if self.done or self.aborted:
+                        while owner and self.busy:
+                            self.cv.wait()
+                        return
+                    if self.tasks:
+                        task = self.tasks.pop() if owner else self.tasks.popleft()
+                        self.busy += 1
+                        break
+                    if not owner:
+                        return
+                    if not self.busy:
+                        # should not happen, do not wait forever
+                        log.warning("purge of {0} stalled".format(self.root_path))
+                        self.aborted = True
+                        return
+                    self.cv.wait()
+            try:
+                self._run(task, should_cancel)
+            except cephfs.Error as e:
+                self._abort(VolumeException(-e.args[0], e.args[1]))
+            except VolumeException as ve:
+                self._abort(ve)
+            finally:
+                with self.lock:
+                    self.busy -= 1
+                    self.cv.notify_all()
+
+    def _abort(self, error=None):
+        with self.lock:
+            if error is not None and self.error is None:
+                self.error = error
+            self.aborted = True
+            self.cv.notify_all()
+
+    def _queue(self, task):
+        pdir, names = task
+        with self.lock:
+            # the task holds a reference on the directory it belongs to
+            (pdir.parent if names is None else pdir).pending += 1
+            self.tasks.append(task)
+            now = time.monotonic()
+            wake = now - self.last_wake >= PurgeTree.WAKE_INTERVAL
+            if wake:
+                self.last_wake = now
+            self.cv.notify_all()
+        if wake and self.on_work:
+            self.on_work()
+
+    def _can_queue(self):
+        return len(self.tasks) < PurgeTree.MAX_QUEUED_TASKS
+
+    def _run(self, task, should_cancel):
+        pdir, names = task
+        if names is None:
+            if not self._rmtree(pdir, should_cancel):
+                return
+        elif not self._unlink(pdir, names, should_cancel):
+            return
+        self._put(pdir)
+
+    def _unlink(self, pdir, names, should_cancel):
+        for name in names:
+            if should_cancel() or self.aborted:
+                self._abort()
+                return False
+            try:
+                self.fs.unlink(os.path.join(pdir.path, name))
+            except cephfs.ObjectNotFound:
+                pass
+        self._purged(len(names))
+        return True
+
+    def _rmtree(self, pdir, should_cancel):
+        """
+        list a directory, queueing its subdirectories and batches of entries.
+        return False if the purge got aborted.
+        """
+        log.debug("rmtree {0}".format(pdir.path))
+        batch = []
+        try:
+            with self.fs.opendir(pdir.path) as dir_handle:
+                d = self.fs.readdir(dir_handle)
+                while d:
+                    if should_cancel() or self.aborted:
+                        self._abort()
+                        return False
+                    if d.d_name not in (b".", b".."):
+                        if d.is_dir():
+                            child = _PurgeDir(pdir, os.path.join(pdir.path, d.d_name))
+                            if self._can_queue():
+                                self._queue((child, None))
+                            else:
+                                with self.lock:
+                                    pdir.pending += 1
+                                if not self._rmtree(child, should_cancel):
+                                    return False
+                                self._put(child)
+                        else:
+                            batch.append(d.d_name)
+                            if len(batch) == PurgeTree.UNLINK_BATCH:
+                                if self._can_queue():
+                                    self._queue((pdir, batch))
+                                elif not self._unlink(pdir, batch, should_cancel):
+                                    return False
+                                batch = []
+                    d = self.fs.readdir(dir_handle)
+        except cephfs.ObjectNotFound:
+            return True
+        except cephfs.Error as e:
+            raise VolumeException(-e.args[0], e.args[1])
+        return self._unlink(pdir, batch, should_cancel)
+
+    def _put(self, pdir):
+        while pdir is not None:
+            with self.lock:
+                pdir.pending -= 1
+                if pdir.pending or self.aborted:
+                    return
+            try:
+                self.fs.rmdir(pdir.path)
+            except cephfs.ObjectNotFound:
+                pass
+            self._purged(1)
+            if pdir.parent is None:
+                with self.lock:
+                    self.done = True
+                    self.cv.notify_all()
+            pdir = pdir.parent
+
+    def _purged(self, count):
+        if count and self.on_purged:
+            self.on_purged(count)
+
 class Trash(GroupTemplate):
     GROUP_NAME = "_deleting"
 
@@ -51,41 +252,44 @@ class Trash(GroupTemplate):
         """
         return self._get_single_dir_entry(exclude_list)
 
-    def purge(self, trashpath, should_cancel):
+    def get_trash_entries(self, exclude_list):
+        """
+        get all trash entries excluding entries provided.
+
+        :praram exclude_list: entries to exclude
+        :return: list of trash entries
+        """
+        exclude_list = list(exclude_list) + [b".", b".."]
+        entries = []
+        try:
+            with self.fs.opendir(self.path) as d:
+                entry = self.fs.readdir(d)
+                while entry:
+                    if entry.d_name not in exclude_list:
+                        entries.append(entry.d_name)
+                    entry = self.fs.readdir(d)
+            return entries
+        except cephfs.Error as e:
+            raise VolumeException(-e.args[0], e.args[1])
+
+    def purge(self, trashpath, should_cancel, share=None, on_purged=None, on_work=None):
         """
         purge a trash entry.
 
         :praram trash_entry: the trash entry to purge
         :praram should_cancel: callback to check if the purge should be aborted
+        :param share: context manager factory making the `PurgeTree` available
+                      to other threads while it is purged
+        :param on_purged: callback invoked with the number of entries removed
+        :param on_work: callback invoked when tasks are queued for other threads
         :return: None
         """
-        def rmtree(root_path):
-            log.debug("rmtree {0}".format(root_path))
-            try:
-                with self.fs.opendir(root_path) as dir_handle:
-                    d = self.fs.readdir(dir_handle)
-                    while d and not should_cancel():
-                        if d.d_name not in (b".", b".."):
-                            d_full = os.path.join(root_path, d.d_name)
-                            if d.is_dir():
-                                rmtree(d_full)
-                            else:
-                                self.fs.unlink(d_full)
-                        d = self.fs.readdir(dir_handle)
-            except cephfs.ObjectNotFound:
-                return
-            except cephfs.Error as e:
-                raise VolumeException(-e.args[0], e.args[1])
-            # remove the directory only if we were not asked to cancel
-            # (else we would fail to remove this anyway)
-            if not should_cancel():
-                self.fs.rmdir(root_path)
-
-        # catch any unlink errors
-        try:
-            rmtree(trashpath)
-        except cephfs.Error as e:
-            raise VolumeException(-e.args[0], e.args[1])
+        tree = PurgeTree(self.fs, trashpath, on_purged=on_purged, on_work=on_work)
+        if share is None:
+            tree.purge(should_cancel)
+        else:
+            with share(tree):
+                tree.purge(should_cancel)
 
     def dump(self, path):
         """
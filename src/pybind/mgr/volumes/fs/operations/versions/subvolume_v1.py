@@ -141,6 +141,62 @@ class SubvolumeV1(SubvolumeBase, SubvolumeTemplate):
         if flush:
             self.metadata_mgr.flush()
 
+    @property
+    def clone_checkpoint_path(self):
+        return os.path.join(self.base_path, b".clone_checkpoint")
+
+    def get_clone_checkpoint(self):
+        """
+        return the copy progress persisted by an interrupted clone, or None.
+        """
+        fd = None
+        try:
+            fd = self.fs.open(self.clone_checkpoint_path, os.O_RDONLY)
+            data = b''
+            while True:
+                buf = self.fs.read(fd, len(data), 65536)
+                if not buf:
+                    break
+                data += buf
+            return json.loads(data)
+        except cephfs.ObjectNotFound:
+            return None
+        except cephfs.Error as e:
+            raise VolumeException(-e.args[0], e.args[1])
+        except ValueError:
+            log.warning("ignoring erroneous clone checkpoint for {0}".format(self.subvolname))
+            return None
+        finally:
+            if fd is not None:
+                self.fs.close(fd)
+
+    def set_clone_checkpoint(self, checkpoint):
+        """
+        persist the copy progress of the clone, replacing the previous one.
+        """
+        data = json.dumps(checkpoint).encode('utf-8')
+        tmp_path = self.clone_checkpoint_path + b'.tmp'
+        try:
+            fd = self.fs.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                written = 0
+                while written < len(data):
+                    written += self.fs.write(fd, data[written:], written)
+                self.fs.fsync(fd, 0)
+            finally:
+                self.fs.close(fd)
+            self.fs.rename(tmp_path, self.clone_checkpoint_path)
+        except cephfs.Error as e:
+            raise VolumeException(-e.args[0], e.args[1])
+
+    def remove_clone_checkpoint(self):
+        try:
+            self.fs.unlink(self.clone_checkpoint_path)
+        except cephfs.ObjectNotFound:
+            pass
+        except cephfs.Error as e:
+            raise VolumeException(-e.args[0], e.args[1])
+
     def add_clone_failure(self, errno, error_msg):
         try:
             self.metadata_mgr.add_section(MetadataManager.CLONE_FAILURE_SECTION)
@@ -898,6 +954,7 @@ class SubvolumeV1(SubvolumeBase, SubvolumeTemplate):
         except (IndexException, MetadataMgrException) as e:
             log.warning("error creating clone index: {0}".format(e))
             raise VolumeException(-errno.EINVAL, "error cloning subvolume")
+        return track_idx
 
     def detach_snapshot(self, snapname, track_id):
         try:
@@ -2,8 +2,13 @@ import errno
 import logging
 import os
 import stat
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 
 import cephfs
+from mgr_util import lock_timeout_log
 
 from .async_job import AsyncJobs
 from .exception import VolumeException
@@ -18,22 +23,22 @@ log = logging.getLogger(__name__)
 
 
 # helper for fetching a trash entry for a given volume
-def get_trash_entry_for_volume(fs_client, volspec, volname, running_jobs):
-    log.debug("fetching trash entry for volume '{0}'".format(volname))
+def get_trash_entries_for_volume(fs_client, volspec, volname, running_jobs):
+    log.debug("fetching trash entries for volume '{0}'".format(volname))
 
     try:
         with open_volume_lockless(fs_client, volname) as fs_handle:
             try:
                 with open_trashcan(fs_handle, volspec) as trashcan:
-                    path = trashcan.get_trash_entry(running_jobs)
-                    return 0, path
+                    entries = trashcan.get_trash_entries(running_jobs)
+                    return 0, entries
             except VolumeException as ve:
                 if ve.errno == -errno.ENOENT:
-                    return 0, None
+                    return 0, []
                 raise ve
     except VolumeException as ve:
-        log.error("error fetching trash entry for volume '{0}' ({1})".format(volname, ve))
-        return ve.errno, None
+        log.error("error fetching trash entries for volume '{0}' ({1})".format(volname, ve))
+        return ve.errno, []
 
 
 def subvolume_purge(fs_client, volspec, volname, trashcan, subvolume_trash_entry, should_cancel):
@@ -57,7 +62,8 @@ def subvolume_purge(fs_client, volspec, volname, trashcan, subvolume_trash_entry
 
 
 # helper for starting a purge operation on a trash entry
-def purge_trash_entry_for_volume(fs_client, volspec, volname, purge_entry, should_cancel):
+def purge_trash_entry_for_volume(fs_client, volspec, volname, purge_entry, should_cancel,
+                                 **purge_args):
     log.debug("purging trash entry '{0}' for volume '{1}'".format(purge_entry, volname))
 
     ret = 0
@@ -74,7 +80,7 @@ def purge_trash_entry_for_volume(fs_client, volspec, volname, purge_entry, shoul
                         log.debug("purging entry pointing to subvolume trash: {0}".format(tgt))
                         delink = True
                         try:
-                            trashcan.purge(tgt, should_cancel)
+                            trashcan.purge(tgt, should_cancel, **purge_args)
                         except VolumeException as ve:
                             if not ve.errno == -errno.ENOENT:
                                 delink = False
@@ -86,28 +92,183 @@ def purge_trash_entry_for_volume(fs_client, volspec, volname, purge_entry, shoul
                                 trashcan.delink(purge_entry)
                     else:
                         log.debug("purging entry pointing to trash: {0}".format(pth))
-                        trashcan.purge(pth, should_cancel)
+                        trashcan.purge(pth, should_cancel, **purge_args)
                 except cephfs.Error as e:
                     log.warn("failed to remove trash entry: {0}".format(e))
+                    if not e.args[0] == errno.ENOENT:
+                        ret = -e.args[0]
     except VolumeException as ve:
         ret = ve.errno
     return ret
 
 
+class PurgeStats(object):
+    """
+    Number of entries purged for a volume, and the rate at which they were
+    purged over the last `WINDOW` seconds.
+    """
+    WINDOW = 60
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.purged = 0
+        # (second, entries purged during that second)
+        self.samples = deque()  # type: deque
+
+    def add(self, count):
+        now = int(time.monotonic())
+        with self.lock:
+            self.purged += count
+            if self.samples and self.samples[-1][0] == now:
+                self.samples[-1][1] += count
+            else:
+                self.samples.append([now, count])
+            self._expire(now)
+
+    def _expire(self, now):
+        while self.samples and self.samples[0][0] <= now - PurgeStats.WINDOW:
+            self.samples.popleft()
+
+    def rate(self):
+        with self.lock:
+            self._expire(int(time.monotonic()))
+            return sum(count for _, count in self.samples) / PurgeStats.WINDOW
+
+
+class PurgeHelperJob(object):
+    """
+    Job helping another purge thread with its trash entry.
+    """
+    def __init__(self, tree):
+        self.tree = tree
+
+    def __repr__(self):
+        return "PurgeHelperJob({0})".format(self.tree.root_path)
+
+
 class ThreadPoolPurgeQueueMixin(AsyncJobs):
     """
     Purge queue mixin class maintaining a pool of threads for purging trash entries.
-    Subvolumes are chosen from volumes in a round robin fashion. If some of the purge
-    entries (belonging to a set of volumes) have huge directory tree's (such as, lots
-    of small files in a directory w/ deep directory trees), this model may lead to
-    _all_ threads purging entries for one volume (starving other volumes).
+    Subvolumes are chosen from volumes in a round robin fashion. Threads finding no
+    trash entry left to purge for a volume help purging the entries being purged by
+    other threads, stealing directories and batches of files from their trees (see
+    `PurgeTree`), so that a single huge entry is purged by all threads.
+
+    A trash entry that fails to purge is retried after `RETRY_DELAY` seconds,
+    doubling up to `MAX_RETRY_DELAY` seconds while it keeps failing.
     """
+
+    # not made configurable on purpose
+    RETRY_DELAY = 1
+    MAX_RETRY_DELAY = 300
+
     def __init__(self, volume_client, tp_size):
         self.vc = volume_client
+        # (volume, trash entry) => [failed attempts, time of next retry]. the
+        # time is None once the entry is handed out for the retry.
+        self.retries = {}  # type: dict
+        # volume => trees being purged, which other threads can help with
+        self.purge_trees = {}  # type: dict
+        # volume => PurgeStats
+        self.purge_stats = {}  # type: dict
         super(ThreadPoolPurgeQueueMixin, self).__init__(volume_client, "purgejob", tp_size)
 
-    def get_next_job(self, volname, running_jobs):
-        return get_trash_entry_for_volume(self.fs_client, self.vc.volspec, volname, running_jobs)
+    @contextmanager
+    def share_purge_tree(self, volname, tree):
+        with lock_timeout_log(self.lock):
+            self.purge_trees.setdefault(volname, []).append(tree)
+            self.cv.notifyAll()
+        try:
+            yield
+        finally:
+            with lock_timeout_log(self.lock):
+                self.purge_trees[volname].remove(tree)
+                if not self.purge_trees[volname]:
+                    del self.purge_trees[volname]
+
+    def wake_helpers(self):
+        with lock_timeout_log(self.lock):
+            self.cv.notifyAll()
+
+    def get_purge_stats(self, volname):
+        with lock_timeout_log(self.lock):
+            jobs = [j[0] for j in self.jobs.get(volname, [])]
+            stats = self.purge_stats.setdefault(volname, PurgeStats())
+        return {
+            'entries_purged': stats.purged,
+            'purge_rate': round(stats.rate(), 1),
+            'purge_jobs': len([j for j in jobs if not isinstance(j, PurgeHelperJob)]),
+            'purge_helpers': len([j for j in jobs if isinstance(j, PurgeHelperJob)]),
+        }
+
+    def get_pending_jobs(self, volname, running_jobs):
+        ret, entries = get_trash_entries_for_volume(self.fs_client, self.vc.volspec, volname,
+                                                    running_jobs)
+        if ret == -errno.ENOENT:
+            self._forget_retries(volname, [])
+        if ret != 0:
+            return ret, entries
+        self._forget_retries(volname, entries + list(running_jobs))
+        now = time.monotonic()
+        pending = []
+        for entry in entries:
+            retry = self.retries.get((volname, entry))
+            if retry and retry[1] is not None:
+                if retry[1] > now:
+                    # failed recently, picked up by `tick()` once due
+                    continue
+                retry[1] = None
+            pending.append(entry)
+        return 0, pending
+
+    def _forget_retries(self, volname, entries):
+        """
+        drop the retries of the entries of a volume that are not in @entries.
+        called under `self.lock`.
+        """
+        for key in [k for k in self.retries if k[0] == volname and k[1] not in entries]:
+            del self.retries[key]
+
+    def tick(self):
+        now = time.monotonic()
+        due = set(v for (v, _), (_, retry_at) in self.retries.items()
+                  if retry_at is not None and retry_at <= now)
+        for volname in due:
+            self._track_volume(volname)
+            self.needs_scan.add(volname)
+        if due:
+            self.cv.notifyAll()
+
+    def next_job(self, volname, running_jobs):
+        job = super(ThreadPoolPurgeQueueMixin, self).next_job(volname, running_jobs)
+        if job is None:
+            for tree in self.purge_trees.get(volname, []):
+                if tree.stealable():
+                    return PurgeHelperJob(tree)
+        return job
 
     def execute_job(self, volname, job, should_cancel):
-        purge_trash_entry_for_volume(self.fs_client, self.vc.volspec, volname, job, should_cancel)
+        if isinstance(job, PurgeHelperJob):
+            log.debug("helping purge of {0} for volume '{1}'".format(job.tree.root_path, volname))
+            job.tree.work(should_cancel)
+            return
+        with lock_timeout_log(self.lock):
+            stats = self.purge_stats.setdefault(volname, PurgeStats())
+        ret = purge_trash_entry_for_volume(self.fs_client, self.vc.volspec, volname, job,
+                                           should_cancel,
+                                           share=lambda tree: self.share_purge_tree(volname, tree),
+                                           on_purged=stats.add,
+                                           on_work=self.wake_helpers)
+        if ret == 0:
+            with lock_timeout_log(self.lock):
+                self.retries.pop((volname, job), None)
+        elif not should_cancel():
+            # the entry is left in the trash, retry it later rather than
+            # with the next scan so that an entry that keeps failing does
+            # not hammer the MDS
+            with lock_timeout_log(self.lock):
+                attempts = self.retries.get((volname, job), [0])[0] + 1
+                delay = min(self.RETRY_DELAY * 2 ** (attempts - 1), self.MAX_RETRY_DELAY)
+                self.retries[(volname, job)] = [attempts, time.monotonic() + delay]
+            log.warning("failed to purge trash entry '{0}' for volume '{1}' ({2}), "
+                        "will retry in {3}s".format(job, volname, ret, delay))
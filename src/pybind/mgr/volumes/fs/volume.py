@@ -189,6 +189,7 @@ class VolumeClient(CephfsClient["Module"]):
                 except cephfs.Error as e:
                     if e.args[0] == errno.ENOENT:
                         pass
+                vol_info_dict['purge_queue'] = self.purge_queue.get_purge_stats(volname)
                 df = self.mgr.get("df")
                 pool_stats = dict([(p['id'], p['stats']) for p in df['pools']])
                 osdmap = self.mgr.get("osd_map")
@@ -867,10 +868,10 @@ class VolumeClient(CephfsClient["Module"]):
         with open_subvol(self.mgr, fs_handle, self.volspec, t_group, t_subvolname, SubvolumeOpType.CLONE_INTERNAL) as t_subvolume:
             try:
                 if t_groupname == s_groupname and t_subvolname == s_subvolname:
-                    t_subvolume.attach_snapshot(s_snapname, t_subvolume)
+                    track_idx = t_subvolume.attach_snapshot(s_snapname, t_subvolume)
                 else:
-                    s_subvolume.attach_snapshot(s_snapname, t_subvolume)
-                self.cloner.queue_job(volname)
+                    track_idx = s_subvolume.attach_snapshot(s_snapname, t_subvolume)
+                self.cloner.queue_job(volname, (track_idx.encode('utf-8'), t_subvolume.base_path))
                 self.clone_progress_reporter.initiate_reporting()
             except VolumeException as ve:
                 try:
@@ -544,7 +544,31 @@ class Module(orchestrator.OrchestratorClientMixin, MgrModule):
             'snapshot_clone_no_wait',
             type='bool',
             default=True,
-            desc='Reject subvolume clone request when cloner threads are busy')
+            desc='Reject subvolume clone request when cloner threads are busy'),
+        Option(
+            'clone_copy_threads',
+            type='int',
+            default=4,
+            min=0,
+            desc='Number of threads copying data for each clone',
+            long_desc='Files are copied by this many threads while the source '
+                      'snapshot is walked by the cloner thread. 0 copies files '
+                      'from the cloner thread itself.'),
+        Option(
+            'clone_copy_chunk_size',
+            type='size',
+            default=64 * 1024 * 1024,
+            min=8 * 1024 * 1024,
+            desc='Files larger than this are copied in parallel chunks of this size'),
+        Option(
+            'clone_checkpoint_interval',
+            type='secs',
+            default=60,
+            min=0,
+            desc='Interval between checkpoints of the progress of a clone',
+            long_desc='A clone interrupted by a mgr failover resumes from its '
+                      'last checkpoint instead of copying everything again. '
+                      '0 disables checkpoints.')
     ]
 
     def __init__(self, *args, **kwargs):
@@ -554,6 +578,9 @@ class Module(orchestrator.OrchestratorClientMixin, MgrModule):
         self.snapshot_clone_delay = None
         self.periodic_async_work = False
         self.snapshot_clone_no_wait = None
+        self.clone_copy_threads = 4
+        self.clone_copy_chunk_size = 64 * 1024 * 1024
+        self.clone_checkpoint_interval = 60
         self.lock = threading.Lock()
         super(Module, self).__init__(*args, **kwargs)
         # Initialize config option members
@@ -0,0 +1,195 @@
+"""
+In-memory file system handle, for the tests and the benchmark of the volumes
+module.
+"""
+import datetime
+import errno
+import os
+import stat
+import threading
+import time
+from unittest import mock
+
+import cephfs
+
+from ..fs.copy_engine import IO_SIZE
+
+
+class CephFSError(Exception):
+    pass
+
+
+class ObjectNotFound(CephFSError):
+    pass
+
+
+def mock_cephfs():
+    """
+    patch what the volumes module uses of the cephfs binding, which is mocked
+    in unit test mode.
+    """
+    flags = ('CEPH_STATX_MODE', 'CEPH_STATX_UID', 'CEPH_STATX_GID',
+             'CEPH_STATX_ATIME', 'CEPH_STATX_MTIME', 'CEPH_STATX_SIZE')
+    return mock.patch.multiple(cephfs,
+                               Error=CephFSError,
+                               ObjectNotFound=ObjectNotFound,
+                               AT_SYMLINK_NOFOLLOW=0x100,
+                               **{name: 1 << bit for bit, name in enumerate(flags)})
+
+
+class Node(object):
+    def __init__(self, mode, size=0, target=b''):
+        now = datetime.datetime.now()
+        self.mode = mode
+        self.uid = self.gid = 0
+        self.atime = self.mtime = now
+        self.size = size
+        self.target = target
+        self.entries = []
+
+
+class DirEntry(object):
+    def __init__(self, d_name, mode):
+        self.d_name = d_name
+        self.mode = mode
+
+    def is_dir(self):
+        return stat.S_ISDIR(self.mode)
+
+
+class DirHandle(object):
+    def __init__(self, path, names):
+        self.path = path
+        self.names = iter([b'.', b'..'] + names)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class MemFs(object):
+    """
+    file system handle keeping sizes but not contents. every call sleeps for
+    @latency seconds, reads and writes additionally for the time it takes to
+    transfer the data at @bandwidth bytes/s. sleeping releases the GIL, as
+    calls into libcephfs do.
+    """
+    def __init__(self, latency, bandwidth):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.lock = threading.Lock()
+        self.nodes = {b'/': Node(stat.S_IFDIR | 0o755)}
+        self.fds = {}
+        self.next_fd = 0
+        self.zeros = bytes(IO_SIZE)
+
+    def wait(self, nbytes=0):
+        time.sleep(self.latency + nbytes / self.bandwidth)
+
+    def add(self, path, node):
+        with self.lock:
+            if path in self.nodes:
+                raise cephfs.Error(errno.EEXIST, os.strerror(errno.EEXIST))
+            self.nodes[path] = node
+            self.nodes[os.path.dirname(path)].entries.append(os.path.basename(path))
+
+    def remove(self, path, directory):
+        with self.lock:
+            node = self.lookup(path)
+            if stat.S_ISDIR(node.mode) != directory:
+                err = errno.ENOTDIR if directory else errno.EISDIR
+                raise cephfs.Error(err, os.strerror(err))
+            if node.entries:
+                raise cephfs.Error(errno.ENOTEMPTY, os.strerror(errno.ENOTEMPTY))
+            del self.nodes[path]
+            self.nodes[os.path.dirname(path)].entries.remove(os.path.basename(path))
+
+    def opendir(self, path):
+        self.wait()
+        return DirHandle(path, list(self.lookup(path).entries))
+
+    def readdir(self, handle):
+        name = next(handle.names, None)
+        if name is None:
+            return None
+        node = self.nodes.get(os.path.join(handle.path, name))
+        return DirEntry(name, node.mode if node is not None else stat.S_IFDIR)
+
+    def lookup(self, path):
+        try:
+            return self.nodes[path]
+        except KeyError:
+            raise cephfs.ObjectNotFound(errno.ENOENT, os.strerror(errno.ENOENT))
+
+    def statx(self, path, mask, flag):
+        self.wait()
+        node = self.lookup(path)
+        return {'mode': node.mode, 'uid': node.uid, 'gid': node.gid,
+                'atime': node.atime, 'mtime': node.mtime, 'size': node.size}
+
+    def mkdir(self, path, mode):
+        self.wait()
+        self.add(path, Node(stat.S_IFDIR | mode))
+
+    def rmdir(self, path):
+        self.wait()
+        self.remove(path, True)
+
+    def unlink(self, path):
+        self.wait()
+        self.remove(path, False)
+
+    def readlink(self, path, size):
+        self.wait()
+        return self.nodes[path].target
+
+    def symlink(self, target, path):
+        self.wait()
+        self.add(path, Node(stat.S_IFLNK | 0o777, len(target), target))
+
+    def open(self, path, flags, mode=0):
+        self.wait()
+        if flags & os.O_CREAT and path not in self.nodes:
+            self.add(path, Node(stat.S_IFREG | mode))
+        node = self.nodes[path]
+        if flags & os.O_TRUNC:
+            node.size = 0
+        with self.lock:
+            self.next_fd += 1
+            self.fds[self.next_fd] = node
+            return self.next_fd
+
+    def read(self, fd, offset, length):
+        node = self.fds[fd]
+        length = max(0, min(length, node.size - offset))
+        self.wait(length)
+        return self.zeros[:length]
+
+    def write(self, fd, buf, offset):
+        node = self.fds[fd]
+        self.wait(len(buf))
+        with self.lock:
+            node.size = max(node.size, offset + len(buf))
+        return len(buf)
+
+    def fsync(self, fd, syncdataonly):
+        self.wait()
+
+    def close(self, fd):
+        with self.lock:
+            del self.fds[fd]
+
+    def lchown(self, path, uid, gid):
+        self.wait()
+
+    def lutimes(self, path, times):
+        self.wait()
+        node = self.lookup(path)
+        node.atime, node.mtime = (datetime.datetime.fromtimestamp(t) for t in times)
+
+    def lchmod(self, path, mode):
+        self.wait()
+        node = self.lookup(path)
+        node.mode = stat.S_IFMT(node.mode) | stat.S_IMODE(mode)
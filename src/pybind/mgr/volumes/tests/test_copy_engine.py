@@ -0,0 +1,167 @@
+import errno
+import stat
+from unittest import mock
+
+import cephfs
+import pytest
+
+from ..fs import copy_engine
+from ..fs.copy_engine import ParallelCopier
+from ..fs.exception import VolumeException
+from .memfs import MemFs, Node, mock_cephfs
+
+IO_SIZE = 4096
+CHUNK_SIZE = 4 * IO_SIZE
+
+
+class DataFs(MemFs):
+    """
+    MemFs keeping the contents of the files, and which of it is durable:
+    data written since the last fsync of a file is lost by `failover()`.
+    """
+    def __init__(self):
+        super(DataFs, self).__init__(0, float('inf'))
+        self.data = {}
+        self.synced = {}
+
+    def create(self, path, data):
+        self.add(path, Node(stat.S_IFREG | 0o644, len(data)))
+        self.data[path] = bytearray(data)
+        self.synced[path] = bytes(data)
+
+    def path_of(self, fd):
+        node = self.fds[fd]
+        return next(p for p, n in self.nodes.items() if n is node)
+
+    def open(self, path, flags, mode=0):
+        fd = super(DataFs, self).open(path, flags, mode)
+        data = self.data.setdefault(path, bytearray())
+        self.synced.setdefault(path, b'')
+        if flags & copy_engine.os.O_TRUNC:
+            del data[:]
+        return fd
+
+    def read(self, fd, offset, length):
+        return bytes(self.data[self.path_of(fd)][offset:offset + length])
+
+    def write(self, fd, buf, offset):
+        data = self.data[self.path_of(fd)]
+        # chunks of a file are written concurrently
+        with self.lock:
+            if len(data) < offset:
+                data.extend(bytes(offset - len(data)))
+            data[offset:offset + len(buf)] = buf
+            self.fds[fd].size = len(data)
+        return len(buf)
+
+    def fsync(self, fd, syncdataonly):
+        path = self.path_of(fd)
+        self.synced[path] = bytes(self.data[path])
+
+    def failover(self):
+        for path, data in self.synced.items():
+            self.data[path] = bytearray(data)
+            self.nodes[path].size = len(data)
+
+
+@pytest.fixture(autouse=True)
+def small_io():
+    with mock_cephfs(), mock.patch.object(copy_engine, 'IO_SIZE', IO_SIZE):
+        yield
+
+
+@pytest.fixture
+def fs():
+    fs = DataFs()
+    fs.mkdir(b'/src', 0o755)
+    fs.mkdir(b'/dst', 0o755)
+    fs.create(b'/src/large', bytes(range(256)) * (4 * CHUNK_SIZE // 256))
+    return fs
+
+
+def test_copy(fs):
+    copier = ParallelCopier(fs, lambda: False, 2, CHUNK_SIZE)
+    copier.copy(b'/src', b'/dst')
+    assert fs.data[b'/dst/large'] == fs.data[b'/src/large']
+    assert copier.stats.files == 1
+
+
+@pytest.mark.parametrize('nr_threads', [0, 4])
+def test_copy_tree(fs, nr_threads):
+    fs.mkdir(b'/src/a', 0o750)
+    fs.mkdir(b'/src/a/b', 0o700)
+    for i in range(10):
+        fs.create(b'/src/a/small.%d' % i, b'%d' % i * 100)
+    fs.create(b'/src/a/b/odd', bytes(range(7)) * (CHUNK_SIZE // 3))
+    fs.symlink(b'../large', b'/src/a/link')
+    copier = ParallelCopier(fs, lambda: False, nr_threads, CHUNK_SIZE)
+    copier.copy(b'/src', b'/dst')
+
+    for path in fs.data:
+        if path.startswith(b'/src/'):
+            assert fs.data[b'/dst' + path[4:]] == fs.data[path]
+    assert fs.nodes[b'/dst/a/link'].target == b'../large'
+    assert stat.S_IMODE(fs.nodes[b'/dst/a'].mode) == 0o750
+    assert stat.S_IMODE(fs.nodes[b'/dst/a/b'].mode) == 0o700
+    assert (copier.stats.dirs, copier.stats.symlinks, copier.stats.files) == (2, 1, 12)
+    assert copier.stats.bytes == sum(len(data) for path, data in fs.data.items()
+                                     if path.startswith(b'/src/'))
+
+
+def test_cancel(fs):
+    writes = [0]
+    orig_write = fs.write
+
+    def write(fd, buf, offset):
+        writes[0] += 1
+        return orig_write(fd, buf, offset)
+
+    fs.write = write
+    copier = ParallelCopier(fs, lambda: writes[0] >= 3, 2, CHUNK_SIZE)
+    with pytest.raises(VolumeException) as e:
+        copier.copy(b'/src', b'/dst')
+    assert e.value.errno == -errno.EINTR
+    assert copier.stats.files == 0
+    assert writes[0] < len(fs.data[b'/src/large']) // IO_SIZE
+
+
+def test_error_stops_copy(fs):
+    def read(fd, offset, length):
+        raise cephfs.Error(errno.EIO, 'I/O error')
+
+    fs.read = read
+    copier = ParallelCopier(fs, lambda: False, 2, CHUNK_SIZE)
+    with pytest.raises(VolumeException) as e:
+        copier.copy(b'/src', b'/dst')
+    assert e.value.errno == -errno.EIO
+    assert copier.stats.files == 0
+
+
+def test_resume_from_checkpoint_taken_mid_file(fs):
+    checkpoints = []
+    writes = [0]
+    orig_write = fs.write
+
+    def write(fd, buf, offset):
+        writes[0] += 1
+        return orig_write(fd, buf, offset)
+
+    # cancel the copy once the first two chunks of the file are written
+    fs.write = write
+    copier = ParallelCopier(fs, lambda: writes[0] >= 2 * CHUNK_SIZE // IO_SIZE,
+                            0, CHUNK_SIZE, checkpoint=checkpoints.append,
+                            checkpoint_interval=1e-9)
+    with pytest.raises(VolumeException) as e:
+        copier.copy(b'/src', b'/dst')
+    assert e.value.errno == -errno.EINTR
+    assert checkpoints[-1]['files'] == {'large': {'chunk_size': CHUNK_SIZE,
+                                                  'chunks': [0, 1]}}
+
+    # data not synced before the failover is lost, the checkpointed chunks
+    # must not be
+    fs.failover()
+    copier = ParallelCopier(fs, lambda: False, 0, CHUNK_SIZE,
+                            resume_from=checkpoints[-1])
+    copier.copy(b'/src', b'/dst')
+    assert fs.data[b'/dst/large'] == fs.data[b'/src/large']
+    assert copier.stats.bytes == 2 * CHUNK_SIZE
@@ -0,0 +1,92 @@
+import errno
+import threading
+from collections import deque
+from unittest import mock
+
+import pytest
+
+from ..fs import purge_queue
+from ..fs.purge_queue import ThreadPoolPurgeQueueMixin
+
+
+@pytest.fixture
+def queue():
+    # skip starting the threads, only the job bookkeeping is needed
+    q = ThreadPoolPurgeQueueMixin.__new__(ThreadPoolPurgeQueueMixin)
+    q.vc = mock.Mock()
+    q.fs_client = mock.Mock()
+    q.lock = threading.Lock()
+    q.cv = threading.Condition(q.lock)
+    q.purge_trees = {}
+    q.purge_stats = {}
+    q.retries = {}
+    q.q = deque()
+    q.jobs = {}
+    q.pending_jobs = {}
+    q.needs_scan = set()
+    return q
+
+
+def purge(queue, ret, entry='entry'):
+    with mock.patch.object(purge_queue, 'purge_trash_entry_for_volume',
+                           return_value=ret):
+        queue.execute_job('vol', entry, should_cancel=lambda: False)
+
+
+def tick(queue):
+    with queue.lock:
+        queue.tick()
+
+
+def scan(queue, entries):
+    with mock.patch.object(purge_queue, 'get_trash_entries_for_volume',
+                           return_value=(0, entries)):
+        return queue.get_pending_jobs('vol', [])
+
+
+def test_failed_purge_is_retried_with_backoff(queue):
+    now = 1000.0
+    with mock.patch.object(purge_queue.time, 'monotonic', side_effect=lambda: now):
+        purge(queue, -errno.EIO)
+        assert queue.retries[('vol', 'entry')] == [1, now + 1]
+        # not handed out again before the delay is over, other entries are
+        assert scan(queue, ['entry', 'other']) == (0, ['other'])
+        tick(queue)
+        assert not queue.needs_scan
+
+        now += 1
+        tick(queue)
+        assert 'vol' in queue.needs_scan and 'vol' in queue.q
+        assert scan(queue, ['entry', 'other']) == (0, ['entry', 'other'])
+        queue.needs_scan.clear()
+        # handed out once, not rescanned until it failed again
+        tick(queue)
+        assert not queue.needs_scan
+
+        # the delay doubles while the entry keeps failing, up to a limit
+        for attempt in range(2, 12):
+            purge(queue, -errno.EIO)
+            delay = min(2 ** (attempt - 1), ThreadPoolPurgeQueueMixin.MAX_RETRY_DELAY)
+            assert queue.retries[('vol', 'entry')] == [attempt, now + delay]
+        assert delay == ThreadPoolPurgeQueueMixin.MAX_RETRY_DELAY
+
+        purge(queue, 0)
+        assert not queue.retries
+
+
+def test_retries_of_gone_entries_are_dropped(queue):
+    purge(queue, -errno.EIO)
+    purge(queue, -errno.EIO, entry='other')
+    assert scan(queue, ['other']) == (0, [])
+    assert list(queue.retries) == [('vol', 'other')]
+    with mock.patch.object(purge_queue, 'get_trash_entries_for_volume',
+                           return_value=(-errno.ENOENT, [])):
+        queue.get_pending_jobs('vol', [])
+    assert not queue.retries
+
+
+def test_canceled_purge_is_not_retried(queue):
+    with mock.patch.object(purge_queue, 'purge_trash_entry_for_volume',
+                           return_value=-errno.EINTR):
+        queue.execute_job('vol', 'entry', should_cancel=lambda: True)
+    assert not queue.retries
@@ -0,0 +1,121 @@
+import stat
+import threading
+from unittest import mock
+
+import pytest
+
+from ..fs.operations.trash import PurgeTree
+from .memfs import MemFs, Node, mock_cephfs
+
+
+@pytest.fixture(autouse=True)
+def small_batches():
+    with mock_cephfs(), mock.patch.object(PurgeTree, 'UNLINK_BATCH', 4):
+        yield
+
+
+@pytest.fixture
+def fs():
+    fs = MemFs(0, float('inf'))
+    fs.mkdir(b'/trash', 0o755)
+    for d in range(4):
+        dir_path = b'/trash/dir.%d' % d
+        fs.mkdir(dir_path, 0o755)
+        fs.mkdir(dir_path + b'/sub', 0o755)
+        for f in range(10):
+            fs.add(b'%s/file.%d' % (dir_path, f), Node(stat.S_IFREG | 0o644))
+            fs.add(b'%s/sub/file.%d' % (dir_path, f), Node(stat.S_IFREG | 0o644))
+    for f in range(10):
+        fs.add(b'/trash/file.%d' % f, Node(stat.S_IFREG | 0o644))
+    return fs
+
+
+def helper(tree, should_cancel=lambda: False):
+    """
+    a purge thread helping with @tree until it is purged, as
+    `PurgeHelperJob`s would.
+    """
+    def run():
+        while not (tree.done or tree.aborted):
+            if tree.stealable():
+                tree.work(should_cancel)
+            else:
+                with tree.lock:
+                    tree.cv.wait(0.01)
+    thread = threading.Thread(target=run, name='helper')
+    thread.start()
+    return thread
+
+
+def test_purge(fs):
+    purged = []
+    nodes = len(fs.nodes) - 1
+    tree = PurgeTree(fs, b'/trash', on_purged=purged.append)
+    tree.purge(lambda: False)
+    assert list(fs.nodes) == [b'/']
+    assert sum(purged) == nodes
+
+
+def test_helpers_steal_tasks(fs):
+    nodes = len(fs.nodes) - 1
+    unlinked_by = {}
+    helped = threading.Event()
+    orig_unlink = fs.unlink
+
+    def unlink(path):
+        name = threading.current_thread().name
+        if name == 'helper':
+            helped.set()
+        else:
+            # leave the queued tasks to the helper for a while
+            helped.wait(5)
+        unlinked_by[path] = name
+        orig_unlink(path)
+
+    fs.unlink = unlink
+    purged = []
+    tree = PurgeTree(fs, b'/trash', on_purged=purged.append)
+    thread = helper(tree)
+    tree.purge(lambda: False)
+    thread.join(5)
+    assert not thread.is_alive()
+    assert list(fs.nodes) == [b'/']
+    assert sum(purged) == nodes
+    assert set(unlinked_by.values()) == {'helper', threading.current_thread().name}
+
+
+def test_cancel_waits_for_helpers(fs):
+    in_helper = threading.Event()
+    release = threading.Event()
+    orig_unlink = fs.unlink
+    helper_calls = []
+
+    def unlink(path):
+        if threading.current_thread().name == 'helper':
+            helper_calls.append(path)
+            in_helper.set()
+            release.wait(5)
+            helper_calls.remove(path)
+        else:
+            in_helper.wait(5)
+        orig_unlink(path)
+
+    fs.unlink = unlink
+    tree = PurgeTree(fs, b'/trash')
+    thread = helper(tree)
+    owner = threading.Thread(target=tree.purge, args=(in_helper.is_set,))
+    owner.start()
+    # the owner is cancelled while the helper is unlinking with its handle
+    assert in_helper.wait(5)
+    owner.join(0.1)
+    assert owner.is_alive()
+    release.set()
+    owner.join(5)
+    assert not owner.is_alive()
+    assert tree.aborted
+    assert tree.busy == 0
+    assert helper_calls == []
+    thread.join(5)
+    assert not thread.is_alive()
+    # the helper stopped at the abort of the purge
+    assert b'/trash' in fs.nodes
@@ -55,6 +55,7 @@ cdef extern from "rados/librados.h" nogil:
     ctypedef void* rados_xattrs_iter_t
     ctypedef void* rados_omap_iter_t
     ctypedef void* rados_list_ctx_t
+    ctypedef void* rados_object_list_cursor
     ctypedef uint64_t rados_snap_t
     ctypedef void *rados_write_op_t
     ctypedef void *rados_read_op_t
@@ -70,6 +71,14 @@ cdef extern from "rados/librados.h" nogil:
     ctypedef void (*rados_watcherrcb_t)(void *pre, uint64_t cookie, int err)
 
 
+    ctypedef struct rados_object_list_item:
+        size_t oid_length
+        char *oid
+        size_t nspace_length
+        char *nspace
+        size_t locator_length
+        char *locator
+
     cdef struct rados_cluster_stat_t:
         uint64_t kb
         uint64_t kb_used
@@ -207,6 +216,15 @@ cdef extern from "rados/librados.h" nogil:
                                   size_t *nspace)
     void rados_nobjects_list_close(rados_list_ctx_t ctx)
 
+    rados_object_list_cursor rados_object_list_begin(rados_ioctx_t io)
+    rados_object_list_cursor rados_object_list_end(rados_ioctx_t io)
+    int rados_object_list_is_end(rados_ioctx_t io, rados_object_list_cursor cur)
+    void rados_object_list_cursor_free(rados_ioctx_t io, rados_object_list_cursor cur)
+    int rados_object_list(rados_ioctx_t io, const rados_object_list_cursor start, const rados_object_list_cursor finish,
+                          const size_t result_size, const char *filter_buf, const size_t filter_buf_len,
+                          rados_object_list_item *results, rados_object_list_cursor *next)
+    void rados_object_list_free(const size_t result_size, rados_object_list_item *results)
+
     int rados_ioctx_pool_requires_alignment2(rados_ioctx_t io, int * requires)
     int rados_ioctx_pool_required_alignment2(rados_ioctx_t io, uint64_t * alignment)
 
@@ -263,6 +281,7 @@ cdef extern from "rados/librados.h" nogil:
     int rados_aio_wait_for_complete_and_cb(rados_completion_t c)
     int rados_aio_wait_for_complete(rados_completion_t c)
     int rados_aio_is_complete(rados_completion_t c)
+    int rados_aio_cancel(rados_ioctx_t io, rados_completion_t completion)
 
     int rados_exec(rados_ioctx_t io, const char * oid, const char * cls, const char * method,
                    const char * in_buf, size_t in_len, char * buf, size_t out_len)
@@ -299,6 +318,8 @@ cdef extern from "rados/librados.h" nogil:
     int rados_read_op_operate(rados_read_op_t read_op, rados_ioctx_t io, const char * oid, int flags)
     int rados_aio_read_op_operate(rados_read_op_t read_op, rados_ioctx_t io, rados_completion_t completion, const char *oid, int flags)
     void rados_read_op_set_flags(rados_read_op_t read_op, int flags)
+    void rados_read_op_stat(rados_read_op_t read_op, uint64_t *psize, time_t *pmtime, int *prval)
+    void rados_read_op_read(rados_read_op_t read_op, uint64_t offset, size_t len, char *buffer, size_t *bytes_read, int *prval)
     int rados_omap_get_next(rados_omap_iter_t iter, const char * const* key, const char * const* val, size_t * len)
     void rados_omap_get_end(rados_omap_iter_t iter)
     int rados_notify2(rados_ioctx_t io, const char * o, const char *buf, int buf_len, uint64_t timeout_ms, char **reply_buffer, size_t *reply_buffer_len)
@@ -43,3 +43,8 @@ cdef class Ioctx(object):
         public object safe_completions
         public object complete_completions
         public object lock
+
+        # limits the number of *_async() operations in flight, the
+        # semaphores enforcing it are created per event loop
+        public object async_max_in_flight
+        object async_semaphores
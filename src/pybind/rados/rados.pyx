@@ -14,6 +14,8 @@ method.
 # Copyright 2016 Mehdi Abaakouk <sileht@redhat.com>
 
 from cpython cimport PyObject, ref
+from cpython.buffer cimport PyObject_GetBuffer, PyBuffer_Release, \
+    PyBUF_SIMPLE, PyBUF_WRITABLE
 from cpython.pycapsule cimport *
 from libc cimport errno
 from libc.stdint cimport *
@@ -23,13 +25,15 @@ IF BUILD_DOC:
 ELSE:
     from c_rados cimport *
 
+import asyncio
 import threading
 import time
+import weakref
 
 from datetime import datetime, timedelta
 from functools import partial, wraps
 from itertools import chain
-from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 cdef extern from "Python.h":
     # These are in cpython/string.pxd, but use "object" types instead of
@@ -77,6 +81,7 @@ ANONYMOUS_AUID = 0xffffffffffffffff
 ADMIN_AUID = 0
 
 OMAP_KEY_TYPE = Union[str,bytes]
+BUFFER_TYPE = Union[bytes, bytearray, memoryview]
 
 class Error(Exception):
     """ `Error` class, derived from `Exception` """
@@ -361,6 +366,35 @@ cdef char ** to_bytes_array(list_bytes):
         ret[i] = <char *>list_bytes[i]
     return ret
 
+
+cdef class _Buffer(object):
+    """
+    A contiguous buffer exported by any object supporting the buffer
+    protocol, e.g. bytes, bytearray, memoryview, mmap or numpy arrays.
+
+    The memory is borrowed from the exporter, not copied, and stays pinned
+    until this object is released.
+    """
+
+    cdef:
+        Py_buffer view
+        bint acquired
+        char *ptr
+        size_t length
+
+    def __cinit__(self, obj, bint writable=False):
+        PyObject_GetBuffer(obj, &self.view,
+                           PyBUF_WRITABLE if writable else PyBUF_SIMPLE)
+        self.acquired = True
+        self.ptr = <char *>self.view.buf
+        self.length = self.view.len
+
+    def __dealloc__(self):
+        if self.acquired:
+            PyBuffer_Release(&self.view)
+            self.acquired = False
+
+
 cdef int __monitor_callback(void *arg, const char *line, const char *who,
                              uint64_t sec, uint64_t nsec, uint64_t seq,
                              const char *level, const char *msg) with gil:
@@ -1459,6 +1493,222 @@ cdef class ObjectIterator(object):
             rados_nobjects_list_close(self.ctx)
 
 
+cdef class ObjectPageIterator(object):
+    """
+    rados.Ioctx object iterator returning the objects in pages
+
+    Each page is a list of (key, locator, nspace) tuples, or of keys only
+    if names_only is set. The next page is fetched in the background while
+    the current one is consumed, so at most two pages are held in memory.
+    """
+
+    cdef:
+        rados_object_list_cursor cursor
+        rados_object_list_cursor next_cursor
+        rados_object_list_cursor end
+        rados_object_list_item *items
+        size_t page_size
+        bint names_only
+        bint at_end
+        object prefetch
+        object page
+
+    cdef public object ioctx
+
+    def __cinit__(self, Ioctx ioctx, size_t page_size=1000,
+                  bint names_only=False):
+        self.ioctx = ioctx
+        if page_size < 1:
+            raise InvalidArgumentError('page_size must be positive')
+        self.page_size = page_size
+        self.names_only = names_only
+        self.items = <rados_object_list_item *>malloc(
+            page_size * sizeof(rados_object_list_item))
+        if self.items == NULL:
+            raise MemoryError("malloc failed")
+
+        with nogil:
+            self.cursor = rados_object_list_begin(ioctx.io)
+            self.next_cursor = rados_object_list_begin(ioctx.io)
+            self.end = rados_object_list_end(ioctx.io)
+        if self.cursor == NULL or self.next_cursor == NULL or self.end == NULL:
+            raise make_ex(-errno.ENOENT,
+                          "error iterating over the objects in ioctx '%s'"
+                          % ioctx.name)
+        self.__prefetch()
+
+    def __prefetch(self):
+        # the thread references self, which keeps the cursors alive
+        self.prefetch = threading.Thread(target=self._fetch, daemon=True)
+        self.prefetch.start()
+
+    def _fetch(self):
+        cdef:
+            Ioctx ioctx = self.ioctx
+            rados_object_list_cursor cursor
+            rados_object_list_item *item
+            int i, ret
+
+        try:
+            with nogil:
+                ret = rados_object_list(ioctx.io, self.cursor, self.end,
+                                        self.page_size, NULL, 0, self.items,
+                                        &self.next_cursor)
+            if ret < 0:
+                raise make_ex(ret, "error iterating over the objects in ioctx '%s'"
+                              % ioctx.name)
+            try:
+                page = []
+                for i in range(ret):
+                    item = &self.items[i]
+                    key = decode_cstr(item.oid[:item.oid_length])
+                    if self.names_only:
+                        page.append(key)
+                        continue
+                    locator = None
+                    if item.locator_length:
+                        locator = decode_cstr(item.locator[:item.locator_length])
+                    nspace = decode_cstr(item.nspace[:item.nspace_length])
+                    page.append((key, locator, nspace))
+            finally:
+                rados_object_list_free(ret, self.items)
+            cursor = self.cursor
+            self.cursor = self.next_cursor
+            self.next_cursor = cursor
+            self.at_end = rados_object_list_is_end(ioctx.io, self.cursor) == 1
+            self.page = page
+        except Exception as e:
+            self.at_end = True
+            self.page = e
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> List:
+        """
+        Get the next page of objects in the pool
+
+        :raises: StopIteration
+        :returns: next page of objects
+        """
+        while True:
+            if self.prefetch is None:
+                raise StopIteration()
+            self.prefetch.join()
+            self.prefetch = None
+            page = self.page
+            self.page = None
+            if isinstance(page, Exception):
+                raise page
+            if not self.at_end:
+                self.__prefetch()
+            if page:
+                return page
+
+    def __dealloc__(self):
+        cdef Ioctx ioctx = self.ioctx
+        if ioctx is not None:
+            with nogil:
+                if self.cursor != NULL:
+                    rados_object_list_cursor_free(ioctx.io, self.cursor)
+                if self.next_cursor != NULL:
+                    rados_object_list_cursor_free(ioctx.io, self.next_cursor)
+                if self.end != NULL:
+                    rados_object_list_cursor_free(ioctx.io, self.end)
+        free(self.items)
+
+
+cdef class OmapPage(object):
+    """
+    One page of the omap values of an object, read in the background
+
+    The read starts when the page is created, wait() returns its values.
+    """
+
+    cdef:
+        object read_op
+        object completion
+        rados_omap_iter_t iter
+        unsigned char more
+        int prval
+        bint done
+
+    cdef public object omap_key_type
+
+    def __cinit__(self, Ioctx ioctx, oid, start_after, filter_prefix,
+                  max_return, omap_key_type):
+        self.omap_key_type = omap_key_type
+        start_after_raw = cstr(start_after, 'start_after') if start_after else None
+        filter_prefix_raw = cstr(filter_prefix, 'filter_prefix') if filter_prefix else None
+        cdef:
+            char *_start_after = opt_str(start_after_raw)
+            char *_filter_prefix = opt_str(filter_prefix_raw)
+            uint64_t _max_return = max_return
+            ReadOp _read_op = ReadOp().create()
+
+        self.read_op = _read_op
+        with nogil:
+            rados_read_op_omap_get_vals2(_read_op.read_op, _start_after,
+                                         _filter_prefix, _max_return,
+                                         &self.iter, &self.more, &self.prval)
+        try:
+            self.completion = ioctx.operate_aio_read_op(_read_op, oid)
+        except Exception:
+            self.done = True
+            _read_op.release()
+            raise
+
+    cdef finish(self):
+        cdef:
+            ReadOp _read_op = self.read_op
+            Completion completion = self.completion
+        if self.done or completion is None:
+            return
+        with nogil:
+            rados_aio_wait_for_complete(completion.rados_comp)
+            rados_release_read_op(_read_op.read_op)
+        self.done = True
+
+    def wait(self) -> Tuple[List[Tuple[Any, bytes]], Optional[bytes], bool]:
+        """
+        Wait for the page to be read
+
+        :raises: :class:`Error`
+        :returns: the (key, value) pairs of the page, the last key as read
+            from the object and whether more keys follow
+        """
+        cdef:
+            char *key_ = NULL
+            char *val_ = NULL
+            size_t len_
+
+        self.finish()
+        ret = self.completion.get_return_value()
+        if ret < 0:
+            raise make_ex(ret, "error reading the omap")
+
+        page = []
+        last_key = None
+        while True:
+            ret = rados_omap_get_next(self.iter, &key_, &val_, &len_)
+            if ret != 0:
+                raise make_ex(ret, "error iterating over the omap")
+            if key_ == NULL:
+                break
+            last_key = key_
+            val = None
+            if val_ != NULL:
+                val = val_[:len_]
+            page.append((self.omap_key_type(last_key), val))
+        return page, last_key, bool(self.more)
+
+    def __dealloc__(self):
+        self.finish()
+        if self.iter != NULL:
+            with nogil:
+                rados_omap_get_end(self.iter)
+
+
 cdef class XattrIterator(object):
     """Extended attribute iterator"""
 
@@ -1625,6 +1875,7 @@ cdef class Completion(object):
          rados_callback_t safe_cb
          rados_completion_t rados_comp
          PyObject* buf
+         _Buffer user_buf
 
     def __cinit__(self, Ioctx ioctx, object oncomplete, object onsafe):
         self.oncomplete = oncomplete
@@ -1701,6 +1952,20 @@ cdef class Completion(object):
             ret = rados_aio_get_return_value(self.rados_comp)
         return ret
 
+    def cancel(self):
+        """
+        Cancel an asynchronous operation
+
+        The operation completes with -ECANCELED, unless it already
+        completed, and its callbacks are still called.
+
+        :raises: :class:`Error`
+        """
+        with nogil:
+            ret = rados_aio_cancel(self.ioctx.io, self.rados_comp)
+        if ret < 0:
+            raise make_ex(ret, "error cancelling completion")
+
     def __dealloc__(self):
         """
         Release a completion
@@ -1805,42 +2070,45 @@ cdef class WriteOp(object):
         with nogil:
             rados_write_op_rmxattr(self.write_op, _xattr_name)
 
-    def append(self, to_write: bytes):
+    def append(self, to_write: BUFFER_TYPE):
         """
         Append data to an object synchronously
-        :param to_write: data to write
+        :param to_write: data to write, any contiguous buffer
         """
 
         cdef:
-            char *_to_write = to_write
-            size_t length = len(to_write)
+            _Buffer buf = _Buffer(to_write)
+            char *_to_write = buf.ptr
+            size_t length = buf.length
 
         with nogil:
             rados_write_op_append(self.write_op, _to_write, length)
 
-    def write_full(self, to_write: bytes):
+    def write_full(self, to_write: BUFFER_TYPE):
         """
         Write whole object, atomically replacing it.
-        :param to_write: data to write
+        :param to_write: data to write, any contiguous buffer
         """
 
         cdef:
-            char *_to_write = to_write
-            size_t length = len(to_write)
+            _Buffer buf = _Buffer(to_write)
+            char *_to_write = buf.ptr
+            size_t length = buf.length
 
         with nogil:
             rados_write_op_write_full(self.write_op, _to_write, length)
 
-    def write(self, to_write: bytes, offset: int = 0):
+    def write(self, to_write: BUFFER_TYPE, offset: int = 0):
         """
         Write to offset.
-        :param to_write: data to write
+        :param to_write: data to write, any contiguous buffer
         :param offset: byte offset in the object to begin writing at
         """
 
         cdef:
-            char *_to_write = to_write
-            size_t length = len(to_write)
+            _Buffer buf = _Buffer(to_write)
+            char *_to_write = buf.ptr
+            size_t length = buf.length
             uint64_t _offset = offset
 
         with nogil:
@@ -1954,17 +2222,95 @@ class WriteOpCtx(WriteOp, OpCtx):
     """write operation context manager"""
 
 
+cdef class ReadOpStat(object):
+    """
+    Size and mtime of an object, as returned by :meth:`ReadOp.stat`
+
+    Only valid once the read operation completed.
+    """
+
+    cdef:
+        uint64_t _size
+        time_t _mtime
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def mtime(self) -> time.struct_time:
+        return time.localtime(self._mtime)
+
+
+cdef class ReadOpData(object):
+    """
+    Data read from an object, as returned by :meth:`ReadOp.read`
+
+    Only valid once the read operation completed.
+    """
+
+    cdef:
+        char *buf
+        size_t length
+        size_t bytes_read
+
+    def __cinit__(self, size_t length):
+        self.buf = <char *>malloc(length if length > 0 else 1)
+        if self.buf == NULL:
+            raise MemoryError("malloc failed")
+        self.length = length
+
+    def __dealloc__(self):
+        free(self.buf)
+
+    @property
+    def data(self) -> bytes:
+        return self.buf[:min(self.bytes_read, self.length)]
+
+
 cdef class ReadOp(object):
-    cdef rados_read_op_t read_op
+    cdef:
+        rados_read_op_t read_op
+        # outputs librados fills in, kept alive until the op is released
+        list outputs
 
     def create(self):
         with nogil:
             self.read_op = rados_create_read_op()
+        self.outputs = []
         return self
 
     def release(self):
         with nogil:
             rados_release_read_op(self.read_op)
+        self.outputs = []
+
+    def stat(self) -> ReadOpStat:
+        """
+        Get the size and mtime of the object
+        :returns: the stats, filled in once the operation completed
+        """
+        cdef ReadOpStat stat = ReadOpStat()
+        self.outputs.append(stat)
+        with nogil:
+            rados_read_op_stat(self.read_op, &stat._size, &stat._mtime, NULL)
+        return stat
+
+    def read(self, length: int = 8192, offset: int = 0) -> ReadOpData:
+        """
+        Read data from the object
+        :param length: the number of bytes to read (default=8192)
+        :param offset: byte offset in the object to begin reading at
+        :returns: the data, filled in once the operation completed
+        """
+        cdef:
+            ReadOpData data = ReadOpData(length)
+            uint64_t _offset = offset
+        self.outputs.append(data)
+        with nogil:
+            rados_read_op_read(self.read_op, _offset, data.length, data.buf,
+                               &data.bytes_read, NULL)
+        return data
 
     def cmpext(self, cmp_buf: bytes, offset: int = 0):
         """
@@ -2151,6 +2497,25 @@ cdef int __aio_complete_cb(rados_completion_t completion, void *args) with gil:
     cb._complete()
     return 0
 
+
+def _resolve_future(future, completion, result, msg):
+    """
+    Resolve the future of an ``Ioctx.*_async()`` operation, on the event
+    loop it belongs to, with the values passed to oncomplete
+    """
+    if future.done():
+        # cancelled or timed out
+        return
+    ret = completion.get_return_value()
+    if ret < 0:
+        future.set_exception(make_ex(ret, msg))
+    elif not result:
+        future.set_result(None)
+    elif len(result) == 1:
+        future.set_result(result[0])
+    else:
+        future.set_result(tuple(result))
+
 cdef class Ioctx(object):
     """rados.Ioctx object"""
     # NOTE(sileht): attributes declared in .pyd
@@ -2166,6 +2531,9 @@ cdef class Ioctx(object):
         self.safe_completions = []
         self.complete_completions = []
 
+        self.async_max_in_flight = None
+        self.async_semaphores = weakref.WeakKeyDictionary()
+
     def __enter__(self):
         return self
 
@@ -2272,7 +2640,7 @@ cdef class Ioctx(object):
             raise make_ex(ret, "error stating %s" % object_name)
         return completion
 
-    def aio_write(self, object_name: str, to_write: bytes, offset: int = 0,
+    def aio_write(self, object_name: str, to_write: BUFFER_TYPE, offset: int = 0,
                   oncomplete: Optional[Callable[[Completion], None]] = None,
                   onsafe: Optional[Callable[[Completion], None]] = None) -> Completion:
         """
@@ -2281,7 +2649,7 @@ cdef class Ioctx(object):
         Queues the write and returns.
 
         :param object_name: name of the object
-        :param to_write: data to write
+        :param to_write: data to write, any contiguous buffer
         :param offset: byte offset in the object to begin writing at
         :param oncomplete: what to do when the write is safe and complete in memory
             on all replicas
@@ -2297,8 +2665,9 @@ cdef class Ioctx(object):
         cdef:
             Completion completion
             char* _object_name = object_name_raw
-            char* _to_write = to_write
-            size_t size = len(to_write)
+            _Buffer buf = _Buffer(to_write)
+            char* _to_write = buf.ptr
+            size_t size = buf.length
             uint64_t _offset = offset
 
         completion = self.__get_completion(oncomplete, onsafe)
@@ -2311,7 +2680,7 @@ cdef class Ioctx(object):
             raise make_ex(ret, "error writing object %s" % object_name)
         return completion
 
-    def aio_write_full(self, object_name: str, to_write: bytes,
+    def aio_write_full(self, object_name: str, to_write: BUFFER_TYPE,
                   oncomplete: Optional[Callable] = None,
                   onsafe: Optional[Callable] = None) -> Completion:
         """
@@ -2322,7 +2691,7 @@ cdef class Ioctx(object):
         Queues the write and returns.
 
         :param object_name: name of the object
-        :param to_write: data to write
+        :param to_write: data to write, any contiguous buffer
         :param oncomplete: what to do when the write is safe and complete in memory
             on all replicas
         :param onsafe:  what to do when the write is safe and complete on storage
@@ -2337,8 +2706,9 @@ cdef class Ioctx(object):
         cdef:
             Completion completion
             char* _object_name = object_name_raw
-            char* _to_write = to_write
-            size_t size = len(to_write)
+            _Buffer buf = _Buffer(to_write)
+            char* _to_write = buf.ptr
+            size_t size = buf.length
 
         completion = self.__get_completion(oncomplete, onsafe)
         self.__track_completion(completion)
@@ -2388,7 +2758,7 @@ cdef class Ioctx(object):
             raise make_ex(ret, "error writing object %s" % object_name)
         return completion
 
-    def aio_append(self, object_name: str, to_append: bytes,
+    def aio_append(self, object_name: str, to_append: BUFFER_TYPE,
                   oncomplete: Optional[Callable] = None,
                   onsafe: Optional[Callable] = None) -> Completion:
         """
@@ -2397,7 +2767,7 @@ cdef class Ioctx(object):
         Queues the write and returns.
 
         :param object_name: name of the object
-        :param to_append: data to append
+        :param to_append: data to append, any contiguous buffer
         :param offset: byte offset in the object to begin writing at
         :param oncomplete: what to do when the write is safe and complete in memory
             on all replicas
@@ -2412,8 +2782,9 @@ cdef class Ioctx(object):
         cdef:
             Completion completion
             char* _object_name = object_name_raw
-            char* _to_append = to_append
-            size_t size = len(to_append)
+            _Buffer buf = _Buffer(to_append)
+            char* _to_append = buf.ptr
+            size_t size = buf.length
 
         completion = self.__get_completion(oncomplete, onsafe)
         self.__track_completion(completion)
@@ -2551,6 +2922,62 @@ cdef class Ioctx(object):
             raise make_ex(ret, "error reading %s" % object_name)
         return completion
 
+    def aio_readinto(self, object_name: str, buffer: BUFFER_TYPE,
+                     offset: int = 0,
+                     oncomplete: Optional[Callable[[Completion, Optional[int]], None]] = None) -> Completion:
+        """
+        Asynchronously read data from an object into a caller-supplied
+        buffer
+
+        Up to the size of ``buffer`` bytes are read straight into it, without
+        allocating a new bytes object. The buffer must be writable and
+        contiguous, and must not be resized until the read completes.
+        oncomplete will be called with the number of bytes read, or None
+        on error, as well as the completion:
+
+        oncomplete(completion, bytes_read)
+
+        :param object_name: name of the object to read from
+        :param buffer: writable buffer to read into, e.g. a bytearray,
+            memoryview, mmap or numpy array
+        :param offset: byte offset in the object to begin reading from
+        :param oncomplete: what to do when the read is complete
+
+        :raises: :class:`Error`
+        :returns: completion object
+        """
+
+        object_name_raw = cstr(object_name, 'object_name')
+
+        cdef:
+            Completion completion
+            char* _object_name = object_name_raw
+            uint64_t _offset = offset
+            _Buffer buf = _Buffer(buffer, True)
+            char *_buf = buf.ptr
+            size_t _length = buf.length
+
+        def oncomplete_(completion_v):
+            cdef Completion _completion_v = completion_v
+            return_value = _completion_v.get_return_value()
+            # the read is done, let the caller resize the buffer again
+            _completion_v.user_buf = None
+            if oncomplete:
+                return oncomplete(_completion_v,
+                                  return_value if return_value >= 0 else None)
+
+        completion = self.__get_completion(oncomplete_, None)
+        # librados writes into the buffer until the read completes
+        completion.user_buf = buf
+        self.__track_completion(completion)
+        with nogil:
+            ret = rados_aio_read(self.io, _object_name, completion.rados_comp,
+                                _buf, _length, _offset)
+        if ret < 0:
+            completion._cleanup()
+            raise make_ex(ret, "error reading %s" % object_name)
+        return completion
+
     def aio_execute(self, object_name: str, cls: str, method: str,
                     data: bytes, length: int = 8192,
                     oncomplete: Optional[Callable[[Completion, bytes], None]] = None,
@@ -2680,6 +3107,203 @@ cdef class Ioctx(object):
             raise make_ex(ret, "error removing %s" % object_name)
         return completion
 
+    def set_async_max_in_flight(self, max_in_flight: Optional[int]):
+        """
+        Limit the number of ``*_async()`` operations in flight
+
+        Operations started beyond the limit wait for earlier ones to
+        complete before they are submitted to librados. The limit applies
+        per event loop.
+
+        :param max_in_flight: maximum number of operations in flight, or
+            None for no limit
+        """
+        if max_in_flight is not None and max_in_flight < 1:
+            raise InvalidArgumentError('max_in_flight must be positive')
+        self.async_max_in_flight = max_in_flight
+        self.async_semaphores = weakref.WeakKeyDictionary()
+
+    async def __await_completion(self, start: Callable[..., Completion],
+                                 msg: str, timeout: Optional[float]):
+        """
+        Start an asynchronous operation and wait for it on the running loop
+
+        :param start: starts the operation given its oncomplete callback
+        :param msg: error message if the operation fails
+        :param timeout: seconds to wait before cancelling the operation
+        :returns: the values passed to oncomplete after the completion
+        """
+        loop = asyncio.get_event_loop()
+        semaphore = None
+        if self.async_max_in_flight is not None:
+            semaphore = self.async_semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.async_max_in_flight)
+                self.async_semaphores[loop] = semaphore
+            await semaphore.acquire()
+        try:
+            future = loop.create_future()
+
+            def oncomplete(completion, *result):
+                try:
+                    loop.call_soon_threadsafe(_resolve_future, future,
+                                              completion, result, msg)
+                except RuntimeError:
+                    # the loop was closed, nobody is waiting for us anymore
+                    pass
+
+            completion = start(oncomplete=oncomplete)
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                completion.cancel()
+                raise TimedOut("%s after %ss" % (msg, timeout),
+                               errno=errno.ETIMEDOUT)
+            except asyncio.CancelledError:
+                completion.cancel()
+                raise
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+    async def stat_async(self, object_name: str,
+                         timeout: Optional[float] = None) -> Tuple[int, time.struct_time]:
+        """
+        Get object stats (size/mtime) without blocking the event loop
+
+        :param object_name: the name of the object to get stats from
+        :param timeout: seconds to wait before cancelling the operation
+
+        :raises: :class:`Error`, :class:`TimedOut`
+        :returns: (size,timestamp)
+        """
+        return await self.__await_completion(
+            partial(self.aio_stat, object_name),
+            "error stating %s" % object_name, timeout)
+
+    async def read_async(self, object_name: str, length: int = 8192,
+                         offset: int = 0,
+                         timeout: Optional[float] = None) -> bytes:
+        """
+        Read data from an object without blocking the event loop
+
+        :param object_name: name of the object to read from
+        :param length: the number of bytes to read (default=8192)
+        :param offset: byte offset in the object to begin reading from
+        :param timeout: seconds to wait before cancelling the operation
+
+        :raises: :class:`Error`, :class:`TimedOut`
+        :returns: data read from object
+        """
+        return await self.__await_completion(
+            partial(self.aio_read, object_name, length, offset),
+            "error reading %s" % object_name, timeout)
+
+    async def readinto_async(self, object_name: str, buffer: BUFFER_TYPE,
+                             offset: int = 0,
+                             timeout: Optional[float] = None) -> int:
+        """
+        Read data from an object into a caller-supplied buffer without
+        blocking the event loop
+
+        The buffer must not be resized until the read completes, which
+        may be after the returned coroutine was cancelled.
+
+        :param object_name: name of the object to read from
+        :param buffer: writable buffer to read into
+        :param offset: byte offset in the object to begin reading from
+        :param timeout: seconds to wait before cancelling the operation
+
+        :raises: :class:`Error`, :class:`TimedOut`
+        :returns: number of bytes read
+        """
+        return await self.__await_completion(
+            partial(self.aio_readinto, object_name, buffer, offset),
+            "error reading %s" % object_name, timeout)
+
+    async def write_async(self, object_name: str, to_write: BUFFER_TYPE,
+                          offset: int = 0,
+                          timeout: Optional[float] = None):
+        """
+        Write data to an object without blocking the event loop
+
+        :param object_name: name of the object
+        :param to_write: data to write, any contiguous buffer
+        :param offset: byte offset in the object to begin writing at
+        :param timeout: seconds to wait before cancelling the operation
+
+        :raises: :class:`Error`, :class:`TimedOut`
+        """
+        await self.__await_completion(
+            partial(self.aio_write, object_name, to_write, offset),
+            "error writing object %s" % object_name, timeout)
+
+    async def write_full_async(self, object_name: str, to_write: BUFFER_TYPE,
+                               timeout: Optional[float] = None):
+        """
+        Write an entire object without blocking the event loop
+
+        :param object_name: name of the object
+        :param to_write: data to write, any contiguous buffer
+        :param timeout: seconds to wait before cancelling the operation
+
+        :raises: :class:`Error`, :class:`TimedOut`
+        """
+        await self.__await_completion(
+            partial(self.aio_write_full, object_name, to_write),
+            "error writing object %s" % object_name, timeout)
+
+    async def append_async(self, object_name: str, to_append: BUFFER_TYPE,
+                           timeout: Optional[float] = None):
+        """
+        Append data to an object without blocking the event loop
+
+        :param object_name: name of the object
+        :param to_append: data to append, any contiguous buffer
+        :param timeout: seconds to wait before cancelling the operation
+
+        :raises: :class:`Error`, :class:`TimedOut`
+        """
+        await self.__await_completion(
+            partial(self.aio_append, object_name, to_append),
+            "error appending object %s" % object_name, timeout)
+
+    async def execute_async(self, object_name: str, cls: str, method: str,
+                            data: bytes, length: int = 8192,
+                            timeout: Optional[float] = None) -> bytes:
+        """
+        Execute an OSD class method on an object without blocking the
+        event loop
+
+        :param object_name: name of the object
+        :param cls: name of the object class
+        :param method: name of the method
+        :param data: input data
+        :param length: size of output buffer in bytes (default=8192)
+        :param timeout: seconds to wait before cancelling the operation
+
+        :raises: :class:`Error`, :class:`TimedOut`
+        :returns: method output
+        """
+        return await self.__await_completion(
+            partial(self.aio_execute, object_name, cls, method, data, length),
+            "error executing %s::%s on %s" % (cls, method, object_name),
+            timeout)
+
+    async def remove_async(self, object_name: str,
+                           timeout: Optional[float] = None):
+        """
+        Remove an object without blocking the event loop
+
+        :param object_name: name of the object to remove
+        :param timeout: seconds to wait before cancelling the operation
+
+        :raises: :class:`Error`, :class:`TimedOut`
+        """
+        await self.__await_completion(
+            partial(self.aio_remove, object_name),
+            "error removing %s" % object_name, timeout)
+
     def require_ioctx_open(self):
         """
         Checks if the rados.Ioctx object state is 'open'
@@ -2779,12 +3403,12 @@ cdef class Ioctx(object):
             self.state = "closed"
 
 
-    def write(self, key: str, data: bytes, offset: int = 0):
+    def write(self, key: str, data: BUFFER_TYPE, offset: int = 0):
         """
         Write data to an object synchronously
 
         :param key: name of the object
-        :param data: data to write
+        :param data: data to write, any contiguous buffer
         :param offset: byte offset in the object to begin writing at
 
         :raises: :class:`TypeError`
@@ -2796,8 +3420,9 @@ cdef class Ioctx(object):
         key_raw = cstr(key, 'key')
         cdef:
             char *_key = key_raw
-            char *_data = data
-            size_t length = len(data)
+            _Buffer buf = _Buffer(data)
+            char *_data = buf.ptr
+            size_t length = buf.length
             uint64_t _offset = offset
 
         with nogil:
@@ -2811,7 +3436,7 @@ cdef class Ioctx(object):
             raise LogicError("Ioctx.write(%s): rados_write \
 returned %d, but should return zero on success." % (self.name, ret))
 
-    def write_full(self, key: str, data: bytes):
+    def write_full(self, key: str, data: BUFFER_TYPE):
         """
         Write an entire object synchronously.
 
@@ -2819,7 +3444,7 @@ returned %d, but should return zero on success." % (self.name, ret))
         it is atomically truncated and then written.
 
         :param key: name of the object
-        :param data: data to write
+        :param data: data to write, any contiguous buffer
 
         :raises: :class:`TypeError`
         :raises: :class:`Error`
@@ -2829,8 +3454,9 @@ returned %d, but should return zero on success." % (self.name, ret))
         key_raw = cstr(key, 'key')
         cdef:
             char *_key = key_raw
-            char *_data = data
-            size_t length = len(data)
+            _Buffer buf = _Buffer(data)
+            char *_data = buf.ptr
+            size_t length = buf.length
 
         with nogil:
             ret = rados_write_full(self.io, _key, _data, length)
@@ -2871,12 +3497,12 @@ returned %d, but should return zero on success." % (self.name, ret))
                            % (self.name, key))
         assert(ret == 0)
 
-    def append(self, key: str, data: bytes):
+    def append(self, key: str, data: BUFFER_TYPE):
         """
         Append data to an object synchronously
 
         :param key: name of the object
-        :param data: data to write
+        :param data: data to write, any contiguous buffer
 
         :raises: :class:`TypeError`
         :raises: :class:`LogicError`
@@ -2886,8 +3512,9 @@ returned %d, but should return zero on success." % (self.name, ret))
         key_raw = cstr(key, 'key')
         cdef:
             char *_key = key_raw
-            char *_data = data
-            size_t length = len(data)
+            _Buffer buf = _Buffer(data)
+            char *_data = buf.ptr
+            size_t length = buf.length
 
         with nogil:
             ret = rados_append(self.io, _key, _data, length)
@@ -2940,6 +3567,38 @@ returned %d, but should return zero on success." % (self.name, ret))
             # itself and set ret_s to NULL, hence XDECREF).
             ref.Py_XDECREF(ret_s)
 
+    def readinto(self, key: str, buffer: BUFFER_TYPE, offset: int = 0) -> int:
+        """
+        Read data from an object synchronously into a caller-supplied buffer
+
+        Up to the size of ``buffer`` bytes are read straight into it, without
+        allocating a new bytes object, so a single buffer can be reused for
+        streaming reads.
+
+        :param key: name of the object
+        :param buffer: writable buffer to read into, e.g. a bytearray,
+            memoryview, mmap or numpy array
+        :param offset: byte offset in the object to begin reading at
+
+        :raises: :class:`TypeError`
+        :raises: :class:`Error`
+        :returns: int - number of bytes read
+        """
+        self.require_ioctx_open()
+        key_raw = cstr(key, 'key')
+        cdef:
+            char *_key = key_raw
+            _Buffer buf = _Buffer(buffer, True)
+            char *_buf = buf.ptr
+            size_t _length = buf.length
+            uint64_t _offset = offset
+
+        with nogil:
+            ret = rados_read(self.io, _key, _buf, _length, _offset)
+        if ret < 0:
+            raise make_ex(ret, "Ioctx.readinto(%s): failed to read %s" % (self.name, key))
+        return ret
+
     def execute(self, key: str, cls: str, method: str, data: bytes, length: int = 8192) -> Tuple[int, object]:
         """
         Execute an OSD class method on an object.
@@ -3352,6 +4011,54 @@ returned %d, but should return zero on success." % (self.name, ret))
         self.require_ioctx_open()
         return ObjectIterator(self)
 
+    def list_objects_paged(self, page_size: int = 1000,
+                           names_only: bool = False) -> ObjectPageIterator:
+        """
+        Get ObjectPageIterator on rados.Ioctx object.
+
+        Lists the objects a page at a time, fetching the next page in the
+        background while the current one is consumed.
+
+        :param page_size: maximum number of objects per page
+        :param names_only: return the object names only, rather than
+            (key, locator, nspace) tuples
+
+        :returns: ObjectPageIterator
+        """
+        self.require_ioctx_open()
+        return ObjectPageIterator(self, page_size, names_only)
+
+    def list_omap_vals_paged(self, oid: str,
+                             filter_prefix: Optional[OMAP_KEY_TYPE] = None,
+                             page_size: int = 1000,
+                             omap_key_type = bytes.decode) -> Iterator[List[Tuple[Any, bytes]]]:
+        """
+        Iterate over all omap values of an object, a page at a time
+
+        Unlike get_omap_vals(), there is no need to page through the keys
+        with start_after: the next page is read in the background while the
+        current one is consumed, so at most two pages are held in memory.
+
+        :param oid: object name
+        :param filter_prefix: list only keys beginning with filter_prefix
+        :param page_size: maximum number of key/value pairs per page
+        :param omap_key_type: converts the keys, as bytes
+
+        :raises: :class:`Error`
+        :returns: an iterator over lists of (key, value) pairs
+        """
+        self.require_ioctx_open()
+        page = OmapPage(self, oid, None, filter_prefix, page_size,
+                        omap_key_type)
+        while page is not None:
+            entries, last_key, more = page.wait()
+            page = None
+            if more and last_key is not None:
+                page = OmapPage(self, oid, last_key, filter_prefix,
+                                page_size, omap_key_type)
+            if entries:
+                yield entries
+
     def list_snaps(self) -> SnapIterator:
         """
         Get SnapIterator on rados.Ioctx object.
@@ -3753,6 +4460,102 @@ returned %d, but should return zero on success." % (self.name, ret))
             raise make_ex(ret, "Failed to operate aio read op for oid %s" % oid)
         return completion
 
+    def __operate_batch(self, oids, new_op, build_op, submit, max_in_flight):
+        if max_in_flight < 1:
+            raise InvalidArgumentError('max_in_flight must be positive')
+        slots = threading.Semaphore(max_in_flight)
+
+        def oncomplete(completion):
+            slots.release()
+
+        ops = []
+        outputs = []
+        completions = []
+        try:
+            for oid in oids:
+                op = new_op().create()
+                ops.append(op)
+                outputs.append(build_op(op, oid))
+                slots.acquire()
+                try:
+                    completions.append(submit(op, oid, oncomplete))
+                except Exception:
+                    slots.release()
+                    raise
+        finally:
+            # librados references the ops until they completed
+            for completion in completions:
+                completion.wait_for_complete_and_cb()
+            for op in ops:
+                op.release()
+
+        results = []
+        for completion, output in zip(completions, outputs):
+            ret = completion.get_return_value()
+            results.append((ret, output if ret >= 0 else None))
+        return results
+
+    def operate_read_op_batch(self,
+                              oids: Sequence[str],
+                              build_op: Callable[[ReadOp, str], Any],
+                              max_in_flight: int = 64,
+                              flag: int = LIBRADOS_OPERATION_NOFLAG) -> List[Tuple[int, Any]]:
+        """
+        execute a read operation on each of many objects, keeping up to
+        max_in_flight of them in flight at once
+
+        build_op(read_op, oid) is called with a new read operation for each
+        object to add the actions to perform on it. Whatever it returns,
+        e.g. the result of ReadOp.read() or the iterator of get_omap_vals(),
+        is handed back for the object once its operation completed.
+
+        :para oids: object names
+        :para build_op: adds the actions to the read operation of an object
+        :para max_in_flight: maximum number of operations in flight
+        :para flag: flags to apply to each operation
+
+        :raises: :class:`Error`
+        :returns: a (return value, build_op result) tuple per object, in the
+            order of oids. The result is None if the return value is a
+            negative error code.
+        """
+        def submit(op, oid, oncomplete):
+            return self.operate_aio_read_op(op, oid, oncomplete, flag=flag)
+        return self.__operate_batch(oids, ReadOp, build_op, submit,
+                                    max_in_flight)
+
+    def operate_write_op_batch(self,
+                               oids: Sequence[str],
+                               build_op: Callable[[WriteOp, str], Any],
+                               max_in_flight: int = 64,
+                               mtime: int = 0,
+                               flags: int = LIBRADOS_OPERATION_NOFLAG) -> List[Tuple[int, Any]]:
+        """
+        execute a write operation on each of many objects, keeping up to
+        max_in_flight of them in flight at once
+
+        build_op(write_op, oid) is called with a new write operation for each
+        object to add the actions to perform on it, e.g. write_op.remove().
+        Whatever it returns is handed back for the object once its
+        operation completed.
+
+        :para oids: object names
+        :para build_op: adds the actions to the write operation of an object
+        :para max_in_flight: maximum number of operations in flight
+        :para mtime: the time to set the mtime to, 0 for the current time
+        :para flags: flags to apply to each operation
+
+        :raises: :class:`Error`
+        :returns: a (return value, build_op result) tuple per object, in the
+            order of oids. The result is None if the return value is a
+            negative error code.
+        """
+        def submit(op, oid, oncomplete):
+            return self.operate_aio_write_op(op, oid, oncomplete, mtime=mtime,
+                                             flags=flags)
+        return self.__operate_batch(oids, WriteOp, build_op, submit,
+                                    max_in_flight)
+
     def get_omap_vals(self,
                       read_op: ReadOp,
                       start_after: OMAP_KEY_TYPE,
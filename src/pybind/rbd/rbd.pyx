@@ -29,6 +29,7 @@ try:
     from collections.abc import Iterable
 except ImportError:
     from collections import Iterable
+from collections import deque
 from datetime import datetime, timezone
 import errno
 from itertools import chain
@@ -5076,6 +5077,229 @@ written." % (self.name, ret, length))
 
         return completion
 
+    def __wait_all(self, completions):
+        # wait for whatever is still in flight before its buffer goes away,
+        # the caller is already handling an error
+        while completions:
+            completions.popleft()[0].wait_for_complete_and_cb()
+
+    def __reap(self, completions):
+        # entries are (completion, error message, ...)
+        entry = completions.popleft()
+        completion = entry[0]
+        completion.wait_for_complete_and_cb()
+        ret = completion.get_return_value()
+        if ret < 0:
+            raise make_ex(ret, entry[1])
+        return entry
+
+    def __export_chunk(self, reads, writes, dest, rel_offset, max_in_flight,
+                       pos):
+        # write out the oldest read, returns the number of bytes read and
+        # the position a stream is at afterwards
+        _, _, off, box = self.__reap(reads)
+        data = box[0]
+        rel = off - rel_offset
+        if isinstance(dest, Image):
+            if len(writes) >= max_in_flight:
+                self.__reap(writes)
+            # librbd may write straight from data until completion
+            writes.append((dest.aio_write(data, rel, None),
+                           'error writing %s %ld~%ld' %
+                           (dest.name, rel, len(data)), data))
+        elif dest.seekable():
+            dest.seek(rel)
+            dest.write(data)
+        else:
+            # streams can't skip holes
+            self.__write_zeroes_to(dest, rel - pos, len(data))
+            dest.write(data)
+        return len(data), rel + len(data)
+
+    def __write_zeroes_to(self, dest, length, chunk_size):
+        if length <= 0:
+            return
+        zeroes = memoryview(bytes(min(length, chunk_size)))
+        while length > 0:
+            length -= dest.write(zeroes[:length])
+
+    @requires_not_closed
+    def export_to(self, dest, offset=0, length=None, chunk_size=None,
+                  max_in_flight=16, sparse=True, on_progress=None,
+                  fadvise_flags=0):
+        """
+        Stream the image, or a range of it, into a file object or another
+        image.
+
+        Up to max_in_flight reads (and writes, when copying to an image)
+        are kept in flight. Data read at ``offset + x`` is written at ``x``
+        in dest, as is, without further copies.
+
+        If sparse is True, extents that were never written are found with
+        diff_iterate() and skipped: they are left as holes in seekable
+        files, written as zeroes to other streams and not written at all to
+        images, which therefore must read as zeroes there, e.g. new ones.
+
+        :param dest: where to write the data to
+        :type dest: binary file object or :class:`Image`
+        :param offset: the offset to start reading at
+        :type offset: int
+        :param length: how many bytes to copy, defaults to the rest of the image
+        :type length: int
+        :param chunk_size: bytes per operation, defaults to the object size
+        :type chunk_size: int
+        :param max_in_flight: maximum number of operations in flight
+        :type max_in_flight: int
+        :param sparse: skip unallocated extents
+        :type sparse: bool
+        :param on_progress: optional progress callback function, called
+            with the number of bytes read so far and in total
+        :type on_progress: callback function
+        :param fadvise_flags: fadvise flags for the reads
+        :type fadvise_flags: int
+        :returns: int - the number of bytes read
+        :raises: :class:`InvalidArgument`, :class:`IOError`
+        """
+        if length is None:
+            length = self.size() - offset
+        if chunk_size is None:
+            chunk_size = self.stat()['obj_size']
+        if chunk_size < 1 or max_in_flight < 1:
+            raise InvalidArgument('chunk_size and max_in_flight must be positive')
+        end = offset + length
+
+        extents = []
+        if sparse:
+            def add_extent(ext_offset, ext_length, exists):
+                if exists:
+                    extents.append([max(ext_offset, offset),
+                                    min(ext_offset + ext_length, end)])
+            self.diff_iterate(offset, length, None, add_extent,
+                              whole_object=True)
+            extents.sort()
+            merged = []
+            for start, stop in extents:
+                if start >= stop:
+                    continue
+                if merged and merged[-1][1] >= start:
+                    merged[-1][1] = max(merged[-1][1], stop)
+                else:
+                    merged.append([start, stop])
+            extents = merged
+        elif length > 0:
+            extents.append([offset, end])
+        total = sum(stop - start for start, stop in extents)
+
+        reads = deque()
+        writes = deque()
+        done = 0
+        pos = 0
+        try:
+            for start, stop in extents:
+                for off in range(start, stop, chunk_size):
+                    if len(reads) >= max_in_flight:
+                        n, pos = self.__export_chunk(reads, writes, dest,
+                                                     offset, max_in_flight,
+                                                     pos)
+                        done += n
+                        if on_progress:
+                            on_progress(done, total)
+                    n = min(chunk_size, stop - off)
+                    box = []
+                    completion = self.aio_read(
+                        off, n, lambda _, data, box=box: box.append(data),
+                        fadvise_flags)
+                    reads.append((completion, 'error reading %s %ld~%ld' %
+                                  (self.name, off, n), off, box))
+            while reads:
+                n, pos = self.__export_chunk(reads, writes, dest, offset,
+                                             max_in_flight, pos)
+                done += n
+                if on_progress:
+                    on_progress(done, total)
+            while writes:
+                self.__reap(writes)
+        finally:
+            self.__wait_all(reads)
+            self.__wait_all(writes)
+
+        if not isinstance(dest, Image):
+            if dest.seekable():
+                if dest.seek(0, 2) < length:
+                    dest.truncate(length)
+            else:
+                self.__write_zeroes_to(dest, length - pos, chunk_size)
+        return done
+
+    @requires_not_closed
+    def import_from(self, src, offset=0, length=None, chunk_size=None,
+                    max_in_flight=16, sparse=True, on_progress=None,
+                    fadvise_flags=0):
+        """
+        Stream a file object into the image.
+
+        src is read sequentially from its current position and written to
+        the image starting at offset, with up to max_in_flight writes in
+        flight. The data read is written as is, without further copies.
+
+        If sparse is True, chunks of zeroes are not written, so the image
+        must read as zeroes there, e.g. a new one.
+
+        :param src: where to read the data from
+        :type src: binary file object
+        :param offset: the offset to start writing at
+        :type offset: int
+        :param length: how many bytes to copy at most, defaults to the rest
+            of the image
+        :type length: int
+        :param chunk_size: bytes per operation, defaults to the object size
+        :type chunk_size: int
+        :param max_in_flight: maximum number of operations in flight
+        :type max_in_flight: int
+        :param sparse: skip chunks of zeroes
+        :type sparse: bool
+        :param on_progress: optional progress callback function, called
+            with the number of bytes copied so far and at most
+        :type on_progress: callback function
+        :param fadvise_flags: fadvise flags for the writes
+        :type fadvise_flags: int
+        :returns: int - the number of bytes copied
+        :raises: :class:`InvalidArgument`, :class:`IOError`
+        """
+        if length is None:
+            length = self.size() - offset
+        if chunk_size is None:
+            chunk_size = self.stat()['obj_size']
+        if chunk_size < 1 or max_in_flight < 1:
+            raise InvalidArgument('chunk_size and max_in_flight must be positive')
+
+        zeroes = bytes(chunk_size) if sparse else None
+        writes = deque()
+        done = 0
+        try:
+            while done < length:
+                data = src.read(min(chunk_size, length - done))
+                if not data:
+                    break
+                if not sparse or data != (zeroes if len(data) == chunk_size
+                                          else bytes(len(data))):
+                    if len(writes) >= max_in_flight:
+                        self.__reap(writes)
+                    completion = self.aio_write(data, offset + done, None,
+                                                fadvise_flags)
+                    # librbd may write straight from data until completion
+                    writes.append((completion, 'error writing %s %ld~%ld' %
+                                   (self.name, offset + done, len(data)),
+                                   data))
+                done += len(data)
+                if on_progress:
+                    on_progress(done, length)
+            while writes:
+                self.__reap(writes)
+        finally:
+            self.__wait_all(writes)
+        return done
+
     @requires_not_closed
     def metadata_get(self, key):
         """
@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+
+"""
+Benchmark streaming reads and writes through the rados python binding.
+
+Compares the bytes based API (read/write) with the buffer based one
+(readinto/write of a reused bytearray) by streaming --total bytes through a
+small set of objects, and reports throughput as well as the memory
+allocated per op. Run against a vstart cluster, e.g.:
+
+    ../src/vstart.sh -n -d
+    python3 bench_rados.py --conffile ./ceph.conf --pool rbd
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import rados
+
+
+def parse_size(s):
+    units = {'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30}
+    if s and s[-1].lower() in units:
+        return int(s[:-1]) * units[s[-1].lower()]
+    return int(s)
+
+
+def run_write_bytes(ioctx, names, buf, num_ops):
+    for i in range(num_ops):
+        # callers holding a bytearray had to copy it for the bytes only API
+        ioctx.write_full(names[i % len(names)], bytes(buf))
+
+
+def run_write_buffer(ioctx, names, buf, num_ops):
+    for i in range(num_ops):
+        ioctx.write_full(names[i % len(names)], buf)
+
+
+def run_read_bytes(ioctx, names, buf, num_ops):
+    for i in range(num_ops):
+        ioctx.read(names[i % len(names)], len(buf))
+
+
+def run_readinto(ioctx, names, buf, num_ops):
+    for i in range(num_ops):
+        ioctx.readinto(names[i % len(names)], buf)
+
+
+BENCHMARKS = [
+    ('write (bytes)', run_write_bytes),
+    ('write (bytearray)', run_write_buffer),
+    ('read', run_read_bytes),
+    ('readinto', run_readinto),
+]
+
+
+def measure_allocations(func, ioctx, names, buf, num_ops):
+    """
+    Return the peak number of bytes allocated while an op is in flight,
+    averaged over num_ops ops, as seen by tracemalloc.
+    """
+    allocated = 0
+    tracemalloc.start()
+    try:
+        for _ in range(num_ops):
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            func(ioctx, names, buf, 1)
+            _, peak = tracemalloc.get_traced_memory()
+            allocated += peak - base
+    finally:
+        tracemalloc.stop()
+    return allocated / num_ops
+
+
+def main():
+    parser = argparse.ArgumentParser(description="""
+Stream data through the rados python binding and report MB/s and
+allocations per op for the bytes and buffer protocol based APIs.
+""")
+    parser.add_argument('--conffile', default='',
+                        help='ceph.conf of the cluster to use')
+    parser.add_argument('--pool', default='rbd',
+                        help='pool to write the benchmark objects to')
+    parser.add_argument('--total', type=parse_size, default='10G',
+                        help='bytes to stream per benchmark (default: 10G)')
+    parser.add_argument('--block-size', type=parse_size, default='4M',
+                        help='bytes per op (default: 4M)')
+    parser.add_argument('--objects', type=int, default=16,
+                        help='number of objects the stream cycles through')
+    parser.add_argument('--sample-ops', type=int, default=16,
+                        help='ops traced to measure allocations')
+    args = parser.parse_args()
+
+    num_ops = max(args.total // args.block_size, 1)
+    names = ['bench_rados.{}'.format(i) for i in range(args.objects)]
+    buf = bytearray(args.block_size)
+
+    with rados.Rados(conffile=args.conffile) as cluster:
+        with cluster.open_ioctx(args.pool) as ioctx:
+            for name in names:
+                ioctx.write_full(name, buf)
+            try:
+                print('{:<20} {:>10} {:>14}'.format(
+                    'benchmark', 'MB/s', 'alloc bytes/op'))
+                for desc, func in BENCHMARKS:
+                    start = time.monotonic()
+                    func(ioctx, names, buf, num_ops)
+                    elapsed = time.monotonic() - start
+                    mbps = num_ops * args.block_size / elapsed / (1 << 20)
+                    allocated = measure_allocations(
+                        func, ioctx, names, buf, args.sample_ops)
+                    print('{:<20} {:>10.1f} {:>14.0f}'.format(
+                        desc, mbps, allocated))
+            finally:
+                for name in names:
+                    ioctx.remove_object(name)
+
+
+if __name__ == '__main__':
+    main()
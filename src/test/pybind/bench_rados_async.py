@@ -0,0 +1,146 @@
+#!/usr/bin/python3
+
+"""
+Benchmark many concurrent small reads through Ioctx.read_async().
+
+By default the reads go to a mock backend that completes them from a
+finisher thread after a fixed latency, the way librados does, so that only
+the cost of bridging completions into asyncio is measured. Pass --conffile
+to read from a (vstart) cluster instead.
+"""
+
+import argparse
+import asyncio
+import collections
+import threading
+import time
+
+import rados
+
+
+class MockCompletion(object):
+    def __init__(self, ret):
+        self.ret = ret
+
+    def get_return_value(self):
+        return self.ret
+
+    def cancel(self):
+        pass
+
+
+class MockIoctx(rados.Ioctx):
+    """
+    An Ioctx whose reads complete from a finisher thread after latency
+    seconds, without talking to a cluster
+    """
+
+    def __init__(self, latency):
+        super().__init__(None, 'mock')
+        # there is no librados ioctx to release
+        self.state = 'closed'
+        self.latency = latency
+        self.cond = threading.Condition()
+        self.pending = collections.deque()
+        self.finisher = threading.Thread(target=self.finish, daemon=True)
+        self.finisher.start()
+
+    def aio_read(self, object_name, length, offset, oncomplete=None):
+        completion = MockCompletion(length)
+        with self.cond:
+            self.pending.append((time.monotonic() + self.latency,
+                                 oncomplete, completion, bytes(length)))
+            self.cond.notify()
+        return completion
+
+    def finish(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                due = self.pending[0][0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            with self.cond:
+                ready = []
+                now = time.monotonic()
+                while self.pending and self.pending[0][0] <= now:
+                    ready.append(self.pending.popleft())
+            for _, oncomplete, completion, data in ready:
+                oncomplete(completion, data)
+
+
+async def run_reads(ioctx, names, num_reads, size):
+    latencies = []
+
+    async def read(i):
+        start = time.monotonic()
+        await ioctx.read_async(names[i % len(names)], size)
+        latencies.append(time.monotonic() - start)
+
+    start = time.monotonic()
+    await asyncio.gather(*(read(i) for i in range(num_reads)))
+    return time.monotonic() - start, sorted(latencies)
+
+
+def report(desc, num_reads, elapsed, latencies):
+    def pct(p):
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)]
+    print('{:<24} {:>10.0f} {:>10.2f} {:>10.2f} {:>10.2f}'.format(
+        desc, num_reads / elapsed, pct(0.5) * 1000, pct(0.99) * 1000,
+        latencies[-1] * 1000))
+
+
+def bench(ioctx, names, args):
+    print('{:<24} {:>10} {:>10} {:>10} {:>10}'.format(
+        'max in flight', 'ops/s', 'p50 ms', 'p99 ms', 'max ms'))
+    for limit in [None] + args.max_in_flight:
+        ioctx.set_async_max_in_flight(limit)
+        elapsed, latencies = asyncio.run(
+            run_reads(ioctx, names, args.reads, args.size))
+        report('unlimited' if limit is None else str(limit),
+               args.reads, elapsed, latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="""
+Issue concurrent small reads with Ioctx.read_async() and report throughput
+and latency, with and without a limit on the reads in flight.
+""")
+    parser.add_argument('--reads', type=int, default=100000,
+                        help='number of concurrent reads (default: 100000)')
+    parser.add_argument('--size', type=int, default=4096,
+                        help='bytes per read (default: 4096)')
+    parser.add_argument('--max-in-flight', type=int, nargs='*',
+                        default=[128, 1024],
+                        help='limits on the reads in flight to compare')
+    parser.add_argument('--latency', type=float, default=0.001,
+                        help='latency of a mock read in seconds')
+    parser.add_argument('--conffile',
+                        help='read from the cluster of this ceph.conf '
+                        'instead of the mock backend')
+    parser.add_argument('--pool', default='rbd',
+                        help='pool to read from when using a cluster')
+    parser.add_argument('--objects', type=int, default=16,
+                        help='number of objects the reads cycle through')
+    args = parser.parse_args()
+
+    names = ['bench_rados_async.{}'.format(i) for i in range(args.objects)]
+    if args.conffile is None:
+        bench(MockIoctx(args.latency), names, args)
+        return
+
+    with rados.Rados(conffile=args.conffile) as cluster:
+        with cluster.open_ioctx(args.pool) as ioctx:
+            for name in names:
+                ioctx.write_full(name, bytes(args.size))
+            try:
+                bench(ioctx, names, args)
+            finally:
+                for name in names:
+                    ioctx.remove_object(name)
+
+
+if __name__ == '__main__':
+    main()
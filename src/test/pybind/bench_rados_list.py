@@ -0,0 +1,131 @@
+#!/usr/bin/python3
+
+"""
+Benchmark listing objects and omap values through the rados python binding.
+
+Compares the per-entry iterators (list_objects, get_omap_vals paged by hand)
+with the paged, prefetching ones (list_objects_paged, list_omap_vals_paged),
+reporting entries/s and the peak memory allocated while listing. Run against
+a vstart cluster, e.g.:
+
+    ../src/vstart.sh -n -d
+    python3 bench_rados_list.py --conffile ./ceph.conf --pool rbd
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import rados
+
+
+PREFIX = 'bench_rados_list.'
+
+
+def populate_objects(ioctx, num_objects, window=256):
+    completions = []
+    for i in range(num_objects):
+        completions.append(ioctx.aio_write_full(PREFIX + str(i), b''))
+        if len(completions) >= window:
+            for c in completions:
+                c.wait_for_complete()
+            completions = []
+    for c in completions:
+        c.wait_for_complete()
+
+
+def populate_omap(ioctx, oid, num_keys, batch=1000):
+    for start in range(0, num_keys, batch):
+        keys = ['key%010d' % i
+                for i in range(start, min(start + batch, num_keys))]
+        with rados.WriteOpCtx() as write_op:
+            ioctx.set_omap(write_op, keys, [b'v' * 16] * len(keys))
+            ioctx.operate_write_op(write_op, oid)
+
+
+def list_objects(ioctx, args):
+    return sum(1 for _ in ioctx.list_objects())
+
+
+def list_objects_paged(ioctx, args):
+    return sum(len(page) for page in
+               ioctx.list_objects_paged(args.page_size))
+
+
+def list_object_names_paged(ioctx, args):
+    return sum(len(page) for page in
+               ioctx.list_objects_paged(args.page_size, names_only=True))
+
+
+def list_omap_vals(ioctx, args):
+    count = 0
+    start_after = ''
+    while True:
+        with rados.ReadOpCtx() as read_op:
+            it, _ = ioctx.get_omap_vals(read_op, start_after, '',
+                                        args.page_size)
+            ioctx.operate_read_op(read_op, PREFIX + 'omap')
+            page = list(it)
+        if not page:
+            return count
+        count += len(page)
+        start_after = page[-1][0]
+
+
+def list_omap_vals_paged(ioctx, args):
+    return sum(len(page) for page in
+               ioctx.list_omap_vals_paged(PREFIX + 'omap',
+                                          page_size=args.page_size))
+
+
+BENCHMARKS = [
+    ('list_objects', list_objects),
+    ('list_objects_paged', list_objects_paged),
+    ('  names_only', list_object_names_paged),
+    ('get_omap_vals', list_omap_vals),
+    ('list_omap_vals_paged', list_omap_vals_paged),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="""
+List the objects of a pool and the omap of an object with the per-entry and
+the paged iterators of the rados binding, and report entries/s and memory.
+""")
+    parser.add_argument('--conffile', default='',
+                        help='ceph.conf of the cluster to use')
+    parser.add_argument('--pool', default='rbd',
+                        help='pool to list')
+    parser.add_argument('--populate-objects', type=int, default=0,
+                        help='create this many empty objects first')
+    parser.add_argument('--populate-omap', type=int, default=0,
+                        help='create an object with this many omap keys first')
+    parser.add_argument('--page-size', type=int, default=1000,
+                        help='entries per page (default: 1000)')
+    args = parser.parse_args()
+
+    with rados.Rados(conffile=args.conffile) as cluster:
+        with cluster.open_ioctx(args.pool) as ioctx:
+            populate_objects(ioctx, args.populate_objects)
+            if args.populate_omap:
+                populate_omap(ioctx, PREFIX + 'omap', args.populate_omap)
+
+            print('{:<24} {:>12} {:>12} {:>14}'.format(
+                'benchmark', 'entries', 'entries/s', 'peak MiB'))
+            for desc, func in BENCHMARKS:
+                tracemalloc.start()
+                start = time.monotonic()
+                try:
+                    count = func(ioctx, args)
+                except rados.ObjectNotFound:
+                    continue
+                finally:
+                    elapsed = time.monotonic() - start
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                print('{:<24} {:>12} {:>12.0f} {:>14.1f}'.format(
+                    desc, count, count / elapsed, peak / (1 << 20)))
+
+
+if __name__ == '__main__':
+    main()
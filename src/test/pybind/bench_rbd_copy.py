@@ -0,0 +1,149 @@
+#!/usr/bin/python3
+
+"""
+Benchmark copying images through the rbd python binding.
+
+Compares a naive loop of synchronous Image.read/Image.write calls with
+Image.export_to/Image.import_from, which keep a queue of aio operations in
+flight and skip unallocated extents, when exporting to a file, importing
+from one and copying to another image. Run against a vstart cluster, e.g.:
+
+    ../src/vstart.sh -n -d
+    python3 bench_rbd_copy.py --conffile ./ceph.conf --pool rbd
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import rados
+import rbd
+
+
+PREFIX = 'bench_rbd_copy.'
+
+
+def parse_size(s):
+    units = {'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30}
+    if s and s[-1].lower() in units:
+        return int(s[:-1]) * units[s[-1].lower()]
+    return int(s)
+
+
+def populate(image, size, allocated, chunk_size):
+    # fill the given fraction of the objects, spread over the image
+    step = max(int(round(1 / allocated)), 1) if allocated > 0 else 0
+    if not step:
+        return
+    data = os.urandom(chunk_size)
+    for i, off in enumerate(range(0, size, chunk_size)):
+        if i % step == 0:
+            image.write(data[:size - off], off)
+
+
+def naive_export(image, f, args):
+    size = image.size()
+    for off in range(0, size, args.chunk_size):
+        f.write(image.read(off, min(args.chunk_size, size - off)))
+    return size
+
+
+def naive_import(image, f, args):
+    size = image.size()
+    done = 0
+    while done < size:
+        data = f.read(min(args.chunk_size, size - done))
+        if not data:
+            break
+        image.write(data, done)
+        done += len(data)
+    return done
+
+
+def naive_copy(image, dst, args):
+    size = image.size()
+    for off in range(0, size, args.chunk_size):
+        dst.write(image.read(off, min(args.chunk_size, size - off)), off)
+    return size
+
+
+def export_to(image, f, args):
+    image.export_to(f, chunk_size=args.chunk_size,
+                    max_in_flight=args.max_in_flight)
+    return image.size()
+
+
+def import_from(image, f, args):
+    return image.import_from(f, chunk_size=args.chunk_size,
+                             max_in_flight=args.max_in_flight)
+
+
+def copy_to(image, dst, args):
+    image.export_to(dst, chunk_size=args.chunk_size,
+                    max_in_flight=args.max_in_flight)
+    return image.size()
+
+
+def run(desc, func, image, target, args):
+    start = time.monotonic()
+    copied = func(image, target, args)
+    elapsed = time.monotonic() - start
+    print('{:<20} {:>10.1f} {:>10.2f}'.format(
+        desc, copied / elapsed / (1 << 20), elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="""
+Export, import and copy an image with a synchronous read/write loop and with
+the streaming helpers of the rbd binding, and report MB/s.
+""")
+    parser.add_argument('--conffile', default='',
+                        help='ceph.conf of the cluster to use')
+    parser.add_argument('--pool', default='rbd',
+                        help='pool to create the benchmark images in')
+    parser.add_argument('--size', type=parse_size, default='1G',
+                        help='image size (default: 1G)')
+    parser.add_argument('--allocated', type=float, default=0.5,
+                        help='fraction of the image that is written '
+                        '(default: 0.5)')
+    parser.add_argument('--chunk-size', type=parse_size, default='4M',
+                        help='bytes per op (default: 4M)')
+    parser.add_argument('--max-in-flight', type=int, default=16,
+                        help='ops in flight for the streaming helpers '
+                        '(default: 16)')
+    args = parser.parse_args()
+
+    names = [PREFIX + suffix for suffix in ('src', 'naive', 'stream')]
+    with rados.Rados(conffile=args.conffile) as cluster:
+        with cluster.open_ioctx(args.pool) as ioctx:
+            rbd_inst = rbd.RBD()
+            for name in names:
+                rbd_inst.create(ioctx, name, args.size)
+            try:
+                with rbd.Image(ioctx, names[0]) as image, \
+                        rbd.Image(ioctx, names[1]) as naive_dst, \
+                        rbd.Image(ioctx, names[2]) as stream_dst, \
+                        tempfile.TemporaryFile() as f:
+                    populate(image, args.size, args.allocated,
+                             args.chunk_size)
+                    print('{:<20} {:>10} {:>10}'.format(
+                        'benchmark', 'MB/s', 'seconds'))
+                    # copy first, export_to skips holes in the new images
+                    run('copy loop', naive_copy, image, naive_dst, args)
+                    run('export_to image', copy_to, image, stream_dst, args)
+                    run('read loop', naive_export, image, f, args)
+                    f.seek(0)
+                    f.truncate()
+                    run('export_to', export_to, image, f, args)
+                    f.seek(0)
+                    run('write loop', naive_import, naive_dst, f, args)
+                    f.seek(0)
+                    run('import_from', import_from, stream_dst, f, args)
+            finally:
+                for name in names:
+                    rbd_inst.remove(ioctx, name)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,7 @@ from rados import (Rados, Error, RadosStateError, Object, ObjectExists,
                    LIBRADOS_CMPXATTR_OP_EQ, LIBRADOS_CMPXATTR_OP_GT, LIBRADOS_CMPXATTR_OP_LT, OSError,
                    LIBRADOS_SNAP_HEAD, LIBRADOS_OPERATION_BALANCE_READS, LIBRADOS_OPERATION_SKIPRWLOCKS, MonitorLog, MAX_ERRNO, NoData, ExtendMismatch)
 from datetime import timedelta
+import asyncio
 import time
 import threading
 import json
@@ -297,6 +298,26 @@ class TestIoctx(object):
         self.ioctx.write('abc', b'a\0b\0c')
         eq(self.ioctx.read('abc'), b'a\0b\0c')
 
+    def test_write_buffers(self):
+        self.ioctx.write('abc', bytearray(b'ab'))
+        self.ioctx.append('abc', memoryview(b'xcd')[1:])
+        eq(self.ioctx.read('abc'), b'abcd')
+        self.ioctx.write_full('abc', memoryview(bytearray(b'efg')))
+        eq(self.ioctx.read('abc'), b'efg')
+        assert_raises(TypeError, self.ioctx.write, 'abc', 'efg')
+        assert_raises(BufferError, self.ioctx.write, 'abc',
+                      memoryview(b'efg')[::2])
+
+    def test_readinto(self):
+        self.ioctx.write('abc', b'abcdef')
+        buf = bytearray(4)
+        eq(self.ioctx.readinto('abc', buf), 4)
+        eq(buf, b'abcd')
+        eq(self.ioctx.readinto('abc', memoryview(buf)[1:], 4), 2)
+        eq(buf, b'aefd')
+        assert_raises(BufferError, self.ioctx.readinto, 'abc', b'abcd')
+        assert_raises(ObjectNotFound, self.ioctx.readinto, 'nonexistent', buf)
+
     def test_trunc(self):
         self.ioctx.write('abc', b'abc')
         self.ioctx.trunc('abc', 2)
@@ -325,6 +346,18 @@ class TestIoctx(object):
         object_names = [obj.key for obj in self.ioctx.list_objects()]
         eq(sorted(object_names), ['a', 'b', 'c', 'd'])
 
+    def test_list_objects_paged(self):
+        eq(list(self.ioctx.list_objects_paged()), [])
+        names = ['obj%02d' % i for i in range(25)]
+        for name in names:
+            self.ioctx.write(name, b'')
+        pages = list(self.ioctx.list_objects_paged(page_size=10))
+        assert all(0 < len(page) <= 10 for page in pages)
+        objects = [obj for page in pages for obj in page]
+        eq(sorted(objects), [(name, None, '') for name in names])
+        pages = list(self.ioctx.list_objects_paged(page_size=10, names_only=True))
+        eq(sorted(name for page in pages for name in page), names)
+
     def test_list_ns_objects(self):
         self.ioctx.write('a', b'')
         self.ioctx.write('b', b'foo')
@@ -510,6 +543,11 @@ class TestIoctx(object):
             self.ioctx.operate_write_op(write_op, "write_ops")
             eq(self.ioctx.read('write_ops'), b'12x45')
 
+            write_op.write_full(bytearray(b'12345'))
+            write_op.write(memoryview(b'xy')[1:], 2)
+            self.ioctx.operate_write_op(write_op, "write_ops")
+            eq(self.ioctx.read('write_ops'), b'12y45')
+
             write_op.write_full(b'12345')
             write_op.zero(2, 2)
             self.ioctx.operate_write_op(write_op, "write_ops")
@@ -554,6 +592,48 @@ class TestIoctx(object):
             with pytest.raises(ObjectNotFound):
                 self.ioctx.operate_read_op(read_op, "no_such")
 
+    def test_operate_batch(self):
+        oids = ["batch%d" % i for i in range(10)]
+
+        def write(write_op, oid):
+            write_op.write_full(oid.encode())
+            self.ioctx.set_omap(write_op, ("key",), (oid.encode(),))
+        results = self.ioctx.operate_write_op_batch(oids, write, max_in_flight=3)
+        eq(results, [(0, None)] * 10)
+
+        def read(read_op, oid):
+            it, _ = self.ioctx.get_omap_vals(read_op, None, None, 10)
+            return read_op.read(), read_op.stat(), it
+        results = self.ioctx.operate_read_op_batch(oids + ["no_such"], read,
+                                                   max_in_flight=3)
+        eq(len(results), 11)
+        for oid, (ret, (data, stat, it)) in zip(oids, results):
+            eq(ret, 0)
+            eq(data.data, oid.encode())
+            eq(stat.size, len(oid))
+            eq(list(it), [("key", oid.encode())])
+        eq(results[-1], (-errno.ENOENT, None))
+
+        def remove(write_op, oid):
+            write_op.remove()
+        results = self.ioctx.operate_write_op_batch(oids, remove)
+        eq(results, [(0, None)] * 10)
+        eq(list(self.ioctx.list_objects()), [])
+
+    def test_list_omap_vals_paged(self):
+        keys = ["key%02d" % i for i in range(25)] + ["other"]
+        values = [k.encode() for k in keys]
+        with WriteOpCtx() as write_op:
+            self.ioctx.set_omap(write_op, keys, values)
+            self.ioctx.operate_write_op(write_op, "hw")
+        pages = list(self.ioctx.list_omap_vals_paged("hw", page_size=10))
+        eq([len(page) for page in pages], [10, 10, 6])
+        eq([kv for page in pages for kv in page], list(zip(keys, values)))
+        pages = list(self.ioctx.list_omap_vals_paged("hw", "key", page_size=10))
+        eq(sum(pages, []), list(zip(keys[:-1], values[:-1])))
+        with pytest.raises(ObjectNotFound):
+            list(self.ioctx.list_omap_vals_paged("no_such"))
+
     def test_get_omap_keys(self):
         keys = ("1", "2", "3")
         values = (b"aaa", b"bbb", b"ccc")
@@ -869,6 +949,49 @@ class TestIoctx(object):
         eq(contents, b"bar")
         [i.remove() for i in self.ioctx.list_objects()]
 
+    def test_aio_readinto(self):
+        lock = threading.Condition()
+        retval = [None]
+        def cb(_, nbytes):
+            with lock:
+                retval[0] = nbytes
+                lock.notify()
+        self.ioctx.write("foo", b"barbaz")
+        buf = bytearray(8)
+        comp = self.ioctx.aio_readinto("foo", buf, 1, cb)
+        comp.wait_for_complete()
+        with lock:
+            while retval[0] is None:
+                lock.wait()
+        eq(retval[0], 5)
+        eq(buf[:5], b"arbaz")
+        # the buffer is released once the read completed
+        buf.extend(b"x")
+        [i.remove() for i in self.ioctx.list_objects()]
+
+    def test_async(self):
+        async def run():
+            await self.ioctx.write_async("foo", b"bar")
+            await self.ioctx.append_async("foo", bytearray(b"baz"))
+            eq(await self.ioctx.read_async("foo"), b"barbaz")
+            buf = bytearray(3)
+            eq(await self.ioctx.readinto_async("foo", buf, 3), 3)
+            eq(buf, b"baz")
+            await self.ioctx.write_full_async("foo", b"ba")
+            size, _ = await self.ioctx.stat_async("foo")
+            eq(size, 2)
+            await self.ioctx.remove_async("foo")
+            with pytest.raises(ObjectNotFound):
+                await self.ioctx.read_async("foo")
+
+            self.ioctx.set_async_max_in_flight(2)
+            await asyncio.gather(*(self.ioctx.write_full_async("foo%d" % i, b"x")
+                                   for i in range(8)))
+            eq(await asyncio.gather(*(self.ioctx.read_async("foo%d" % i)
+                                      for i in range(8))), [b"x"] * 8)
+        asyncio.run(run())
+        [i.remove() for i in self.ioctx.list_objects()]
+
     def test_aio_writesame(self):
         lock = threading.Condition()
         count = [0]
@@ -3,6 +3,7 @@ import base64
 import copy
 import errno
 import functools
+import io
 import json
 import socket
 import os
@@ -1453,6 +1454,67 @@ class TestImage(object):
         eq(sys.getrefcount(comp), 2)
         eq(self.image.read(256, 256), data)
 
+    def test_export_to(self):
+        data = rand_data(256)
+        self.image.write(data, 1 << IMG_ORDER)
+        expected = bytearray(IMG_SIZE)
+        expected[1 << IMG_ORDER:(1 << IMG_ORDER) + 256] = data
+
+        progress = []
+        f = io.BytesIO()
+        eq(self.image.export_to(f, chunk_size=1 << 20, max_in_flight=2,
+                                on_progress=lambda *args:
+                                progress.append(args)),
+           1 << IMG_ORDER)
+        eq(f.getvalue(), expected)
+        eq(progress[-1], (1 << IMG_ORDER, 1 << IMG_ORDER))
+
+        class Stream(io.BytesIO):
+            def seekable(self):
+                return False
+
+        f = Stream()
+        eq(self.image.export_to(f, sparse=False), IMG_SIZE)
+        eq(f.getvalue(), expected)
+
+        f = Stream()
+        eq(self.image.export_to(f, offset=1 << IMG_ORDER, length=512), 512)
+        eq(f.getvalue(), expected[1 << IMG_ORDER:(1 << IMG_ORDER) + 512])
+
+        dst_name = get_temp_image_name()
+        self.rbd.create(ioctx, dst_name, IMG_SIZE, IMG_ORDER)
+        try:
+            with Image(ioctx, dst_name) as dst:
+                self.image.export_to(dst, max_in_flight=1)
+                eq(dst.read(0, IMG_SIZE), expected)
+        finally:
+            self.rbd.remove(ioctx, dst_name)
+
+        assert_raises(InvalidArgument, self.image.export_to, io.BytesIO(),
+                      chunk_size=0)
+
+    def test_import_from(self):
+        data = rand_data(256)
+        src = bytearray(IMG_SIZE)
+        src[1 << IMG_ORDER:(1 << IMG_ORDER) + 256] = data
+
+        progress = []
+        eq(self.image.import_from(io.BytesIO(src), chunk_size=1 << 20,
+                                  max_in_flight=2,
+                                  on_progress=lambda *args:
+                                  progress.append(args)),
+           IMG_SIZE)
+        eq(self.image.read(0, IMG_SIZE), src)
+        eq(progress[-1], (IMG_SIZE, IMG_SIZE))
+        check_diff(self.image, 0, IMG_SIZE, None,
+                   [(1 << IMG_ORDER, 1 << 20, True)])
+
+        eq(self.image.import_from(io.BytesIO(data), offset=256), 256)
+        eq(self.image.read(256, 256), data)
+
+        assert_raises(InvalidArgument, self.image.import_from,
+                      io.BytesIO(data), offset=IMG_SIZE - 128, length=256)
+
     def test_aio_discard(self):
         retval = [None]
         def cb(comp):